@@ -9,9 +9,12 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
 
+import functools
 from abc import ABC, abstractmethod
 from typing import Dict
 
+from pkg.stats import get_crawl_stats
+
 
 class AbstractCrawler(ABC):
 
@@ -33,9 +36,42 @@ class AbstractCrawler(ABC):
         """
         raise NotImplementedError
 
+    async def close(self):
+        """
+        Release the resources held by the crawler job, called after the job finishes, fails or is cancelled
+        Returns:
+
+        """
+        return None
+
+
+
+# 存储方法 -> 统计项名称
+_STORE_STATS_NAMES = {
+    "store_content": "contents",
+    "store_comment": "comments",
+    "store_creator": "creators",
+}
+
+
+def _count_stored(store_method, stats_name: str):
+    @functools.wraps(store_method)
+    async def wrapper(self, *args, **kwargs):
+        result = await store_method(self, *args, **kwargs)
+        get_crawl_stats().incr(stats_name)
+        return result
+
+    return wrapper
 
 
 class AbstractStore(ABC):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 各平台存储实现的保存方法自动计入当前爬虫任务的统计
+        for method_name, stats_name in _STORE_STATS_NAMES.items():
+            if method_name in cls.__dict__:
+                setattr(cls, method_name, _count_stored(cls.__dict__[method_name], stats_name))
+
     @abstractmethod
     async def store_content(self, content_item: Dict):
         """
@@ -17,6 +17,7 @@ from typing_extensions import Annotated
 
 import config
 import constant
+from pkg.tools.publish_time_window import parse_time_bound
 
 
 class PlatformEnum(str, Enum):
@@ -38,6 +39,13 @@ class CrawlerTypeEnum(str, Enum):
     HOMEFEED = constant.CRALER_TYPE_HOMEFEED
 
 
+class DetailModeEnum(str, Enum):
+    """帖子详情获取模式枚举"""
+    LITE = constant.DETAIL_MODE_LITE
+    FULL = constant.DETAIL_MODE_FULL
+    AUTO = constant.DETAIL_MODE_AUTO
+
+
 class SaveDataOptionEnum(str, Enum):
     """数据保存选项枚举"""
     CSV = "csv"
@@ -45,6 +53,43 @@ class SaveDataOptionEnum(str, Enum):
     JSON = "json"
 
 
+def _validate_platforms(platform: str) -> str:
+    """
+    校验平台参数，支持逗号分隔的多个平台
+    Args:
+        platform: 平台参数
+
+    Returns:
+        str: 去除空白后的平台参数
+    """
+    platform_list = [item.strip() for item in platform.split(",") if item.strip()]
+    supported_platforms = [item.value for item in PlatformEnum]
+    for item in platform_list:
+        if item not in supported_platforms:
+            raise typer.BadParameter(
+                f"不支持的平台: {item}，可选值: {', '.join(supported_platforms)}"
+            )
+    if not platform_list:
+        raise typer.BadParameter("至少需要指定一个平台")
+    return ",".join(platform_list)
+
+
+def _validate_time_bound(time_str: str) -> str:
+    """
+    校验发布时间窗口参数
+    Args:
+        time_str: 发布时间参数
+
+    Returns:
+        str: 去除空白后的发布时间参数
+    """
+    try:
+        parse_time_bound(time_str)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    return (time_str or "").strip()
+
+
 def parse_cmd():
     """
     解析命令行参数并更新配置
@@ -54,12 +99,13 @@ def parse_cmd():
     """
     def main(
         platform: Annotated[
-            PlatformEnum,
+            str,
             typer.Option(
                 "--platform",
-                help="🎯 选择媒体平台 (xhs=小红书, dy=抖音, ks=快手, bili=B站, wb=微博, tieba=贴吧, zhihu=知乎)"
+                help="🎯 选择媒体平台 (xhs=小红书, dy=抖音, ks=快手, bili=B站, wb=微博, tieba=贴吧, zhihu=知乎)，多个平台用逗号分隔，在同一个进程中并发爬取",
+                callback=_validate_platforms,
             )
-        ] = PlatformEnum.XHS,
+        ] = PlatformEnum.XHS.value,
 
         crawler_type: Annotated[
             CrawlerTypeEnum,
@@ -93,6 +139,50 @@ def parse_cmd():
             )
         ] = config.KEYWORDS,
 
+        job_file: Annotated[
+            str,
+            typer.Option(
+                "--job_file",
+                help="📋 多平台任务文件（JSON列表，每个任务是一组配置项，例如 {\"PLATFORM\": \"xhs\", \"KEYWORDS\": \"AI\"}），指定后忽略 --platform",
+            )
+        ] = config.PLATFORM_JOB_FILE,
+
+        workers: Annotated[
+            int,
+            typer.Option(
+                "--workers",
+                min=1,
+                help="⚙️ 子进程数量，大于1时按关键词、创作者、帖子ID把任务分片，交给多个子进程并行爬取",
+            )
+        ] = config.CRAWLER_WORKER_PROCESS_NUM,
+
+        detail_mode: Annotated[
+            DetailModeEnum,
+            typer.Option(
+                "--detail-mode",
+                "--detail_mode",
+                help="📄 帖子详情获取模式 (full=每个帖子都请求详情, lite=直接用列表中的数据不请求详情, auto=列表数据缺少必要字段时才请求详情)，支持小红书、B站",
+            )
+        ] = config.NOTE_DETAIL_MODE,
+
+        since: Annotated[
+            str,
+            typer.Option(
+                "--since",
+                help="🕒 只爬取这个时间之后发布的帖子，支持 2024-01-01、\"2024-01-01 12:00:00\" 或者 7d（最近7天）",
+                callback=_validate_time_bound,
+            )
+        ] = config.CRAWLER_PUBLISH_TIME_SINCE,
+
+        until: Annotated[
+            str,
+            typer.Option(
+                "--until",
+                help="🕒 只爬取这个时间之前发布的帖子，格式同 --since，只写日期时包含当天",
+                callback=_validate_time_bound,
+            )
+        ] = config.CRAWLER_PUBLISH_TIME_UNTIL,
+
     ):
         """
         🚀 MediaCrawlerPro - 多平台媒体爬虫工具
@@ -110,13 +200,30 @@ def parse_cmd():
         • 禁用断点续爬：
           python main.py --platform wb --type detail --no-enable_checkpoint
 
+        • 同一个进程并发爬取多个平台：
+          python main.py --platform xhs,dy,bili --type search --keywords "AI"
+
+        • 4个子进程并行爬取多个关键词：
+          python main.py --platform xhs --type search --keywords "AI,深度学习,大模型,机器人" --workers 4
+
+        • 只用搜索结果保存帖子，不请求帖子详情：
+          python main.py --platform xhs --type search --keywords "AI" --detail-mode lite
+
+        • 只爬取创作者最近7天发布的视频：
+          python main.py --platform dy --type creator --since 7d
+
         """
         # 更新全局配置，保持与原有逻辑的兼容性
-        config.PLATFORM = platform.value
+        config.PLATFORM = platform
         config.CRAWLER_TYPE = crawler_type.value
         config.KEYWORDS = keywords
         config.ENABLE_CHECKPOINT = enable_checkpoint
         config.SPECIFIED_CHECKPOINT_ID = checkpoint_id
+        config.PLATFORM_JOB_FILE = job_file
+        config.CRAWLER_WORKER_PROCESS_NUM = workers
+        config.NOTE_DETAIL_MODE = detail_mode.value
+        config.CRAWLER_PUBLISH_TIME_SINCE = since
+        config.CRAWLER_PUBLISH_TIME_UNTIL = until
 
 
     # 检查是否是帮助命令
@@ -12,4 +12,9 @@
 from .base_config import *
 from .db_config import *
 from .proxy_config import *
-from .sign_srv_config import *
\ No newline at end of file
+from .sign_srv_config import *
+
+# 多平台同进程运行时，每个爬虫任务在自己的配置作用域里读写配置
+from .config_scope import enter_config_scope, install_config_scope
+
+install_config_scope(__name__)
@@ -11,11 +11,15 @@
 
 # 基础配置
 import os
-from typing import List
+from typing import Dict, List
 
 from constant import MYSQL_ACCOUNT_SAVE
 
-PLATFORM = "bili"
+PLATFORM = "bili"  # 多个平台用逗号分隔，例如 "xhs,dy,bili"，在同一个进程中并发爬取
+
+# 多平台任务文件路径（JSON列表），每个任务是一组配置项，例如 [{"PLATFORM": "xhs", "KEYWORDS": "AI"}, {"PLATFORM": "dy", "CRAWLER_TYPE": "detail"}]
+# 任务中没有指定的配置项使用本文件中的配置，指定后忽略 PLATFORM 配置
+PLATFORM_JOB_FILE = ""
 KEYWORDS = "trust"
 
 # 具体值参见media_platform.xxx.field下的枚举值，暂时只支持小红书
@@ -25,6 +29,11 @@ SORT_TYPE = "popularity_descending"
 PUBLISH_TIME_TYPE = 0
 CRAWLER_TYPE = "search"  # 爬取类型，search(关键词搜索) | detail(帖子详情)| creator(创作者主页数据) | homefeed(首页推荐)
 
+# 帖子详情获取模式，目前支持小红书、B站（抖音、快手的列表接口本身就返回完整的帖子，不会单独请求详情）
+# full: 每个帖子都请求详情接口 | lite: 直接用搜索、创作者主页、首页推荐列表中的数据保存帖子，不请求详情 | auto: 列表数据缺少必要字段时才请求详情
+# 小红书列表数据中没有发布时间，设置了 CRAWLER_PUBLISH_TIME_SINCE/UNTIL 时 lite、auto 模式也会请求详情
+NOTE_DETAIL_MODE = "full"
+
 # 数据保存类型选项配置,支持三种类型：csv、db、json
 SAVE_DATA_OPTION = "json"  # csv or db or json
 
@@ -37,9 +46,52 @@ START_PAGE = 1
 # 爬取视频/帖子的数量控制
 CRAWLER_MAX_NOTES_COUNT = 40
 
+# 发布时间窗口，只爬取发布时间在这个范围内的帖子，为空表示不限制
+# 支持日期 "2024-01-01"、日期时间 "2024-01-01 12:00:00"，或者最近N天 "7d"，只写日期的结束时间包含当天
+# 窗口外的帖子在请求详情和评论之前跳过，创作者主页、按最新排序的搜索等按发布时间倒序的列表越过开始时间后停止翻页
+CRAWLER_PUBLISH_TIME_SINCE = ""
+CRAWLER_PUBLISH_TIME_UNTIL = ""
+
 # 并发爬虫数量控制（请勿对平台发起大规模请求，并发控制仅限用于学习python的并发控制技术⚠️⚠️）
 MAX_CONCURRENCY_NUM = 1
 
+# 多账号并行：同时使用多少个账号（每个账号各自的客户端和IP）爬取同一个任务，请求由进行中请求最少的客户端执行
+# 实际数量受账号池中可用账号数量限制，每个客户端同时最多执行 MAX_CONCURRENCY_NUM 个请求，按各自账号的限速发起
+ACCOUNT_WORKER_NUM = 1
+
+# 自适应并发（AIMD）：请求正常时缓慢增加并发，出现访问频次异常、IP被封、验证码（461/471）或者延迟升高时成倍减少并发
+# 开启后 MAX_CONCURRENCY_NUM 作为并发上限，关闭后并发数固定为 MAX_CONCURRENCY_NUM
+ENABLE_ADAPTIVE_CONCURRENCY = True
+# 初始并发数
+ADAPTIVE_CONCURRENCY_INITIAL = 1
+# 每次减少并发时乘以的系数
+ADAPTIVE_CONCURRENCY_DECREASE_FACTOR = 0.5
+# 请求延迟超过平均延迟的多少倍视为延迟升高
+ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE = 2.0
+# 两次减少并发之间的冷却时间，单位：秒
+ADAPTIVE_CONCURRENCY_BACKOFF_COOLDOWN = 5
+
+# 搜索模式流水线：搜索翻页、帖子详情、帖子评论三个阶段通过有界队列串联，翻页可以和评论抓取重叠进行
+# 详情阶段、评论阶段各自的worker数量（每个worker一次处理一页搜索结果）
+SEARCH_PIPELINE_DETAIL_WORKERS = 1
+SEARCH_PIPELINE_COMMENT_WORKERS = 1
+# 阶段之间队列的容量（单位：页），控制搜索翻页最多领先后面阶段多少页
+SEARCH_PIPELINE_QUEUE_SIZE = 2
+
+# 搜索模式同时搜索的关键词数量，每个关键词在检查点中有自己的翻页游标
+SEARCH_KEYWORD_CONCURRENCY = 1
+
+# 多进程模式（--workers N）：主进程把任务按关键词（search）、创作者（creator）、帖子ID（detail）分成 N 片，
+# 每个子进程运行自己的事件循环，解析、入库等CPU密集的工作可以用上多个CPU核心，每个分片有自己的检查点
+# 首页推荐流（homefeed）无法分片，仍然在单个进程中运行
+CRAWLER_WORKER_PROCESS_NUM = 1
+
+# CPU密集的页面解析（小红书网页中的 __INITIAL_STATE__、贴吧网页）放到进程池中执行，避免大页面的解析阻塞事件循环
+# 进程池中的进程数量，0表示不使用进程池，全部在事件循环中解析
+EXTRACTION_PROCESS_NUM = 2
+# 页面内容超过该大小（字符数）时才放到进程池中解析，小页面直接解析比进程间传输更快
+EXTRACTION_OFFLOAD_MIN_SIZE = 64 * 1024
+
 # 是否开启爬评论模式, 默认不开启爬评论
 ENABLE_GET_COMMENTS = True  # Disabled to reduce CAPTCHA triggers
 
@@ -49,6 +101,36 @@ ENABLE_GET_SUB_COMMENTS = False
 # 有的帖子评论数量太大了，这个变量用于一个帖子评论的最大数量，0表示不限制
 PER_NOTE_MAX_COMMENTS_COUNT = 0
 
+# 单次运行所有帖子最多爬取的评论数量，0表示不限制；按帖子上的评论数量把预算分配给各个帖子，评论数量为0的帖子不会请求评论接口
+CRAWLER_MAX_COMMENTS_COUNT_PER_RUN = 0
+
+# 增量爬取评论：记录每个帖子已保存的最新一级评论（ID和时间），再次爬取同一个帖子时按时间倒序翻页，遇到已保存的评论就停止翻页
+# 适合每天监控相同帖子的场景，目前支持小红书、B站、知乎（这几个平台的评论接口可以按时间倒序返回）
+# 注意：已保存的一级评论下新增的二级评论不会被增量爬取
+ENABLE_INCREMENTAL_COMMENTS = False
+# 评论水位的存储类型，支持 sqlite（单机） 和 redis
+COMMENT_WATERMARK_STORAGE_TYPE = "sqlite"
+
+# 跳过没有变化的帖子：记录搜索、创作者主页、首页推荐等列表接口返回的点赞数、评论数、更新时间，
+# 再次爬取时这些元数据都没有变化的帖子不再请求详情和评论，只记录看到帖子的时间，目前支持小红书、B站
+ENABLE_NOTE_FRESHNESS_CHECK = False
+# 帖子快照的存储类型，支持 sqlite（单机） 和 redis
+NOTE_SNAPSHOT_STORAGE_TYPE = "sqlite"
+
+# 跨关键词、跨任务去重：记录已经爬取过详情和评论的帖子，同一个帖子在其他关键词或者之后的任务中再次出现时，
+# 不再请求详情和评论，只记录新的来源关键词。开启后优先于 ENABLE_NOTE_FRESHNESS_CHECK，有变化的帖子也不会重新爬取
+ENABLE_NOTE_DEDUP = False
+# 已爬取帖子集合的存储类型，支持 sqlite（单机） 和 redis
+NOTE_SEEN_SET_STORAGE_TYPE = "sqlite"
+# 布隆过滤器预计保存的帖子数量（每个平台），超过后误判率升高，误判的帖子会被精确查询纠正
+NOTE_SEEN_SET_CAPACITY = 1000000
+
+# 平台辅助参数缓存：抖音 msToken/webid、B站 w_webid、微博创作者容器ID等预备请求的结果，
+# 按平台、账号持久化缓存，程序重启后在有效期内直接复用，不再重复请求
+ENABLE_PLATFORM_AUX_CACHE = True
+# 平台辅助参数缓存的存储类型，支持 sqlite（单机） 和 redis
+PLATFORM_AUX_CACHE_STORAGE_TYPE = "sqlite"
+
 # 是否开启日志打印输出到文件中
 ENABLE_LOG_FILE = True
 
@@ -61,6 +143,11 @@ SPECIFIED_CHECKPOINT_ID = ""
 # 检查点存储类型，支持 file 和 redis
 CHECKPOINT_STORAGE_TYPE = "file"  # file or redis
 
+# 二级评论游标先缓存在内存中，一级评论的二级评论爬完，或者缓存的页数、秒数达到下面的值时写入检查点
+# 值越小进程崩溃后重爬的二级评论越少，读写检查点的次数越多
+CHECKPOINT_SUB_COMMENT_FLUSH_PAGES = 10
+CHECKPOINT_SUB_COMMENT_FLUSH_SECONDS = 30
+
 # 是否开启微博爬取全文的功能，默认不开启（关键词搜索、创作者主页的返回的帖子里表，如果正文过长，则只返回部分内容）
 # 如果开启的话会增加被风控的概率，相当于一个关键词搜索请求会再遍历所有帖子的时候，再请求一次帖子详情
 ENABLE_WEIBO_FULL_TEXT = False
@@ -68,6 +155,56 @@ ENABLE_WEIBO_FULL_TEXT = False
 # 爬虫请求间隔时间，单位：秒，默认1秒
 CRAWLER_TIME_SLEEP = 10  # 增加延迟以减少CAPTCHA触发
 
+# 请求限速（令牌桶），同一 (平台, 账号) 的所有请求共享一个令牌桶，所有客户端的 request() 发起请求前都会先拿令牌
+# 每个账号的每秒请求数，0 表示按 1 / CRAWLER_TIME_SLEEP 计算
+CRAWLER_PACING_RATE = 0
+# 令牌桶容量，允许的最大突发请求数
+CRAWLER_PACING_BURST = 1
+# 按接口类型额外限制每秒请求数，在账号速率之内再限速，接口类型：search | comment | default，例如 {"comment": 0.05}
+CRAWLER_PACING_ENDPOINT_RATES: Dict[str, float] = {}
+
+# 相同请求合并（single-flight）：同一个账号并发发起的相同只读请求（方法、URI、参数/请求体都相同）只发送一次，
+# 其他协程等待第一个请求的结果，例如多个帖子共用的创作者信息、并行的登录态检查、多个关键词搜到的同一个帖子
+ENABLE_REQUEST_COALESCING = True
+
+# 请求重试策略：只重试临时性错误（网络异常、超时、访问频次异常、429/503），账号/IP被风控时直接更换账号，签名错误等确定性错误不重试
+# 单个请求最多尝试次数
+RETRY_MAX_ATTEMPTS = 5
+# 指数退避的基数和上限，单位：秒，第n次重试等待 random(0, min(上限, 基数 * 2^(n-1)))
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_MAX = 10
+# 服务端返回 Retry-After 时最多等待的时间，单位：秒
+RETRY_AFTER_MAX_WAIT = 60
+# 单次运行所有请求共享的重试次数预算，用完之后不再重试（直接抛出原始异常，不更换账号），0表示不限制
+RETRY_BUDGET_PER_RUN = 200
+
+# 爬虫守护进程（python daemon.py）：常驻进程保持数据库连接池、签名服务客户端等资源，从持久化任务队列中领取任务运行
+# 任务队列存储类型，支持 sqlite（单机） 和 redis
+DAEMON_JOB_STORAGE_TYPE = "sqlite"
+# 守护进程本地HTTP接口的监听地址和端口，web_ui 通过该接口提交、查询、取消任务
+DAEMON_API_HOST = "127.0.0.1"
+DAEMON_API_PORT = 8765
+# 同时运行的任务数量
+DAEMON_MAX_RUNNING_JOBS = 1
+# 领取新任务、检查取消请求的间隔时间，单位：秒
+DAEMON_POLL_INTERVAL = 1
+
+# 分布式工作队列：开启后帖子详情、帖子评论、创作者作为独立任务放入工作队列，多台机器运行相同的命令即可共同消费
+# 目前支持小红书的 detail 和 creator 模式，入队是幂等的，各机器重复入队相同的帖子或创作者不会重复爬取
+ENABLE_WORK_QUEUE = False
+# 工作队列类型，支持 redis（多机共享） 和 memory（单机）
+WORK_QUEUE_TYPE = "redis"
+# 队列名称，名称相同的机器共享任务，队列处理完后会清空入队记录，下一轮用相同名称重新运行即可
+WORK_QUEUE_NAME = "default"
+# 可见性超时时间，单位：秒，消费者在该时间内没有确认（处理过程中会自动续租，宕机时才会超时）的任务会重新投递
+WORK_QUEUE_LEASE_SECONDS = 300
+# 任务最多投递次数，达到后仍然失败的任务进入死信队列
+WORK_QUEUE_MAX_DELIVERIES = 3
+# 每台机器同时处理的任务数量
+WORK_QUEUE_WORKER_NUM = 1
+# 队列为空但其他机器还有未确认的任务时，再次领取的间隔时间，单位：秒
+WORK_QUEUE_POLL_INTERVAL = 1
+
 # 已废弃⚠️⚠️⚠️指定小红书需要爬虫的笔记ID列表
 # 已废弃⚠️⚠️⚠️ 指定笔记ID笔记列表会因为缺少xsec_token和xsec_source参数导致爬取失败
 # XHS_SPECIFIED_ID_LIST = [
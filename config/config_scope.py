@@ -0,0 +1,69 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按协程上下文隔离的配置作用域，同一个进程里并发运行多个平台的爬虫时，每个爬虫使用自己的配置
+import sys
+from contextvars import ContextVar
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+# 当前上下文的配置覆盖项，None 表示没有进入配置作用域，读写的都是模块全局配置
+_config_overrides_var: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "config_overrides", default=None
+)
+
+
+class ScopedConfigModule(ModuleType):
+    """
+    config 包的模块类型，读取配置时优先使用当前上下文的覆盖项；
+    进入配置作用域之后，对 config.XXX 的赋值也只写入当前作用域，不会影响其他爬虫
+    """
+
+    def __getattribute__(self, name: str) -> Any:
+        if not name.startswith("__"):
+            overrides = _config_overrides_var.get()
+            if overrides is not None and name in overrides:
+                return overrides[name]
+        return super().__getattribute__(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        overrides = _config_overrides_var.get()
+        if overrides is not None and not name.startswith("__"):
+            overrides[name] = value
+            return
+        super().__setattr__(name, value)
+
+
+def install_config_scope(module_name: str) -> None:
+    """
+    把 config 包的模块类型替换为 ScopedConfigModule
+    Args:
+        module_name: config 包的模块名
+
+    Returns:
+
+    """
+    sys.modules[module_name].__class__ = ScopedConfigModule
+
+
+def enter_config_scope(overrides: Dict[str, Any]) -> None:
+    """
+    在当前上下文进入配置作用域，一般在 asyncio 任务内调用，
+    任务会复制创建时的上下文，所以作用域只对当前任务及其创建的子任务生效
+    Args:
+        overrides: 配置覆盖项，配置名 -> 配置值
+
+    Returns:
+
+    """
+    parent_overrides = _config_overrides_var.get() or {}
+    _config_overrides_var.set({**parent_overrides, **overrides})
@@ -28,3 +28,7 @@ CRALER_TYPE_DETAIL = 'detail'
 CRALER_TYPE_CREATOR = 'creator'
 CRALER_TYPE_HOMEFEED = 'homefeed'
 
+DETAIL_MODE_LITE = 'lite'
+DETAIL_MODE_FULL = 'full'
+DETAIL_MODE_AUTO = 'auto'
+
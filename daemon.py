@@ -0,0 +1,230 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻的爬虫守护进程，从持久化任务队列领取任务运行，并提供本地HTTP接口提交、查询、取消任务
+#            python daemon.py
+#            POST /jobs                 {"platform": "xhs", "crawler_type": "search", "config_overrides": {"KEYWORDS": "AI"}}
+#            GET  /jobs                 最近的任务列表
+#            GET  /jobs/{job_id}        任务详情，结束的任务包含运行统计
+#            POST /jobs/{job_id}/cancel 取消任务
+import asyncio
+import sys
+from typing import Any, Dict, Set
+
+from aiohttp import web
+from pydantic import ValidationError
+
+import config
+from constant import MYSQL_ACCOUNT_SAVE
+from main import run_crawler_job, validate_crawler_job
+from model.m_crawl_job import CrawlJob, CrawlJobStatus
+from pkg.tools import utils
+from pkg.tools.utils import init_logging_config
+from repo.crawl_job import CrawlJobRepoManager, create_crawl_job_manager
+
+
+class CrawlDaemon:
+    def __init__(
+        self,
+        job_manager: CrawlJobRepoManager,
+        max_running_jobs: int = config.DAEMON_MAX_RUNNING_JOBS,
+        poll_interval: float = config.DAEMON_POLL_INTERVAL,
+    ):
+        """
+        crawl daemon constructor
+        Args:
+            job_manager: 任务队列管理器
+            max_running_jobs: 同时运行的任务数量
+            poll_interval: 领取新任务、检查取消请求的间隔时间
+        """
+        self.job_manager = job_manager
+        self._max_running_jobs = max(1, max_running_jobs)
+        self._poll_interval = poll_interval
+        self._running_tasks: Dict[str, asyncio.Task] = {}
+        # 已经发出取消的任务，爬虫释放资源期间不再重复取消，避免打断释放过程
+        self._cancelling_job_ids: Set[str] = set()
+
+    async def submit_job(self, job_params: Dict[str, Any]) -> CrawlJob:
+        """
+        提交任务，任务参数保存在任务自身，运行时作为配置作用域的覆盖项，不再改写配置文件
+        Args:
+            job_params: 任务参数
+
+        Returns:
+            CrawlJob: 提交后的任务
+        """
+        job = CrawlJob(
+            platform=job_params.get("platform"),
+            crawler_type=job_params.get("crawler_type", config.CRAWLER_TYPE),
+            config_overrides=job_params.get("config_overrides") or {},
+        )
+        validate_crawler_job(job.to_crawler_job())
+        return await self.job_manager.submit_job(job)
+
+    async def run_forever(self) -> None:
+        """
+        持续领取并运行任务
+        Returns:
+
+        """
+        requeued_count = await self.job_manager.requeue_interrupted_jobs(
+            list(self._running_tasks)
+        )
+        if requeued_count:
+            utils.logger.info(
+                f"[CrawlDaemon.run_forever] requeue {requeued_count} interrupted jobs"
+            )
+
+        while True:
+            await self._cancel_requested_jobs()
+            while len(self._running_tasks) < self._max_running_jobs:
+                job = await self.job_manager.claim_next_job()
+                if job is None:
+                    break
+                utils.logger.info(f"[CrawlDaemon.run_forever] start job: {job.id}")
+                self._running_tasks[job.id] = asyncio.create_task(self._run_job(job))
+            await asyncio.sleep(self._poll_interval)
+
+    async def _cancel_requested_jobs(self) -> None:
+        """
+        停止收到取消请求的运行中任务
+        Returns:
+
+        """
+        for job_id, task in list(self._running_tasks.items()):
+            if job_id in self._cancelling_job_ids:
+                continue
+            job = await self.job_manager.load_job(job_id)
+            if job and job.cancel_requested and not task.done():
+                utils.logger.info(f"[CrawlDaemon] cancel running job: {job_id}")
+                self._cancelling_job_ids.add(job_id)
+                task.cancel()
+
+    async def stop(self) -> None:
+        """
+        守护进程退出时取消所有运行中的任务，并等待各个爬虫释放资源（任务保持 running 状态，下次启动时重新入队）
+        Returns:
+
+        """
+        running_tasks = list(self._running_tasks.values())
+        for task in running_tasks:
+            task.cancel()
+        await asyncio.gather(*running_tasks, return_exceptions=True)
+
+    async def _run_job(self, job: CrawlJob) -> None:
+        """
+        在独立的配置作用域中运行任务并记录结果
+        Args:
+            job: 任务
+
+        Returns:
+
+        """
+        try:
+            job_stats = await run_crawler_job(job.to_crawler_job())
+            await self.job_manager.finish_job(job, CrawlJobStatus.SUCCEEDED, stats=job_stats)
+        except asyncio.CancelledError:
+            latest_job = await self.job_manager.load_job(job.id)
+            if latest_job is None or not latest_job.cancel_requested:
+                # 守护进程退出导致的取消，任务保持 running 状态，下次启动时重新入队
+                raise
+            await self.job_manager.finish_job(job, CrawlJobStatus.CANCELLED)
+        except Exception as e:
+            utils.logger.error(f"[CrawlDaemon] job {job.id} failed: {e!r}")
+            await self.job_manager.finish_job(job, CrawlJobStatus.FAILED, repr(e))
+        finally:
+            self._running_tasks.pop(job.id, None)
+            self._cancelling_job_ids.discard(job.id)
+            utils.logger.info(f"[CrawlDaemon] job finished: {job.id}")
+
+    def create_api_app(self) -> web.Application:
+        """
+        创建本地HTTP接口
+        Returns:
+
+        """
+        routes = web.RouteTableDef()
+
+        @routes.post("/jobs")
+        async def submit(request: web.Request) -> web.Response:
+            try:
+                job = await self.submit_job(await request.json())
+            except (ValueError, ValidationError) as e:
+                return web.json_response({"error": str(e)}, status=400)
+            return web.json_response(job.model_dump(mode="json"))
+
+        @routes.get("/jobs")
+        async def list_jobs(request: web.Request) -> web.Response:
+            limit = int(request.query.get("limit", 50))
+            jobs = await self.job_manager.list_jobs(limit)
+            return web.json_response([job.model_dump(mode="json") for job in jobs])
+
+        @routes.get("/jobs/{job_id}")
+        async def status(request: web.Request) -> web.Response:
+            job = await self.job_manager.load_job(request.match_info["job_id"])
+            if job is None:
+                return web.json_response({"error": "job not found"}, status=404)
+            return web.json_response(job.model_dump(mode="json"))
+
+        @routes.post("/jobs/{job_id}/cancel")
+        async def cancel(request: web.Request) -> web.Response:
+            job = await self.job_manager.cancel_job(request.match_info["job_id"])
+            if job is None:
+                return web.json_response({"error": "job not found"}, status=404)
+            return web.json_response(job.model_dump(mode="json"))
+
+        app = web.Application()
+        app.add_routes(routes)
+        return app
+
+
+async def daemon_main():
+    init_logging_config()
+
+    # 数据库连接池在守护进程启动时初始化一次，所有任务共用
+    use_db = config.SAVE_DATA_OPTION == "db" or config.ACCOUNT_POOL_SAVE_TYPE in [
+        MYSQL_ACCOUNT_SAVE
+    ]
+    if use_db:
+        import db
+
+        await db.init_db()
+
+    daemon = CrawlDaemon(create_crawl_job_manager())
+    runner = web.AppRunner(daemon.create_api_app())
+    await runner.setup()
+    await web.TCPSite(runner, config.DAEMON_API_HOST, config.DAEMON_API_PORT).start()
+    utils.logger.info(
+        f"[daemon_main] crawl daemon api listening on http://{config.DAEMON_API_HOST}:{config.DAEMON_API_PORT}"
+    )
+
+    try:
+        await daemon.run_forever()
+    finally:
+        await daemon.stop()
+        await runner.cleanup()
+        if "pkg.rpc.sign_srv_client" in sys.modules:
+            await sys.modules["pkg.rpc.sign_srv_client"].close_sign_client()
+        # 关闭解析进程池
+        if "pkg.extraction" in sys.modules:
+            sys.modules["pkg.extraction"].shutdown_extraction_executor()
+        if use_db:
+            await db.close()
+
+
+if __name__ == "__main__":
+    try:
+        if sys.platform == "win32":
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        asyncio.get_event_loop().run_until_complete(daemon_main())
+    except KeyboardInterrupt:
+        sys.exit()
@@ -10,56 +10,137 @@
 
 
 import asyncio
+import importlib
+import json
 import sys
-from typing import Dict, Optional, Type
+from typing import Any, Dict, List, Type
 
 import cmd_arg
 import config
 import constant
-import db
 from base.base_crawler import AbstractCrawler
-from media_platform.bilibili import BilibiliCrawler
-from media_platform.douyin import DouYinCrawler
-from media_platform.kuaishou import KuaiShouCrawler
-from media_platform.tieba import TieBaCrawler
-from media_platform.weibo import WeiboCrawler
-from media_platform.xhs import XiaoHongShuCrawler
-from media_platform.zhihu import ZhihuCrawler
 from constant import MYSQL_ACCOUNT_SAVE
+from pkg.tools import utils
 from pkg.tools.utils import init_logging_config
 
 
 class CrawlerFactory:
-    CRAWLERS: Dict[str, AbstractCrawler] = {
-        constant.XHS_PLATFORM_NAME: XiaoHongShuCrawler,
-        constant.WEIBO_PLATFORM_NAME: WeiboCrawler,
-        constant.TIEBA_PLATFORM_NAME: TieBaCrawler,
-        constant.BILIBILI_PLATFORM_NAME: BilibiliCrawler,
-        constant.DOUYIN_PLATFORM_NAME: DouYinCrawler,
-        constant.KUAISHOU_PLATFORM_NAME: KuaiShouCrawler,
-        constant.ZHIHU_PLATFORM_NAME: ZhihuCrawler,
+    # 平台 -> "模块路径:类名"，只在创建爬虫时才导入对应平台的包，避免启动时加载全部平台及其依赖
+    CRAWLERS: Dict[str, str] = {
+        constant.XHS_PLATFORM_NAME: "media_platform.xhs:XiaoHongShuCrawler",
+        constant.WEIBO_PLATFORM_NAME: "media_platform.weibo:WeiboCrawler",
+        constant.TIEBA_PLATFORM_NAME: "media_platform.tieba:TieBaCrawler",
+        constant.BILIBILI_PLATFORM_NAME: "media_platform.bilibili:BilibiliCrawler",
+        constant.DOUYIN_PLATFORM_NAME: "media_platform.douyin:DouYinCrawler",
+        constant.KUAISHOU_PLATFORM_NAME: "media_platform.kuaishou:KuaiShouCrawler",
+        constant.ZHIHU_PLATFORM_NAME: "media_platform.zhihu:ZhihuCrawler",
     }
 
     @staticmethod
-    def create_crawler(platform: str) -> AbstractCrawler:
+    def get_crawler_class(platform: str) -> Type[AbstractCrawler]:
         """
-        Create a crawler instance by platform
+        Import and return the crawler class registered for the platform
         Args:
             platform:
 
         Returns:
 
         """
-        crawler_class: Optional[Type[AbstractCrawler]] = CrawlerFactory.CRAWLERS.get(
-            platform
-        )
-        if not crawler_class:
+        crawler_path = CrawlerFactory.CRAWLERS.get(platform)
+        if not crawler_path:
             raise ValueError(
                 "Invalid Media Platform Currently only supported xhs or dy or ks or bili ..."
             )
+        module_path, class_name = crawler_path.split(":")
+        return getattr(importlib.import_module(module_path), class_name)
+
+    @staticmethod
+    def create_crawler(platform: str) -> AbstractCrawler:
+        """
+        Create a crawler instance by platform
+        Args:
+            platform:
+
+        Returns:
+
+        """
+        crawler_class = CrawlerFactory.get_crawler_class(platform)
         return crawler_class()
 
 
+def validate_crawler_job(crawler_job: Dict[str, Any]) -> None:
+    """
+    校验爬虫任务的平台和配置项
+    Args:
+        crawler_job: 爬虫任务（配置覆盖项）
+
+    Returns:
+
+    """
+    if crawler_job.get("PLATFORM") not in CrawlerFactory.CRAWLERS:
+        raise ValueError(f"任务 {crawler_job} 的 PLATFORM 无效")
+    for config_name in crawler_job:
+        if not hasattr(config, config_name):
+            raise ValueError(f"任务 {crawler_job} 中的配置项 {config_name} 不存在")
+
+
+def load_crawler_jobs() -> List[Dict[str, Any]]:
+    """
+    加载爬虫任务列表，每个任务是一组配置覆盖项，在各自的配置作用域中运行
+    优先使用任务文件，否则按 PLATFORM 中逗号分隔的平台各创建一个任务
+    Returns:
+        List[Dict[str, Any]]: 爬虫任务列表
+    """
+    if not config.PLATFORM_JOB_FILE:
+        return [
+            {"PLATFORM": platform.strip()}
+            for platform in config.PLATFORM.split(",")
+            if platform.strip()
+        ]
+
+    with open(config.PLATFORM_JOB_FILE, "r", encoding="utf-8") as f:
+        crawler_jobs = json.load(f)
+    if not isinstance(crawler_jobs, list):
+        raise ValueError(f"任务文件 {config.PLATFORM_JOB_FILE} 的内容必须是任务列表")
+    for crawler_job in crawler_jobs:
+        validate_crawler_job(crawler_job)
+    return crawler_jobs
+
+
+async def run_crawler_job(crawler_job: Dict[str, Any]) -> Dict[str, int]:
+    """
+    在独立的配置作用域中运行一个平台的爬虫，爬虫内部对 config 的读写都只作用于当前任务
+    Args:
+        crawler_job: 爬虫任务（配置覆盖项）
+
+    Returns:
+        Dict[str, int]: 任务的运行统计
+    """
+    # pkg.retry 依赖 httpx，在运行任务时才导入，避免拖慢启动
+    from pkg.rate_limit import enter_concurrency_scope, get_concurrency_metrics
+    from pkg.retry import enter_retry_budget_scope
+    from pkg.stats import enter_crawl_stats_scope
+
+    config.enter_config_scope(crawler_job)
+    retry_budget = enter_retry_budget_scope()
+    crawl_stats = enter_crawl_stats_scope()
+    enter_concurrency_scope()
+    crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
+    try:
+        await crawler.async_initialize()
+        await crawler.start()
+    finally:
+        # 任务失败或被取消（守护进程的取消请求）时，也要等爬虫释放资源后才返回
+        await crawler.close()
+    crawl_stats.incr("retries", retry_budget.used)
+    # 任务结束时自适应并发控制器调整到的并发数
+    for limiter_name, limit in get_concurrency_metrics().items():
+        crawl_stats.incr(f"concurrency_limit.{limiter_name}", limit)
+    job_stats = crawl_stats.snapshot()
+    utils.logger.info(f"[run_crawler_job] {config.PLATFORM} crawler job finished, stats: {job_stats}")
+    return job_stats
+
+
 async def main():
     print(
         """
@@ -81,27 +162,58 @@ async def main():
     # init logging config
     init_logging_config()
 
+    crawler_jobs = load_crawler_jobs()
+
+    # 多进程模式：主进程把任务按关键词、创作者、帖子ID分片，交给多个子进程各自运行事件循环
+    if config.CRAWLER_WORKER_PROCESS_NUM > 1:
+        from supervisor import run_supervisor
+
+        await run_supervisor(crawler_jobs, config.CRAWLER_WORKER_PROCESS_NUM)
+        return
+
     # store or read using database, init db
-    if config.SAVE_DATA_OPTION == "db" or config.ACCOUNT_POOL_SAVE_TYPE in [
-        MYSQL_ACCOUNT_SAVE
-    ]:
+    use_db = any(
+        crawler_job.get("SAVE_DATA_OPTION", config.SAVE_DATA_OPTION) == "db"
+        or crawler_job.get("ACCOUNT_POOL_SAVE_TYPE", config.ACCOUNT_POOL_SAVE_TYPE)
+        in [MYSQL_ACCOUNT_SAVE]
+        for crawler_job in crawler_jobs
+    )
+    if use_db:
+        # aiomysql 只在需要数据库时才导入
+        import db
+
         await db.init_db()
 
-    crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.async_initialize()
-    await crawler.start()
+    # 多个平台在同一个事件循环中并发运行，共享数据库连接池、缓存客户端和签名服务客户端
+    results = await asyncio.gather(
+        *[run_crawler_job(crawler_job) for crawler_job in crawler_jobs],
+        return_exceptions=True,
+    )
+    for crawler_job, result in zip(crawler_jobs, results):
+        if isinstance(result, BaseException) and len(results) > 1:
+            utils.logger.error(
+                f"[main] crawler job {crawler_job} failed: {result!r}"
+            )
+
+    # 用到签名服务的平台运行结束后，关闭共享的签名服务客户端
+    if "pkg.rpc.sign_srv_client" in sys.modules:
+        await sys.modules["pkg.rpc.sign_srv_client"].close_sign_client()
+    # 关闭解析进程池
+    if "pkg.extraction" in sys.modules:
+        sys.modules["pkg.extraction"].shutdown_extraction_executor()
 
     # store or read using database, close db
-    if config.SAVE_DATA_OPTION == "db" or config.ACCOUNT_POOL_SAVE_TYPE in [
-        MYSQL_ACCOUNT_SAVE
-    ]:
+    if use_db:
         await db.close()
 
+    # 只有一个任务时保持原来的行为，异常直接抛出
+    if len(results) == 1 and isinstance(results[0], BaseException):
+        raise results[0]
+
 
 if __name__ == "__main__":
     try:
         # Fix for Windows asyncio event loop
-        import sys
         if sys.platform == 'win32':
             asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
         
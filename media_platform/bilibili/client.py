@@ -15,6 +15,7 @@
 # @Desc    : bilibili 请求客户端
 import asyncio
 import json
+import time
 import traceback
 from typing import Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
@@ -25,7 +26,7 @@ from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
 
 import config
 from base.base_crawler import AbstractApiClient
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+from constant.base_constant import BILIBILI_PLATFORM_NAME
 from constant.bilibili import BILI_API_URL, BILI_INDEX_URL, BILI_SPACE_URL
 from model.m_bilibili import (
     CreatorQueryResponse,
@@ -36,14 +37,18 @@ from model.m_bilibili import (
 from media_platform.bilibili.extractor import BilibiliExtractor
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
-from pkg.cache.cache_factory import CacheFactory
-from pkg.rpc.sign_srv_client import BilibliSignRequest, SignServerClient
+from pkg.cache.aux_cache import AuxCacheNamespace, get_platform_aux_cache
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.rpc.sign_srv_client import BilibliSignRequest, get_sign_client
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
 
-memory_cache = CacheFactory().create_cache("memory")
+# w_webid 从UP主空间页面的HTML中提取，与登录账号绑定，按账号持久化缓存
+W_WEBID_CACHE = AuxCacheNamespace("bili_w_webid", str, ttl=3600 * 12)
 
 
 class BilibiliClient(AbstractApiClient):
@@ -63,7 +68,7 @@ class BilibiliClient(AbstractApiClient):
         """
         self.timeout = timeout
         self._user_agent = user_agent or utils.get_user_agent()
-        self._sign_client = SignServerClient()
+        self._sign_client = get_sign_client()
         self.account_with_ip_pool = account_with_ip_pool
         self.account_info: Optional[AccountWithIpModel] = None
         self._extractor = BilibiliExtractor()
@@ -88,6 +93,17 @@ class BilibiliClient(AbstractApiClient):
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         return self.account_info.account.cookies
@@ -166,7 +182,7 @@ class BilibiliClient(AbstractApiClient):
                 await self.account_with_ip_pool.proxy_ip_pool.get_proxy()
             )
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(1))
+    @request_retry()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -179,8 +195,16 @@ class BilibiliClient(AbstractApiClient):
 
         """
         await self.check_ip_expired()
+        await get_request_pacer().acquire(
+            BILIBILI_PLATFORM_NAME, self._pacing_account_name, url
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        await get_concurrency_controller(BILIBILI_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
         try:
             data: Dict = response.json()
             if data.get("code") != 0:
@@ -200,6 +224,7 @@ class BilibiliClient(AbstractApiClient):
             )
             raise DataFetchError("数据请求失败")
 
+    @coalesce_requests(BILIBILI_PLATFORM_NAME)
     async def get(
         self, uri: str, params=None, enable_params_sign: bool = True, **kwargs
     ) -> Union[Dict, Response]:
@@ -250,6 +275,7 @@ class BilibiliClient(AbstractApiClient):
                 **kwargs,
             )
 
+    @coalesce_requests(BILIBILI_PLATFORM_NAME)
     async def post(self, uri: str, data: dict) -> Union[Dict, Response]:
         """
         POST请求, 对请求参数进行签名
@@ -326,20 +352,24 @@ class BilibiliClient(AbstractApiClient):
         Returns:
             str: w_webid
         """
-        cache_key = f"w_webid_key"
-        ttl = 3600 * 12
-        if memory_cache.get(cache_key):
-            return memory_cache.get(cache_key)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{BILI_SPACE_URL}/{up_id}/dynamic", headers=self.headers
-            )
+        async def fetch_w_webid() -> str:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(
+                    f"{BILI_SPACE_URL}/{up_id}/dynamic", headers=self.headers
+                )
             w_webid = self._extractor.extract_w_webid(response.text)
-            memory_cache.set(cache_key, w_webid, ttl)
             if not w_webid:
                 raise DataFetchError("获取w_webid失败")
-        return w_webid
+            return w_webid
+
+        return await get_platform_aux_cache().get_or_load(
+            W_WEBID_CACHE,
+            BILIBILI_PLATFORM_NAME,
+            self._pacing_account_name,
+            "w_webid",
+            fetch_w_webid,
+        )
 
     async def search_video_by_keyword(
         self,
@@ -68,6 +68,60 @@ class BilibiliExtractor:
             source_keyword=source_keyword_var.get()
         )
     
+    def extract_video_from_list_item(self, video_item: Dict) -> Optional[BilibiliVideo]:
+        """
+        从搜索、UP主主页、首页推荐列表中的视频数据提取视频信息，不需要请求视频详情
+        三种列表的字段不同，列表中没有的统计信息保持为空
+
+        Args:
+            video_item: 列表中的视频数据
+
+        Returns:
+            BilibiliVideo: 视频模型对象，缺少视频ID时返回 None
+        """
+        aid = str(video_item.get("aid", "") or video_item.get("id", ""))
+        bvid = video_item.get("bvid", "")
+        if not aid or not bvid:
+            return None
+
+        stat = video_item.get("stat", {})
+        owner = video_item.get("owner", {})
+        # 搜索结果的标题中用 <em class="keyword"> 标记了关键词
+        title = re.sub(r"<[^>]+>", "", video_item.get("title", ""))
+        cover_url = video_item.get("pic", "")
+        if cover_url.startswith("//"):
+            cover_url = f"https:{cover_url}"
+
+        return BilibiliVideo(
+            video_id=aid,
+            bvid=bvid,
+            video_type=video_item.get("typename") or video_item.get("tname", ""),
+            title=title,
+            desc=video_item.get("description") or video_item.get("desc", ""),
+            create_time=str(video_item.get("pubdate") or video_item.get("created", "")),
+            duration=str(video_item.get("duration") or video_item.get("length", "")),
+
+            # 统计信息
+            liked_count=str(video_item.get("like", stat.get("like", ""))),
+            video_play_count=str(video_item.get("play", stat.get("view", ""))),
+            video_danmaku=str(video_item.get("video_review", stat.get("danmaku", ""))),
+            video_comment=str(
+                video_item.get("review", video_item.get("comment", stat.get("reply", "")))
+            ),
+
+            # 视频链接
+            video_url=f"https://www.bilibili.com/video/{bvid}",
+            video_cover_url=cover_url,
+
+            # 作者信息
+            user_id=str(video_item.get("mid", "") or owner.get("mid", "")),
+            nickname=video_item.get("author") or owner.get("name", ""),
+            avatar=video_item.get("upic") or owner.get("face", ""),
+
+            # 其他信息
+            source_keyword=source_keyword_var.get()
+        )
+
     def extract_comments_from_dict(self, video_id: str, comments_data: List[Dict]) -> List[BilibiliComment]:
         """
         从API响应中提取评论列表
@@ -8,14 +8,17 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
+import math
+from contextlib import aclosing
 from typing import List, Dict, TYPE_CHECKING
 
 import config
 import constant
 from model.m_bilibili import VideoIdInfo
 from model.m_checkpoint import Checkpoint
+from pkg.pipeline import fetch_pages_concurrently
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
 from repo.platform_save_data import bilibili as bilibili_store
 from .base_handler import BaseHandler
 from ..field import SearchOrderType
@@ -157,37 +160,66 @@ class CreatorHandler(BaseHandler):
         result = []
         page_num = int(checkpoint.current_creator_page or 1)
         page_size = 30
-        has_more = True
         saved_creator_count = 0
-        while has_more and saved_creator_count <= config.CRAWLER_MAX_NOTES_COUNT:
+        publish_time_window = PublishTimeWindow.from_config()
+
+        async def fetch_videos_page(page: int) -> Dict:
             utils.logger.info(
-                f"[CreatorHandler.get_all_videos_by_creator] begin get creator_id: {creator_id} videos, page_num: {page_num} ..."
+                f"[CreatorHandler.get_all_videos_by_creator] begin get creator_id: {creator_id} videos, page_num: {page} ..."
             )
             videos_res = await self.bili_client.get_creator_videos(
-                creator_id, page_num, page_size, order_mode
+                creator_id, page, page_size, order_mode
             )
             utils.logger.info(
-                f"[CreatorHandler.get_all_videos_by_creator] get creator_id: {creator_id} videos, page_num: {page_num} success, count: {len(videos_res.get('list', {}).get('vlist', []))} ..."
-            )
-            video_list = videos_res.get("list", {}).get("vlist", [])
-            result.extend(video_list)
-            has_more = videos_res.get("page").get("count") > page_num * page_size
-            page_num += 1
-            saved_creator_count += len(video_list)
-
-            video_ids: List[VideoIdInfo] = await self.video_processor.batch_get_video_list(
-                video_list, checkpoint_id=checkpoint_id
+                f"[CreatorHandler.get_all_videos_by_creator] get creator_id: {creator_id} videos, page_num: {page} success, count: {len(videos_res.get('list', {}).get('vlist', []))} ..."
             )
-            await self.comment_processor.batch_get_video_comments(
-                video_ids, checkpoint_id=checkpoint_id
+            return videos_res
+
+        # 第一页返回视频总数后，并发请求后面的几页（并发数为客户端工作池同时能执行的请求数），按页码顺序处理
+        async with aclosing(
+            fetch_pages_concurrently(
+                fetch_videos_page,
+                start_page=page_num,
+                concurrency=self.bili_client.concurrency,
+                get_last_page=lambda videos_res: max(
+                    page_num, math.ceil(videos_res.get("page").get("count") / page_size)
+                ),
+                is_empty=lambda videos_res: not videos_res.get("list", {}).get("vlist"),
             )
+        ) as page_iterator:
+            async for page, videos_res in page_iterator:
+                video_list = videos_res.get("list", {}).get("vlist", [])
+                # 发布时间窗口外的视频不请求详情也不爬评论
+                window_video_list = [
+                    video_item
+                    for video_item in video_list
+                    if publish_time_window.contains(video_item.get("created"))
+                ]
+                result.extend(window_video_list)
+                saved_creator_count += len(window_video_list)
+
+                video_ids: List[VideoIdInfo] = await self.video_processor.batch_get_video_list(
+                    window_video_list, checkpoint_id=checkpoint_id
+                )
+                await self.comment_processor.batch_get_video_comments(
+                    video_ids, checkpoint_id=checkpoint_id
+                )
+
+                # 需要加载最新的检查点，因为在fetch_creator_notes_detail方法中，有对检查点左边
+                checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(checkpoint_id)
+                checkpoint.current_creator_page = str(page + 1)
+                await self.checkpoint_manager.update_checkpoint(checkpoint)
 
-            # 需要加载最新的检查点，因为在fetch_creator_notes_detail方法中，有对检查点左边
-            checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(checkpoint_id)
-            checkpoint.current_creator_page = str(page_num)
-            await self.checkpoint_manager.update_checkpoint(checkpoint)
+                if saved_creator_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                # 按发布时间倒序请求时，这一页最后一个视频早于开始时间后不再翻页，取消已经发出的请求
+                if order_mode == SearchOrderType.LAST_PUBLISH and publish_time_window.is_before_since(
+                    video_list[-1].get("created")
+                ):
+                    utils.logger.info(
+                        f"[CreatorHandler.get_all_videos_by_creator] creator_id: {creator_id} reached publish time since, stop"
+                    )
+                    break
 
         return result
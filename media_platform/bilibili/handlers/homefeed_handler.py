@@ -8,14 +8,16 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
-from typing import List, Dict, TYPE_CHECKING
+from contextlib import aclosing
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 
 import config
 import constant
 from model.m_bilibili import VideoIdInfo
 from model.m_checkpoint import Checkpoint
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
 from .base_handler import BaseHandler
 
 if TYPE_CHECKING:
@@ -88,56 +90,75 @@ class HomefeedHandler(BaseHandler):
         per_page_count = 12
         current_page_idx = checkpoint.current_homefeed_note_index or 1
         save_video_count = (current_page_idx - 1) * per_page_count
-        while save_video_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            try:
-                homefeed_videos_res = await self.bili_client.get_homefeed_videos(
-                    page_count=per_page_count, fresh_idx=current_page_idx
-                )
-                videos_list: List[Dict] = homefeed_videos_res.get("item", [])
-                if not videos_list:
-                    utils.logger.info(
-                        f"[HomefeedHandler.get_homefeed_videos] No more content!"
+        if save_video_count > config.CRAWLER_MAX_NOTES_COUNT:
+            return
+
+        async def fetch_homefeed_page(page_idx: int) -> Tuple[int, Dict]:
+            homefeed_videos_res = await self.bili_client.get_homefeed_videos(
+                page_count=per_page_count, fresh_idx=page_idx
+            )
+            return page_idx, homefeed_videos_res
+
+        def get_next_page_idx(homefeed_page: Tuple[int, Dict]) -> Optional[int]:
+            page_idx, homefeed_videos_res = homefeed_page
+            if not homefeed_videos_res.get("item"):
+                return None
+            return page_idx + 1
+
+        publish_time_window = PublishTimeWindow.from_config()
+        try:
+            # 处理当前页视频和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+            async with aclosing(
+                prefetch_cursor_pages(fetch_homefeed_page, current_page_idx, get_next_page_idx)
+            ) as homefeed_pages:
+                async for page_idx, homefeed_videos_res in homefeed_pages:
+                    videos_list: List[Dict] = homefeed_videos_res.get("item", [])
+                    if not videos_list:
+                        utils.logger.info(
+                            f"[HomefeedHandler.get_homefeed_videos] No more content!"
+                        )
+                        break
+
+                    # goto: 目标类型，av: 视频 ogv: 边栏 live: 直播
+                    # show_info: 展示信息: 1: 普通视频 0: 直播
+                    # 同时过滤掉发布时间窗口外的视频
+                    filtered_video_list = [
+                        video
+                        for video in videos_list
+                        if video.get("goto") == "av"
+                        and video.get("show_info") == 1
+                        and publish_time_window.contains(video.get("pubdate"))
+                    ]
+
+                    video_infos: List[VideoIdInfo] = await self.video_processor.batch_get_video_list(
+                        filtered_video_list, checkpoint_id=checkpoint.id
+                    )
+                    await self.comment_processor.batch_get_video_comments(
+                        video_infos, checkpoint_id=checkpoint.id
                     )
-                    break
-
-                # goto: 目标类型，av: 视频 ogv: 边栏 live: 直播
-                # show_info: 展示信息: 1: 普通视频 0: 直播
-                filtered_video_list = [
-                    video
-                    for video in videos_list
-                    if video.get("goto") == "av" and video.get("show_info") == 1
-                ]
-
-                video_infos: List[VideoIdInfo] = await self.video_processor.batch_get_video_list(
-                    filtered_video_list, checkpoint_id=checkpoint.id
-                )
-                await self.comment_processor.batch_get_video_comments(
-                    video_infos, checkpoint_id=checkpoint.id
-                )
 
-                current_page_idx += 1
-                save_video_count += len(video_infos)
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos, current_page_idx: {current_page_idx}, per_page_count: {per_page_count}, save_video_count: {save_video_count}"
-                )
+                    current_page_idx = page_idx + 1
+                    save_video_count += len(video_infos)
+                    utils.logger.info(
+                        f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos, current_page_idx: {current_page_idx}, per_page_count: {per_page_count}, save_video_count: {save_video_count}"
+                    )
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                    # 更新检查点
+                    lastest_checkpoint = (
+                        await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
+                    )
+                    if lastest_checkpoint:
+                        lastest_checkpoint.current_homefeed_note_index = current_page_idx
+                        await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
 
-            except Exception as ex:
-                utils.logger.error(
-                    f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos error: {ex}"
-                )
-                return
+                    if save_video_count > config.CRAWLER_MAX_NOTES_COUNT:
+                        break
 
-            finally:
-                # 更新检查点
-                lastest_checkpoint = (
-                    await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
-                )
-                if lastest_checkpoint:
-                    lastest_checkpoint.current_homefeed_note_index = current_page_idx
-                    await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
+        except Exception as ex:
+            utils.logger.error(
+                f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos error: {ex}"
+            )
+            return
 
         utils.logger.info(
             "[HomefeedHandler.get_homefeed_videos] Bilibili homefeed videos crawler finished ..."
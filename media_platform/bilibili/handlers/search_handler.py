@@ -9,13 +9,17 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
-from typing import List, Dict, TYPE_CHECKING
+from contextlib import aclosing
+from functools import partial
+from typing import AsyncIterator, List, Dict, TYPE_CHECKING
 
 import config
 import constant
 from model.m_bilibili import VideoIdInfo
-from model.m_checkpoint import Checkpoint
+from model.m_checkpoint import Checkpoint, CheckpointSearchKeyword
+from pkg.pipeline import PipelineStage, StagedPipeline, fetch_pages_concurrently
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
 from var import source_keyword_var
 from ..field import SearchOrderType
 from .base_handler import BaseHandler
@@ -69,25 +73,10 @@ class SearchHandler(BaseHandler):
         """
         return config.KEYWORDS.split(",")
 
-    def _find_keyword_index_in_keyword_list(self, keyword: str) -> int:
-        """
-        Find keyword index in keyword list
-
-        Args:
-            keyword: keyword
-
-        Returns:
-            int: keyword index
-        """
-        keyword_list = self._get_search_keyword_list()
-        for index, keyword_item in enumerate(keyword_list):
-            if keyword_item == keyword:
-                return index
-        return -1
-
     async def search(self) -> None:
         """
         Search for videos and retrieve their comment information.
+        多个关键词并发搜索（并发数 SEARCH_KEYWORD_CONCURRENCY），每个关键词在检查点中有自己的翻页游标
         Returns:
             None
         """
@@ -100,7 +89,6 @@ class SearchHandler(BaseHandler):
         checkpoint = Checkpoint(
             platform=constant.BILIBILI_PLATFORM_NAME,
             mode=constant.CRALER_TYPE_SEARCH,
-            current_search_page=1,
         )
 
         # 如果开启了断点续爬，则加载检查点
@@ -111,112 +99,225 @@ class SearchHandler(BaseHandler):
                 checkpoint_id=config.SPECIFIED_CHECKPOINT_ID,
             )
             if lastest_checkpoint:
-                keyword_index = self._find_keyword_index_in_keyword_list(
-                    lastest_checkpoint.current_search_keyword
-                )
-                if keyword_index == -1:
-                    # 没有搜索到，则从第一个关键词开始爬取
-                    utils.logger.warning(
-                        f"[SearchHandler.search] Keyword {lastest_checkpoint.current_search_keyword} not found in keyword list"
-                    )
-                    keyword_index = 0
-                else:
-                    # 如果搜索到了，则从检查点中保存的当前关键词开始爬取
+                if self.checkpoint_manager.has_search_keyword_progress(
+                    lastest_checkpoint, keyword_list
+                ):
+                    # 检查点中有当前关键词的进度，则每个未完成的关键词从各自的页码继续爬取
                     checkpoint = lastest_checkpoint
                     utils.logger.info(
                         f"[SearchHandler.search] Load lastest checkpoint: {lastest_checkpoint.id}"
                     )
-                    keyword_list = keyword_list[keyword_index:]
+                else:
+                    # 没有搜索到，则从第一页开始爬取所有关键词
+                    utils.logger.warning(
+                        f"[SearchHandler.search] Keywords of checkpoint {lastest_checkpoint.id} not found in keyword list"
+                    )
+
+        # 先保存每个关键词的游标，后面的业务行为都是基于这个检查点来更新page信息
+        checkpoint = await self.checkpoint_manager.init_search_keyword_cursors(
+            checkpoint, keyword_list
+        )
+        keyword_semaphore = asyncio.Semaphore(max(1, config.SEARCH_KEYWORD_CONCURRENCY))
+        await asyncio.gather(
+            *[
+                self._search_keyword(
+                    keyword,
+                    checkpoint.search_keyword_cursors[keyword],
+                    checkpoint.id,
+                    keyword_semaphore,
+                    bili_limit_count,
+                )
+                for keyword in keyword_list
+                if not checkpoint.search_keyword_cursors[keyword].is_finished
+            ]
+        )
+
+    async def _search_keyword(
+        self,
+        keyword: str,
+        keyword_cursor: CheckpointSearchKeyword,
+        checkpoint_id: str,
+        semaphore: asyncio.Semaphore,
+        bili_limit_count: int,
+    ) -> None:
+        """
+        搜索单个关键词，从关键词游标记录的页码开始翻页
+
+        Args:
+            keyword: 搜索关键词
+            keyword_cursor: 关键词搜索游标
+            checkpoint_id: 检查点ID
+            semaphore: 关键词并发控制
+            bili_limit_count: 每页数量
 
-        for keyword in keyword_list:
+        Returns:
+            None
+        """
+        async with semaphore:
             source_keyword_var.set(keyword)
-            page = checkpoint.current_search_page
+            page = keyword_cursor.current_search_page
+            utils.logger.info(
+                f"[SearchHandler.search] Current search keyword: {keyword}, page: {page}"
+            )
 
-            # bugfix: https://github.com/MediaCrawlerPro/MediaCrawlerPro-Python/issues/311
-            if checkpoint.current_search_keyword != keyword:
-                page = 1
+            # 搜索翻页 -> 视频详情 -> 视频评论，三个阶段通过有界队列串联执行
+            pipeline = StagedPipeline(
+                producer=self._search_video_pages(keyword, page, bili_limit_count),
+                stages=[
+                    PipelineStage(
+                        name="video_detail",
+                        handler=partial(
+                            self._fetch_page_video_details, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_DETAIL_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                    PipelineStage(
+                        name="video_comments",
+                        handler=partial(
+                            self._fetch_page_video_comments, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_COMMENT_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                ],
+                on_item_done=partial(
+                    self._save_search_page_checkpoint,
+                    checkpoint_id=checkpoint_id,
+                    keyword=keyword,
+                ),
+            )
+            try:
+                await pipeline.run()
+            except Exception as ex:
+                utils.logger.error(
+                    f"[SearchHandler.search] Search keyword {keyword} videos error: {ex}"
+                )
+                lastest_checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
+                    checkpoint_id
+                )
+                if lastest_checkpoint and keyword in lastest_checkpoint.search_keyword_cursors:
+                    page = lastest_checkpoint.search_keyword_cursors[keyword].current_search_page
+                # 发生异常了，则打印当前爬取的关键词和页码，其他关键词继续爬取，当前关键词可以通过断点续爬继续
+                utils.logger.error(
+                    f"[SearchHandler.search] Current keyword: {keyword}, page: {page}, "
+                    f"可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
+                )
+                return
+
+            await self.checkpoint_manager.update_search_keyword_cursor(
+                checkpoint_id, keyword, is_finished=True
+            )
+
+    async def _search_video_pages(
+        self, keyword: str, page: int, bili_limit_count: int
+    ) -> AsyncIterator[Dict]:
+        """
+        搜索翻页生产者，每次产出一页视频类型的搜索结果
 
-            # 按关键字保存检查点，后面的业务行为都是基于这个检查点来更新page信息，所以需要先保存检查点
-            checkpoint.current_search_keyword = keyword
-            await self.checkpoint_manager.save_checkpoint(checkpoint)
+        Args:
+            keyword: 搜索关键词
+            page: 起始页码
+            bili_limit_count: 每页数量
 
+        Returns:
+            AsyncIterator[Dict]: {"page": 页码, "video_list": 视频搜索结果列表}
+        """
+
+        async def fetch_search_page(page_num: int) -> List[Dict]:
             utils.logger.info(
-                f"[SearchHandler.search] Current search keyword: {keyword}"
+                f"[SearchHandler.search] search bilibili keyword: {keyword}, page: {page_num}"
+            )
+            videos_res = await self.bili_client.search_video_by_keyword(
+                keyword=keyword,
+                page=page_num,
+                page_size=bili_limit_count,
+                order=SearchOrderType.DEFAULT,
             )
+            video_list: List[Dict] = videos_res.get("result")
+            if not video_list:
+                utils.logger.info(f"[SearchHandler.search] Search video list is empty")
+            return video_list
 
-            saved_note_count = (page - 1) * 20
-            while saved_note_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                try:
-                    utils.logger.info(
-                        f"[SearchHandler.search] search bilibili keyword: {keyword}, page: {page}"
-                    )
-                    videos_res = await self.bili_client.search_video_by_keyword(
-                        keyword=keyword,
-                        page=page,
-                        page_size=bili_limit_count,
-                        order=SearchOrderType.DEFAULT,
-                    )
-                    video_list: List[Dict] = videos_res.get("result")
-                    if not video_list:
-                        utils.logger.info(
-                            f"[SearchHandler.search] Search video list is empty"
-                        )
-                        break
-                    utils.logger.info(
-                        f"[SearchHandler.search] Video list len: {len(video_list)}"
-                    )
+        saved_note_count = (page - 1) * bili_limit_count
+        if saved_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+            return
+        publish_time_window = PublishTimeWindow.from_config()
 
-                    # 过滤出视频类型的内容
-                    filtered_video_list = [
-                        video_item
-                        for video_item in video_list
-                        if video_item.get("type") == "video"
-                    ]
-
-                    video_infos: List[VideoIdInfo] = (
-                        await self.video_processor.batch_get_video_list(
-                            video_list=filtered_video_list, checkpoint_id=checkpoint.id
-                        )
-                    )
-                    await self.comment_processor.batch_get_video_comments(
-                        video_infos, checkpoint_id=checkpoint.id
-                    )
+        # 搜索结果按页码寻址，并发请求后面的几页（并发数为客户端工作池同时能执行的请求数），按页码顺序产出
+        async with aclosing(
+            fetch_pages_concurrently(
+                fetch_search_page, start_page=page, concurrency=self.bili_client.concurrency
+            )
+        ) as page_iterator:
+            async for page, video_list in page_iterator:
+                utils.logger.info(
+                    f"[SearchHandler.search] Video list len: {len(video_list)}"
+                )
 
-                    page += 1
-                    saved_note_count += len(video_infos)
+                # 过滤出发布时间窗口内的视频类型的内容
+                filtered_video_list = [
+                    video_item
+                    for video_item in video_list
+                    if video_item.get("type") == "video"
+                    and publish_time_window.contains(video_item.get("pubdate"))
+                ]
 
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                yield {"page": page, "video_list": filtered_video_list}
 
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[SearchHandler.search] Search videos error: {ex}"
-                    )
-                    # 发生异常了，则打印当前爬取的关键词和页码，用于后续继续爬取
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码------------------------------------------"
-                    )
-                    for i in range(3):
-                        utils.logger.error(
-                            f"[SearchHandler.search] Current keyword: {keyword}, page: {page}"
-                        )
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码---------------------------------------------------"
-                    )
+                saved_note_count += len(filtered_video_list)
+                if saved_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
 
-                    utils.logger.info(
-                        f"[SearchHandler.search] 可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
-                    )
-                    return
+    async def _fetch_page_video_details(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> Dict:
+        """
+        详情阶段：获取一页搜索结果中视频的详情
 
-                finally:
-                    lastest_checkpoint = (
-                        await self.checkpoint_manager.load_checkpoint_by_id(
-                            checkpoint.id
-                        )
-                    )
-                    if lastest_checkpoint:
-                        lastest_checkpoint.current_search_page = page
-                        await self.checkpoint_manager.update_checkpoint(
-                            lastest_checkpoint
-                        )
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+
+        Returns:
+            Dict: 追加了 video_infos 的搜索页数据
+        """
+        video_infos: List[VideoIdInfo] = await self.video_processor.batch_get_video_list(
+            video_list=search_page["video_list"], checkpoint_id=checkpoint_id
+        )
+        return {**search_page, "video_infos": video_infos}
+
+    async def _fetch_page_video_comments(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> None:
+        """
+        评论阶段：获取一页搜索结果中视频的评论
+
+        Args:
+            search_page: 详情阶段产出的数据
+            checkpoint_id: 检查点ID
+
+        Returns:
+            None
+        """
+        await self.comment_processor.batch_get_video_comments(
+            search_page["video_infos"], checkpoint_id=checkpoint_id
+        )
+
+    async def _save_search_page_checkpoint(
+        self, search_page: Dict, checkpoint_id: str, keyword: str
+    ) -> None:
+        """
+        一页搜索结果（以及它之前的所有页）全部处理完成后，推进检查点中该关键词的页码
+
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+            keyword: 搜索关键词
+
+        Returns:
+            None
+        """
+        await self.checkpoint_manager.update_search_keyword_cursor(
+            checkpoint_id, keyword, current_search_page=search_page["page"] + 1
+        )
@@ -11,12 +11,25 @@
 import asyncio
 import random
 from asyncio import Task
-from typing import List, TYPE_CHECKING, Dict, Optional, Callable
+from contextlib import aclosing
+from typing import AsyncIterator, List, TYPE_CHECKING, Dict, Optional, Callable, Tuple
 
 import config
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+import constant
 from model.m_bilibili import VideoIdInfo, BilibiliComment
+from pkg.pipeline import (
+    CommentCrawlPlan,
+    CommentPlanner,
+    get_note_completion_records,
+    ordered_concurrent_stream,
+    parse_comment_count,
+)
 from pkg.tools import utils
+from repo.comment_watermark import (
+    advance_watermark,
+    filter_new_comments,
+    get_comment_watermark_manager,
+)
 from repo.platform_save_data import bilibili as bilibili_store
 from ..exception import DataFetchError
 from ..field import CommentOrderType
@@ -24,7 +37,10 @@ from ..field import CommentOrderType
 if TYPE_CHECKING:
     from ..client import BilibiliClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
+# 评论接口每页返回的一级评论数量，用于预估翻页次数
+BILI_COMMENT_PAGE_SIZE = 20
 
 
 class CommentProcessor:
@@ -34,7 +50,7 @@ class CommentProcessor:
         self,
         bili_client: "BilibiliClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_video_comment_semaphore: asyncio.Semaphore,
+        crawler_video_comment_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize comment processor
@@ -42,11 +58,17 @@ class CommentProcessor:
         Args:
             bili_client: Bilibili API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_video_comment_semaphore: Semaphore to limit concurrent comment tasks
+            crawler_video_comment_semaphore: Adaptive concurrency limiter to limit concurrent comment tasks
         """
         self.bili_client = bili_client
         self.checkpoint_manager = checkpoint_manager
         self.crawler_video_comment_semaphore = crawler_video_comment_semaphore
+        # 评论预算在一次运行的所有批次之间共享
+        self.comment_planner = CommentPlanner(
+            per_note_limit=config.PER_NOTE_MAX_COMMENTS_COUNT,
+            run_budget=config.CRAWLER_MAX_COMMENTS_COUNT_PER_RUN,
+            page_size=BILI_COMMENT_PAGE_SIZE,
+        )
 
     async def batch_get_video_comments(
         self,
@@ -68,7 +90,8 @@ class CommentProcessor:
             )
             return
 
-        task_list: List[Task] = []
+        video_info_map: Dict[str, VideoIdInfo] = {}
+        video_comment_counts: List[Tuple[str, Optional[int]]] = []
         for video_info in video_infos:
             # 先判断checkpoint中该video的is_success_crawled_comments是否为True，如果为True，则跳过
             if await self.checkpoint_manager.check_note_comments_is_crawled_in_checkpoint(
@@ -77,24 +100,78 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.batch_get_video_comments] Video {video_info.bvid} is already crawled comments, skip"
                 )
+                await get_note_completion_records().complete_note(
+                    constant.BILIBILI_PLATFORM_NAME, video_info.bvid
+                )
                 continue
 
+            video_info_map[video_info.bvid] = video_info
+            video_comment_counts.append(
+                (
+                    video_info.bvid,
+                    await self._get_video_comment_count(checkpoint_id, video_info.bvid),
+                )
+            )
+
+        # 根据视频的评论数量生成爬取计划，跳过没有评论的视频，并在请求之前分配每个视频的评论数量上限
+        comment_plans = self.comment_planner.plan(video_comment_counts)
+        planned_bvids = {plan.note_id for plan in comment_plans}
+        for bvid, comment_count in video_comment_counts:
+            if bvid not in planned_bvids:
+                utils.logger.info(
+                    f"[CommentProcessor.batch_get_video_comments] Video {bvid} has no comments or the comment budget is used up, skip"
+                )
+                # 没有评论的视频已经爬完，评论预算用完的视频下次运行时还需要爬取评论
+                if comment_count == 0:
+                    await get_note_completion_records().complete_note(
+                        constant.BILIBILI_PLATFORM_NAME, bvid
+                    )
+
+        task_list: List[Task] = []
+        for comment_plan in comment_plans:
+            video_info = video_info_map[comment_plan.note_id]
+            utils.logger.info(
+                f"[CommentProcessor.batch_get_video_comments] Video {video_info.bvid} comment plan, "
+                f"comment_count: {comment_plan.comment_count}, estimated_pages: {comment_plan.estimated_pages}, "
+                f"max_comments: {comment_plan.max_comments}"
+            )
             task = asyncio.create_task(
                 self.get_comments_async_task(
                     aid=video_info.aid,
                     bvid=video_info.bvid,
                     checkpoint_id=checkpoint_id,
+                    comment_plan=comment_plan,
                 ),
                 name=video_info.aid,
             )
             task_list.append(task)
         await asyncio.gather(*task_list)
 
+    async def _get_video_comment_count(
+        self, checkpoint_id: str, bvid: str
+    ) -> Optional[int]:
+        """
+        从检查点中获取视频详情（或列表项）上的评论数量
+        Args:
+            checkpoint_id: checkpoint id
+            bvid: video bvid
+
+        Returns:
+            Optional[int]: 评论数量，未知时返回 None
+        """
+        video_info = await self.checkpoint_manager.get_note_info_from_checkpont(
+            checkpoint_id=checkpoint_id, note_id=bvid
+        )
+        if not video_info or not video_info.extra_params_info:
+            return None
+        return parse_comment_count(video_info.extra_params_info.get("comment_count"))
+
     async def get_comments_async_task(
         self,
         aid: str,
         bvid: str,
         checkpoint_id: str,
+        comment_plan: Optional[CommentCrawlPlan] = None,
     ):
         """
         Get video comments with quantity limitation
@@ -102,6 +179,7 @@ class CommentProcessor:
             aid: video id
             bvid: video id
             checkpoint_id: checkpoint id
+            comment_plan: comment crawl plan of the video
 
         Returns:
             None
@@ -111,12 +189,21 @@ class CommentProcessor:
                 f"[CommentProcessor.get_comments_async_task] Begin get video id comments {bvid}"
             )
             try:
-                await self.get_video_all_comments(
-                    aid=aid,
-                    bvid=bvid,
-                    callback=bilibili_store.batch_update_bilibili_video_comments,
-                    checkpoint_id=checkpoint_id
-                )
+                # 评论按页入库，这里只统计数量，不保留评论
+                crawled_count = 0
+                async with aclosing(
+                    self.get_video_all_comments(
+                        aid=aid,
+                        bvid=bvid,
+                        callback=bilibili_store.batch_update_bilibili_video_comments,
+                        checkpoint_id=checkpoint_id,
+                        comment_plan=comment_plan,
+                    )
+                ) as comment_pages:
+                    async for comments in comment_pages:
+                        crawled_count += len(comments)
+                if comment_plan:
+                    self.comment_planner.release(comment_plan, crawled_count)
             except DataFetchError as ex:
                 utils.logger.error(
                     f"[CommentProcessor.get_comments_async_task] get video_id: {aid} comment error: {ex}"
@@ -133,17 +220,19 @@ class CommentProcessor:
             bvid: str,
             callback: Optional[Callable] = None,
             checkpoint_id: str = "",
-    ):
+            comment_plan: Optional[CommentCrawlPlan] = None,
+    ) -> AsyncIterator[List[BilibiliComment]]:
         """
-        获取视频所有评论
+        获取视频所有评论，每一页评论回调入库后立即产出，只记录数量，不在内存中累积整个视频的评论
         Args:
             aid: 视频ID (aid)
             bvid: 视频ID (bvid)
             callback: 回调函数
             checkpoint_id: 检查点ID
+            comment_plan: 评论爬取计划，没有传入时只按 PER_NOTE_MAX_COMMENTS_COUNT 限制数量
 
         Returns:
-
+            AsyncIterator[List[BilibiliComment]]: 已入库的评论页
         """
         next_page = 0
         lastest_comment_cursor = await self.checkpoint_manager.get_note_comment_cursor(
@@ -155,43 +244,86 @@ class CommentProcessor:
             )
             next_page = int(lastest_comment_cursor)
 
-        result = []
+        # 增量爬取：按时间倒序获取评论，翻到已保存的最新一级评论就停止翻页
+        order_mode = CommentOrderType.DEFAULT
+        watermark_manager = None
+        watermark = None
+        if config.ENABLE_INCREMENTAL_COMMENTS:
+            order_mode = CommentOrderType.TIME
+            watermark_manager = get_comment_watermark_manager()
+            watermark = await watermark_manager.load_watermark(
+                constant.BILIBILI_PLATFORM_NAME, bvid
+            )
+        newest_watermark = watermark.model_copy() if watermark else None
+
+        if comment_plan is None:
+            comment_plan = CommentCrawlPlan(
+                note_id=bvid,
+                comment_count=None,
+                estimated_pages=0,
+                max_comments=config.PER_NOTE_MAX_COMMENTS_COUNT,
+            )
+
+        crawled_count = 0
         is_end = False
+        checkpoint_comment_page = next_page
         while not is_end:
+            # 上一页的一级评论和二级评论都入库后才把评论游标推进到下一页，中断后从没有处理完的一页继续，
+            # 该页下二级评论已经爬完的一级评论直接跳过，没爬完的从保存的二级评论页码继续
+            if next_page and next_page != checkpoint_comment_page:
+                await self.checkpoint_manager.update_note_comment_cursor(
+                    checkpoint_id=checkpoint_id,
+                    note_id=bvid,
+                    comment_cursor=str(next_page),
+                )
+                checkpoint_comment_page = next_page
+
+            # 在请求下一页之前判断评论数量上限，避免多请求一页再丢弃
+            if not comment_plan.allows_more(crawled_count):
+                utils.logger.info(
+                    f"[CommentProcessor.get_note_all_comments] The number of comments reaches the limit: {comment_plan.max_comments}"
+                )
+                break
             comment_list, response_data = await self.bili_client.get_video_comments(
-                aid, CommentOrderType.DEFAULT, next_page
+                aid, order_mode, next_page
             )
             cursor_info: Dict = response_data.get("cursor", {})
             is_end = cursor_info.get("is_end")
             next_page = cursor_info.get("next")
 
-            # 更新评论游标到checkpoint中
-            if next_page:
-                await self.checkpoint_manager.update_note_comment_cursor(
-                    checkpoint_id=checkpoint_id,
-                    note_id=bvid,
-                    comment_cursor=str(next_page),
+            if config.ENABLE_INCREMENTAL_COMMENTS:
+                comment_list, reached_watermark = filter_new_comments(watermark, comment_list)
+                newest_watermark = advance_watermark(
+                    newest_watermark, constant.BILIBILI_PLATFORM_NAME, bvid, comment_list
                 )
+                if reached_watermark:
+                    utils.logger.info(
+                        f"[CommentProcessor.get_note_all_comments] Reached stored comments of video {bvid}, stop paging"
+                    )
+                    is_end = True
+
+            # 最后一页只保留上限以内的评论
+            remaining_count = comment_plan.remaining(crawled_count)
+            if remaining_count is not None and len(comment_list) > remaining_count:
+                comment_list = comment_list[:remaining_count]
 
             if callback:
                 await callback(aid, comment_list)
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-            result.extend(comment_list)
+            crawled_count += len(comment_list)
+            if comment_list:
+                yield comment_list
 
-            if (
-                    PER_NOTE_MAX_COMMENTS_COUNT
-                    and len(result) >= PER_NOTE_MAX_COMMENTS_COUNT
-            ):
-                utils.logger.info(
-                    f"[CommentProcessor.get_note_all_comments] The number of comments exceeds the limit: {PER_NOTE_MAX_COMMENTS_COUNT}"
+            if not comment_plan.allows_more(crawled_count):
+                continue
+            async with aclosing(
+                self.get_comments_all_sub_comments(
+                    aid, comment_list, callback, bvid=bvid, checkpoint_id=checkpoint_id
                 )
-                break
-            sub_comments = await self.get_comments_all_sub_comments(
-                aid, comment_list, callback
-            )
-            result.extend(sub_comments)
+            ) as sub_comment_pages:
+                async for sub_comments in sub_comment_pages:
+                    crawled_count += len(sub_comments)
+                    yield sub_comments
 
         # 更新评论游标，标记为该帖子的评论已爬取
         await self.checkpoint_manager.update_note_comment_cursor(
@@ -200,56 +332,88 @@ class CommentProcessor:
             comment_cursor=str(next_page),
             is_success_crawled_comments=True,
         )
-
-        return result
+        if watermark_manager:
+            await watermark_manager.save_watermark(newest_watermark)
+        await get_note_completion_records().complete_note(
+            constant.BILIBILI_PLATFORM_NAME, bvid
+        )
 
     async def get_comments_all_sub_comments(
             self,
             video_id: str,
             comments: List[BilibiliComment],
             callback: Optional[Callable] = None,
-    ) -> List[BilibiliComment]:
+            bvid: str = "",
+            checkpoint_id: str = "",
+    ) -> AsyncIterator[List[BilibiliComment]]:
         """
         获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
+        每页二级评论回调后在检查点中记录该一级评论的二级评论页码，爬完后记录到已完成的一级评论中，
+        断点续爬时跳过已完成的一级评论，没爬完的一级评论从保存的页码继续
         Args:
             video_id: 视频ID
             comments: 评论列表
             callback: 一次评论爬取结束后
+            bvid: 视频ID (bvid)，检查点中的帖子ID
+            checkpoint_id: 检查点ID
 
         Returns:
-
+            AsyncIterator[List[BilibiliComment]]: 按一级评论顺序产出已回调的二级评论
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
-            return []
+            return
 
         if not comments:
-            return []
+            return
 
-        result = []
-        for comment in comments:
+        sub_comment_cursors, completed_root_comment_ids = (
+            await self.checkpoint_manager.get_note_sub_comment_progress(
+                checkpoint_id=checkpoint_id, note_id=bvid
+            )
+        )
+
+        async def iter_root_sub_comments(
+            comment: BilibiliComment,
+        ) -> AsyncIterator[Tuple[List[BilibiliComment], int, bool]]:
+            # 产出 (二级评论, 下一页页码, 是否已爬完)
             if int(comment.sub_comment_count or "0") == 0:
-                continue
+                return
+            if comment.comment_id in completed_root_comment_ids:
+                return
             sub_comment_has_more = True
-            rpid = comment.comment_id
-            page_num = 1
+            page_num = int(sub_comment_cursors.get(comment.comment_id) or 1)
             page_size = 10
             while sub_comment_has_more:
                 sub_comments, response_data = await self.bili_client.get_video_sub_comments(
                     video_id=video_id,
-                    root_comment_id=rpid,
+                    root_comment_id=comment.comment_id,
                     pn=page_num,
                     ps=page_size,
                     order_mode=CommentOrderType.DEFAULT,
                 )
-                if callback:
-                    await callback(video_id, sub_comments)
-
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-                result.extend(sub_comments)
                 sub_comment_has_more = (
                         response_data.get("page", {}).get("count", 0) > page_num * page_size
                 )
                 page_num += 1
+                yield sub_comments, page_num, not sub_comment_has_more
 
-        return result
\ No newline at end of file
+        # 各一级评论的二级评论并发获取，并发数为客户端工作池同时能执行的请求数，按一级评论的顺序回调，回调后交给调用方计数，不再保留
+        async with aclosing(
+            ordered_concurrent_stream(
+                iter_root_sub_comments,
+                comments,
+                concurrency=self.bili_client.concurrency,
+            )
+        ) as root_results:
+            async for comment, (sub_comments, page_num, is_finished) in root_results:
+                if sub_comments:
+                    if callback:
+                        await callback(video_id, sub_comments)
+                    yield sub_comments
+                await self.checkpoint_manager.update_note_sub_comment_progress(
+                    checkpoint_id=checkpoint_id,
+                    note_id=bvid,
+                    root_comment_id=comment.comment_id,
+                    sub_comment_cursor=str(page_num),
+                    is_finished=is_finished,
+                )
@@ -10,18 +10,31 @@
 
 import asyncio
 import sys
+from functools import partial
 from typing import Dict, List, Optional, TYPE_CHECKING
 from tenacity import RetryError
 
+import config
+import constant
 from model.m_bilibili import VideoIdInfo, BilibiliVideo
 from model.m_checkpoint import CheckpointNote
+from model.m_note_snapshot import NoteSnapshot
+from pkg.pipeline import get_note_completion_records
 from pkg.tools import utils
+from repo.note_seen_set import get_note_seen_set_manager
+from repo.note_snapshot import get_note_snapshot_manager
 from repo.platform_save_data import bilibili as bilibili_store
 from ..exception import DataFetchError
+from ..extractor import BilibiliExtractor
+from var import source_keyword_var
 
 if TYPE_CHECKING:
     from ..client import BilibiliClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
+
+# auto 模式下列表中的视频数据必须包含的字段，缺少任意一个时请求视频详情
+LITE_VIDEO_REQUIRED_FIELDS = ("title", "user_id", "liked_count", "video_comment")
 
 
 class VideoProcessor:
@@ -31,7 +44,7 @@ class VideoProcessor:
         self,
         bili_client: "BilibiliClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_video_task_semaphore: asyncio.Semaphore,
+        crawler_video_task_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize video processor
@@ -39,17 +52,19 @@ class VideoProcessor:
         Args:
             bili_client: Bilibili API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_video_task_semaphore: Semaphore to limit concurrent video tasks
+            crawler_video_task_semaphore: Adaptive concurrency limiter to limit concurrent video tasks
         """
         self.bili_client = bili_client
         self.checkpoint_manager = checkpoint_manager
         self.crawler_video_task_semaphore = crawler_video_task_semaphore
+        self.extractor = BilibiliExtractor()
 
     async def get_video_detail_async_task(
         self,
         aid: str,
         bvid: str,
         checkpoint_id: str,
+        video_snapshot: Optional[NoteSnapshot] = None,
     ) -> Optional[BilibiliVideo]:
         """
         Get video detail from API
@@ -58,6 +73,7 @@ class VideoProcessor:
             aid: video aid
             bvid: video bvid
             checkpoint_id: checkpoint id
+            video_snapshot: list-level metadata snapshot, saved after the comments are crawled
         Returns:
             video detail
         """
@@ -67,6 +83,7 @@ class VideoProcessor:
                 video_detail = await self.bili_client.get_video_info(aid=aid, bvid=bvid)
                 if video_detail:
                     await bilibili_store.update_bilibili_video(video_detail)
+                    await self._record_crawled_video(bvid, video_snapshot)
                     return video_detail
 
             except DataFetchError as ex:
@@ -96,6 +113,7 @@ class VideoProcessor:
                     extram_params_info = {
                         "aid": video_aid,
                         "bvid": video_vid,
+                        "comment_count": video_detail.video_comment,
                     }
                 await self.checkpoint_manager.update_note_to_checkpoint(
                     checkpoint_id=checkpoint_id,
@@ -106,6 +124,86 @@ class VideoProcessor:
                     extra_params_info=extram_params_info,
                 )
 
+    async def save_video_from_list_item_task(
+        self,
+        video: BilibiliVideo,
+        checkpoint_id: str,
+        video_snapshot: Optional[NoteSnapshot] = None,
+    ) -> BilibiliVideo:
+        """
+        Save video built from the list item without requesting video detail
+
+        Args:
+            video: video built from the list item
+            checkpoint_id: checkpoint id
+            video_snapshot: list-level metadata snapshot
+        Returns:
+            video
+        """
+        await bilibili_store.update_bilibili_video(video)
+        await self._record_crawled_video(video.bvid, video_snapshot)
+        await self.checkpoint_manager.update_note_to_checkpoint(
+            checkpoint_id=checkpoint_id,
+            note_id=video.bvid,
+            is_success_crawled=True,
+            is_success_crawled_comments=False,
+            current_note_comment_cursor=None,
+            extra_params_info={
+                "aid": video.video_id,
+                "bvid": video.bvid,
+                "comment_count": video.video_comment,
+            },
+        )
+        return video
+
+    @staticmethod
+    async def _record_crawled_video(
+        bvid: str, video_snapshot: Optional[NoteSnapshot] = None
+    ) -> None:
+        """
+        Record the stored video for dedup and freshness check of later crawls,
+        both are recorded after the comments of the video are crawled
+
+        Args:
+            bvid: video bvid
+            video_snapshot: list-level metadata snapshot
+
+        Returns:
+            None
+        """
+        if config.ENABLE_NOTE_DEDUP:
+            await get_note_seen_set_manager().mark_seen_note_after_comments(
+                constant.BILIBILI_PLATFORM_NAME, bvid, source_keyword_var.get()
+            )
+        if video_snapshot:
+            await get_note_completion_records().record_after_comments(
+                constant.BILIBILI_PLATFORM_NAME,
+                bvid,
+                partial(get_note_snapshot_manager().save_snapshot, video_snapshot),
+            )
+
+    def _get_video_from_list_item(self, video_item: Dict) -> Optional[BilibiliVideo]:
+        """
+        Build video from the list item according to NOTE_DETAIL_MODE,
+        return None when the video detail should be requested
+
+        Args:
+            video_item: video item from search, creator or homefeed list
+
+        Returns:
+            Optional[BilibiliVideo]
+        """
+        if config.NOTE_DETAIL_MODE == constant.DETAIL_MODE_FULL:
+            return None
+        video = self.extractor.extract_video_from_list_item(video_item)
+        if video is None:
+            return None
+        if config.NOTE_DETAIL_MODE == constant.DETAIL_MODE_AUTO and not all(
+            getattr(video, field) for field in LITE_VIDEO_REQUIRED_FIELDS
+        ):
+            return None
+        return video
+
     async def batch_get_video_list(
         self, video_list: List[Dict], checkpoint_id: str = ""
     ) -> List[VideoIdInfo]:
@@ -129,10 +227,34 @@ class VideoProcessor:
                 )
                 continue
 
-            video_id_infos.append(VideoIdInfo(aid=aid, bvid=bvid))
-            if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                checkpoint_id=checkpoint_id, note_id=bvid
+            is_crawled_in_checkpoint = (
+                await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                    checkpoint_id=checkpoint_id, note_id=bvid
+                )
+            )
+            if (
+                config.ENABLE_NOTE_DEDUP
+                and not is_crawled_in_checkpoint
+                and await get_note_seen_set_manager().check_seen_note(
+                    constant.BILIBILI_PLATFORM_NAME, bvid, source_keyword_var.get()
+                )
             ):
+                utils.logger.info(
+                    f"[VideoProcessor.batch_get_videos] Video {bvid} is already crawled by other keyword or job, skip"
+                )
+                continue
+
+            video_snapshot = None
+            if config.ENABLE_NOTE_FRESHNESS_CHECK and not is_crawled_in_checkpoint:
+                video_snapshot = self._make_video_snapshot(bvid, video_item)
+                if await get_note_snapshot_manager().is_note_unchanged(video_snapshot):
+                    utils.logger.info(
+                        f"[VideoProcessor.batch_get_videos] Video {bvid} is unchanged since last crawl, skip detail and comments"
+                    )
+                    continue
+
+            video_id_infos.append(VideoIdInfo(aid=aid, bvid=bvid))
+            if is_crawled_in_checkpoint:
                 utils.logger.info(
                     f"[VideoProcessor.batch_get_videos] Video {bvid} is already crawled, skip"
                 )
@@ -146,16 +268,50 @@ class VideoProcessor:
                     "bvid": bvid,
                 },
             )
-            task = self.get_video_detail_async_task(
-                aid=aid,
-                bvid=bvid,
-                checkpoint_id=checkpoint_id,
-            )
+            video_from_list_item = self._get_video_from_list_item(video_item)
+            if video_from_list_item:
+                task = self.save_video_from_list_item_task(
+                    video=video_from_list_item,
+                    checkpoint_id=checkpoint_id,
+                    video_snapshot=video_snapshot,
+                )
+            else:
+                task = self.get_video_detail_async_task(
+                    aid=aid,
+                    bvid=bvid,
+                    checkpoint_id=checkpoint_id,
+                    video_snapshot=video_snapshot,
+                )
             task_list.append(task)
 
         await asyncio.gather(*task_list)
         return video_id_infos
 
+    @staticmethod
+    def _make_video_snapshot(bvid: str, video_item: Dict) -> NoteSnapshot:
+        """
+        Make snapshot from list-level metadata of a video item,
+        search items use like/review, creator items use comment, homefeed items use stat
+
+        Args:
+            bvid: video bvid
+            video_item: video item from search, creator or homefeed list
+
+        Returns:
+            NoteSnapshot
+        """
+        stat = video_item.get("stat") or {}
+        liked_count = video_item.get("like", stat.get("like", ""))
+        comment_count = video_item.get(
+            "review", video_item.get("comment", stat.get("reply", ""))
+        )
+        return NoteSnapshot(
+            platform=constant.BILIBILI_PLATFORM_NAME,
+            note_id=bvid,
+            liked_count=str(liked_count),
+            comment_count=str(comment_count),
+        )
+
     async def batch_get_video_list_from_bvids(
         self, bvids_list: List[str], checkpoint_id: str
     ) -> List[VideoIdInfo]:
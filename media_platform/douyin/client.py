@@ -13,6 +13,7 @@ import asyncio
 import copy
 import json
 import re
+import time
 import traceback
 import urllib.parse
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
@@ -21,15 +22,18 @@ from .extractor import DouyinExtractor
 
 import httpx
 from httpx import Response
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractApiClient
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+from constant.base_constant import DOUYIN_PLATFORM_NAME
 from constant.douyin import DOUYIN_API_URL, DOUYIN_FIXED_USER_AGENT
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
-from pkg.rpc.sign_srv_client import DouyinSignRequest, SignServerClient
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.rpc.sign_srv_client import DouyinSignRequest, get_sign_client
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
 from var import request_keyword_var
 
@@ -56,7 +60,7 @@ class DouYinApiClient(AbstractApiClient):
         """
         self.timeout = timeout
         self._user_agent = user_agent or DOUYIN_FIXED_USER_AGENT
-        self._sign_client = SignServerClient()
+        self._sign_client = get_sign_client()
         self.common_verfiy_params = common_verfiy_params
         self.account_with_ip_pool = account_with_ip_pool
         self.account_info: Optional[AccountWithIpModel] = None
@@ -82,6 +86,17 @@ class DouYinApiClient(AbstractApiClient):
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         return self.account_info.account.cookies
@@ -203,7 +218,7 @@ class DouYinApiClient(AbstractApiClient):
                 await self.account_with_ip_pool.proxy_ip_pool.get_proxy()
             )
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(1))
+    @request_retry()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -223,8 +238,16 @@ class DouYinApiClient(AbstractApiClient):
         if "headers" not in kwargs:
             kwargs["headers"] = self._headers
 
+        await get_request_pacer().acquire(
+            DOUYIN_PLATFORM_NAME, self._pacing_account_name, url
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        await get_concurrency_controller(DOUYIN_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
 
         if need_return_ori_response:
             return response
@@ -239,6 +262,7 @@ class DouYinApiClient(AbstractApiClient):
         except Exception as e:
             raise DataFetchError(f"{e}, {response.text}")
 
+    @coalesce_requests(DOUYIN_PLATFORM_NAME)
     async def get(self, uri: str, params: Optional[Dict] = None, **kwargs):
         """
         GET请求
@@ -274,6 +298,7 @@ class DouYinApiClient(AbstractApiClient):
                 method="GET", url=f"{DOUYIN_API_URL}{uri}", params=params, **kwargs
             )
 
+    @coalesce_requests(DOUYIN_PLATFORM_NAME)
     async def post(
         self,
         uri: str,
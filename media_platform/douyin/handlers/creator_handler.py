@@ -8,15 +8,19 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。  
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
-import asyncio
+from contextlib import aclosing
 from typing import Dict, List, TYPE_CHECKING, Optional, Callable
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
 from model.m_douyin import DouyinAweme
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import douyin as douyin_store
+from var import source_keyword_var
 from .base_handler import BaseHandler
 
 if TYPE_CHECKING:
@@ -140,69 +144,104 @@ class CreatorHandler(BaseHandler):
                 f"[CreatorHandler.get_all_notes_by_creator] Get checkpoint error, checkpoint_id: {checkpoint_id}"
             )
 
-        posts_has_more = 1
         max_cursor = checkpoint.current_creator_page or "0"
         result = []
-        while posts_has_more == 1 and len(result) <= config.CRAWLER_MAX_NOTES_COUNT:
-            aweme_post_res = await self.dy_client.get_user_aweme_posts(sec_user_id, max_cursor)
-            posts_has_more = aweme_post_res.get("has_more", 0)
-            max_cursor = aweme_post_res.get("max_cursor")
-            aweme_list = (
-                aweme_post_res.get("aweme_list")
-                if aweme_post_res.get("aweme_list")
-                else []
-            )
-            if not aweme_list:
-                # 如果获取到的视频列表为空，则认为该用户没有视频，直接跳出循环 还有一种可能是私密账号
+
+        async def fetch_posts_page(cursor: str) -> Dict:
+            return await self.dy_client.get_user_aweme_posts(sec_user_id, cursor)
+
+        def get_next_max_cursor(aweme_post_res: Dict) -> Optional[str]:
+            if aweme_post_res.get("has_more", 0) != 1 or not aweme_post_res.get("aweme_list"):
+                return None
+            return aweme_post_res.get("max_cursor")
+
+        publish_time_window = PublishTimeWindow.from_config()
+        # 处理当前页视频和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+        async with aclosing(
+            prefetch_cursor_pages(fetch_posts_page, max_cursor, get_next_max_cursor)
+        ) as posts_pages:
+            async for aweme_post_res in posts_pages:
+                max_cursor = aweme_post_res.get("max_cursor")
+                aweme_list = (
+                    aweme_post_res.get("aweme_list")
+                    if aweme_post_res.get("aweme_list")
+                    else []
+                )
+                if not aweme_list:
+                    # 如果获取到的视频列表为空，则认为该用户没有视频，直接跳出循环 还有一种可能是私密账号
+                    utils.logger.info(
+                        f"[AwemeProcessor.get_all_user_aweme_posts] sec_user_id:{sec_user_id} has no video"
+                    )
+                    break
+
                 utils.logger.info(
-                    f"[AwemeProcessor.get_all_user_aweme_posts] sec_user_id:{sec_user_id} has no video"
+                    f"[AwemeProcessor.get_all_user_aweme_posts] got sec_user_id:{sec_user_id} creator page cursor: {max_cursor}"
                 )
-                break
 
-            utils.logger.info(
-                f"[AwemeProcessor.get_all_user_aweme_posts] got sec_user_id:{sec_user_id} creator page cursor: {max_cursor}"
-            )
+                aweme_ids = []
+                for aweme_info in aweme_list:
+                    aweme_id = aweme_info.get("aweme_id", "")
+                    if not aweme_id:
+                        continue
+
+                    # 发布时间窗口外的视频直接跳过
+                    if not publish_time_window.contains(aweme_info.get("create_time")):
+                        continue
+
+                    # 检查是否已经爬取过
+                    if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                            checkpoint_id=checkpoint.id, note_id=aweme_id
+                    ):
+                        aweme_ids.append(aweme_id)
+                        utils.logger.info(
+                            f"[SearchHandler.search] Aweme {aweme_id} is already crawled, skip"
+                        )
+                        continue
+
+                    # 其他关键词或者之前的任务已经爬取过
+                    if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                        constant.DOUYIN_PLATFORM_NAME, aweme_id, source_keyword_var.get()
+                    ):
+                        utils.logger.info(
+                            f"[SearchHandler.search] Aweme {aweme_id} is already crawled by other keyword or job, skip"
+                        )
+                        continue
+
+                    aweme_ids.append(aweme_id)
+                    await self.checkpoint_manager.add_note_to_checkpoint(
+                        checkpoint_id=checkpoint.id,
+                        note_id=aweme_id,
+                        extra_params_info={},
+                        is_success_crawled=True,
+                    )
+                    from media_platform.douyin.extractor import DouyinExtractor
+                    extractor = DouyinExtractor()
+                    aweme = extractor.extract_aweme_from_dict(aweme_info)
+                    if aweme:
+                        await douyin_store.update_douyin_aweme(aweme_item=aweme)
+                        if config.ENABLE_NOTE_DEDUP:
+                            await get_note_seen_set_manager().mark_seen_note_after_comments(
+                                constant.DOUYIN_PLATFORM_NAME, aweme_id, source_keyword_var.get()
+                            )
+
+                await self.comment_processor.batch_get_aweme_comments(
+                    aweme_ids, checkpoint_id=checkpoint_id
+                )
+                result.extend(aweme_list)
 
-            aweme_ids = []
-            for aweme_info in aweme_list:
-                aweme_id = aweme_info.get("aweme_id", "")
-                if not aweme_id:
-                    continue
+                # 需要加载最新的检查点，因为在fetch_creator_notes_detail方法中，有对检查点左边
+                checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(checkpoint_id)
+                checkpoint.current_creator_page = str(max_cursor)
+                await self.checkpoint_manager.update_checkpoint(checkpoint)
 
-                aweme_ids.append(aweme_id)
+                if len(result) > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
 
-                # 检查是否已经爬取过
-                if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                        checkpoint_id=checkpoint.id, note_id=aweme_id
-                ):
+                # 主页视频按发布时间倒序，置顶视频只会出现在开头，这一页最后一个视频早于开始时间后不再翻页
+                if publish_time_window.is_before_since(aweme_list[-1].get("create_time")):
                     utils.logger.info(
-                        f"[SearchHandler.search] Aweme {aweme_id} is already crawled, skip"
+                        f"[AwemeProcessor.get_all_user_aweme_posts] sec_user_id:{sec_user_id} reached publish time since, stop"
                     )
-                    continue
-
-                await self.checkpoint_manager.add_note_to_checkpoint(
-                    checkpoint_id=checkpoint.id,
-                    note_id=aweme_id,
-                    extra_params_info={},
-                    is_success_crawled=True,
-                )
-                from media_platform.douyin.extractor import DouyinExtractor
-                extractor = DouyinExtractor()
-                aweme = extractor.extract_aweme_from_dict(aweme_info)
-                if aweme:
-                    await douyin_store.update_douyin_aweme(aweme_item=aweme)
-
-            await self.comment_processor.batch_get_aweme_comments(
-                aweme_ids, checkpoint_id=checkpoint_id
-            )
-            result.extend(aweme_list)
-
-            # 需要加载最新的检查点，因为在fetch_creator_notes_detail方法中，有对检查点左边
-            checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(checkpoint_id)
-            checkpoint.current_creator_page = str(max_cursor)
-            await self.checkpoint_manager.update_checkpoint(checkpoint)
-
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                    break
 
         return result
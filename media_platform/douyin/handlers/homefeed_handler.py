@@ -8,15 +8,19 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。  
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
-import asyncio
 import json
-from typing import Dict, List, TYPE_CHECKING
+from contextlib import aclosing
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import douyin as douyin_store
+from var import source_keyword_var
 from ..field import HomeFeedTagIdType
 from .base_handler import BaseHandler
 
@@ -92,99 +96,130 @@ class HomefeedHandler(BaseHandler):
         current_refresh_index = checkpoint.current_homefeed_note_index or 0
         per_page_count = 20
         saved_aweme_count = 0
-        while saved_aweme_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            try:
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_awemes] Get homefeed awemes, current_refresh_index: {current_refresh_index}, per_page_count: {per_page_count}"
-                )
-
-                homefeed_aweme_res = await self.dy_client.get_homefeed_aweme_list(
-                    tag_id=HomeFeedTagIdType.ALL,
-                    refresh_index=current_refresh_index,
-                    count=per_page_count,
+        publish_time_window = PublishTimeWindow.from_config()
+        async def fetch_homefeed_page(refresh_index: int) -> Tuple[int, Dict]:
+            utils.logger.info(
+                f"[HomefeedHandler.get_homefeed_awemes] Get homefeed awemes, current_refresh_index: {refresh_index}, per_page_count: {per_page_count}"
+            )
+            homefeed_aweme_res = await self.dy_client.get_homefeed_aweme_list(
+                tag_id=HomeFeedTagIdType.ALL,
+                refresh_index=refresh_index,
+                count=per_page_count,
+            )
+            return refresh_index, homefeed_aweme_res
+
+        def get_next_refresh_index(homefeed_page: Tuple[int, Dict]) -> Optional[int]:
+            refresh_index, homefeed_aweme_res = homefeed_page
+            if not homefeed_aweme_res or homefeed_aweme_res.get("StatusCode") != 0:
+                return None
+            return refresh_index + per_page_count
+
+        try:
+            # 处理当前页视频和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+            async with aclosing(
+                prefetch_cursor_pages(
+                    fetch_homefeed_page, current_refresh_index, get_next_refresh_index
                 )
-                if not homefeed_aweme_res or homefeed_aweme_res.get("StatusCode") != 0:
-                    utils.logger.info(
-                        f"[HomefeedHandler.get_homefeed_awemes] No more content!"
-                    )
-                    break
-
-                # extract aweme list from homefeed_aweme_res
-                aweme_ids = []
-                cards: List[Dict] = homefeed_aweme_res.get("cards", [])
-                filtered_cards = [card for card in cards if card.get("type") == 1]
-
-                for card in filtered_cards:
-                    aweme_json_str: str = card.get("aweme")
-                    if not aweme_json_str:
-                        continue
-
-                    aweme_info: Dict = json.loads(aweme_json_str)
-                    if not aweme_info.get("aweme_id"):
-                        continue
-                    aweme_id = aweme_info.get("aweme_id")
-                    aweme_ids.append(aweme_id)
-
-                    # 检查是否已经爬取过
-                    if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                            checkpoint_id=checkpoint.id, note_id=aweme_id
-                    ):
+            ) as homefeed_pages:
+                async for page_refresh_index, homefeed_aweme_res in homefeed_pages:
+                    if not homefeed_aweme_res or homefeed_aweme_res.get("StatusCode") != 0:
                         utils.logger.info(
-                            f"[HomefeedHandler.get_homefeed_videos] Aweme {aweme_id} is already crawled, skip"
+                            f"[HomefeedHandler.get_homefeed_awemes] No more content!"
                         )
+                        break
+
+                    # extract aweme list from homefeed_aweme_res
+                    aweme_ids = []
+                    cards: List[Dict] = homefeed_aweme_res.get("cards", [])
+                    filtered_cards = [card for card in cards if card.get("type") == 1]
+
+                    for card in filtered_cards:
+                        aweme_json_str: str = card.get("aweme")
+                        if not aweme_json_str:
+                            continue
+
+                        aweme_info: Dict = json.loads(aweme_json_str)
+                        if not aweme_info.get("aweme_id"):
+                            continue
+                        aweme_id = aweme_info.get("aweme_id")
+                        # 发布时间窗口外的视频不保存也不爬评论
+                        if not publish_time_window.contains(aweme_info.get("create_time")):
+                            continue
+
+                        # 检查是否已经爬取过
+                        if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                                checkpoint_id=checkpoint.id, note_id=aweme_id
+                        ):
+                            aweme_ids.append(aweme_id)
+                            utils.logger.info(
+                                f"[HomefeedHandler.get_homefeed_videos] Aweme {aweme_id} is already crawled, skip"
+                            )
+                            saved_aweme_count += 1
+                            continue
+
+                        # 其他关键词或者之前的任务已经爬取过
+                        if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                            constant.DOUYIN_PLATFORM_NAME, aweme_id, source_keyword_var.get()
+                        ):
+                            utils.logger.info(
+                                f"[HomefeedHandler.get_homefeed_videos] Aweme {aweme_id} is already crawled by other keyword or job, skip"
+                            )
+                            continue
+
+                        aweme_ids.append(aweme_id)
+                        await self.checkpoint_manager.add_note_to_checkpoint(
+                            checkpoint_id=checkpoint.id,
+                            note_id=aweme_id,
+                            extra_params_info={},
+                            is_success_crawled=True,
+                        )
+
+                        from media_platform.douyin.extractor import DouyinExtractor
+                        extractor = DouyinExtractor()
+                        aweme = extractor.extract_aweme_from_dict(aweme_info)
+                        if aweme:
+                            await douyin_store.update_douyin_aweme(aweme_item=aweme)
+                            if config.ENABLE_NOTE_DEDUP:
+                                await get_note_seen_set_manager().mark_seen_note_after_comments(
+                                    constant.DOUYIN_PLATFORM_NAME, aweme_id, source_keyword_var.get()
+                                )
                         saved_aweme_count += 1
-                        continue
 
-                    await self.checkpoint_manager.add_note_to_checkpoint(
-                        checkpoint_id=checkpoint.id,
-                        note_id=aweme_id,
-                        extra_params_info={},
-                        is_success_crawled=True,
+                    await self.comment_processor.batch_get_aweme_comments(
+                        aweme_ids, checkpoint_id=checkpoint.id
                     )
+                    current_refresh_index = page_refresh_index + per_page_count
 
-                    from media_platform.douyin.extractor import DouyinExtractor
-                    extractor = DouyinExtractor()
-                    aweme = extractor.extract_aweme_from_dict(aweme_info)
-                    if aweme:
-                        await douyin_store.update_douyin_aweme(aweme_item=aweme)
-                    saved_aweme_count += 1
-
-                await self.comment_processor.batch_get_aweme_comments(
-                    aweme_ids, checkpoint_id=checkpoint.id
-                )
-                current_refresh_index += per_page_count
+                    # 更新检查点状态
+                    lastest_checkpoint = (
+                        await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
+                    )
+                    lastest_checkpoint.current_homefeed_note_index = current_refresh_index
+                    await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                    if saved_aweme_count > config.CRAWLER_MAX_NOTES_COUNT:
+                        break
 
-            except Exception as ex:
+        except Exception as ex:
+            utils.logger.error(
+                f"[HomefeedHandler.get_homefeed_awemes] Get homefeed awemes error: {ex}"
+            )
+            # 发生异常了，则打印当前爬取的索引，用于后续继续爬取
+            utils.logger.info(
+                "------------------------------------------记录当前爬取的索引------------------------------------------"
+            )
+            for i in range(3):
                 utils.logger.error(
-                    f"[HomefeedHandler.get_homefeed_awemes] Get homefeed awemes error: {ex}"
-                )
-                # 发生异常了，则打印当前爬取的索引，用于后续继续爬取
-                utils.logger.info(
-                    "------------------------------------------记录当前爬取的索引------------------------------------------"
-                )
-                for i in range(3):
-                    utils.logger.error(
-                        f"[HomefeedHandler.get_homefeed_awemes] Current refresh_index: {current_refresh_index}"
-                    )
-                utils.logger.info(
-                    "------------------------------------------记录当前爬取的索引---------------------------------------------------"
+                    f"[HomefeedHandler.get_homefeed_awemes] Current refresh_index: {current_refresh_index}"
                 )
+            utils.logger.info(
+                "------------------------------------------记录当前爬取的索引---------------------------------------------------"
+            )
 
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_awemes] 可以在配置文件中开启断点续爬功能，继续爬取当前位置的信息"
-                )
-                return
-
-            finally:
-                # 更新检查点状态
-                lastest_checkpoint = (
-                    await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
-                )
-                lastest_checkpoint.current_homefeed_note_index = current_refresh_index
-                await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
+            utils.logger.info(
+                f"[HomefeedHandler.get_homefeed_awemes] 可以在配置文件中开启断点续爬功能，继续爬取当前位置的信息"
+            )
+            return
 
         utils.logger.info(
             "[HomefeedHandler.get_homefeed_awemes] Douyin homefeed awemes crawler finished ..."
@@ -9,12 +9,16 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
-from typing import Dict, List, TYPE_CHECKING
+from functools import partial
+from typing import AsyncIterator, Dict, List, TYPE_CHECKING
 
 import config
 import constant
-from model.m_checkpoint import Checkpoint
+from model.m_checkpoint import Checkpoint, CheckpointSearchKeyword
+from pkg.pipeline import PipelineStage, StagedPipeline
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import douyin as douyin_store
 from var import source_keyword_var
 from ..field import PublishTimeType
@@ -69,25 +73,10 @@ class SearchHandler(BaseHandler):
         """
         return config.KEYWORDS.split(",")
 
-    def _find_keyword_index_in_keyword_list(self, keyword: str) -> int:
-        """
-        Find keyword index in keyword list
-
-        Args:
-            keyword: keyword
-
-        Returns:
-            int: keyword index
-        """
-        keyword_list = self._get_search_keyword_list()
-        for index, keyword_item in enumerate(keyword_list):
-            if keyword_item == keyword:
-                return index
-        return -1
-
     async def search(self) -> None:
         """
         Search for video list and retrieve their comment information.
+        多个关键词并发搜索（并发数 SEARCH_KEYWORD_CONCURRENCY），每个关键词在检查点中有自己的翻页游标
         Returns:
             None
         """
@@ -100,7 +89,6 @@ class SearchHandler(BaseHandler):
         checkpoint = Checkpoint(
             platform=constant.DOUYIN_PLATFORM_NAME,
             mode=constant.CRALER_TYPE_SEARCH,
-            current_search_page=1,
         )
 
         # 如果开启了断点续爬，则加载检查点
@@ -111,150 +99,275 @@ class SearchHandler(BaseHandler):
                 checkpoint_id=config.SPECIFIED_CHECKPOINT_ID,
             )
             if lastest_checkpoint:
-                keyword_index = self._find_keyword_index_in_keyword_list(
-                    lastest_checkpoint.current_search_keyword
-                )
-                if keyword_index == -1:
-                    # 没有搜索到，则从第一个关键词开始爬取
-                    utils.logger.warning(
-                        f"[SearchHandler.search] Keyword {lastest_checkpoint.current_search_keyword} not found in keyword list"
-                    )
-                    keyword_index = 0
-                else:
-                    # 如果搜索到了，则从检查点中保存的当前关键词开始爬取
+                if self.checkpoint_manager.has_search_keyword_progress(
+                    lastest_checkpoint, keyword_list
+                ):
+                    # 检查点中有当前关键词的进度，则每个未完成的关键词从各自的页码继续爬取
                     checkpoint = lastest_checkpoint
                     utils.logger.info(
                         f"[SearchHandler.search] Load lastest checkpoint: {lastest_checkpoint.id}"
                     )
-                    keyword_list = keyword_list[keyword_index:]
+                else:
+                    # 没有搜索到，则从第一页开始爬取所有关键词
+                    utils.logger.warning(
+                        f"[SearchHandler.search] Keywords of checkpoint {lastest_checkpoint.id} not found in keyword list"
+                    )
 
-        for keyword in keyword_list:
+        # 先保存每个关键词的游标，后面的业务行为都是基于这个检查点来更新page信息
+        checkpoint = await self.checkpoint_manager.init_search_keyword_cursors(
+            checkpoint, keyword_list
+        )
+        keyword_semaphore = asyncio.Semaphore(max(1, config.SEARCH_KEYWORD_CONCURRENCY))
+        await asyncio.gather(
+            *[
+                self._search_keyword(
+                    keyword,
+                    checkpoint.search_keyword_cursors[keyword],
+                    checkpoint.id,
+                    keyword_semaphore,
+                    dy_limit_count,
+                )
+                for keyword in keyword_list
+                if not checkpoint.search_keyword_cursors[keyword].is_finished
+            ]
+        )
+
+    async def _search_keyword(
+        self,
+        keyword: str,
+        keyword_cursor: CheckpointSearchKeyword,
+        checkpoint_id: str,
+        semaphore: asyncio.Semaphore,
+        dy_limit_count: int,
+    ) -> None:
+        """
+        搜索单个关键词，从关键词游标记录的页码开始翻页
+
+        Args:
+            keyword: 搜索关键词
+            keyword_cursor: 关键词搜索游标
+            checkpoint_id: 检查点ID
+            semaphore: 关键词并发控制
+            dy_limit_count: 每页数量
+
+        Returns:
+            None
+        """
+        async with semaphore:
             source_keyword_var.set(keyword)
-            page = checkpoint.current_search_page
-            dy_search_id = checkpoint.current_search_id or ""
+            page = keyword_cursor.current_search_page
+            dy_search_id = keyword_cursor.current_search_id or ""
+            utils.logger.info(
+                f"[SearchHandler.search] Current search keyword: {keyword}, page: {page}"
+            )
 
-            # bugfix: https://github.com/MediaCrawlerPro/MediaCrawlerPro-Python/issues/311
-            if checkpoint.current_search_keyword != keyword:
-                page = 1
-                dy_search_id = ""
+            # 搜索翻页 -> 视频保存 -> 视频评论，三个阶段通过有界队列串联执行
+            pipeline = StagedPipeline(
+                producer=self._search_aweme_pages(
+                    keyword, page, dy_search_id, dy_limit_count
+                ),
+                stages=[
+                    PipelineStage(
+                        name="aweme_detail",
+                        handler=partial(
+                            self._save_page_awemes, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_DETAIL_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                    PipelineStage(
+                        name="aweme_comments",
+                        handler=partial(
+                            self._fetch_page_aweme_comments, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_COMMENT_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                ],
+                on_item_done=partial(
+                    self._save_search_page_checkpoint,
+                    checkpoint_id=checkpoint_id,
+                    keyword=keyword,
+                ),
+            )
+            try:
+                await pipeline.run()
+            except Exception as ex:
+                utils.logger.error(
+                    f"[SearchHandler.search] Search keyword {keyword} videos error: {ex}"
+                )
+                lastest_checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
+                    checkpoint_id
+                )
+                if lastest_checkpoint and keyword in lastest_checkpoint.search_keyword_cursors:
+                    page = lastest_checkpoint.search_keyword_cursors[keyword].current_search_page
+                # 发生异常了，则打印当前爬取的关键词和页码，其他关键词继续爬取，当前关键词可以通过断点续爬继续
+                utils.logger.error(
+                    f"[SearchHandler.search] Current keyword: {keyword}, page: {page}, "
+                    f"可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
+                )
+                return
 
-            # 按关键字保存检查点，后面的业务行为都是基于这个检查点来更新page信息，所以需要先保存检查点
-            checkpoint.current_search_keyword = keyword
-            await self.checkpoint_manager.save_checkpoint(checkpoint)
-            saved_aweme_count = (page - 1) * dy_limit_count
-            utils.logger.info(f"[SearchHandler.search] Current keyword: {keyword}")
+            await self.checkpoint_manager.update_search_keyword_cursor(
+                checkpoint_id, keyword, is_finished=True
+            )
+
+    async def _search_aweme_pages(
+        self, keyword: str, page: int, dy_search_id: str, dy_limit_count: int
+    ) -> AsyncIterator[Dict]:
+        """
+        搜索翻页生产者，每次产出一页视频信息
+
+        Args:
+            keyword: 搜索关键词
+            page: 起始页码
+            dy_search_id: 搜索ID（翻页需要携带上一页返回的logid）
+            dy_limit_count: 每页数量
+
+        Returns:
+            AsyncIterator[Dict]: {"page": 页码, "search_id": 搜索ID, "aweme_info_list": 视频信息列表}
+        """
+        saved_aweme_count = (page - 1) * dy_limit_count
+        publish_time_window = PublishTimeWindow.from_config()
+        while saved_aweme_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            utils.logger.info(
+                f"[SearchHandler.search] search douyin keyword: {keyword}, page: {page}"
+            )
+            posts_res = await self.dy_client.search_info_by_keyword(
+                keyword=keyword,
+                offset=(page - 1) * dy_limit_count,
+                publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
+                search_id=dy_search_id,
+            )
+            if "data" not in posts_res:
+                utils.logger.error(
+                    f"[SearchHandler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
+                )
+                break
+            dy_search_id = posts_res.get("extra", {}).get("logid", "")
+            post_item_list: List[Dict] = posts_res.get("data")
+            if len(post_item_list) == 0:
+                utils.logger.error(
+                    f"[SearchHandler.search] search douyin keyword: {keyword} empty post list。"
+                )
+                break
 
-            while saved_aweme_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            aweme_info_list: List[Dict] = []
+            for post_item in post_item_list:
                 try:
-                    utils.logger.info(
-                        f"[SearchHandler.search] search douyin keyword: {keyword}, page: {page}"
-                    )
-                    posts_res = await self.dy_client.search_info_by_keyword(
-                        keyword=keyword,
-                        offset=(page - 1) * dy_limit_count,
-                        publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
-                        search_id=dy_search_id,
+                    aweme_info: Dict = (
+                        post_item.get("aweme_info")
+                        or post_item.get("aweme_mix_info", {}).get("mix_items")[0]
                     )
+                except TypeError:
+                    continue
+                if not aweme_info.get("aweme_id", ""):
+                    continue
+                # 发布时间窗口外的视频不保存也不爬评论
+                if not publish_time_window.contains(aweme_info.get("create_time")):
+                    continue
+                aweme_info_list.append(aweme_info)
+
+            yield {
+                "page": page,
+                "search_id": dy_search_id,
+                "aweme_info_list": aweme_info_list,
+            }
+
+            page += 1
+            saved_aweme_count += len(aweme_info_list)
+
+    async def _save_page_awemes(self, search_page: Dict, checkpoint_id: str) -> Dict:
+        """
+        视频阶段：搜索结果里已经包含视频详情，直接提取并保存
 
-                    if "data" not in posts_res:
-                        utils.logger.error(
-                            f"[SearchHandler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
-                        )
-                        break
-
-                    dy_search_id = posts_res.get("extra", {}).get("logid", "")
-                    aweme_id_list: List[str] = []
-
-                    post_item_list: List[Dict] = posts_res.get("data")
-                    if len(post_item_list) == 0:
-                        utils.logger.error(
-                            f"[SearchHandler.search] search douyin keyword: {keyword} empty post list。"
-                        )
-                        break
-
-                    for post_item in post_item_list:
-                        try:
-                            aweme_info: Dict = (
-                                post_item.get("aweme_info")
-                                or post_item.get("aweme_mix_info", {}).get("mix_items")[
-                                    0
-                                ]
-                            )
-                        except TypeError:
-                            continue
-
-                        aweme_id = aweme_info.get("aweme_id", "")
-                        if not aweme_id:
-                            continue
-
-                        aweme_id_list.append(aweme_id)
-
-                        # 检查是否已经爬取过
-                        if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                            checkpoint_id=checkpoint.id, note_id=aweme_id
-                        ):
-                            utils.logger.info(
-                                f"[SearchHandler.search] Aweme {aweme_id} is already crawled, skip"
-                            )
-                            saved_aweme_count += 1
-                            continue
-
-                        await self.checkpoint_manager.add_note_to_checkpoint(
-                            checkpoint_id=checkpoint.id,
-                            note_id=aweme_id,
-                            extra_params_info={},
-                            is_success_crawled=True,
-                        )
-
-                        from media_platform.douyin.extractor import DouyinExtractor
-                        extractor = DouyinExtractor()
-                        aweme = extractor.extract_aweme_from_dict(aweme_info)
-                        if aweme:
-                            await douyin_store.update_douyin_aweme(aweme_item=aweme)
-                        saved_aweme_count += 1
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
 
-                    utils.logger.info(
-                        f"[SearchHandler.search] keyword:{keyword}, aweme_id_list:{aweme_id_list}"
-                    )
-                    await self.comment_processor.batch_get_aweme_comments(
-                        aweme_id_list, checkpoint_id=checkpoint.id
+        Returns:
+            Dict: 追加了 aweme_id_list 的搜索页数据
+        """
+        from media_platform.douyin.extractor import DouyinExtractor
+
+        extractor = DouyinExtractor()
+        aweme_id_list: List[str] = []
+        for aweme_info in search_page["aweme_info_list"]:
+            aweme_id = aweme_info.get("aweme_id", "")
+
+            # 检查是否已经爬取过
+            if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                checkpoint_id=checkpoint_id, note_id=aweme_id
+            ):
+                aweme_id_list.append(aweme_id)
+                utils.logger.info(
+                    f"[SearchHandler.search] Aweme {aweme_id} is already crawled, skip"
+                )
+                continue
+
+            # 其他关键词或者之前的任务已经爬取过
+            if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                constant.DOUYIN_PLATFORM_NAME, aweme_id, source_keyword_var.get()
+            ):
+                utils.logger.info(
+                    f"[SearchHandler.search] Aweme {aweme_id} is already crawled by other keyword or job, skip"
+                )
+                continue
+
+            aweme_id_list.append(aweme_id)
+            await self.checkpoint_manager.add_note_to_checkpoint(
+                checkpoint_id=checkpoint_id,
+                note_id=aweme_id,
+                extra_params_info={},
+                is_success_crawled=True,
+            )
+            aweme = extractor.extract_aweme_from_dict(aweme_info)
+            if aweme:
+                await douyin_store.update_douyin_aweme(aweme_item=aweme)
+                if config.ENABLE_NOTE_DEDUP:
+                    await get_note_seen_set_manager().mark_seen_note_after_comments(
+                        constant.DOUYIN_PLATFORM_NAME, aweme_id, source_keyword_var.get()
                     )
 
-                    page += 1
+        utils.logger.info(
+            f"[SearchHandler.search] keyword:{source_keyword_var.get()}, aweme_id_list:{aweme_id_list}"
+        )
+        return {**search_page, "aweme_id_list": aweme_id_list}
 
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+    async def _fetch_page_aweme_comments(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> None:
+        """
+        评论阶段：获取一页搜索结果中视频的评论
 
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[SearchHandler.search] Search videos error: {ex}"
-                    )
-                    # 发生异常了，则打印当前爬取的关键词和页码，用于后续继续爬取
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码------------------------------------------"
-                    )
-                    for i in range(3):
-                        utils.logger.error(
-                            f"[SearchHandler.search] Current keyword: {keyword}, page: {page}"
-                        )
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码---------------------------------------------------"
-                    )
+        Args:
+            search_page: 视频阶段产出的数据
+            checkpoint_id: 检查点ID
 
-                    utils.logger.info(
-                        f"[SearchHandler.search] 可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
-                    )
-                    return
+        Returns:
+            None
+        """
+        await self.comment_processor.batch_get_aweme_comments(
+            search_page["aweme_id_list"], checkpoint_id=checkpoint_id
+        )
 
-                finally:
-                    lastest_checkpoint = (
-                        await self.checkpoint_manager.load_checkpoint_by_id(
-                            checkpoint.id
-                        )
-                    )
-                    if lastest_checkpoint:
-                        lastest_checkpoint.current_search_page = page
-                        lastest_checkpoint.current_search_id = dy_search_id
-                        await self.checkpoint_manager.update_checkpoint(
-                            lastest_checkpoint
-                        )
+    async def _save_search_page_checkpoint(
+        self, search_page: Dict, checkpoint_id: str, keyword: str
+    ) -> None:
+        """
+        一页搜索结果（以及它之前的所有页）全部处理完成后，推进检查点中该关键词的页码和搜索ID
+
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+            keyword: 搜索关键词
+
+        Returns:
+            None
+        """
+        await self.checkpoint_manager.update_search_keyword_cursor(
+            checkpoint_id,
+            keyword,
+            current_search_page=search_page["page"] + 1,
+            current_search_id=search_page["search_id"],
+        )
@@ -11,18 +11,25 @@
 
 # -*- coding: utf-8 -*-
 import asyncio
+import hashlib
 import random
 import time
 
 import httpx
 from pydantic import BaseModel, Field
 
+from constant.base_constant import DOUYIN_PLATFORM_NAME
 from constant.douyin import (DOUYIN_FIXED_USER_AGENT,
                              DOUYIN_MS_TOKEN_REQ_STR_DATA,
                              DOUYIN_MS_TOKEN_REQ_URL, DOUYIN_WEBID_REQ_URL)
 from pkg.async_http_client import AsyncHTTPClient
+from pkg.cache.aux_cache import AuxCacheNamespace, get_platform_aux_cache
 from pkg.tools import utils
 
+# msToken、webid 与 User-Agent 绑定，由所有账号共用，按 User-Agent 持久化缓存，重启后直接复用
+MS_TOKEN_CACHE = AuxCacheNamespace("dy_ms_token", str, ttl=3600 * 12)
+WEBID_CACHE = AuxCacheNamespace("dy_webid", str, ttl=3600 * 24 * 7)
+
 
 class CommonVerfiyParams(BaseModel):
     ms_token: str = Field(..., title="ms_token", description="ms_token")
@@ -92,6 +99,7 @@ class TokenManager:
 
     def __init__(self, user_agent: str):
         self._user_agent = user_agent
+        self._cache_key = hashlib.md5(user_agent.encode()).hexdigest()
 
     async def gen_real_msToken(self) -> str:
         """
@@ -137,17 +145,20 @@ class TokenManager:
 
         """
         try:
-            return await self.gen_real_msToken()
+            # 只缓存真实的 msToken，获取失败时返回的假 msToken 不写入缓存
+            return await get_platform_aux_cache().get_or_load(
+                MS_TOKEN_CACHE, DOUYIN_PLATFORM_NAME, "", self._cache_key,
+                self.gen_real_msToken,
+            )
         except Exception as e:
             utils.logger.warning(f"gen_real_msToken error: {e}, return a fake msToken")
             return self.gen_fake_msToken()
 
-    async def gen_webid(self) -> str:
+    async def gen_real_webid(self) -> str:
         """
-        生成个性化追踪webid (Generate personalized tracking webid)
-
+        请求接口生成个性化追踪webid
         Returns:
-            str: 生成的webid (Generated webid)
+
         """
         async with AsyncHTTPClient() as client:
             post_data = {
@@ -162,17 +173,30 @@ class TokenManager:
                 "Content-Type": "application/json; charset=UTF-8",
                 "Referer": "https://www.douyin.com/",
             }
-            try:
-                response = await client.post(
-                    DOUYIN_WEBID_REQ_URL, json=post_data, headers=headers
-                )
-                webid = response.json().get("web_id")
-                if not webid:
-                    raise Exception("获取webid失败")
-                return webid
-            except Exception as e:
-                utils.logger.warning(f"gen_webid error: {e}, return a random webid")
-                return get_web_id()
+            response = await client.post(
+                DOUYIN_WEBID_REQ_URL, json=post_data, headers=headers
+            )
+            webid = response.json().get("web_id")
+            if not webid:
+                raise Exception("获取webid失败")
+            return webid
+
+    async def gen_webid(self) -> str:
+        """
+        生成个性化追踪webid (Generate personalized tracking webid)
+
+        Returns:
+            str: 生成的webid (Generated webid)
+        """
+        try:
+            # 只缓存接口返回的webid，获取失败时返回的随机webid不写入缓存
+            return await get_platform_aux_cache().get_or_load(
+                WEBID_CACHE, DOUYIN_PLATFORM_NAME, "", self._cache_key,
+                self.gen_real_webid,
+            )
+        except Exception as e:
+            utils.logger.warning(f"gen_webid error: {e}, return a random webid")
+            return get_web_id()
 
 
 class VerifyFpManager:
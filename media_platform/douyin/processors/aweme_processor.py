@@ -19,6 +19,7 @@ from ..exception import DataFetchError
 if TYPE_CHECKING:
     from ..client import DouYinApiClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class AwemeProcessor:
@@ -28,7 +29,7 @@ class AwemeProcessor:
         self,
         dy_client: "DouYinApiClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_aweme_task_semaphore: asyncio.Semaphore,
+        crawler_aweme_task_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize aweme processor
@@ -36,7 +37,7 @@ class AwemeProcessor:
         Args:
             dy_client: Douyin API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_aweme_task_semaphore: Semaphore to limit concurrent aweme tasks
+            crawler_aweme_task_semaphore: Adaptive concurrency limiter to limit concurrent aweme tasks
         """
         self.dy_client = dy_client
         self.checkpoint_manager = checkpoint_manager
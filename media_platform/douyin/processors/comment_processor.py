@@ -10,11 +10,13 @@
 
 import asyncio
 from asyncio import Task
-from typing import List, TYPE_CHECKING
+from contextlib import aclosing
+from typing import AsyncIterator, List, Tuple, TYPE_CHECKING
 
 import config
-from config.base_config import PER_NOTE_MAX_COMMENTS_COUNT
+import constant
 from model.m_douyin import DouyinAwemeComment
+from pkg.pipeline import get_note_completion_records, ordered_concurrent_stream
 from pkg.tools import utils
 from repo.platform_save_data import douyin as douyin_store
 from ..exception import DataFetchError
@@ -22,6 +24,7 @@ from ..exception import DataFetchError
 if TYPE_CHECKING:
     from ..client import DouYinApiClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class CommentProcessor:
@@ -31,7 +34,7 @@ class CommentProcessor:
         self,
         dy_client: "DouYinApiClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_comment_semaphore: asyncio.Semaphore
+        crawler_comment_semaphore: "AdaptiveConcurrencyLimiter"
     ):
         """
         Initialize comment processor
@@ -39,7 +42,7 @@ class CommentProcessor:
         Args:
             dy_client: Douyin API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_comment_semaphore: Semaphore to limit concurrent comment tasks
+            crawler_comment_semaphore: Adaptive concurrency limiter to limit concurrent comment tasks
         """
         self.dy_client = dy_client
         self.checkpoint_manager = checkpoint_manager
@@ -81,6 +84,9 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.batch_get_aweme_comments] Aweme {aweme_id} is already crawled comments, skip"
                 )
+                await get_note_completion_records().complete_note(
+                    constant.DOUYIN_PLATFORM_NAME, aweme_id
+                )
                 continue
 
             task = asyncio.create_task(
@@ -114,13 +120,18 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.get_comments_async_task] Begin get aweme id comments {aweme_id}"
                 )
-                # 获取视频的所有评论
-                await self.get_aweme_all_comments(
-                    aweme_id=aweme_id,
-                    checkpoint_id=checkpoint_id
-                )
+                # 获取视频的所有评论，评论按页入库，这里只统计数量，不保留评论
+                crawled_count = 0
+                async with aclosing(
+                    self.get_aweme_all_comments(
+                        aweme_id=aweme_id,
+                        checkpoint_id=checkpoint_id
+                    )
+                ) as comment_pages:
+                    async for comments in comment_pages:
+                        crawled_count += len(comments)
                 utils.logger.info(
-                    f"[CommentProcessor.get_comments_async_task] aweme_id: {aweme_id} comments have all been obtained and filtered ..."
+                    f"[CommentProcessor.get_comments_async_task] aweme_id: {aweme_id} comments have all been obtained and filtered, count: {crawled_count}"
                 )
             except DataFetchError as e:
                 utils.logger.error(
@@ -131,17 +142,17 @@ class CommentProcessor:
         self,
         aweme_id: str,
         checkpoint_id: str = ""
-    ):
+    ) -> AsyncIterator[List[DouyinAwemeComment]]:
         """
-        获取视频的所有评论
+        获取视频的所有评论，每一页评论入库后立即产出，只记录数量，不在内存中累积整个视频的评论
         Args:
             aweme_id: 视频ID
             checkpoint_id: 检查点ID
 
         Returns:
-            List of comments
+            AsyncIterator of stored comment pages
         """
-        result = []
+        crawled_count = 0
         comments_has_more = 1
         comments_cursor = 0
 
@@ -163,38 +174,42 @@ class CommentProcessor:
                     )
                     comments_cursor = 0
 
+        checkpoint_comment_cursor = comments_cursor
         while comments_has_more:
-            comments, comments_res = await self.dy_client.get_aweme_comments(aweme_id, comments_cursor)
-            comments_has_more = comments_res.get("has_more", 0)
-            comments_cursor = comments_res.get("cursor", 0)
-
-            # 更新评论游标到checkpoint中（将整数转换为字符串存储）
-            if checkpoint_id and comments_cursor:
+            # 上一页的一级评论和二级评论都入库后才把评论游标推进到下一页（将整数转换为字符串存储），
+            # 中断后从没有处理完的一页继续，该页下已经爬完的一级评论跳过，没爬完的从二级评论游标继续
+            if checkpoint_id and comments_cursor and comments_cursor != checkpoint_comment_cursor:
                 await self.checkpoint_manager.update_note_comment_cursor(
                     checkpoint_id=checkpoint_id,
                     note_id=aweme_id,
                     comment_cursor=str(comments_cursor),
                 )
+                checkpoint_comment_cursor = comments_cursor
+
+            comments, comments_res = await self.dy_client.get_aweme_comments(aweme_id, comments_cursor)
+            comments_has_more = comments_res.get("has_more", 0)
+            comments_cursor = comments_res.get("cursor", 0)
 
             if not comments:
                 continue
-            result.extend(comments)
             # 保存评论到数据库
             await douyin_store.batch_update_dy_aweme_comments(aweme_id, comments)
+            crawled_count += len(comments)
+            yield comments
             if (
-                PER_NOTE_MAX_COMMENTS_COUNT
-                and len(result) >= PER_NOTE_MAX_COMMENTS_COUNT
+                config.PER_NOTE_MAX_COMMENTS_COUNT
+                and crawled_count >= config.PER_NOTE_MAX_COMMENTS_COUNT
             ):
                 utils.logger.info(
-                    f"[CommentProcessor.get_aweme_all_comments] The number of comments exceeds the limit: {PER_NOTE_MAX_COMMENTS_COUNT}"
+                    f"[CommentProcessor.get_aweme_all_comments] The number of comments exceeds the limit: {config.PER_NOTE_MAX_COMMENTS_COUNT}"
                 )
                 break
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-            sub_comments = await self.get_comments_all_sub_comments(
-                aweme_id, comments
-            )
-            result.extend(sub_comments)
+            async with aclosing(
+                self.get_comments_all_sub_comments(aweme_id, comments, checkpoint_id)
+            ) as sub_comment_pages:
+                async for sub_comments in sub_comment_pages:
+                    crawled_count += len(sub_comments)
+                    yield sub_comments
 
         # 标记该aweme的评论已完全爬取
         if checkpoint_id:
@@ -204,47 +219,77 @@ class CommentProcessor:
                 comment_cursor=str(comments_cursor),
                 is_success_crawled_comments=True,
             )
-
-        return result
+        await get_note_completion_records().complete_note(
+            constant.DOUYIN_PLATFORM_NAME, aweme_id
+        )
 
     async def get_comments_all_sub_comments(
         self,
         aweme_id: str,
-        comments: List[DouyinAwemeComment]
-    ) -> List[DouyinAwemeComment]:
+        comments: List[DouyinAwemeComment],
+        checkpoint_id: str = "",
+    ) -> AsyncIterator[List[DouyinAwemeComment]]:
         """
         获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
+        每页二级评论入库后在检查点中记录该一级评论的二级评论游标，爬完后记录到已完成的一级评论中，
+        断点续爬时跳过已完成的一级评论，没爬完的一级评论从保存的游标继续
         Args:
             aweme_id: 视频ID
             comments: 评论列表
+            checkpoint_id: 检查点ID
 
         Returns:
-            List of sub-comments
+            AsyncIterator of stored sub-comment pages, in the order of root comments
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(
                 f"[CommentProcessor.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
             )
-            return []
-        result = []
-        for comment in comments:
+            return
+
+        sub_comment_cursors, completed_root_comment_ids = {}, set()
+        if checkpoint_id:
+            sub_comment_cursors, completed_root_comment_ids = (
+                await self.checkpoint_manager.get_note_sub_comment_progress(
+                    checkpoint_id=checkpoint_id, note_id=aweme_id
+                )
+            )
+
+        async def iter_root_sub_comments(
+            comment: DouyinAwemeComment,
+        ) -> AsyncIterator[Tuple[List[DouyinAwemeComment], int, bool]]:
+            # 产出 (二级评论, 下一页游标, 是否已爬完)
             reply_comment_total = int(comment.sub_comment_count) if comment.sub_comment_count else 0
-            if reply_comment_total > 0:
-                comment_id = comment.comment_id
-                sub_comments_has_more = 1
-                sub_comments_cursor = 0
-                while sub_comments_has_more:
-                    sub_comments, sub_comments_res = await self.dy_client.get_sub_comments(
-                        comment_id, sub_comments_cursor, aweme_id
-                    )
-                    sub_comments_has_more = sub_comments_res.get("has_more", 0)
-                    sub_comments_cursor = sub_comments_res.get("cursor", 0)
-                    if not sub_comments:
-                        continue
-                    result.extend(sub_comments)
+            if reply_comment_total <= 0 or comment.comment_id in completed_root_comment_ids:
+                return
+            sub_comments_has_more = 1
+            sub_comments_cursor = int(sub_comment_cursors.get(comment.comment_id) or 0)
+            while sub_comments_has_more:
+                sub_comments, sub_comments_res = await self.dy_client.get_sub_comments(
+                    comment.comment_id, sub_comments_cursor, aweme_id
+                )
+                sub_comments_has_more = sub_comments_res.get("has_more", 0)
+                sub_comments_cursor = sub_comments_res.get("cursor", 0)
+                yield sub_comments or [], sub_comments_cursor, not sub_comments_has_more
+
+        # 各一级评论的二级评论并发获取，并发数为客户端工作池同时能执行的请求数，按一级评论的顺序入库，入库后交给调用方计数，不再保留
+        async with aclosing(
+            ordered_concurrent_stream(
+                iter_root_sub_comments,
+                comments,
+                concurrency=self.dy_client.concurrency,
+            )
+        ) as root_results:
+            async for comment, (sub_comments, sub_comments_cursor, is_finished) in root_results:
+                if sub_comments:
                     # 保存子评论到数据库
                     await douyin_store.batch_update_dy_aweme_comments(aweme_id, sub_comments)
-
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-        return result
+                    yield sub_comments
+                if checkpoint_id:
+                    await self.checkpoint_manager.update_note_sub_comment_progress(
+                        checkpoint_id=checkpoint_id,
+                        note_id=aweme_id,
+                        root_comment_id=comment.comment_id,
+                        sub_comment_cursor=str(sub_comments_cursor),
+                        is_finished=is_finished,
+                    )
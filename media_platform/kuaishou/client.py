@@ -12,21 +12,25 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import json
+import time
 import traceback
 from typing import Callable, Dict, List, Optional, Union, Tuple
 from urllib.parse import urlencode
 
 import httpx
 from httpx import Response
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractApiClient
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+from constant.base_constant import KUAISHOU_PLATFORM_NAME
 from constant.kuaishou import KUAISHOU_API
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
-from pkg.rpc.sign_srv_client import SignServerClient
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.rpc.sign_srv_client import get_sign_client
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
 
 from .exception import DataFetchError
@@ -51,7 +55,7 @@ class KuaiShouApiClient(AbstractApiClient):
         """
         self.timeout = timeout
         self._user_agent = user_agent or utils.get_user_agent()
-        self._sign_client = SignServerClient()
+        self._sign_client = get_sign_client()
         self._graphql = KuaiShouGraphQL()
         self._extractor = KuaishouExtractor()
         self.account_with_ip_pool = account_with_ip_pool
@@ -76,6 +80,17 @@ class KuaiShouApiClient(AbstractApiClient):
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         return self.account_info.account.cookies
@@ -135,7 +150,7 @@ class KuaiShouApiClient(AbstractApiClient):
                 await self.account_with_ip_pool.proxy_ip_pool.get_proxy()
             )
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(1))
+    @request_retry()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -147,14 +162,26 @@ class KuaiShouApiClient(AbstractApiClient):
         Returns:
 
         """
+        await get_request_pacer().acquire(
+            KUAISHOU_PLATFORM_NAME,
+            self._pacing_account_name,
+            url,
+            operation_name=(kwargs.get("json") or {}).get("operationName", ""),
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        await get_concurrency_controller(KUAISHOU_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
         data: Dict = response.json()
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
         else:
             return data.get("data", {})
 
+    @coalesce_requests(KUAISHOU_PLATFORM_NAME)
     async def get(self, uri: str, params=None, **kwargs) -> Dict:
         """
         get请求
@@ -215,6 +242,7 @@ class KuaiShouApiClient(AbstractApiClient):
                     method="GET", url=f"{KUAISHOU_API}{final_uri}", **kwargs
                 )
 
+    @coalesce_requests(KUAISHOU_PLATFORM_NAME)
     async def post(self, uri: str, data: dict, **kwargs) -> Dict:
         """
         post请求
@@ -8,15 +8,19 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。  
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
-import asyncio
 import random
-from typing import Dict, List, TYPE_CHECKING
+from contextlib import aclosing
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import kuaishou as kuaishou_store
+from var import source_keyword_var
 from .base_handler import BaseHandler
 
 if TYPE_CHECKING:
@@ -153,70 +157,109 @@ class CreatorHandler(BaseHandler):
         result = []
         pcursor = checkpoint.current_creator_page or ""
         saved_video_count = 0
+        publish_time_window = PublishTimeWindow.from_config()
 
-        while saved_video_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            videos_res = await self.ks_client.get_video_by_creater(user_id, pcursor)
-            if not videos_res:
-                utils.logger.error(
-                    f"[CreatorHandler.get_all_user_videos] The current creator may have been banned by ks, so they cannot access the data."
-                )
-                break
+        async def fetch_videos_page(cursor: str) -> Dict:
+            return await self.ks_client.get_video_by_creater(user_id, cursor)
 
-            vision_profile_photo_list = videos_res.get("visionProfilePhotoList", {})
+        def get_next_pcursor(videos_res: Dict) -> Optional[str]:
+            vision_profile_photo_list = (videos_res or {}).get("visionProfilePhotoList", {})
             pcursor = vision_profile_photo_list.get("pcursor", "")
+            if pcursor == "no_more" or not vision_profile_photo_list.get("feeds"):
+                return None
+            return pcursor
+
+        # 处理当前页视频和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+        async with aclosing(
+            prefetch_cursor_pages(fetch_videos_page, pcursor, get_next_pcursor)
+        ) as videos_pages:
+            async for videos_res in videos_pages:
+                if not videos_res:
+                    utils.logger.error(
+                        f"[CreatorHandler.get_all_user_videos] The current creator may have been banned by ks, so they cannot access the data."
+                    )
+                    break
 
-            videos = vision_profile_photo_list.get("feeds", [])
-            if not videos:
-                utils.logger.info(
-                    f"[CreatorHandler.get_all_user_videos] user_id:{user_id} has no more videos"
-                )
-                break
-
-            utils.logger.info(
-                f"[CreatorHandler.get_all_user_videos] got user_id:{user_id} videos len : {len(videos)}, pcursor: {pcursor}"
-            )
+                vision_profile_photo_list = videos_res.get("visionProfilePhotoList", {})
+                pcursor = vision_profile_photo_list.get("pcursor", "")
 
-            video_ids = []
-            for video_info in videos:
-                video_id = video_info.get("photo", {}).get("id", "")
-                if not video_id:
-                    continue
+                videos = vision_profile_photo_list.get("feeds", [])
+                if not videos:
+                    utils.logger.info(
+                        f"[CreatorHandler.get_all_user_videos] user_id:{user_id} has no more videos"
+                    )
+                    break
 
-                video_ids.append(video_id)
+                utils.logger.info(
+                    f"[CreatorHandler.get_all_user_videos] got user_id:{user_id} videos len : {len(videos)}, pcursor: {pcursor}"
+                )
 
-                # 检查是否已经爬取过
-                if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                    checkpoint_id=checkpoint.id, note_id=video_id
-                ):
-                    utils.logger.info(
-                        f"[CreatorHandler.get_all_user_videos] Video {video_id} is already crawled, skip"
+                video_ids = []
+                for video_info in videos:
+                    video_id = video_info.get("photo", {}).get("id", "")
+                    if not video_id:
+                        continue
+
+                    # 发布时间窗口外的视频直接跳过
+                    if not publish_time_window.contains(
+                        video_info.get("photo", {}).get("timestamp")
+                    ):
+                        continue
+
+                    # 检查是否已经爬取过
+                    if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                        checkpoint_id=checkpoint.id, note_id=video_id
+                    ):
+                        video_ids.append(video_id)
+                        utils.logger.info(
+                            f"[CreatorHandler.get_all_user_videos] Video {video_id} is already crawled, skip"
+                        )
+                        saved_video_count += 1
+                        continue
+
+                    # 其他关键词或者之前的任务已经爬取过
+                    if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                        constant.KUAISHOU_PLATFORM_NAME, video_id, source_keyword_var.get()
+                    ):
+                        utils.logger.info(
+                            f"[CreatorHandler.get_all_user_videos] Video {video_id} is already crawled by other keyword or job, skip"
+                        )
+                        continue
+
+                    video_ids.append(video_id)
+                    await self.checkpoint_manager.add_note_to_checkpoint(
+                        checkpoint_id=checkpoint.id,
+                        note_id=video_id,
+                        extra_params_info={},
+                        is_success_crawled=True,
                     )
+                    await kuaishou_store.update_kuaishou_video(video_item=video_info)
+                    if config.ENABLE_NOTE_DEDUP:
+                        await get_note_seen_set_manager().mark_seen_note_after_comments(
+                            constant.KUAISHOU_PLATFORM_NAME, video_id, source_keyword_var.get()
+                        )
                     saved_video_count += 1
-                    continue
 
-                await self.checkpoint_manager.add_note_to_checkpoint(
-                    checkpoint_id=checkpoint.id,
-                    note_id=video_id,
-                    extra_params_info={},
-                    is_success_crawled=True,
+                await self.comment_processor.batch_get_video_comments(
+                    video_ids, checkpoint_id=checkpoint_id
                 )
-                await kuaishou_store.update_kuaishou_video(video_item=video_info)
-                saved_video_count += 1
+                result.extend(videos)
 
-            await self.comment_processor.batch_get_video_comments(
-                video_ids, checkpoint_id=checkpoint_id
-            )
-            result.extend(videos)
-
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                # 需要加载最新的检查点，因为在处理过程中，有对检查点的更新
+                checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(checkpoint_id)
+                checkpoint.current_creator_page = pcursor
+                await self.checkpoint_manager.update_checkpoint(checkpoint)
 
-            # 需要加载最新的检查点，因为在处理过程中，有对检查点的更新
-            checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(checkpoint_id)
-            checkpoint.current_creator_page = pcursor
-            await self.checkpoint_manager.update_checkpoint(checkpoint)
+                if pcursor == "no_more" or saved_video_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
 
-            if pcursor == "no_more":
-                break
+                # 主页视频按发布时间倒序，置顶视频只会出现在开头，这一页最后一个视频早于开始时间后不再翻页
+                if publish_time_window.is_before_since(
+                    videos[-1].get("photo", {}).get("timestamp")
+                ):
+                    utils.logger.info(
+                        f"[CreatorHandler.get_all_user_videos] user_id:{user_id} reached publish time since, stop"
+                    )
+                    break
 
         return result
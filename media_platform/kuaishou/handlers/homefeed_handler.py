@@ -8,14 +8,18 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。  
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
-import asyncio
-from typing import Dict, List, TYPE_CHECKING
+from contextlib import aclosing
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import kuaishou as kuaishou_store
+from var import source_keyword_var
 from .base_handler import BaseHandler
 
 if TYPE_CHECKING:
@@ -88,97 +92,128 @@ class HomefeedHandler(BaseHandler):
         # 从checkpoint恢复游标和计数
         pcursor = checkpoint.current_homefeed_cursor or ""
         saved_video_count = 0
+        publish_time_window = PublishTimeWindow.from_config()
 
         utils.logger.info(
             f"[HomefeedHandler.get_homefeed_videos] Resume from cursor: {pcursor}, saved_count: {saved_video_count}"
         )
 
-        while saved_video_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            try:
-                homefeed_videos_res = await self.ks_client.get_homefeed_videos(pcursor)
-                if not homefeed_videos_res:
-                    utils.logger.info(
-                        "[HomefeedHandler.get_homefeed_videos] No more content!"
-                    )
-                    break
-
-                brilliant_type_data: Dict = homefeed_videos_res.get("brilliantTypeData")
-                videos_list: List[Dict] = brilliant_type_data.get("feeds", [])
-
-                if not videos_list:
-                    utils.logger.info(
-                        "[HomefeedHandler.get_homefeed_videos] No more content!"
-                    )
-                    break
-
-                video_id_list = []
-                for video_detail in videos_list:
-                    video_id = video_detail.get("photo", {}).get("id")
-                    if not video_id:
-                        continue
+        def get_next_pcursor(homefeed_videos_res: Dict) -> Optional[str]:
+            brilliant_type_data: Dict = (homefeed_videos_res or {}).get("brilliantTypeData") or {}
+            next_pcursor = brilliant_type_data.get("pcursor", "")
+            if not brilliant_type_data.get("feeds") or next_pcursor == "no_more":
+                return None
+            return next_pcursor
+
+        try:
+            # 处理当前页视频和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+            async with aclosing(
+                prefetch_cursor_pages(
+                    self.ks_client.get_homefeed_videos, pcursor, get_next_pcursor
+                )
+            ) as homefeed_pages:
+                async for homefeed_videos_res in homefeed_pages:
+                    if not homefeed_videos_res:
+                        utils.logger.info(
+                            "[HomefeedHandler.get_homefeed_videos] No more content!"
+                        )
+                        break
 
-                    video_id_list.append(video_id)
+                    brilliant_type_data: Dict = homefeed_videos_res.get("brilliantTypeData")
+                    videos_list: List[Dict] = brilliant_type_data.get("feeds", [])
 
-                    # 检查是否已经爬取过
-                    if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                            checkpoint_id=checkpoint.id, note_id=video_id
-                    ):
+                    if not videos_list:
                         utils.logger.info(
-                            f"[HomefeedHandler.get_homefeed_videos] video {video_id} is already crawled, skip"
+                            "[HomefeedHandler.get_homefeed_videos] No more content!"
+                        )
+                        break
+
+                    video_id_list = []
+                    for video_detail in videos_list:
+                        video_id = video_detail.get("photo", {}).get("id")
+                        if not video_id:
+                            continue
+
+                        # 发布时间窗口外的视频不保存也不爬评论
+                        if not publish_time_window.contains(
+                            video_detail.get("photo", {}).get("timestamp")
+                        ):
+                            continue
+
+                        # 检查是否已经爬取过
+                        if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                                checkpoint_id=checkpoint.id, note_id=video_id
+                        ):
+                            video_id_list.append(video_id)
+                            utils.logger.info(
+                                f"[HomefeedHandler.get_homefeed_videos] video {video_id} is already crawled, skip"
+                            )
+                            saved_video_count += 1
+                            continue
+
+                        # 其他关键词或者之前的任务已经爬取过
+                        if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                            constant.KUAISHOU_PLATFORM_NAME, video_id, source_keyword_var.get()
+                        ):
+                            utils.logger.info(
+                                f"[HomefeedHandler.get_homefeed_videos] video {video_id} is already crawled by other keyword or job, skip"
+                            )
+                            continue
+
+                        video_id_list.append(video_id)
+                        await self.checkpoint_manager.add_note_to_checkpoint(
+                            checkpoint_id=checkpoint.id,
+                            note_id=video_id,
+                            extra_params_info={},
+                            is_success_crawled=True,
                         )
-                        saved_video_count += 1
-                        continue
 
-                    await self.checkpoint_manager.add_note_to_checkpoint(
-                        checkpoint_id=checkpoint.id,
-                        note_id=video_id,
-                        extra_params_info={},
-                        is_success_crawled=True,
-                    )
+                        saved_video_count += 1
+                        await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+                        if config.ENABLE_NOTE_DEDUP:
+                            await get_note_seen_set_manager().mark_seen_note_after_comments(
+                                constant.KUAISHOU_PLATFORM_NAME, video_id, source_keyword_var.get()
+                            )
 
-                    saved_video_count += 1
-                    await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+                    # 批量获取视频评论
+                    await self.comment_processor.batch_get_video_comments(video_id_list, checkpoint.id)
 
-                # 批量获取视频评论
-                await self.comment_processor.batch_get_video_comments(video_id_list, checkpoint.id)
+                    pcursor = brilliant_type_data.get("pcursor", "")
 
-                pcursor = brilliant_type_data.get("pcursor", "")
+                    utils.logger.info(
+                        f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos, saved_video_count: {saved_video_count}"
+                    )
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                    # 更新检查点状态
+                    lastest_checkpoint = (
+                        await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
+                    )
+                    lastest_checkpoint.current_homefeed_cursor = pcursor
+                    await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
 
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos, saved_video_count: {saved_video_count}"
-                )
+                    if saved_video_count > config.CRAWLER_MAX_NOTES_COUNT:
+                        break
 
-            except Exception as ex:
+        except Exception as ex:
+            utils.logger.error(
+                f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos error: {ex}"
+            )
+            # 发生异常了，则打印当前爬取的游标和计数，用于后续继续爬取
+            utils.logger.info(
+                "------------------------------------------记录当前爬取的游标和计数------------------------------------------"
+            )
+            for i in range(3):
                 utils.logger.error(
-                    f"[HomefeedHandler.get_homefeed_videos] Get homefeed videos error: {ex}"
-                )
-                # 发生异常了，则打印当前爬取的游标和计数，用于后续继续爬取
-                utils.logger.info(
-                    "------------------------------------------记录当前爬取的游标和计数------------------------------------------"
-                )
-                for i in range(3):
-                    utils.logger.error(
-                        f"[HomefeedHandler.get_homefeed_videos] Current cursor: {pcursor}, saved_video_count: {saved_video_count}"
-                    )
-                utils.logger.info(
-                    "------------------------------------------记录当前爬取的游标和计数---------------------------------------------------"
-                )
-
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_videos] 可以在配置文件中开启断点续爬功能，继续爬取当前位置的信息"
+                    f"[HomefeedHandler.get_homefeed_videos] Current cursor: {pcursor}, saved_video_count: {saved_video_count}"
                 )
-                return
+            utils.logger.info(
+                "------------------------------------------记录当前爬取的游标和计数---------------------------------------------------"
+            )
 
-            finally:
-                # 更新检查点状态
-                lastest_checkpoint = (
-                    await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
-                )
-                lastest_checkpoint.current_homefeed_cursor = pcursor
-                await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
+            utils.logger.info(
+                f"[HomefeedHandler.get_homefeed_videos] 可以在配置文件中开启断点续爬功能，继续爬取当前位置的信息"
+            )
+            return
 
         utils.logger.info(
             "[HomefeedHandler.get_homefeed_videos] Kuaishou homefeed videos crawler finished ..."
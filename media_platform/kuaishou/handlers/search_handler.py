@@ -9,12 +9,16 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
-from typing import Dict, List, TYPE_CHECKING
+from functools import partial
+from typing import AsyncIterator, Dict, List, TYPE_CHECKING
 
 import config
 import constant
-from model.m_checkpoint import Checkpoint
+from model.m_checkpoint import Checkpoint, CheckpointSearchKeyword
+from pkg.pipeline import PipelineStage, StagedPipeline
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import kuaishou as kuaishou_store
 from var import source_keyword_var
 from .base_handler import BaseHandler
@@ -68,25 +72,10 @@ class SearchHandler(BaseHandler):
         """
         return config.KEYWORDS.split(",")
 
-    def _find_keyword_index_in_keyword_list(self, keyword: str) -> int:
-        """
-        Find keyword index in keyword list
-
-        Args:
-            keyword: keyword
-
-        Returns:
-            int: keyword index
-        """
-        keyword_list = self._get_search_keyword_list()
-        for index, keyword_item in enumerate(keyword_list):
-            if keyword_item == keyword:
-                return index
-        return -1
-
     async def search(self) -> None:
         """
         Search for videos and retrieve their comment information with checkpoint support.
+        多个关键词并发搜索（并发数 SEARCH_KEYWORD_CONCURRENCY），每个关键词在检查点中有自己的翻页游标
         Returns:
             None
         """
@@ -99,7 +88,6 @@ class SearchHandler(BaseHandler):
         checkpoint = Checkpoint(
             platform=constant.KUAISHOU_PLATFORM_NAME,
             mode=constant.CRALER_TYPE_SEARCH,
-            current_search_page=1,
         )
 
         # 如果开启了断点续爬，则加载检查点
@@ -110,132 +98,245 @@ class SearchHandler(BaseHandler):
                 checkpoint_id=config.SPECIFIED_CHECKPOINT_ID,
             )
             if lastest_checkpoint:
-                keyword_index = self._find_keyword_index_in_keyword_list(
-                    lastest_checkpoint.current_search_keyword
-                )
-                if keyword_index == -1:
-                    # 没有搜索到，则从第一个关键词开始爬取
-                    utils.logger.warning(
-                        f"[SearchHandler.search] Keyword {lastest_checkpoint.current_search_keyword} not found in keyword list"
-                    )
-                    keyword_index = 0
-                else:
-                    # 如果搜索到了，则从检查点中保存的当前关键词开始爬取
+                if self.checkpoint_manager.has_search_keyword_progress(
+                    lastest_checkpoint, keyword_list
+                ):
+                    # 检查点中有当前关键词的进度，则每个未完成的关键词从各自的页码继续爬取
                     checkpoint = lastest_checkpoint
                     utils.logger.info(
                         f"[SearchHandler.search] Load lastest checkpoint: {lastest_checkpoint.id}"
                     )
-                    keyword_list = keyword_list[keyword_index:]
+                else:
+                    # 没有搜索到，则从第一页开始爬取所有关键词
+                    utils.logger.warning(
+                        f"[SearchHandler.search] Keywords of checkpoint {lastest_checkpoint.id} not found in keyword list"
+                    )
+
+        # 先保存每个关键词的游标，后面的业务行为都是基于这个检查点来更新page信息
+        checkpoint = await self.checkpoint_manager.init_search_keyword_cursors(
+            checkpoint, keyword_list
+        )
+        keyword_semaphore = asyncio.Semaphore(max(1, config.SEARCH_KEYWORD_CONCURRENCY))
+        await asyncio.gather(
+            *[
+                self._search_keyword(
+                    keyword,
+                    checkpoint.search_keyword_cursors[keyword],
+                    checkpoint.id,
+                    keyword_semaphore,
+                    ks_limit_count,
+                )
+                for keyword in keyword_list
+                if not checkpoint.search_keyword_cursors[keyword].is_finished
+            ]
+        )
 
-        for keyword in keyword_list:
+    async def _search_keyword(
+        self,
+        keyword: str,
+        keyword_cursor: CheckpointSearchKeyword,
+        checkpoint_id: str,
+        semaphore: asyncio.Semaphore,
+        ks_limit_count: int,
+    ) -> None:
+        """
+        搜索单个关键词，从关键词游标记录的页码开始翻页
+
+        Args:
+            keyword: 搜索关键词
+            keyword_cursor: 关键词搜索游标
+            checkpoint_id: 检查点ID
+            semaphore: 关键词并发控制
+            ks_limit_count: 每页数量
+
+        Returns:
+            None
+        """
+        async with semaphore:
             source_keyword_var.set(keyword)
-            search_session_id = ""
-            page = checkpoint.current_search_page
+            page = keyword_cursor.current_search_page
+            utils.logger.info(
+                f"[SearchHandler.search] Current search keyword: {keyword}, page: {page}"
+            )
 
-            # bugfix: https://github.com/MediaCrawlerPro/MediaCrawlerPro-Python/issues/311
-            if checkpoint.current_search_keyword != keyword:
-                page = 1
+            # 搜索翻页 -> 视频保存 -> 视频评论，三个阶段通过有界队列串联执行
+            pipeline = StagedPipeline(
+                producer=self._search_video_pages(keyword, page, ks_limit_count),
+                stages=[
+                    PipelineStage(
+                        name="video_detail",
+                        handler=partial(
+                            self._save_page_videos, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_DETAIL_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                    PipelineStage(
+                        name="video_comments",
+                        handler=partial(
+                            self._fetch_page_video_comments, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_COMMENT_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                ],
+                on_item_done=partial(
+                    self._save_search_page_checkpoint,
+                    checkpoint_id=checkpoint_id,
+                    keyword=keyword,
+                ),
+            )
+            try:
+                await pipeline.run()
+            except Exception as ex:
+                utils.logger.error(
+                    f"[SearchHandler.search] Search keyword {keyword} videos error: {ex}"
+                )
+                lastest_checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
+                    checkpoint_id
+                )
+                if lastest_checkpoint and keyword in lastest_checkpoint.search_keyword_cursors:
+                    page = lastest_checkpoint.search_keyword_cursors[keyword].current_search_page
+                # 发生异常了，则打印当前爬取的关键词和页码，其他关键词继续爬取，当前关键词可以通过断点续爬继续
+                utils.logger.error(
+                    f"[SearchHandler.search] Current keyword: {keyword}, page: {page}, "
+                    f"可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
+                )
+                return
 
-            # 按关键字保存检查点，后面的业务行为都是基于这个检查点来更新page信息，所以需要先保存检查点
-            checkpoint.current_search_keyword = keyword
-            await self.checkpoint_manager.save_checkpoint(checkpoint)
+            await self.checkpoint_manager.update_search_keyword_cursor(
+                checkpoint_id, keyword, is_finished=True
+            )
 
-            utils.logger.info(f"[SearchHandler.search] Current keyword: {keyword}")
-            saved_video_count = (page - 1) * ks_limit_count
+    async def _search_video_pages(
+        self, keyword: str, page: int, ks_limit_count: int
+    ) -> AsyncIterator[Dict]:
+        """
+        搜索翻页生产者，每次产出一页视频模型
 
-            while saved_video_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                try:
-                    utils.logger.info(
-                        f"[SearchHandler.search] search kuaishou keyword: {keyword}, page: {page}"
-                    )
+        Args:
+            keyword: 搜索关键词
+            page: 起始页码
+            ks_limit_count: 每页数量
 
-                    video_id_list: List[str] = []
-                    videos, videos_res = await self.ks_client.search_info_by_keyword(
-                        keyword=keyword,
-                        pcursor=str(page),
-                        search_session_id=search_session_id,
-                    )
+        Returns:
+            AsyncIterator[Dict]: {"page": 页码, "videos": 视频模型列表}
+        """
+        search_session_id = ""
+        saved_video_count = (page - 1) * ks_limit_count
+        publish_time_window = PublishTimeWindow.from_config()
+        while saved_video_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            utils.logger.info(
+                f"[SearchHandler.search] search kuaishou keyword: {keyword}, page: {page}"
+            )
+            videos, videos_res = await self.ks_client.search_info_by_keyword(
+                keyword=keyword,
+                pcursor=str(page),
+                search_session_id=search_session_id,
+            )
+            if not videos_res:
+                utils.logger.error(
+                    f"[SearchHandler.search] search info by keyword:{keyword} not found data"
+                )
+                continue
 
-                    if not videos_res:
-                        utils.logger.error(
-                            f"[SearchHandler.search] search info by keyword:{keyword} not found data"
-                        )
-                        continue
-
-                    vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
-                    if vision_search_photo.get("result") != 1:
-                        utils.logger.error(
-                            f"[SearchHandler.search] search info by keyword:{keyword} not found data "
-                        )
-                        continue
-
-                    search_session_id = vision_search_photo.get("searchSessionId", "")
-
-                    # 处理视频列表并保存
-                    for video in videos:
-                        if not video.video_id:
-                            continue
-
-                        video_id_list.append(video.video_id)
-
-                        # 检查是否已经爬取过
-                        if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                            checkpoint_id=checkpoint.id, note_id=video.video_id
-                        ):
-                            utils.logger.info(
-                                f"[SearchHandler.search] video {video.video_id} is already crawled, skip"
-                            )
-                            saved_video_count += 1
-                            continue
-
-                        await self.checkpoint_manager.add_note_to_checkpoint(
-                            checkpoint_id=checkpoint.id,
-                            note_id=video.video_id,
-                            extra_params_info={},
-                            is_success_crawled=True,
-                        )
-
-                        await kuaishou_store.update_kuaishou_video(video)
-                        saved_video_count += 1
-
-                    # 批量获取视频评论
-                    await self.comment_processor.batch_get_video_comments(
-                        video_id_list, checkpoint.id
-                    )
-                    page += 1
+            vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
+            if vision_search_photo.get("result") != 1:
+                utils.logger.error(
+                    f"[SearchHandler.search] search info by keyword:{keyword} not found data "
+                )
+                continue
 
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+            search_session_id = vision_search_photo.get("searchSessionId", "")
+            # 发布时间窗口外的视频不保存也不爬评论
+            videos = [
+                video
+                for video in videos
+                if video.video_id and publish_time_window.contains(video.create_time)
+            ]
 
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[SearchHandler.search] Search videos error: {ex}"
-                    )
-                    # 发生异常了，则打印当前爬取的关键词和页码，用于后续继续爬取
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码------------------------------------------"
-                    )
-                    for i in range(3):
-                        utils.logger.error(
-                            f"[SearchHandler.search] Current keyword: {keyword}, page: {page}"
-                        )
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码---------------------------------------------------"
-                    )
+            yield {"page": page, "videos": videos}
 
-                    utils.logger.info(
-                        f"[SearchHandler.search] 可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
-                    )
-                    return
+            page += 1
+            saved_video_count += len(videos)
 
-                finally:
-                    lastest_checkpoint = (
-                        await self.checkpoint_manager.load_checkpoint_by_id(
-                            checkpoint.id
-                        )
-                    )
-                    if lastest_checkpoint:
-                        lastest_checkpoint.current_search_page = page
-                        await self.checkpoint_manager.update_checkpoint(
-                            lastest_checkpoint
-                        )
+    async def _save_page_videos(self, search_page: Dict, checkpoint_id: str) -> Dict:
+        """
+        视频阶段：搜索结果里已经包含视频详情，直接保存
+
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+
+        Returns:
+            Dict: 追加了 video_id_list 的搜索页数据
+        """
+        video_id_list: List[str] = []
+        for video in search_page["videos"]:
+            # 检查是否已经爬取过
+            if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                checkpoint_id=checkpoint_id, note_id=video.video_id
+            ):
+                video_id_list.append(video.video_id)
+                utils.logger.info(
+                    f"[SearchHandler.search] video {video.video_id} is already crawled, skip"
+                )
+                continue
+
+            # 其他关键词或者之前的任务已经爬取过
+            if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                constant.KUAISHOU_PLATFORM_NAME, video.video_id, source_keyword_var.get()
+            ):
+                utils.logger.info(
+                    f"[SearchHandler.search] video {video.video_id} is already crawled by other keyword or job, skip"
+                )
+                continue
+
+            video_id_list.append(video.video_id)
+            await self.checkpoint_manager.add_note_to_checkpoint(
+                checkpoint_id=checkpoint_id,
+                note_id=video.video_id,
+                extra_params_info={},
+                is_success_crawled=True,
+            )
+            await kuaishou_store.update_kuaishou_video(video)
+            if config.ENABLE_NOTE_DEDUP:
+                await get_note_seen_set_manager().mark_seen_note_after_comments(
+                    constant.KUAISHOU_PLATFORM_NAME, video.video_id, source_keyword_var.get()
+                )
+        return {**search_page, "video_id_list": video_id_list}
+
+    async def _fetch_page_video_comments(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> None:
+        """
+        评论阶段：批量获取一页搜索结果中视频的评论
+
+        Args:
+            search_page: 视频阶段产出的数据
+            checkpoint_id: 检查点ID
+
+        Returns:
+            None
+        """
+        await self.comment_processor.batch_get_video_comments(
+            search_page["video_id_list"], checkpoint_id
+        )
+
+    async def _save_search_page_checkpoint(
+        self, search_page: Dict, checkpoint_id: str, keyword: str
+    ) -> None:
+        """
+        一页搜索结果（以及它之前的所有页）全部处理完成后，推进检查点中该关键词的页码
+
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+            keyword: 搜索关键词
+
+        Returns:
+            None
+        """
+        await self.checkpoint_manager.update_search_keyword_cursor(
+            checkpoint_id, keyword, current_search_page=search_page["page"] + 1
+        )
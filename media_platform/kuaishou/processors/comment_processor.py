@@ -11,11 +11,13 @@
 import asyncio
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Callable, TYPE_CHECKING
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Callable, Tuple, TYPE_CHECKING
 
 import config
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+import constant
 from model.m_kuaishou import KuaishouVideoComment
+from pkg.pipeline import get_note_completion_records, ordered_concurrent_stream
 from pkg.tools import utils
 from repo.platform_save_data import kuaishou as kuaishou_store
 from ..exception import DataFetchError
@@ -23,6 +25,7 @@ from ..exception import DataFetchError
 if TYPE_CHECKING:
     from ..client import KuaiShouApiClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class CommentProcessor:
@@ -32,7 +35,7 @@ class CommentProcessor:
         self,
         ks_client: "KuaiShouApiClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_comment_semaphore: asyncio.Semaphore
+        crawler_comment_semaphore: "AdaptiveConcurrencyLimiter"
     ):
         """
         Initialize comment processor
@@ -40,7 +43,7 @@ class CommentProcessor:
         Args:
             ks_client: Kuaishou API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_comment_semaphore: Semaphore to limit concurrent comment tasks
+            crawler_comment_semaphore: Adaptive concurrency limiter to limit concurrent comment tasks
         """
         self.ks_client = ks_client
         self.checkpoint_manager = checkpoint_manager
@@ -103,13 +106,18 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.get_comments_async_task] Begin get video id comments {video_id}"
                 )
-                # 获取视频的所有评论
-                await self.get_video_all_comments(
-                    photo_id=video_id,
-                    checkpoint_id=checkpoint_id
-                )
+                # 获取视频的所有评论，评论按页入库，这里只统计数量，不保留评论
+                crawled_count = 0
+                async with aclosing(
+                    self.get_video_all_comments(
+                        photo_id=video_id,
+                        checkpoint_id=checkpoint_id
+                    )
+                ) as comment_pages:
+                    async for comments in comment_pages:
+                        crawled_count += len(comments)
                 utils.logger.info(
-                    f"[CommentProcessor.get_comments_async_task] video_id: {video_id} comments have all been obtained and filtered ..."
+                    f"[CommentProcessor.get_comments_async_task] video_id: {video_id} comments have all been obtained and filtered, count: {crawled_count}"
                 )
             except DataFetchError as e:
                 utils.logger.error(
@@ -124,19 +132,19 @@ class CommentProcessor:
         self,
         photo_id: str,
         checkpoint_id: str = "",
-    ) -> List[KuaishouVideoComment]:
+    ) -> AsyncIterator[List[KuaishouVideoComment]]:
         """
         获取视频所有评论，包括一级评论和二级评论，支持断点续传
+        每一页评论入库后立即产出，只记录数量，不在内存中累积整个视频的评论
         
         Args:
             photo_id: 视频ID
-            callback: 一次评论爬取结束后的回调函数
             checkpoint_id: checkpoint id for resume functionality
             
         Returns:
-            List[KuaishouVideoComment]: 评论模型列表
+            AsyncIterator[List[KuaishouVideoComment]]: 已入库的评论页
         """
-        result = []
+        crawled_count = 0
         pcursor = ""
         
         # 从checkpoint中获取上次保存的评论游标
@@ -161,37 +169,41 @@ class CommentProcessor:
                     
                 # 保存评论到数据库
                 await kuaishou_store.batch_update_ks_video_comments(comments)
-                result.extend(comments)
-                
-                # 更新checkpoint中的评论游标
-                await self.checkpoint_manager.update_note_comment_cursor(
-                    checkpoint_id=checkpoint_id,
-                    note_id=photo_id,
-                    comment_cursor=pcursor,
-                    is_success_crawled_comments=False,
-                )
+                crawled_count += len(comments)
+                yield comments
                 
                 if (
-                    PER_NOTE_MAX_COMMENTS_COUNT
-                    and len(result) >= PER_NOTE_MAX_COMMENTS_COUNT
+                    config.PER_NOTE_MAX_COMMENTS_COUNT
+                    and crawled_count >= config.PER_NOTE_MAX_COMMENTS_COUNT
                 ):
                     utils.logger.info(
-                        f"[CommentProcessor.get_video_all_comments] The number of comments exceeds the limit: {PER_NOTE_MAX_COMMENTS_COUNT}"
+                        f"[CommentProcessor.get_video_all_comments] The number of comments exceeds the limit: {config.PER_NOTE_MAX_COMMENTS_COUNT}"
                     )
                     break
                     
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-                sub_comments = await self.get_comments_all_sub_comments(
-                    comments, vision_comment_list.get("rootComments", []), photo_id
+                async with aclosing(
+                    self.get_comments_all_sub_comments(
+                        comments, vision_comment_list.get("rootComments", []), photo_id, checkpoint_id
+                    )
+                ) as sub_comment_pages:
+                    async for sub_comments in sub_comment_pages:
+                        crawled_count += len(sub_comments)
+                        yield sub_comments
+
+                # 当前页的一级评论和二级评论都入库后才更新checkpoint中的评论游标，
+                # 中断后从没有处理完的一页继续，该页下已经爬完的一级评论跳过，没爬完的从二级评论游标继续
+                await self.checkpoint_manager.update_note_comment_cursor(
+                    checkpoint_id=checkpoint_id,
+                    note_id=photo_id,
+                    comment_cursor=pcursor,
+                    is_success_crawled_comments=False,
                 )
-                result.extend(sub_comments)
                 
             except Exception as e:
                 utils.logger.error(
                     f"[CommentProcessor.get_video_all_comments] Error getting comments for {photo_id}: {e}"
                 )
-                return result
+                return
         
         # 标记该video的评论已完全爬取
         await self.checkpoint_manager.update_note_comment_cursor(
@@ -200,66 +212,94 @@ class CommentProcessor:
             comment_cursor=pcursor,
             is_success_crawled_comments=True,
         )
-        
-        return result
+        await get_note_completion_records().complete_note(
+            constant.KUAISHOU_PLATFORM_NAME, photo_id
+        )
 
     async def get_comments_all_sub_comments(
         self,
         comments: List[KuaishouVideoComment],
         raw_comments: List[Dict],
         photo_id: str,
-    ) -> List[KuaishouVideoComment]:
+        checkpoint_id: str = "",
+    ) -> AsyncIterator[List[KuaishouVideoComment]]:
         """
         获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
+        每页二级评论入库后在检查点中记录该一级评论的二级评论游标，爬完后记录到已完成的一级评论中，
+        断点续爬时跳过已完成的一级评论，没爬完的一级评论从保存的游标继续
         Args:
             comments: 评论模型列表
             raw_comments: 原始评论数据（用于获取游标信息）
             photo_id: 视频ID
+            checkpoint_id: 检查点ID
 
         Returns:
-            List[KuaishouVideoComment]: 子评论模型列表
+            AsyncIterator[List[KuaishouVideoComment]]: 按一级评论顺序产出已入库的二级评论
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(
                 f"[CommentProcessor.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
             )
-            return []
+            return
 
-        result = []
-        # 使用raw_comments获取游标信息，使用comments获取评论ID
-        for comment, raw_comment in zip(comments, raw_comments):
-            sub_comments_data = raw_comment.get("subComments")
-            if sub_comments_data:
-                # 转换子评论为模型并保存
-                sub_comments_models = self.ks_client._extractor.extract_comments_from_list(
-                    photo_id, sub_comments_data
-                )
-                await kuaishou_store.batch_update_ks_video_comments(sub_comments_models)
-                result.extend(sub_comments_models)
+        sub_comment_cursors, completed_root_comment_ids = (
+            await self.checkpoint_manager.get_note_sub_comment_progress(
+                checkpoint_id=checkpoint_id, note_id=photo_id
+            )
+        )
 
-            sub_comment_pcursor = raw_comment.get("subCommentsPcursor")
-            if sub_comment_pcursor == "no_more":
-                continue
+        async def iter_root_sub_comments(
+            comment_pair: Tuple[KuaishouVideoComment, Dict]
+        ) -> AsyncIterator[Tuple[List[KuaishouVideoComment], Optional[str], bool]]:
+            # 产出 (二级评论, 下一页游标, 是否已爬完)，游标为 None 表示不需要记录进度
+            comment, raw_comment = comment_pair
+            if comment.comment_id in completed_root_comment_ids:
+                return
 
-            root_comment_id = comment.comment_id
-            sub_comment_pcursor = ""
+            sub_comment_pcursor = sub_comment_cursors.get(comment.comment_id)
+            if sub_comment_pcursor is None:
+                # 一级评论中自带前几条二级评论
+                sub_comments_data = raw_comment.get("subComments")
+                if raw_comment.get("subCommentsPcursor") == "no_more":
+                    if sub_comments_data:
+                        yield self.ks_client._extractor.extract_comments_from_list(
+                            photo_id, sub_comments_data
+                        ), None, True
+                    return
+                sub_comment_pcursor = ""
 
             while sub_comment_pcursor != "no_more":
                 try:
                     sub_comments, sub_comments_res = await self.ks_client.get_video_sub_comments(
-                        photo_id, root_comment_id, sub_comment_pcursor
+                        photo_id, comment.comment_id, sub_comment_pcursor
                     )
-                    vision_sub_comment_list = sub_comments_res.get("visionSubCommentList", {})
-                    sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
-
-                    if sub_comments:
-                        await kuaishou_store.batch_update_ks_video_comments(sub_comments)
-                        result.extend(sub_comments)
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
                 except Exception as e:
                     utils.logger.error(
                         f"[CommentProcessor.get_comments_all_sub_comments] Error getting sub comments: {e}"
                     )
-                    break
-        return result
+                    return
+                vision_sub_comment_list = sub_comments_res.get("visionSubCommentList", {})
+                sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
+                yield sub_comments or [], sub_comment_pcursor, sub_comment_pcursor == "no_more"
+
+        # 各一级评论的二级评论并发获取，并发数为客户端工作池同时能执行的请求数，按一级评论的顺序入库，入库后交给调用方计数，不再保留
+        # 使用raw_comments获取游标信息，使用comments获取评论ID
+        async with aclosing(
+            ordered_concurrent_stream(
+                iter_root_sub_comments,
+                list(zip(comments, raw_comments)),
+                concurrency=self.ks_client.concurrency,
+            )
+        ) as root_results:
+            async for (comment, _), (sub_comments, sub_comment_pcursor, is_finished) in root_results:
+                if sub_comments:
+                    await kuaishou_store.batch_update_ks_video_comments(sub_comments)
+                    yield sub_comments
+                if sub_comment_pcursor is not None:
+                    await self.checkpoint_manager.update_note_sub_comment_progress(
+                        checkpoint_id=checkpoint_id,
+                        note_id=photo_id,
+                        root_comment_id=comment.comment_id,
+                        sub_comment_cursor=sub_comment_pcursor,
+                        is_finished=is_finished,
+                    )
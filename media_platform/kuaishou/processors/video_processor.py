@@ -11,7 +11,6 @@
 import asyncio
 from typing import Dict, List, Optional, TYPE_CHECKING
 
-import config
 from pkg.tools import utils
 from repo.platform_save_data import kuaishou as kuaishou_store
 from ..exception import DataFetchError
@@ -19,6 +18,7 @@ from ..exception import DataFetchError
 if TYPE_CHECKING:
     from ..client import KuaiShouApiClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class VideoProcessor:
@@ -28,7 +28,7 @@ class VideoProcessor:
         self,
         ks_client: "KuaiShouApiClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_video_task_semaphore: asyncio.Semaphore,
+        crawler_video_task_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize video processor
@@ -36,7 +36,7 @@ class VideoProcessor:
         Args:
             ks_client: Kuaishou API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_video_task_semaphore: Semaphore to limit concurrent video tasks
+            crawler_video_task_semaphore: Adaptive concurrency limiter to limit concurrent video tasks
         """
         self.ks_client = ks_client
         self.checkpoint_manager = checkpoint_manager
@@ -88,9 +88,6 @@ class VideoProcessor:
                     current_note_comment_cursor=None,
                 )
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-
         return video_detail
 
     async def batch_get_video_list(
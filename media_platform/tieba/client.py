@@ -9,20 +9,26 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import json
+import time
 import traceback
 from typing import Dict, List, Optional, Union
 from urllib.parse import urlencode
 
 import httpx
 from httpx import Response
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractApiClient
+from constant.base_constant import TIEBA_PLATFORM_NAME
 from constant.baidu_tieba import TIEBA_URL
 from model.m_baidu_tieba import TiebaNote
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
+from pkg.extraction import run_extraction
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
 
 from .field import SearchNoteType, SearchSortType
@@ -67,6 +73,17 @@ class BaiduTieBaClient(AbstractApiClient):
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         # return ""
@@ -128,7 +145,7 @@ class BaiduTieBaClient(AbstractApiClient):
                 await self.account_with_ip_pool.proxy_ip_pool.get_proxy()
             )
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(1))
+    @request_retry()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -145,10 +162,18 @@ class BaiduTieBaClient(AbstractApiClient):
         if "return_response" in kwargs:
             del kwargs["return_response"]
 
+        await get_request_pacer().acquire(
+            TIEBA_PLATFORM_NAME, self._pacing_account_name, url
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(
                 method, url, timeout=self.timeout, headers=self.headers, **kwargs
             )
+        await get_concurrency_controller(TIEBA_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
 
         if response.status_code != 200:
             utils.logger.error(
@@ -168,6 +193,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         return response.json()
 
+    @coalesce_requests(TIEBA_PLATFORM_NAME)
     async def get(self, uri: str, params=None, **kwargs) -> Union[Response, Dict]:
         """
         GET请求，对请求头签名
@@ -230,6 +256,7 @@ class BaiduTieBaClient(AbstractApiClient):
                     method="GET", url=f"{TIEBA_URL}{final_uri}", **kwargs
                 )
 
+    @coalesce_requests(TIEBA_PLATFORM_NAME)
     async def post(self, uri: str, data: dict, **kwargs) -> Dict:
         """
         POST请求，对请求头签名
@@ -344,7 +371,9 @@ class BaiduTieBaClient(AbstractApiClient):
             "only_thread": note_type.value,
         }
         response = await self.get(uri, params=params, return_response=True)
-        return self.page_extractor.extract_search_note_list(response.text)
+        return await run_extraction(
+            self.page_extractor.extract_search_note_list, response.text
+        )
 
     async def get_note_by_id(self, note_id: str) -> TiebaNote:
         """
@@ -357,7 +386,9 @@ class BaiduTieBaClient(AbstractApiClient):
         """
         uri = f"/p/{note_id}"
         response = await self.get(uri, return_response=True)
-        return self.page_extractor.extract_note_detail(response.text)
+        return await run_extraction(
+            self.page_extractor.extract_note_detail, response.text
+        )
 
     async def get_note_comments(self, note_id: str, page: int = 1) -> str:
         """
@@ -410,7 +441,9 @@ class BaiduTieBaClient(AbstractApiClient):
         """
         uri = f"/f?kw={tieba_name}&pn={page_num}"
         response = await self.get(uri, return_response=True)
-        return self.page_extractor.extract_tieba_note_list(response.text)
+        return await run_extraction(
+            self.page_extractor.extract_tieba_note_list, response.text
+        )
 
     async def get_creator_info_by_url(self, creator_url: str) -> str:
         """
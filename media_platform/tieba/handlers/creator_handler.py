@@ -7,7 +7,6 @@
 #   
 # 详细许可条款请参阅项目根目录下的LICENSE文件。  
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
-import asyncio
 import random
 from typing import List, TYPE_CHECKING
 
@@ -15,6 +14,7 @@ import config
 import constant
 from model.m_checkpoint import Checkpoint
 from model.m_baidu_tieba import TiebaCreator, TiebaNote
+from pkg.extraction import run_extraction
 from pkg.tools import utils
 from repo.platform_save_data import tieba as tieba_store
 from ..help import TieBaExtractor
@@ -129,8 +129,8 @@ class CreatorHandler(BaseHandler):
                 creator_page_html_content = await self.tieba_client.get_creator_info_by_url(
                     creator_url=creator_url
                 )
-                creator_info: TiebaCreator = self.extractor.extract_creator_info(
-                    creator_page_html_content
+                creator_info: TiebaCreator = await run_extraction(
+                    self.extractor.extract_creator_info, creator_page_html_content
                 )
                 if creator_info:
                     utils.logger.info(
@@ -145,9 +145,6 @@ class CreatorHandler(BaseHandler):
                         checkpoint_id=checkpoint.id
                     )
 
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-
                 else:
                     utils.logger.error(
                         f"[CreatorHandler.get_creators_and_notes] get creator info error, creator_url:{creator_url}"
@@ -189,10 +186,9 @@ class CreatorHandler(BaseHandler):
         # 百度贴吧比较特殊一些，前10个帖子是直接展示在主页上的，要单独处理，通过API获取不到
         result: List[TiebaNote] = []
         if creator_page_html_content:
-            thread_id_list = (
-                self.tieba_client.page_extractor.extract_tieba_thread_id_list_from_creator_page(
-                    creator_page_html_content
-                )
+            thread_id_list = await run_extraction(
+                self.tieba_client.page_extractor.extract_tieba_thread_id_list_from_creator_page,
+                creator_page_html_content,
             )
             utils.logger.info(
                 f"[CreatorHandler.get_all_notes_by_creator] got user_name:{user_name} thread_id_list len : {len(thread_id_list)}"
@@ -235,8 +231,6 @@ class CreatorHandler(BaseHandler):
             tieba_note_list: List[TiebaNote] = await self.note_processor.batch_get_note_list(note_id_list, checkpoint_id=checkpoint_id)
             await self.comment_processor.batch_get_note_comments(tieba_note_list, checkpoint_id=checkpoint_id)
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
             result.extend(notes)
             page_number += 1
             total_get_count += page_per_count
@@ -8,7 +8,6 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。  
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
 from typing import List, TYPE_CHECKING
 
 import config
@@ -95,5 +94,3 @@ class DetailHandler(BaseHandler):
             note_details, checkpoint_id=checkpoint.id
         )
         
-        # 爬虫请求间隔时间
-        await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
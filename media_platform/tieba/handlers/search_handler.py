@@ -9,11 +9,14 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
-from typing import List, TYPE_CHECKING
+from contextlib import aclosing
+from functools import partial
+from typing import AsyncIterator, Dict, List, TYPE_CHECKING
 
 import config
 import constant
-from model.m_checkpoint import Checkpoint
+from model.m_checkpoint import Checkpoint, CheckpointSearchKeyword
+from pkg.pipeline import PipelineStage, StagedPipeline, fetch_pages_concurrently
 from pkg.tools import utils
 from var import source_keyword_var
 from ..field import SearchNoteType, SearchSortType
@@ -80,22 +83,6 @@ class SearchHandler(BaseHandler):
         """
         return config.TIEBA_NAME_LIST
 
-    def _find_keyword_index_in_keyword_list(self, keyword: str) -> int:
-        """
-        Find keyword index in keyword list
-
-        Args:
-            keyword: keyword
-
-        Returns:
-            int: keyword index
-        """
-        keyword_list = self._get_search_keyword_list()
-        for index, keyword_item in enumerate(keyword_list):
-            if keyword_item == keyword:
-                return index
-        return -1
-
     def _find_tieba_name_index_in_tieba_name_list(self, tieba_name: str) -> int:
         """
         Find tieba name index in tieba name list
@@ -115,15 +102,18 @@ class SearchHandler(BaseHandler):
     async def search(self) -> None:
         """
         Search for notes and retrieve their comment information.
+        多个关键词并发搜索（并发数 SEARCH_KEYWORD_CONCURRENCY），每个关键词在检查点中有自己的翻页游标
         Returns:
             None
         """
         utils.logger.info("[SearchHandler.search] Begin search baidu tieba keywords")
+        tieba_limit_count = 10  # tieba limit page fixed value
+        if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
+            config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
         keyword_list = self._get_search_keyword_list()
         checkpoint = Checkpoint(
             platform=constant.TIEBA_PLATFORM_NAME,
             mode=constant.CRALER_TYPE_SEARCH,
-            current_search_page=1,
         )
 
         # 如果开启了断点续爬，则加载检查点
@@ -134,109 +124,220 @@ class SearchHandler(BaseHandler):
                 checkpoint_id=config.SPECIFIED_CHECKPOINT_ID,
             )
             if lastest_checkpoint:
-                keyword_index = self._find_keyword_index_in_keyword_list(
-                    lastest_checkpoint.current_search_keyword
-                )
-                if keyword_index == -1:
-                    # 没有搜索到，则从第一个关键词开始爬取
-                    utils.logger.warning(
-                        f"[SearchHandler.search] Keyword {lastest_checkpoint.current_search_keyword} not found in keyword list"
-                    )
-                    keyword_index = 0
-                else:
-                    # 如果搜索到了，则从检查点中保存的当前关键词开始爬取
+                if self.checkpoint_manager.has_search_keyword_progress(
+                    lastest_checkpoint, keyword_list
+                ):
+                    # 检查点中有当前关键词的进度，则每个未完成的关键词从各自的页码继续爬取
                     checkpoint = lastest_checkpoint
                     utils.logger.info(
                         f"[SearchHandler.search] Load lastest checkpoint: {lastest_checkpoint.id}"
                     )
-                    keyword_list = keyword_list[keyword_index:]
+                else:
+                    # 没有搜索到，则从第一页开始爬取所有关键词
+                    utils.logger.warning(
+                        f"[SearchHandler.search] Keywords of checkpoint {lastest_checkpoint.id} not found in keyword list"
+                    )
 
-        tieba_limit_count = 10  # tieba limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
+        # 先保存每个关键词的游标，后面的业务行为都是基于这个检查点来更新page信息
+        checkpoint = await self.checkpoint_manager.init_search_keyword_cursors(
+            checkpoint, keyword_list
+        )
+        keyword_semaphore = asyncio.Semaphore(max(1, config.SEARCH_KEYWORD_CONCURRENCY))
+        await asyncio.gather(
+            *[
+                self._search_keyword(
+                    keyword,
+                    checkpoint.search_keyword_cursors[keyword],
+                    checkpoint.id,
+                    keyword_semaphore,
+                    tieba_limit_count,
+                )
+                for keyword in keyword_list
+                if not checkpoint.search_keyword_cursors[keyword].is_finished
+            ]
+        )
+
+    async def _search_keyword(
+        self,
+        keyword: str,
+        keyword_cursor: CheckpointSearchKeyword,
+        checkpoint_id: str,
+        semaphore: asyncio.Semaphore,
+        tieba_limit_count: int,
+    ) -> None:
+        """
+        搜索单个关键词，从关键词游标记录的页码开始翻页
+
+        Args:
+            keyword: 搜索关键词
+            keyword_cursor: 关键词搜索游标
+            checkpoint_id: 检查点ID
+            semaphore: 关键词并发控制
+            tieba_limit_count: 每页数量
 
-        for keyword in keyword_list:
+        Returns:
+            None
+        """
+        async with semaphore:
             source_keyword_var.set(keyword)
-            page = checkpoint.current_search_page or 1
+            page = keyword_cursor.current_search_page
+            utils.logger.info(
+                f"[SearchHandler.search] Current search keyword: {keyword}, page: {page}"
+            )
 
-            # bugfix: https://github.com/MediaCrawlerPro/MediaCrawlerPro-Python/issues/311
-            if checkpoint.current_search_keyword != keyword:
-                page = 1
+            # 搜索翻页 -> 帖子详情 -> 帖子评论，三个阶段通过有界队列串联执行
+            pipeline = StagedPipeline(
+                producer=self._search_note_pages(keyword, page, tieba_limit_count),
+                stages=[
+                    PipelineStage(
+                        name="note_detail",
+                        handler=partial(
+                            self._fetch_page_note_details, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_DETAIL_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                    PipelineStage(
+                        name="note_comments",
+                        handler=partial(
+                            self._fetch_page_note_comments, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_COMMENT_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                ],
+                on_item_done=partial(
+                    self._save_search_page_checkpoint,
+                    checkpoint_id=checkpoint_id,
+                    keyword=keyword,
+                ),
+            )
+            try:
+                await pipeline.run()
+            except Exception as ex:
+                utils.logger.error(
+                    f"[SearchHandler.search] Search keyword {keyword} notes error: {ex}"
+                )
+                lastest_checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
+                    checkpoint_id
+                )
+                if lastest_checkpoint and keyword in lastest_checkpoint.search_keyword_cursors:
+                    page = lastest_checkpoint.search_keyword_cursors[keyword].current_search_page
+                # 发生异常了，则打印当前爬取的关键词和页码，其他关键词继续爬取，当前关键词可以通过断点续爬继续
+                utils.logger.error(
+                    f"[SearchHandler.search] Current keyword: {keyword}, page: {page}, "
+                    f"可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
+                )
+                return
 
-            # 按关键字保存检查点，后面的业务行为都是基于这个检查点来更新page信息，所以需要先保存检查点
-            checkpoint.current_search_keyword = keyword
-            await self.checkpoint_manager.save_checkpoint(checkpoint)
+            await self.checkpoint_manager.update_search_keyword_cursor(
+                checkpoint_id, keyword, is_finished=True
+            )
 
+    async def _search_note_pages(
+        self, keyword: str, page: int, tieba_limit_count: int
+    ) -> AsyncIterator[Dict]:
+        """
+        搜索翻页生产者，每次产出一页帖子ID列表
+
+        Args:
+            keyword: 搜索关键词
+            page: 起始页码
+            tieba_limit_count: 每页数量
+
+        Returns:
+            AsyncIterator[Dict]: {"page": 页码, "note_id_list": 帖子ID列表}
+        """
+
+        async def fetch_search_page(page_num: int) -> List:
             utils.logger.info(
-                f"[SearchHandler.search] Current search keyword: {keyword}"
+                f"[SearchHandler.search] search tieba keyword: {keyword}, page: {page_num}"
             )
-            saved_note_count = (page - 1) * tieba_limit_count
-            while saved_note_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                try:
-                    utils.logger.info(
-                        f"[SearchHandler.search] search tieba keyword: {keyword}, page: {page}"
-                    )
-                    notes_list = await self.tieba_client.get_notes_by_keyword(
-                        keyword=keyword,
-                        page=page,
-                        page_size=tieba_limit_count,
-                        sort=SearchSortType.TIME_DESC,
-                        note_type=SearchNoteType.FIXED_THREAD,
-                    )
-                    if not notes_list:
-                        utils.logger.info(
-                            f"[SearchHandler.search] Search note list is empty"
-                        )
-                        break
-                    utils.logger.info(
-                        f"[SearchHandler.search] Note list len: {len(notes_list)}"
-                    )
+            notes_list = await self.tieba_client.get_notes_by_keyword(
+                keyword=keyword,
+                page=page_num,
+                page_size=tieba_limit_count,
+                sort=SearchSortType.TIME_DESC,
+                note_type=SearchNoteType.FIXED_THREAD,
+            )
+            if not notes_list:
+                utils.logger.info(f"[SearchHandler.search] Search note list is empty")
+            return notes_list
+
+        saved_note_count = (page - 1) * tieba_limit_count
+        if saved_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+            return
+
+        # 搜索结果按页码寻址，并发请求后面的几页（并发数为客户端工作池同时能执行的请求数），按页码顺序产出
+        async with aclosing(
+            fetch_pages_concurrently(
+                fetch_search_page, start_page=page, concurrency=self.tieba_client.concurrency
+            )
+        ) as page_iterator:
+            async for page, notes_list in page_iterator:
+                utils.logger.info(
+                    f"[SearchHandler.search] Note list len: {len(notes_list)}"
+                )
+                note_id_list = [note_detail.note_id for note_detail in notes_list]
 
-                    note_id_list = [note_detail.note_id for note_detail in notes_list]
-                    note_details = await self.note_processor.batch_get_note_list(
-                        note_id_list=note_id_list, checkpoint_id=checkpoint.id
-                    )
-                    await self.comment_processor.batch_get_note_comments(
-                        note_details, checkpoint_id=checkpoint.id
-                    )
+                yield {"page": page, "note_id_list": note_id_list}
 
-                    page += 1
+                saved_note_count += len(note_id_list)
+                if saved_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
 
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+    async def _fetch_page_note_details(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> Dict:
+        """
+        详情阶段：获取一页搜索结果中帖子的详情
 
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[SearchHandler.search] Search notes error: {ex}"
-                    )
-                    # 发生异常了，则打印当前爬取的关键词和页码，用于后续继续爬取
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码------------------------------------------"
-                    )
-                    for i in range(3):
-                        utils.logger.error(
-                            f"[SearchHandler.search] Current keyword: {keyword}, page: {page}"
-                        )
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码---------------------------------------------------"
-                    )
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
 
-                    utils.logger.info(
-                        f"[SearchHandler.search] 可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
-                    )
-                    return
+        Returns:
+            Dict: 追加了 note_details 的搜索页数据
+        """
+        note_details = await self.note_processor.batch_get_note_list(
+            note_id_list=search_page["note_id_list"], checkpoint_id=checkpoint_id
+        )
+        return {**search_page, "note_details": note_details}
 
-                finally:
-                    lastest_checkpoint = (
-                        await self.checkpoint_manager.load_checkpoint_by_id(
-                            checkpoint.id
-                        )
-                    )
-                    if lastest_checkpoint:
-                        lastest_checkpoint.current_search_page = page
-                        await self.checkpoint_manager.update_checkpoint(
-                            lastest_checkpoint
-                        )
+    async def _fetch_page_note_comments(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> None:
+        """
+        评论阶段：获取一页搜索结果中帖子的评论
+
+        Args:
+            search_page: 详情阶段产出的数据
+            checkpoint_id: 检查点ID
+
+        Returns:
+            None
+        """
+        await self.comment_processor.batch_get_note_comments(
+            search_page["note_details"], checkpoint_id=checkpoint_id
+        )
+
+    async def _save_search_page_checkpoint(
+        self, search_page: Dict, checkpoint_id: str, keyword: str
+    ) -> None:
+        """
+        一页搜索结果（以及它之前的所有页）全部处理完成后，推进检查点中该关键词的页码
+
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+            keyword: 搜索关键词
+
+        Returns:
+            None
+        """
+        await self.checkpoint_manager.update_search_keyword_cursor(
+            checkpoint_id, keyword, current_search_page=search_page["page"] + 1
+        )
 
     async def get_specified_tieba_notes(self):
         """
@@ -289,48 +390,55 @@ class SearchHandler(BaseHandler):
                 f"[SearchHandler.get_specified_tieba_notes] Begin get tieba name: {tieba_name}"
             )
             page_number = checkpoint.current_search_page
-            while page_number <= config.CRAWLER_MAX_NOTES_COUNT:
-                try:
-                    note_list = await self.tieba_client.get_notes_by_tieba_name(
-                        tieba_name=tieba_name, page_num=page_number
-                    )
-                    if not note_list:
-                        utils.logger.info(
-                            f"[SearchHandler.get_specified_tieba_notes] Get note list is empty"
-                        )
-                        break
 
+            async def fetch_tieba_page(page_num: int) -> List:
+                note_list = await self.tieba_client.get_notes_by_tieba_name(
+                    tieba_name=tieba_name, page_num=page_num
+                )
+                if not note_list:
                     utils.logger.info(
-                        f"[SearchHandler.get_specified_tieba_notes] tieba name: {tieba_name} note list len: {len(note_list)}"
+                        f"[SearchHandler.get_specified_tieba_notes] Get note list is empty"
                     )
-
-                    note_id_list = [note.note_id for note in note_list]
-                    note_details = await self.note_processor.batch_get_note_list(
-                        note_id_list=note_id_list, checkpoint_id=checkpoint.id
-                    )
-                    await self.comment_processor.batch_get_note_comments(
-                        note_details, checkpoint_id=checkpoint.id
-                    )
-
-                    page_number += tieba_limit_count
-
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[SearchHandler.get_specified_tieba_notes] Get tieba notes error: {ex}"
+                return note_list
+
+            try:
+                # 贴吧帖子列表按偏移量寻址，并发请求后面的几页（并发数为客户端工作池同时能执行的请求数），按顺序处理
+                async with aclosing(
+                    fetch_pages_concurrently(
+                        fetch_tieba_page,
+                        start_page=page_number,
+                        concurrency=self.tieba_client.concurrency,
+                        page_step=tieba_limit_count,
+                        last_page=config.CRAWLER_MAX_NOTES_COUNT,
                     )
-                    return
+                ) as page_iterator:
+                    async for page_number, note_list in page_iterator:
+                        utils.logger.info(
+                            f"[SearchHandler.get_specified_tieba_notes] tieba name: {tieba_name} note list len: {len(note_list)}"
+                        )
 
-                finally:
-                    lastest_checkpoint = (
-                        await self.checkpoint_manager.load_checkpoint_by_id(
-                            checkpoint.id
+                        note_id_list = [note.note_id for note in note_list]
+                        note_details = await self.note_processor.batch_get_note_list(
+                            note_id_list=note_id_list, checkpoint_id=checkpoint.id
                         )
-                    )
-                    if lastest_checkpoint:
-                        lastest_checkpoint.current_search_page = page_number
-                        await self.checkpoint_manager.update_checkpoint(
-                            lastest_checkpoint
+                        await self.comment_processor.batch_get_note_comments(
+                            note_details, checkpoint_id=checkpoint.id
                         )
+
+                        page_number += tieba_limit_count
+                        lastest_checkpoint = (
+                            await self.checkpoint_manager.load_checkpoint_by_id(
+                                checkpoint.id
+                            )
+                        )
+                        if lastest_checkpoint:
+                            lastest_checkpoint.current_search_page = page_number
+                            await self.checkpoint_manager.update_checkpoint(
+                                lastest_checkpoint
+                            )
+
+            except Exception as ex:
+                utils.logger.error(
+                    f"[SearchHandler.get_specified_tieba_notes] Get tieba notes error: {ex}"
+                )
+                return
@@ -21,6 +21,7 @@ from parsel import Selector
 from constant import baidu_tieba as const
 from constant.baidu_tieba import GENDER_FEMALE, GENDER_MALE
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
+from pkg.extraction import cpu_heavy
 from pkg.tools import utils
 
 
@@ -29,6 +30,7 @@ class TieBaExtractor:
         pass
 
     @staticmethod
+    @cpu_heavy("page_content")
     def extract_search_note_list(page_content: str) -> List[TiebaNote]:
         """
         提取贴吧帖子列表，这里提取的关键词搜索结果页的数据，还缺少帖子的回复数和回复页等数据
@@ -75,6 +77,7 @@ class TieBaExtractor:
             result.append(tieba_note)
         return result
 
+    @cpu_heavy("page_content")
     def extract_tieba_note_list(self, page_content: str) -> List[TiebaNote]:
         """
         提取贴吧帖子列表
@@ -127,6 +130,7 @@ class TieBaExtractor:
             result.append(tieba_note)
         return result
 
+    @cpu_heavy("page_content")
     def extract_note_detail(self, page_content: str) -> TiebaNote:
         """
         提取贴吧帖子详情
@@ -197,6 +201,7 @@ class TieBaExtractor:
         note.title = note.title.replace(f"【{note.tieba_name}】_百度贴吧", "")
         return note
 
+    @cpu_heavy("page_content")
     def extract_tieba_note_parment_comments(
         self, page_content: str, note_id: str
     ) -> List[TiebaComment]:
@@ -258,6 +263,7 @@ class TieBaExtractor:
             result.append(tieba_comment)
         return result
 
+    @cpu_heavy("page_content")
     def extract_tieba_note_sub_comments(
         self, page_content: str, parent_comment: TiebaComment
     ) -> List[TiebaComment]:
@@ -308,6 +314,7 @@ class TieBaExtractor:
 
         return comments
 
+    @cpu_heavy("html_content")
     def extract_creator_info(self, html_content: str) -> TiebaCreator:
         """
         提取贴吧创作者信息
@@ -345,6 +352,7 @@ class TieBaExtractor:
             registration_duration=self.extract_registration_duration(user_content),
         )
 
+    @cpu_heavy("html_content")
     def extract_tieba_thread_id_list_from_creator_page(
         self, html_content: str
     ) -> List[str]:
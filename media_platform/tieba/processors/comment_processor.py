@@ -11,17 +11,25 @@
 import asyncio
 import random
 from asyncio import Task
-from typing import List, TYPE_CHECKING, Callable, Optional
+from contextlib import aclosing
+from typing import AsyncIterator, List, TYPE_CHECKING, Callable, Optional, Tuple
 
 import config
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+import constant
 from model.m_baidu_tieba import TiebaNote, TiebaComment
+from pkg.extraction import run_extraction
+from pkg.pipeline import (
+    fetch_pages_concurrently,
+    get_note_completion_records,
+    ordered_concurrent_stream,
+)
 from pkg.tools import utils
 from repo.platform_save_data import tieba as tieba_store
 
 if TYPE_CHECKING:
     from ..client import BaiduTieBaClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class CommentProcessor:
@@ -31,7 +39,7 @@ class CommentProcessor:
             self,
             tieba_client: "BaiduTieBaClient",
             checkpoint_manager: "CheckpointRepoManager",
-            crawler_note_comment_semaphore: asyncio.Semaphore
+            crawler_note_comment_semaphore: "AdaptiveConcurrencyLimiter"
     ):
         """
         Initialize comment processor
@@ -39,7 +47,7 @@ class CommentProcessor:
         Args:
             tieba_client: Tieba API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_note_comment_semaphore: Semaphore to limit concurrent comment tasks
+            crawler_note_comment_semaphore: Adaptive concurrency limiter to limit concurrent comment tasks
         """
         self.tieba_client = tieba_client
         self.checkpoint_manager = checkpoint_manager
@@ -77,6 +85,9 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.batch_get_note_comments] Note {note_detail.note_id} is already crawled comments, skip"
                 )
+                await get_note_completion_records().complete_note(
+                    constant.TIEBA_PLATFORM_NAME, note_detail.note_id
+                )
                 continue
 
             task = asyncio.create_task(
@@ -107,10 +118,19 @@ class CommentProcessor:
             utils.logger.info(
                 f"[CommentProcessor.get_comments_async_task] Begin get note id comments {note_detail.note_id}"
             )
-            await self.get_note_all_comments(
-                note_detail=note_detail,
-                callback=tieba_store.batch_update_tieba_note_comments,
-                checkpoint_id=checkpoint_id,
+            # 评论按页入库，这里只统计数量，不保留评论
+            crawled_count = 0
+            async with aclosing(
+                self.get_note_all_comments(
+                    note_detail=note_detail,
+                    callback=tieba_store.batch_update_tieba_note_comments,
+                    checkpoint_id=checkpoint_id,
+                )
+            ) as comment_pages:
+                async for comments in comment_pages:
+                    crawled_count += len(comments)
+            utils.logger.info(
+                f"[CommentProcessor.get_comments_async_task] note_id: {note_detail.note_id} comments have all been obtained, count: {crawled_count}"
             )
 
     async def get_note_all_comments(
@@ -118,18 +138,19 @@ class CommentProcessor:
             note_detail: TiebaNote,
             callback: Optional[Callable] = None,
             checkpoint_id: str = ""
-    ) -> List[TiebaComment]:
+    ) -> AsyncIterator[List[TiebaComment]]:
         """
         获取指定帖子下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
+        每一页评论回调入库后立即产出，只记录数量，不在内存中累积整个帖子的评论
         Args:
             note_detail: 帖子详情对象
             callback: 一次笔记爬取结束后
             checkpoint_id: 检查点ID
 
         Returns:
-
+            AsyncIterator[List[TiebaComment]]: 已回调的评论页
         """
-        result: List[TiebaComment] = []
+        crawled_count = 0
         current_page = 1
         note_id = note_detail.note_id
         lastest_comment_cursor = await self.checkpoint_manager.get_note_comment_cursor(
@@ -141,40 +162,58 @@ class CommentProcessor:
             )
             current_page = int(lastest_comment_cursor)
 
-        while note_detail.total_replay_page >= current_page:
-            response_txt = await self.tieba_client.get_note_comments(note_id, current_page)
-            comments: List[TiebaComment] = self.tieba_client.page_extractor.extract_tieba_note_parment_comments(
-                response_txt, note_id=note_detail.note_id
+        async def fetch_comments_page(page: int) -> List[TiebaComment]:
+            response_txt = await self.tieba_client.get_note_comments(note_id, page)
+            return await run_extraction(
+                self.tieba_client.page_extractor.extract_tieba_note_parment_comments,
+                response_txt,
+                note_id=note_detail.note_id,
             )
-            if not comments:
-                break
 
-            if callback:
-                await callback(note_detail.note_id, comments)
-
-            result.extend(comments)
-            if (
-                    PER_NOTE_MAX_COMMENTS_COUNT
-                    and len(result) >= PER_NOTE_MAX_COMMENTS_COUNT
-            ):
-                utils.logger.info(
-                    f"[CommentProcessor.get_note_all_comments] The number of comments exceeds the limit: {PER_NOTE_MAX_COMMENTS_COUNT}"
+        if note_detail.total_replay_page >= current_page:
+            # 帖子详情中已经有总页数，并发请求后面的几页（并发数为客户端工作池同时能执行的请求数），按页码顺序处理
+            async with aclosing(
+                fetch_pages_concurrently(
+                    fetch_comments_page,
+                    start_page=current_page,
+                    concurrency=self.tieba_client.concurrency,
+                    last_page=note_detail.total_replay_page,
                 )
-                break
-
-            current_page += 1
-            await self.checkpoint_manager.update_note_comment_cursor(
-                checkpoint_id=checkpoint_id,
-                note_id=note_id,
-                comment_cursor=str(current_page),
-            )
-
-            # 获取所有子评论
-            await self.get_comments_all_sub_comments(
-                comments, callback=callback
-            )
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+            ) as page_iterator:
+                async for page, comments in page_iterator:
+                    if callback:
+                        await callback(note_detail.note_id, comments)
+
+                    crawled_count += len(comments)
+                    if comments:
+                        yield comments
+                    if (
+                            config.PER_NOTE_MAX_COMMENTS_COUNT
+                            and crawled_count >= config.PER_NOTE_MAX_COMMENTS_COUNT
+                    ):
+                        utils.logger.info(
+                            f"[CommentProcessor.get_note_all_comments] The number of comments exceeds the limit: {config.PER_NOTE_MAX_COMMENTS_COUNT}"
+                        )
+                        break
+
+                    # 获取所有子评论
+                    async with aclosing(
+                        self.get_comments_all_sub_comments(
+                            comments, callback=callback, checkpoint_id=checkpoint_id
+                        )
+                    ) as sub_comment_pages:
+                        async for sub_comments in sub_comment_pages:
+                            crawled_count += len(sub_comments)
+                            yield sub_comments
+
+                    # 当前页的楼层和楼中楼评论都回调后才推进评论游标，
+                    # 中断后从没有处理完的一页继续，该页下已经爬完的楼层跳过，没爬完的从楼中楼页码继续
+                    current_page = page + 1
+                    await self.checkpoint_manager.update_note_comment_cursor(
+                        checkpoint_id=checkpoint_id,
+                        note_id=note_id,
+                        comment_cursor=str(current_page),
+                    )
 
         # 更新评论游标，标记为该帖子的评论已爬取
         await self.checkpoint_manager.update_note_comment_cursor(
@@ -183,51 +222,84 @@ class CommentProcessor:
             comment_cursor=str(current_page),
             is_success_crawled_comments=True,
         )
-
-        return result
+        await get_note_completion_records().complete_note(
+            constant.TIEBA_PLATFORM_NAME, note_id
+        )
 
     async def get_comments_all_sub_comments(
             self,
             comments: List[TiebaComment],
             callback: Optional[Callable] = None,
-    ) -> List[TiebaComment]:
+            checkpoint_id: str = "",
+    ) -> AsyncIterator[List[TiebaComment]]:
         """
         获取指定评论下的所有子评论
+        每页楼中楼评论回调后在检查点中记录该楼层的楼中楼页码，爬完后记录到已完成的楼层中，
+        断点续爬时跳过已完成的楼层，没爬完的楼层从保存的页码继续
         Args:
             comments: 评论列表
             callback: 一次笔记爬取结束后
+            checkpoint_id: 检查点ID
 
         Returns:
-
+            AsyncIterator[List[TiebaComment]]: 按楼层顺序产出已回调的楼中楼评论
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
-            return []
+            return
+
+        if not comments:
+            return
 
-        all_sub_comments: List[TiebaComment] = []
-        for parment_comment in comments:
+        note_id = comments[0].note_id
+        sub_comment_cursors, completed_root_comment_ids = (
+            await self.checkpoint_manager.get_note_sub_comment_progress(
+                checkpoint_id=checkpoint_id, note_id=note_id
+            )
+        )
+
+        async def iter_root_sub_comments(
+            parment_comment: TiebaComment,
+        ) -> AsyncIterator[Tuple[List[TiebaComment], int, bool]]:
+            # 产出 (楼中楼评论, 下一页页码, 是否已爬完)
             if parment_comment.sub_comment_count == 0:
-                continue
+                return
+            if parment_comment.comment_id in completed_root_comment_ids:
+                return
 
-            current_page = 1
+            current_page = int(sub_comment_cursors.get(parment_comment.comment_id) or 1)
             max_sub_page_num = parment_comment.sub_comment_count // 10 + 1
             while max_sub_page_num >= current_page:
                 response_txt = await self.tieba_client.get_note_sub_comments(parment_comment.note_id, parment_comment.tieba_id,
                                                               current_page)
 
-                sub_comments: List[TiebaComment] = self.tieba_client.page_extractor.extract_tieba_note_sub_comments(
-                    response_txt, parment_comment
+                sub_comments: List[TiebaComment] = await run_extraction(
+                    self.tieba_client.page_extractor.extract_tieba_note_sub_comments,
+                    response_txt,
+                    parment_comment,
                 )
-                if not sub_comments:
-                    break
-
-                if callback:
-                    await callback(parment_comment.note_id, sub_comments)
-
-                all_sub_comments.extend(sub_comments)
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
                 current_page += 1
-
-        return all_sub_comments
-
-
+                if not sub_comments:
+                    yield [], current_page, True
+                    return
+                yield sub_comments, current_page, current_page > max_sub_page_num
+
+        # 各楼层的楼中楼评论并发获取，并发数为客户端工作池同时能执行的请求数，按楼层顺序回调，回调后交给调用方计数，不再保留
+        async with aclosing(
+            ordered_concurrent_stream(
+                iter_root_sub_comments,
+                comments,
+                concurrency=self.tieba_client.concurrency,
+            )
+        ) as root_results:
+            async for parment_comment, (sub_comments, current_page, is_finished) in root_results:
+                if sub_comments:
+                    if callback:
+                        await callback(parment_comment.note_id, sub_comments)
+                    yield sub_comments
+                await self.checkpoint_manager.update_note_sub_comment_progress(
+                    checkpoint_id=checkpoint_id,
+                    note_id=note_id,
+                    root_comment_id=parment_comment.comment_id,
+                    sub_comment_cursor=str(current_page),
+                    is_finished=is_finished,
+                )
@@ -12,13 +12,17 @@ import asyncio
 from typing import List, Optional, TYPE_CHECKING
 
 import config
+import constant
 from model.m_baidu_tieba import TiebaNote
 from pkg.tools import utils
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import tieba as tieba_store
+from var import source_keyword_var
 
 if TYPE_CHECKING:
     from ..client import BaiduTieBaClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class NoteProcessor:
@@ -28,7 +32,7 @@ class NoteProcessor:
         self,
         tieba_client: "BaiduTieBaClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_note_task_semaphore: asyncio.Semaphore,
+        crawler_note_task_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize note processor
@@ -36,7 +40,7 @@ class NoteProcessor:
         Args:
             tieba_client: Tieba API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_note_task_semaphore: Semaphore to limit concurrent note tasks
+            crawler_note_task_semaphore: Adaptive concurrency limiter to limit concurrent note tasks
         """
         self.tieba_client = tieba_client
         self.checkpoint_manager = checkpoint_manager
@@ -69,6 +73,10 @@ class NoteProcessor:
                     )
                     return None
                 await tieba_store.update_tieba_note(note_detail)
+                if config.ENABLE_NOTE_DEDUP:
+                    await get_note_seen_set_manager().mark_seen_note_after_comments(
+                        constant.TIEBA_PLATFORM_NAME, note_id, source_keyword_var.get()
+                    )
                 return note_detail
             except Exception as ex:
                 utils.logger.error(
@@ -90,9 +98,6 @@ class NoteProcessor:
                     current_note_comment_cursor=None,
                 )
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-
     async def batch_get_note_list(
         self, note_id_list: List[str], checkpoint_id: str = ""
     ) -> List[TiebaNote]:
@@ -118,6 +123,14 @@ class NoteProcessor:
                 )
                 continue
 
+            if config.ENABLE_NOTE_DEDUP and await get_note_seen_set_manager().check_seen_note(
+                constant.TIEBA_PLATFORM_NAME, note_id, source_keyword_var.get()
+            ):
+                utils.logger.info(
+                    f"[NoteProcessor.batch_get_note_list] Note {note_id} is already crawled by other keyword or job, skip"
+                )
+                continue
+
             await self.checkpoint_manager.add_note_to_checkpoint(
                 checkpoint_id=checkpoint_id,
                 note_id=note_id,
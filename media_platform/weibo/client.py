@@ -18,27 +18,37 @@ import asyncio
 import copy
 import json
 import re
+import time
 from typing import Callable, Dict, List, Optional, Union, cast, Tuple
 from urllib.parse import parse_qs, unquote, urlencode
 
 import httpx
 from httpx import Response
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryError
 
 import config
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+from constant.base_constant import WEIBO_PLATFORM_NAME
 from constant.weibo import WEIBO_API_URL
 from model.m_weibo import WeiboNote, WeiboComment, WeiboCreator
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
+from pkg.cache.aux_cache import AuxCacheNamespace, get_platform_aux_cache
 from pkg.proxy import IpInfoModel
 from pkg.proxy.proxy_ip_pool import ProxyIpPool
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
 
 from .exception import DataFetchError
 from .extractor import WeiboExtractor
 from .field import SearchType
 
+# 创作者的容器ID与登录账号无关，所有账号共享缓存
+CREATOR_CONTAINER_CACHE = AuxCacheNamespace(
+    "wb_creator_container", Dict[str, str], ttl=3600 * 24 * 7
+)
+
 
 class WeiboClient:
     account_info: AccountWithIpModel
@@ -80,6 +90,17 @@ class WeiboClient:
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         return self.account_info.account.cookies
@@ -140,7 +161,7 @@ class WeiboClient:
                 ProxyIpPool, self.account_with_ip_pool.proxy_ip_pool
             ).get_proxy()
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(1))
+    @request_retry()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -157,10 +178,18 @@ class WeiboClient:
         if "return_response" in kwargs:
             del kwargs["return_response"]
         headers = kwargs.pop("headers", None) or self.headers
+        await get_request_pacer().acquire(
+            WEIBO_PLATFORM_NAME, self._pacing_account_name, url
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(
                 method, url, timeout=self.timeout, headers=headers, **kwargs
             )
+        await get_concurrency_controller(WEIBO_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
 
         if need_return_ori_response:
             return response
@@ -175,6 +204,7 @@ class WeiboClient:
         else:
             return cast(Dict, data.get("data", {}))
 
+    @coalesce_requests(WEIBO_PLATFORM_NAME)
     async def get(self, uri: str, params=None, **kwargs) -> Union[Response, Dict]:
         """
         GET请求，对请求头签名
@@ -225,6 +255,7 @@ class WeiboClient:
                 method="GET", url=f"{WEIBO_API_URL}{final_uri}", **kwargs
             )
 
+    @coalesce_requests(WEIBO_PLATFORM_NAME)
     async def post(self, uri: str, data: Dict, **kwargs) -> Union[Response, Dict]:
         """
         POST请求，对请求头签名
@@ -410,15 +441,25 @@ class WeiboClient:
         Returns: {
 
         """
-        response = await self.get(f"/u/{creator_id}", return_response=True)
-        m_weibocn_params = response.cookies.get("M_WEIBOCN_PARAMS")
-        if not m_weibocn_params:
-            raise DataFetchError("get containerid failed")
-        m_weibocn_params_dict = parse_qs(unquote(m_weibocn_params))
-        return {
-            "fid_container_id": m_weibocn_params_dict.get("fid", [""])[0],
-            "lfid_container_id": m_weibocn_params_dict.get("lfid", [""])[0],
-        }
+
+        async def fetch_container_info() -> Dict[str, str]:
+            response = await self.get(f"/u/{creator_id}", return_response=True)
+            m_weibocn_params = response.cookies.get("M_WEIBOCN_PARAMS")
+            if not m_weibocn_params:
+                raise DataFetchError("get containerid failed")
+            m_weibocn_params_dict = parse_qs(unquote(m_weibocn_params))
+            return {
+                "fid_container_id": m_weibocn_params_dict.get("fid", [""])[0],
+                "lfid_container_id": m_weibocn_params_dict.get("lfid", [""])[0],
+            }
+
+        return await get_platform_aux_cache().get_or_load(
+            CREATOR_CONTAINER_CACHE,
+            WEIBO_PLATFORM_NAME,
+            "",
+            creator_id,
+            fetch_container_info,
+        )
 
     async def get_creator_info_by_id(self, creator_id: str) -> Optional[WeiboCreator]:
         """
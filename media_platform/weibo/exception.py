@@ -16,10 +16,16 @@
 
 from httpx import RequestError
 
+from pkg.retry import RetryClass
+
 
 class DataFetchError(RequestError):
     """something error when fetch"""
 
+    retry_class = RetryClass.FATAL
+
 
 class IPBlockError(RequestError):
     """fetch so fast that the server block us ip"""
+
+    retry_class = RetryClass.ACCOUNT
@@ -8,13 +8,13 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
 from typing import List, TYPE_CHECKING, Optional
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
 from repo.platform_save_data import weibo as weibo_store
 from model.m_weibo import WeiboCreator, WeiboNote
 from .base_handler import BaseHandler
@@ -171,6 +171,7 @@ class CreatorHandler(BaseHandler):
         notes_has_more = True
         since_id = checkpoint.current_creator_page or "0"
         crawler_total_count = 0
+        publish_time_window = PublishTimeWindow.from_config()
         while notes_has_more and crawler_total_count <= config.CRAWLER_MAX_NOTES_COUNT:
             notes_res = await self.wb_client.get_notes_by_creator(
                 creator_id, container_id, since_id
@@ -201,6 +202,13 @@ class CreatorHandler(BaseHandler):
                     if note:
                         notes.append(note)
 
+            # 主页微博按发布时间倒序，置顶微博只会出现在开头，这一页最后一条微博早于开始时间后不再翻页
+            reached_since = bool(notes) and publish_time_window.is_before_since(
+                notes[-1].create_time
+            )
+            # 发布时间窗口外的微博不保存也不爬评论
+            notes = [note for note in notes if publish_time_window.contains(note.create_time)]
+
             # Process notes through note processor
             note_ids = await self.note_processor.batch_get_note_list(
                 notes, checkpoint_id=checkpoint_id
@@ -222,7 +230,10 @@ class CreatorHandler(BaseHandler):
             checkpoint.current_creator_page = since_id
             await self.checkpoint_manager.update_checkpoint(checkpoint)
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+            if reached_since:
+                utils.logger.info(
+                    f"[CreatorHandler.get_all_notes_by_creator] user_id:{creator_id} reached publish time since, stop"
+                )
+                break
 
         return result
@@ -9,12 +9,15 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
-from typing import List, TYPE_CHECKING
+from functools import partial
+from typing import AsyncIterator, Dict, List, TYPE_CHECKING
 
 import config
 import constant
-from model.m_checkpoint import Checkpoint
+from model.m_checkpoint import Checkpoint, CheckpointSearchKeyword
+from pkg.pipeline import PipelineStage, StagedPipeline
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
 from var import source_keyword_var
 from ..field import SearchType
 from .base_handler import BaseHandler
@@ -68,34 +71,21 @@ class SearchHandler(BaseHandler):
         """
         return config.KEYWORDS.split(",")
 
-    def _find_keyword_index_in_keyword_list(self, keyword: str) -> int:
-        """
-        Find keyword index in keyword list
-
-        Args:
-            keyword: keyword
-
-        Returns:
-            int: keyword index
-        """
-        keyword_list = self._get_search_keyword_list()
-        for index, keyword_item in enumerate(keyword_list):
-            if keyword_item == keyword:
-                return index
-        return -1
-
     async def search(self) -> None:
         """
         Search for notes and retrieve their comment information.
+        多个关键词并发搜索（并发数 SEARCH_KEYWORD_CONCURRENCY），每个关键词在检查点中有自己的翻页游标
         Returns:
             None
         """
         utils.logger.info("[SearchHandler.search] Begin search weibo keywords")
+        weibo_limit_count = 10  # weibo limit page fixed value
+        if config.CRAWLER_MAX_NOTES_COUNT < weibo_limit_count:
+            config.CRAWLER_MAX_NOTES_COUNT = weibo_limit_count
         keyword_list = self._get_search_keyword_list()
         checkpoint = Checkpoint(
             platform=constant.WEIBO_PLATFORM_NAME,
             mode=constant.CRALER_TYPE_SEARCH,
-            current_search_page=1,
         )
 
         # 如果开启了断点续爬，则加载检查点
@@ -106,100 +96,204 @@ class SearchHandler(BaseHandler):
                 checkpoint_id=config.SPECIFIED_CHECKPOINT_ID,
             )
             if lastest_checkpoint:
-                keyword_index = self._find_keyword_index_in_keyword_list(
-                    lastest_checkpoint.current_search_keyword
-                )
-                if keyword_index == -1:
-                    # 没有搜索到，则从第一个关键词开始爬取
-                    utils.logger.warning(
-                        f"[SearchHandler.search] Keyword {lastest_checkpoint.current_search_keyword} not found in keyword list"
-                    )
-                    keyword_index = 0
-                else:
-                    # 如果搜索到了，则从检查点中保存的当前关键词开始爬取
+                if self.checkpoint_manager.has_search_keyword_progress(
+                    lastest_checkpoint, keyword_list
+                ):
+                    # 检查点中有当前关键词的进度，则每个未完成的关键词从各自的页码继续爬取
                     checkpoint = lastest_checkpoint
                     utils.logger.info(
                         f"[SearchHandler.search] Load lastest checkpoint: {lastest_checkpoint.id}"
                     )
-                    keyword_list = keyword_list[keyword_index:]
+                else:
+                    # 没有搜索到，则从第一页开始爬取所有关键词
+                    utils.logger.warning(
+                        f"[SearchHandler.search] Keywords of checkpoint {lastest_checkpoint.id} not found in keyword list"
+                    )
 
-        weibo_limit_count = 10  # weibo limit page fixed value
-        if config.CRAWLER_MAX_NOTES_COUNT < weibo_limit_count:
-            config.CRAWLER_MAX_NOTES_COUNT = weibo_limit_count
+        # 先保存每个关键词的游标，后面的业务行为都是基于这个检查点来更新page信息
+        checkpoint = await self.checkpoint_manager.init_search_keyword_cursors(
+            checkpoint, keyword_list
+        )
+        keyword_semaphore = asyncio.Semaphore(max(1, config.SEARCH_KEYWORD_CONCURRENCY))
+        await asyncio.gather(
+            *[
+                self._search_keyword(
+                    keyword,
+                    checkpoint.search_keyword_cursors[keyword],
+                    checkpoint.id,
+                    keyword_semaphore,
+                    weibo_limit_count,
+                )
+                for keyword in keyword_list
+                if not checkpoint.search_keyword_cursors[keyword].is_finished
+            ]
+        )
+
+    async def _search_keyword(
+        self,
+        keyword: str,
+        keyword_cursor: CheckpointSearchKeyword,
+        checkpoint_id: str,
+        semaphore: asyncio.Semaphore,
+        weibo_limit_count: int,
+    ) -> None:
+        """
+        搜索单个关键词，从关键词游标记录的页码开始翻页
+
+        Args:
+            keyword: 搜索关键词
+            keyword_cursor: 关键词搜索游标
+            checkpoint_id: 检查点ID
+            semaphore: 关键词并发控制
+            weibo_limit_count: 每页数量
 
-        for keyword in keyword_list:
+        Returns:
+            None
+        """
+        async with semaphore:
             source_keyword_var.set(keyword)
-            page = checkpoint.current_search_page or 1
+            page = keyword_cursor.current_search_page
+            utils.logger.info(
+                f"[SearchHandler.search] Current search keyword: {keyword}, page: {page}"
+            )
+
+            # 搜索翻页 -> 帖子详情 -> 帖子评论，三个阶段通过有界队列串联执行
+            pipeline = StagedPipeline(
+                producer=self._search_note_pages(keyword, page, weibo_limit_count),
+                stages=[
+                    PipelineStage(
+                        name="note_detail",
+                        handler=partial(
+                            self._fetch_page_note_details, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_DETAIL_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                    PipelineStage(
+                        name="note_comments",
+                        handler=partial(
+                            self._fetch_page_note_comments, checkpoint_id=checkpoint_id
+                        ),
+                        workers=config.SEARCH_PIPELINE_COMMENT_WORKERS,
+                        queue_size=config.SEARCH_PIPELINE_QUEUE_SIZE,
+                    ),
+                ],
+                on_item_done=partial(
+                    self._save_search_page_checkpoint,
+                    checkpoint_id=checkpoint_id,
+                    keyword=keyword,
+                ),
+            )
+            try:
+                await pipeline.run()
+            except Exception as ex:
+                utils.logger.error(
+                    f"[SearchHandler.search] Search keyword {keyword} notes error: {ex}"
+                )
+                lastest_checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
+                    checkpoint_id
+                )
+                if lastest_checkpoint and keyword in lastest_checkpoint.search_keyword_cursors:
+                    page = lastest_checkpoint.search_keyword_cursors[keyword].current_search_page
+                # 发生异常了，则打印当前爬取的关键词和页码，其他关键词继续爬取，当前关键词可以通过断点续爬继续
+                utils.logger.error(
+                    f"[SearchHandler.search] Current keyword: {keyword}, page: {page}, "
+                    f"可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
+                )
+                return
+
+            await self.checkpoint_manager.update_search_keyword_cursor(
+                checkpoint_id, keyword, is_finished=True
+            )
 
-            # bugfix: https://github.com/MediaCrawlerPro/MediaCrawlerPro-Python/issues/311
-            if checkpoint.current_search_keyword != keyword:
-                page = 1
+    async def _search_note_pages(
+        self, keyword: str, page: int, weibo_limit_count: int
+    ) -> AsyncIterator[Dict]:
+        """
+        搜索翻页生产者，每次产出一页微博帖子模型
 
-            # 按关键字保存检查点，后面的业务行为都是基于这个检查点来更新page信息，所以需要先保存检查点
-            checkpoint.current_search_keyword = keyword
-            await self.checkpoint_manager.save_checkpoint(checkpoint)
+        Args:
+            keyword: 搜索关键词
+            page: 起始页码
+            weibo_limit_count: 每页数量
 
+        Returns:
+            AsyncIterator[Dict]: {"page": 页码, "note_list": 帖子模型列表}
+        """
+        saved_note_count = (page - 1) * weibo_limit_count
+        publish_time_window = PublishTimeWindow.from_config()
+        while saved_note_count <= config.CRAWLER_MAX_NOTES_COUNT:
             utils.logger.info(
-                f"[SearchHandler.search] Current search keyword: {keyword}"
+                f"[SearchHandler.search] search weibo keyword: {keyword}, page: {page}"
+            )
+            notes, _ = await self.wb_client.get_note_by_keyword(
+                keyword=keyword, page=page, search_type=SearchType.DEFAULT
             )
+            # notes already extracted as WeiboNote models
+            note_list = notes
+            if not note_list:
+                utils.logger.info("No more content!")
+                break
 
-            saved_note_count = (page - 1) * weibo_limit_count
-            while saved_note_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                try:
-                    utils.logger.info(
-                        f"[SearchHandler.search] search weibo keyword: {keyword}, page: {page}"
-                    )
-                    notes, _ = await self.wb_client.get_note_by_keyword(
-                        keyword=keyword, page=page, search_type=SearchType.DEFAULT
-                    )
-                    # notes already extracted as WeiboNote models
-                    note_list = notes
-                    if not note_list:
-                        utils.logger.info("No more content!")
-                        break
-
-                    note_id_list = await self.note_processor.batch_get_note_list(
-                        note_list=note_list, checkpoint_id=checkpoint.id
-                    )
-                    await self.comment_processor.batch_get_note_comments(
-                        note_id_list, checkpoint_id=checkpoint.id
-                    )
+            # 发布时间窗口外的帖子不保存也不爬评论
+            note_list = [
+                note for note in note_list if publish_time_window.contains(note.create_time)
+            ]
 
-                    page += 1
-                    saved_note_count += len(note_list)
+            yield {"page": page, "note_list": note_list}
 
-                    # 爬虫请求间隔时间
-                    await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+            page += 1
+            saved_note_count += len(note_list)
 
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[SearchHandler.search] Search notes error: {ex}"
-                    )
-                    # 发生异常了，则打印当前爬取的关键词和页码，用于后续继续爬取
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码------------------------------------------"
-                    )
-                    for _ in range(3):
-                        utils.logger.error(
-                            f"[SearchHandler.search] Current keyword: {keyword}, page: {page}"
-                        )
-                    utils.logger.info(
-                        "------------------------------------------记录当前爬取的关键词和页码---------------------------------------------------"
-                    )
+    async def _fetch_page_note_details(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> Dict:
+        """
+        详情阶段：处理并保存一页搜索结果中的帖子
 
-                    utils.logger.info(
-                        f"[SearchHandler.search] 可以在配置文件中开启断点续爬功能，继续爬取当前关键词的信息"
-                    )
-                    return
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
 
-                finally:
-                    lastest_checkpoint = (
-                        await self.checkpoint_manager.load_checkpoint_by_id(
-                            checkpoint.id
-                        )
-                    )
-                    if lastest_checkpoint:
-                        lastest_checkpoint.current_search_page = page
-                        await self.checkpoint_manager.update_checkpoint(
-                            lastest_checkpoint
-                        )
+        Returns:
+            Dict: 追加了 note_id_list 的搜索页数据
+        """
+        note_id_list = await self.note_processor.batch_get_note_list(
+            note_list=search_page["note_list"], checkpoint_id=checkpoint_id
+        )
+        return {**search_page, "note_id_list": note_id_list}
+
+    async def _fetch_page_note_comments(
+        self, search_page: Dict, checkpoint_id: str
+    ) -> None:
+        """
+        评论阶段：获取一页搜索结果中帖子的评论
+
+        Args:
+            search_page: 详情阶段产出的数据
+            checkpoint_id: 检查点ID
+
+        Returns:
+            None
+        """
+        await self.comment_processor.batch_get_note_comments(
+            search_page["note_id_list"], checkpoint_id=checkpoint_id
+        )
+
+    async def _save_search_page_checkpoint(
+        self, search_page: Dict, checkpoint_id: str, keyword: str
+    ) -> None:
+        """
+        一页搜索结果（以及它之前的所有页）全部处理完成后，推进检查点中该关键词的页码
+
+        Args:
+            search_page: 搜索翻页产出的数据
+            checkpoint_id: 检查点ID
+            keyword: 搜索关键词
+
+        Returns:
+            None
+        """
+        await self.checkpoint_manager.update_search_keyword_cursor(
+            checkpoint_id, keyword, current_search_page=search_page["page"] + 1
+        )
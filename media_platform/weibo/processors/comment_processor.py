@@ -11,10 +11,12 @@
 import asyncio
 import random
 from asyncio import Task
-from typing import List, TYPE_CHECKING, Dict, Optional, Callable
+from contextlib import aclosing
+from typing import AsyncIterator, List, TYPE_CHECKING, Dict, Optional, Callable
 
 import config
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+import constant
+from pkg.pipeline import get_note_completion_records
 from pkg.tools import utils
 from repo.platform_save_data import weibo as weibo_store
 from ..exception import DataFetchError
@@ -23,6 +25,7 @@ from model.m_weibo import WeiboComment
 if TYPE_CHECKING:
     from ..client import WeiboClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class CommentProcessor:
@@ -32,7 +35,7 @@ class CommentProcessor:
         self,
         wb_client: "WeiboClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_note_comment_semaphore: asyncio.Semaphore
+        crawler_note_comment_semaphore: "AdaptiveConcurrencyLimiter"
     ):
         """
         Initialize comment processor
@@ -40,7 +43,7 @@ class CommentProcessor:
         Args:
             wb_client: Weibo API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_note_comment_semaphore: Semaphore to limit concurrent comment tasks
+            crawler_note_comment_semaphore: Adaptive concurrency limiter to limit concurrent comment tasks
         """
         self.wb_client = wb_client
         self.checkpoint_manager = checkpoint_manager
@@ -79,6 +82,9 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.batch_get_note_comments] Note {note_id} is already crawled comments, skip"
                 )
+                await get_note_completion_records().complete_note(
+                    constant.WEIBO_PLATFORM_NAME, note_id
+                )
                 continue
 
             task = asyncio.create_task(
@@ -110,10 +116,19 @@ class CommentProcessor:
                 f"[CommentProcessor.get_comments_async_task] Begin get note id comments {note_id}"
             )
             try:
-                await self.get_note_all_comments(
-                    note_id=note_id,
-                    callback=weibo_store.batch_update_weibo_note_comments,
-                    checkpoint_id=checkpoint_id
+                # 评论按页入库，这里只统计数量，不保留评论
+                crawled_count = 0
+                async with aclosing(
+                    self.get_note_all_comments(
+                        note_id=note_id,
+                        callback=weibo_store.batch_update_weibo_note_comments,
+                        checkpoint_id=checkpoint_id
+                    )
+                ) as comment_pages:
+                    async for comments in comment_pages:
+                        crawled_count += len(comments)
+                utils.logger.info(
+                    f"[CommentProcessor.get_comments_async_task] note_id: {note_id} comments have all been obtained, count: {crawled_count}"
                 )
 
             except DataFetchError as ex:
@@ -125,26 +140,25 @@ class CommentProcessor:
                     f"[CommentProcessor.get_comments_async_task] may be been blocked, err:{e}"
                 )
 
-
-
     async def get_note_all_comments(
         self,
         note_id: str,
         callback: Optional[Callable] = None,
         checkpoint_id: str = "",
-    ):
+    ) -> AsyncIterator[List[WeiboComment]]:
         """
         获取指定微博下的所有一级评论，该方法会一直查找一个微博下的所有评论信息
+        每一页评论回调入库后立即产出，只记录数量，不在内存中累积整个微博的评论
         Args:
             note_id: 微博ID
             callback: 回调函数
             checkpoint_id: 检查点ID
 
         Returns:
-
+            AsyncIterator[List[WeiboComment]]: 已回调的评论页
         """
 
-        result = []
+        crawled_count = 0
         is_end = False
         max_id = -1
         max_id_type = 0
@@ -180,24 +194,25 @@ class CommentProcessor:
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(note_id, comment_list)
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-            result.extend(comment_list)
+            crawled_count += len(comment_list)
+            if comment_list:
+                yield comment_list
 
             if (
-                PER_NOTE_MAX_COMMENTS_COUNT
-                and len(result) >= PER_NOTE_MAX_COMMENTS_COUNT
+                config.PER_NOTE_MAX_COMMENTS_COUNT
+                and crawled_count >= config.PER_NOTE_MAX_COMMENTS_COUNT
             ):
                 utils.logger.info(
-                    f"[WeiboClient.get_note_all_comments] The number of comments exceeds the limit: {PER_NOTE_MAX_COMMENTS_COUNT}"
+                    f"[WeiboClient.get_note_all_comments] The number of comments exceeds the limit: {config.PER_NOTE_MAX_COMMENTS_COUNT}"
                 )
                 break
 
-            sub_comment_result = await self.get_comments_all_sub_comments(
-                note_id, comment_list, callback
-            )
-            result.extend(sub_comment_result)
-
+            async with aclosing(
+                self.get_comments_all_sub_comments(note_id, comment_list, callback)
+            ) as sub_comment_pages:
+                async for sub_comments in sub_comment_pages:
+                    crawled_count += len(sub_comments)
+                    yield sub_comments
 
         # 标记该aweme的评论已完全爬取
         if checkpoint_id:
@@ -207,15 +222,16 @@ class CommentProcessor:
                 comment_cursor=str(max_id),
                 is_success_crawled_comments=True,
             )
-
-        return result
+        await get_note_completion_records().complete_note(
+            constant.WEIBO_PLATFORM_NAME, note_id
+        )
 
     @staticmethod
     async def get_comments_all_sub_comments(
         note_id: str, comment_list: List[WeiboComment], callback: Optional[Callable] = None
-    ) -> List[WeiboComment]:
+    ) -> AsyncIterator[List[WeiboComment]]:
         """
-        获取评论的所有子评论
+        获取评论的所有子评论，按一级评论顺序产出已回调的子评论
         Args:
             note_id:
             comment_list:
@@ -228,13 +244,11 @@ class CommentProcessor:
             utils.logger.info(
                 f"[WeiboClient.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
             )
-            return []
+            return
 
-        res_sub_comments = []
         for comment in comment_list:
             sub_comments = comment.sub_comments or []
             if sub_comments:
                 if callback:
                     await callback(note_id, sub_comments)
-                res_sub_comments.extend(sub_comments)
-        return res_sub_comments
\ No newline at end of file
+                yield sub_comments
\ No newline at end of file
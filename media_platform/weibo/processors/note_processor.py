@@ -12,14 +12,18 @@ import asyncio
 from typing import List, Optional, TYPE_CHECKING
 
 from pkg.tools import utils
+from repo.note_seen_set import get_note_seen_set_manager
 from repo.platform_save_data import weibo as weibo_store
 from ..exception import DataFetchError
-from config import base_config as config
+import config
+import constant
 from model.m_weibo import WeiboNote
+from var import source_keyword_var
 
 if TYPE_CHECKING:
     from ..client import WeiboClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
 
 
 class NoteProcessor:
@@ -29,7 +33,7 @@ class NoteProcessor:
         self,
         wb_client: "WeiboClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_note_task_semaphore: asyncio.Semaphore,
+        crawler_note_task_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize note processor
@@ -37,7 +41,7 @@ class NoteProcessor:
         Args:
             wb_client: Weibo API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_note_task_semaphore: Semaphore to limit concurrent note tasks
+            crawler_note_task_semaphore: Adaptive concurrency limiter to limit concurrent note tasks
         """
         self.wb_client = wb_client
         self.checkpoint_manager = checkpoint_manager
@@ -105,11 +109,26 @@ class NoteProcessor:
             if not note_id:
                 continue
 
+            is_crawled_in_checkpoint = (
+                await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                    checkpoint_id=checkpoint_id, note_id=note_id
+                )
+            )
+            if (
+                config.ENABLE_NOTE_DEDUP
+                and not is_crawled_in_checkpoint
+                and await get_note_seen_set_manager().check_seen_note(
+                    constant.WEIBO_PLATFORM_NAME, note_id, source_keyword_var.get()
+                )
+            ):
+                utils.logger.info(
+                    f"[NoteProcessor.batch_get_note_list] Note {note_id} is already crawled by other keyword or job, skip"
+                )
+                continue
+
             note_ids.append(note_id)
 
-            if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                checkpoint_id=checkpoint_id, note_id=note_id
-            ):
+            if is_crawled_in_checkpoint:
                 utils.logger.info(
                     f"[NoteProcessor.batch_get_note_list] Note {note_id} is already crawled, skip"
                 )
@@ -131,9 +150,11 @@ class NoteProcessor:
                     )
                 else:
                     await weibo_store.update_weibo_note(note_detail)
+                    await self._record_crawled_note(note_id)
             else:
                 # 如果未开启微博爬取全文的功能，则直接保存
                 await weibo_store.update_weibo_note(note_item)
+                await self._record_crawled_note(note_id)
 
                 # Mark as successfully crawled in checkpoint
                 await self.checkpoint_manager.update_note_to_checkpoint(
@@ -146,6 +167,22 @@ class NoteProcessor:
 
         return note_ids
 
+    @staticmethod
+    async def _record_crawled_note(note_id: str) -> None:
+        """
+        Record the stored note for dedup of later crawls, recorded after the comments of the note are crawled
+
+        Args:
+            note_id: note id
+
+        Returns:
+            None
+        """
+        if config.ENABLE_NOTE_DEDUP:
+            await get_note_seen_set_manager().mark_seen_note_after_comments(
+                constant.WEIBO_PLATFORM_NAME, note_id, source_keyword_var.get()
+            )
+
     async def batch_get_specified_notes(
         self, note_id_list: List[str], checkpoint_id: str = ""
     ) -> List[str]:
@@ -9,10 +9,9 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 
-import asyncio
 import json
-import random
 import re
+import time
 import traceback
 from typing import Callable, Dict, List, Optional, Union, Tuple
 from model.m_xhs import XhsNote, XhsComment, XhsCreator
@@ -20,15 +19,19 @@ from urllib.parse import urlencode
 
 import httpx
 from httpx import Response
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed, wait_random
+from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractApiClient
-from config import PER_NOTE_MAX_COMMENTS_COUNT
+from constant.base_constant import XHS_PLATFORM_NAME
 from constant.xiaohongshu import XHS_API_URL, XHS_INDEX_URL
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
-from pkg.rpc.sign_srv_client import SignServerClient, XhsSignRequest
+from pkg.extraction import run_extraction
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.rpc.sign_srv_client import XhsSignRequest, get_sign_client
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
 
 from .exception import (
@@ -60,7 +63,7 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         self.timeout = timeout
         self._user_agent = user_agent or utils.get_user_agent()
-        self._sign_client = SignServerClient()
+        self._sign_client = get_sign_client()
         self.account_with_ip_pool = account_with_ip_pool
         self.account_info: Optional[AccountWithIpModel] = None
         self._extractor = XiaoHongShuExtractor()
@@ -95,6 +98,17 @@ class XiaoHongShuClient(AbstractApiClient):
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         return self.account_info.account.cookies
@@ -189,7 +203,7 @@ class XiaoHongShuClient(AbstractApiClient):
                 await self.account_with_ip_pool.proxy_ip_pool.get_proxy()
             )
 
-    @retry(stop=stop_after_attempt(5), wait=wait_random(2, 10))
+    @request_retry()
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -206,8 +220,16 @@ class XiaoHongShuClient(AbstractApiClient):
         if "return_response" in kwargs:
             del kwargs["return_response"]
 
+        await get_request_pacer().acquire(
+            XHS_PLATFORM_NAME, self._pacing_account_name, url
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        await get_concurrency_controller(XHS_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
 
         if need_return_ori_response:
             return response
@@ -221,25 +243,31 @@ class XiaoHongShuClient(AbstractApiClient):
             # someday someone maybe will bypass captcha
             verify_type = response.headers.get("Verifytype", "")
             verify_uuid = response.headers.get("Verifyuuid", "")
-            raise Exception(
-                f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}, Response: {response}"
+            raise NeedVerifyError(
+                f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}, Response: {response}",
+                verify_type=verify_type,
+                verify_uuid=verify_uuid,
             )
         elif data.get("success"):
             return data.get("data", data.get("success"))
         elif data.get("code") == ErrorEnum.IP_BLOCK.value.code:
+            get_concurrency_controller(XHS_PLATFORM_NAME).record_backoff("ip block")
             raise IPBlockError(ErrorEnum.IP_BLOCK.value.msg)
         elif data.get("code") == ErrorEnum.SIGN_FAULT.value.code:
             raise SignError(ErrorEnum.SIGN_FAULT.value.msg)
         elif data.get("code") == ErrorEnum.ACCEESS_FREQUENCY_ERROR.value.code:
-            # 访问频次异常, 再随机延时一下
+            # 访问频次异常，由重试策略按退避时间等待后重试
             utils.logger.error(
-                f"[XiaoHongShuClient.request] 访问频次异常，尝试随机延时一下..."
+                "[XiaoHongShuClient.request] 访问频次异常，等待退避后重试..."
+            )
+            get_concurrency_controller(XHS_PLATFORM_NAME).record_backoff(
+                "access frequency"
             )
-            await asyncio.sleep(utils.random_delay_time(2, 10))
             raise AccessFrequencyError(ErrorEnum.ACCEESS_FREQUENCY_ERROR.value.msg)
         else:
             raise DataFetchError(data)
 
+    @coalesce_requests(XHS_PLATFORM_NAME)
     async def get(self, uri: str, params=None, **kwargs) -> Union[Response, Dict]:
         """
         GET请求，对请求头签名
@@ -279,6 +307,7 @@ class XiaoHongShuClient(AbstractApiClient):
                 method="GET", url=f"{XHS_API_URL}{final_uri}", headers=headers, **kwargs
             )
 
+    @coalesce_requests(XHS_PLATFORM_NAME)
     async def post(self, uri: str, data: dict, **kwargs) -> Union[Dict, Response]:
         """
         POST请求，对请求头签名
@@ -324,6 +353,7 @@ class XiaoHongShuClient(AbstractApiClient):
                 **kwargs,
             )
 
+    @coalesce_requests(XHS_PLATFORM_NAME)
     async def query_self(self) -> Optional[Dict]:
         """
         查询自己信息
@@ -527,8 +557,8 @@ class XiaoHongShuClient(AbstractApiClient):
             follow_redirects=True,
             headers=self.headers,
         )
-        creator_info = self._extractor.extract_creator_info_from_html(
-            user_id, response.text
+        creator_info = await run_extraction(
+            self._extractor.extract_creator_info_from_html, user_id, response.text
         )
         return creator_info
 
@@ -572,6 +602,7 @@ class XiaoHongShuClient(AbstractApiClient):
         req_url = f"{XHS_INDEX_URL}/explore/{note_id}?xsec_token={xsec_token}&xsec_source={xsec_source}"
         retry_times = 5
         ip_proxies = self._proxies
+        # 每次重试前都经过限速器，重试之间不再额外随机等待
         for current_retry in range(1, retry_times + 1):
             copy_headers = self.headers.copy()
             # 20250901 目前只有权重高的xhs账号产生的xsectoken才能不携带登录态请求网页
@@ -579,6 +610,9 @@ class XiaoHongShuClient(AbstractApiClient):
             #     # 前三次删除cookie，直接不带登录态请求网页
             #     del copy_headers["cookie"]
 
+            await get_request_pacer().acquire(
+                XHS_PLATFORM_NAME, self._pacing_account_name, req_url
+            )
             async with httpx.AsyncClient(proxies=ip_proxies) as client:
                 try:
                     reponse = await client.get(req_url, headers=copy_headers)
@@ -596,8 +630,10 @@ class XiaoHongShuClient(AbstractApiClient):
                             f"---------- 出现安全验证码，请手机扫码验证，RedirectPath: {redirect_path} ----------\n"
                         )
 
-                    note = self._extractor.extract_note_detail_from_html(
-                        note_id, reponse.text
+                    note = await run_extraction(
+                        self._extractor.extract_note_detail_from_html,
+                        note_id,
+                        reponse.text,
                     )
                     if note:
                         # 添加xsec_token到笔记模型中
@@ -610,7 +646,6 @@ class XiaoHongShuClient(AbstractApiClient):
                     utils.logger.info(
                         f"[XiaoHongShuClient.get_note_by_id_from_html] current retried times: {current_retry}"
                     )
-                    await asyncio.sleep(random.random())
                     if config.ENABLE_IP_PROXY and 1 < current_retry <= 3:
                         try:
                             ip_proxies = (
@@ -625,7 +660,6 @@ class XiaoHongShuClient(AbstractApiClient):
                     utils.logger.error(
                         f"[XiaoHongShuClient.get_note_by_id_from_html] 请求笔记详情页失败: {e}"
                     )
-                    await asyncio.sleep(random.random())
         return None
 
     async def get_note_short_url(self, note_id: str) -> Dict:
@@ -9,16 +9,18 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 
-import asyncio
+from functools import partial
 from typing import Optional
 
 import config
 import constant
 from base.base_crawler import AbstractCrawler
+from pkg.account_pool.client_pool import ClientWorkerPool
 from pkg.account_pool.pool import AccountWithIpPoolManager
 from repo.checkpoint import create_checkpoint_manager
 from repo.checkpoint.checkpoint_store import CheckpointRepoManager
 from pkg.proxy.proxy_ip_pool import ProxyIpPool, create_ip_pool
+from pkg.rate_limit import get_concurrency_controller
 from pkg.tools import utils
 from var import crawler_type_var
 
@@ -30,47 +32,48 @@ from .processors import NoteProcessor, CommentProcessor
 class XiaoHongShuCrawler(AbstractCrawler):
     def __init__(self) -> None:
         self.xhs_client = XiaoHongShuClient()
+        # 多账号并行时，处理器通过客户端工作池发起请求，池中每个客户端使用各自的账号和IP
+        self.client_pool = ClientWorkerPool(self.xhs_client)
         self.checkpoint_manager: CheckpointRepoManager = create_checkpoint_manager()
 
-        # 限制并发数
-        self.crawler_note_task_semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-        self.crawler_note_comment_semaphore = asyncio.Semaphore(
-            config.MAX_CONCURRENCY_NUM
-        )
+        # 限制并发数，并发数由自适应并发控制器根据请求结果动态调整
+        concurrency_controller = get_concurrency_controller(constant.XHS_PLATFORM_NAME)
+        self.crawler_note_task_semaphore = concurrency_controller.limiter("note")
+        self.crawler_note_comment_semaphore = concurrency_controller.limiter("comment")
 
         # 初始化帖子处理器，评论处理器
         self.note_processor = NoteProcessor(
-            self.xhs_client,
+            self.client_pool,
             self.checkpoint_manager,
             self.crawler_note_task_semaphore
         )
         self.comment_processor = CommentProcessor(
-            self.xhs_client,
+            self.client_pool,
             self.checkpoint_manager,
             self.crawler_note_comment_semaphore
         )
 
         # 初始化搜索、详情、创作者、首页推荐流处理器
         self.search_handler = SearchHandler(
-            self.xhs_client,
+            self.client_pool,
             self.checkpoint_manager,
             self.note_processor,
             self.comment_processor
         )
         self.detail_handler = DetailHandler(
-            self.xhs_client,
+            self.client_pool,
             self.checkpoint_manager,
             self.note_processor,
             self.comment_processor
         )
         self.creator_handler = CreatorHandler(
-            self.xhs_client,
+            self.client_pool,
             self.checkpoint_manager,
             self.note_processor,
             self.comment_processor
         )
         self.homefeed_handler = HomefeedHandler(
-            self.xhs_client,
+            self.client_pool,
             self.checkpoint_manager,
             self.note_processor,
             self.comment_processor
@@ -106,9 +109,33 @@ class XiaoHongShuCrawler(AbstractCrawler):
         self.xhs_client.account_with_ip_pool = account_with_ip_pool
         await self.xhs_client.update_account_info()
 
+        # 多账号并行：额外创建 ACCOUNT_WORKER_NUM - 1 个客户端，每个客户端从账号池租用各自的账号和IP
+        await self.client_pool.add_workers(
+            partial(self._create_worker_client, account_with_ip_pool),
+            min(
+                config.ACCOUNT_WORKER_NUM - 1,
+                account_with_ip_pool.available_account_count(),
+            ),
+        )
+
         # 设置爬虫类型
         crawler_type_var.set(config.CRAWLER_TYPE)
 
+    async def _create_worker_client(
+        self, account_with_ip_pool: AccountWithIpPoolManager
+    ) -> XiaoHongShuClient:
+        """
+        创建多账号并行模式下的工作客户端
+        Args:
+            account_with_ip_pool: 账号池管理器
+
+        Returns:
+
+        """
+        client = XiaoHongShuClient(account_with_ip_pool=account_with_ip_pool)
+        await client.update_account_info()
+        return client
+
     async def start(self) -> None:
         """
         Start the crawler
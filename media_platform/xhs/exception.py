@@ -16,6 +16,8 @@ from typing import NamedTuple
 
 from httpx import RequestError
 
+from pkg.retry import RetryClass
+
 
 class ErrorTuple(NamedTuple):
     code: int
@@ -34,23 +36,33 @@ class ErrorEnum(Enum):
 class DataFetchError(RequestError):
     """something error when fetch"""
 
+    retry_class = RetryClass.FATAL
+
 
 class IPBlockError(RequestError):
     """fetch so fast that the server block us ip"""
 
+    retry_class = RetryClass.ACCOUNT
+
 
 class SignError(RequestError):
     """fetch error because x-s sign verror"""
 
+    retry_class = RetryClass.FATAL
+
 
 class AccessFrequencyError(RequestError):
     """
     fetch error because access frequency
     """
 
+    retry_class = RetryClass.TRANSIENT
+
 class NeedVerifyError(RequestError):
     """fetch error because need captcha"""
 
+    retry_class = RetryClass.ACCOUNT
+
     def __init__(self, *args, **kwargs):
         self.verify_type = kwargs.pop("verify_type", None)
         self.verify_uuid = kwargs.pop("verify_uuid", None)
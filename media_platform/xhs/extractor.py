@@ -14,6 +14,7 @@ from typing import Dict, List, Optional
 
 import humps
 from model.m_xhs import XhsComment, XhsCreator, XhsNote, NoteUrlInfo, CreatorUrlInfo
+from pkg.extraction import cpu_heavy
 from pkg.tools.crawler_util import extract_url_params_to_dict
 from var import source_keyword_var
 
@@ -22,6 +23,7 @@ class XiaoHongShuExtractor:
     def __init__(self):
         pass
 
+    @cpu_heavy("html")
     def extract_note_detail_from_html(
         self, note_id: str, html: str
     ) -> Optional[XhsNote]:
@@ -47,6 +49,7 @@ class XiaoHongShuExtractor:
             return self._extract_note_from_dict(note_data)
         return None
 
+    @cpu_heavy("html")
     def extract_creator_info_from_html(
         self, user_id: str, html: str
     ) -> Optional[XhsCreator]:
@@ -83,6 +86,50 @@ class XiaoHongShuExtractor:
             return None
         return self._extract_note_from_dict(note_data)
 
+    def extract_note_from_list_item(self, note_item: Dict) -> Optional[XhsNote]:
+        """从搜索、创作者主页、首页推荐列表中的笔记卡片提取笔记信息，不需要请求笔记详情
+
+        列表卡片中没有笔记描述、发布时间、标签等字段，这些字段保持为空
+
+        Args:
+            note_item: 列表中的笔记数据，搜索和首页推荐的卡片在 note_card 中，创作者主页的卡片就是笔记数据本身
+
+        Returns:
+            XhsNote: 笔记模型对象，不是笔记卡片时返回 None
+        """
+        note_card = note_item.get("note_card") or note_item
+        if not note_card.get("display_title") and not note_card.get("interact_info"):
+            return None
+
+        note_id = note_item.get("note_id") or note_item.get("id", "")
+        user_info = note_card.get("user", {})
+        interact_info = note_card.get("interact_info", {})
+        image_urls = []
+        for img in note_card.get("image_list", []):
+            info_list = img.get("info_list", [])
+            if info_list:
+                image_urls.append(info_list[-1].get("url", ""))
+        if not image_urls and note_card.get("cover", {}).get("url_default"):
+            image_urls.append(note_card["cover"]["url_default"])
+        xsec_source = note_item.get("xsec_source") or "pc_search"
+
+        return XhsNote(
+            note_id=note_id,
+            type=note_card.get("type", ""),
+            title=note_card.get("display_title", ""),
+            last_update_time=str(note_card.get("last_update_time", "")),
+            user_id=user_info.get("user_id", ""),
+            nickname=user_info.get("nickname") or user_info.get("nick_name", ""),
+            avatar=user_info.get("avatar", ""),
+            liked_count=str(interact_info.get("liked_count", "")),
+            collected_count=str(interact_info.get("collected_count", "")),
+            comment_count=str(interact_info.get("comment_count", "")),
+            share_count=str(interact_info.get("shared_count", "")),
+            image_list=",".join(image_urls),
+            note_url=f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={note_item.get('xsec_token', '')}&xsec_source={xsec_source}",
+            source_keyword=source_keyword_var.get(),
+        )
+
     def _extract_note_from_dict(self, note_item: Dict) -> XhsNote:
         """内部方法：从字典提取笔记信息"""
         user_info = note_item.get("user", {})
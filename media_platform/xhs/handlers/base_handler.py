@@ -9,7 +9,22 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import config
+import constant
+from pkg.tools import utils
+from pkg.work_queue import (
+    WORK_ITEM_KIND_COMMENT_THREAD,
+    WORK_ITEM_KIND_NOTE,
+    AbstractWorkQueue,
+    WorkItem,
+    WorkQueueWorker,
+    create_work_queue,
+    make_work_item_id,
+)
+from ..exception import DataFetchError
 
 if TYPE_CHECKING:
     from ..client import XiaoHongShuClient
@@ -41,6 +56,7 @@ class BaseHandler(ABC):
         self.checkpoint_manager = checkpoint_manager
         self.note_processor = note_processor
         self.comment_processor = comment_processor
+        self.work_queue: Optional[AbstractWorkQueue] = None
     
     @abstractmethod
     async def handle(self) -> None:
@@ -51,3 +67,169 @@ class BaseHandler(ABC):
             None
         """
         raise NotImplementedError("Subclasses must implement handle method")
+
+    async def run_work_queue(self, checkpoint_id: str, seed_items: List[WorkItem]) -> None:
+        """
+        分布式工作队列模式：把种子任务幂等入队，然后作为无状态的消费者处理队列中的任务，直到所有机器上的任务都处理完
+        多台机器同时运行相同的命令时，种子任务只会入队一次，队列处理完后清空入队记录
+
+        Args:
+            checkpoint_id: 本机的检查点ID
+            seed_items: 种子任务
+
+        Returns:
+            None
+        """
+        self.work_queue = create_work_queue(
+            f"{constant.XHS_PLATFORM_NAME}:{config.WORK_QUEUE_NAME}"
+        )
+        for item in seed_items:
+            await self.work_queue.enqueue(item)
+
+        worker = WorkQueueWorker(
+            self.work_queue,
+            self.get_work_item_handlers(checkpoint_id),
+            concurrency=config.WORK_QUEUE_WORKER_NUM,
+            poll_interval=config.WORK_QUEUE_POLL_INTERVAL,
+        )
+        await worker.run_until_drained()
+
+        for dead_item in await self.work_queue.list_dead_letters():
+            utils.logger.error(
+                f"[BaseHandler.run_work_queue] Dead letter work item: {dead_item.id}, error: {dead_item.last_error}"
+            )
+        # 所有机器都处理完后清空入队记录，下一次用相同配置运行时种子任务可以重新入队
+        await self.work_queue.clear_if_drained()
+
+    def get_work_item_handlers(self, checkpoint_id: str) -> Dict:
+        """
+        Get work item kind -> handler mapping
+
+        Args:
+            checkpoint_id: Checkpoint ID
+
+        Returns:
+            Dict of work item kind and handler
+        """
+        return {
+            WORK_ITEM_KIND_NOTE: partial(self.process_note_work_item, checkpoint_id),
+            WORK_ITEM_KIND_COMMENT_THREAD: partial(
+                self.process_comment_thread_work_item, checkpoint_id
+            ),
+        }
+
+    @staticmethod
+    def make_note_work_item(note_item: Dict, checkpoint_id: str) -> WorkItem:
+        """
+        Make note work item
+
+        Args:
+            note_item: note item with note_id, xsec_source, xsec_token
+            checkpoint_id: 入队机器的检查点ID，帖子的评论进度记录在这个检查点中
+
+        Returns:
+            WorkItem
+        """
+        note_id = note_item.get("note_id", "")
+        return WorkItem(
+            id=make_work_item_id(WORK_ITEM_KIND_NOTE, note_id),
+            kind=WORK_ITEM_KIND_NOTE,
+            payload={
+                "note_id": note_id,
+                "xsec_source": note_item.get("xsec_source", ""),
+                "xsec_token": note_item.get("xsec_token", ""),
+                "checkpoint_id": checkpoint_id,
+                # 完整的列表项，处理时和非队列模式一样用于去重、新鲜度检查和按详情模式从列表项构建帖子
+                "note_item": note_item,
+            },
+        )
+
+    async def get_work_item_checkpoint_id(self, checkpoint_id: str, item: WorkItem) -> str:
+        """
+        获取处理任务时使用的检查点ID。检查点ID是每台机器各自生成的，
+        任务中记录的检查点（入队的机器生成）在共享的检查点存储（redis）中能加载到时使用它，
+        这样任意机器领取任务都能接着之前的评论游标继续爬取；否则使用本机的检查点
+
+        Args:
+            checkpoint_id: 本机的检查点ID
+            item: 领取到的任务
+
+        Returns:
+            str: 检查点ID
+        """
+        item_checkpoint_id = item.payload.get("checkpoint_id")
+        if not item_checkpoint_id or item_checkpoint_id == checkpoint_id:
+            return checkpoint_id
+        if await self.checkpoint_manager.load_checkpoint_by_id(item_checkpoint_id) is None:
+            return checkpoint_id
+        return item_checkpoint_id
+
+    async def process_note_work_item(self, checkpoint_id: str, item: WorkItem) -> None:
+        """
+        获取帖子详情，成功后把帖子的评论作为新任务入队，失败时抛出异常让任务重新投递
+        帖子和非队列模式一样经过 batch_get_note_list 的去重、新鲜度检查、详情模式和发布时间窗口过滤，
+        被过滤掉的帖子直接完成，不爬评论
+
+        Args:
+            checkpoint_id: Checkpoint ID
+            item: note work item
+
+        Returns:
+            None
+        """
+        note_id = item.payload["note_id"]
+        note_item = item.payload.get("note_item") or {
+            "note_id": note_id,
+            "xsec_source": item.payload.get("xsec_source", ""),
+            "xsec_token": item.payload.get("xsec_token", ""),
+        }
+        checkpoint_id = await self.get_work_item_checkpoint_id(checkpoint_id, item)
+        note_ids, xsec_tokens = await self.note_processor.batch_get_note_list(
+            [note_item], checkpoint_id=checkpoint_id
+        )
+        if not note_ids:
+            return
+        if not await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+            checkpoint_id=checkpoint_id, note_id=note_id
+        ):
+            raise DataFetchError(f"get note detail failed, note_id: {note_id}")
+
+        if config.ENABLE_GET_COMMENTS:
+            await self.work_queue.enqueue(
+                WorkItem(
+                    id=make_work_item_id(WORK_ITEM_KIND_COMMENT_THREAD, note_id),
+                    kind=WORK_ITEM_KIND_COMMENT_THREAD,
+                    payload={
+                        "note_id": note_id,
+                        "xsec_token": xsec_tokens[0],
+                        "checkpoint_id": checkpoint_id,
+                    },
+                )
+            )
+
+    async def process_comment_thread_work_item(self, checkpoint_id: str, item: WorkItem) -> None:
+        """
+        获取帖子的所有评论
+
+        Args:
+            checkpoint_id: Checkpoint ID
+            item: comment thread work item
+
+        Returns:
+            None
+        """
+        note_id = item.payload["note_id"]
+        xsec_token = item.payload.get("xsec_token", "")
+        checkpoint_id = await self.get_work_item_checkpoint_id(checkpoint_id, item)
+        # 帖子详情可能是其他机器爬取的，检查点中没有这个帖子时先加入，否则评论游标无法记录
+        await self.checkpoint_manager.add_note_to_checkpoint(
+            checkpoint_id=checkpoint_id,
+            note_id=note_id,
+            extra_params_info={"xsec_token": xsec_token},
+            is_success_crawled=True,
+        )
+        await self.comment_processor.get_comments_async_task(
+            note_id,
+            xsec_token=xsec_token,
+            checkpoint_id=checkpoint_id,
+        )
@@ -8,15 +8,19 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
-from typing import Dict, List, TYPE_CHECKING
+from contextlib import aclosing
+from functools import partial
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
 from model.m_xhs import CreatorUrlInfo
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
+from pkg.work_queue import WORK_ITEM_KIND_CREATOR, WorkItem, make_work_item_id
 from repo.platform_save_data import xhs as xhs_store
+from ..exception import DataFetchError
 from ..extractor import XiaoHongShuExtractor
 from .base_handler import BaseHandler
 
@@ -114,6 +118,17 @@ class CreatorHandler(BaseHandler):
 
                 creator_list = creator_list[creator_index:]
 
+        if config.ENABLE_WORK_QUEUE:
+            await self.checkpoint_manager.save_checkpoint(checkpoint)
+            await self.run_work_queue(
+                checkpoint.id,
+                [
+                    self.make_creator_work_item(creator_url, checkpoint.id)
+                    for creator_url in creator_list
+                ],
+            )
+            return
+
         for creator_url in creator_list:
             creator_url_info: CreatorUrlInfo = self.extractor.parse_creator_info_from_creator_url(
                 creator_url
@@ -166,53 +181,158 @@ class CreatorHandler(BaseHandler):
             )
 
         result = []
-        notes_has_more = True
         notes_cursor = checkpoint.current_creator_page or ""
         saved_creator_count = 0
-        while notes_has_more and saved_creator_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            notes_res = await self.xhs_client.get_notes_by_creator(
+
+        async def fetch_notes_page(cursor: str) -> Dict:
+            return await self.xhs_client.get_notes_by_creator(
                 user_id,
-                notes_cursor,
+                cursor,
                 xsec_token=xsec_token,
                 xsec_source=xsec_source,
             )
 
-            if not notes_res:
-                utils.logger.error(
-                    f"[CreatorHandler.get_notes_by_creator] The current creator may have been banned by xhs, so they cannot access the data."
-                )
-                break
+        # 处理当前页帖子详情和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+        async with aclosing(
+            prefetch_cursor_pages(
+                fetch_notes_page, notes_cursor, self._get_next_notes_cursor
+            )
+        ) as notes_pages:
+            async for notes_res in notes_pages:
+                if not notes_res:
+                    utils.logger.error(
+                        f"[CreatorHandler.get_notes_by_creator] The current creator may have been banned by xhs, so they cannot access the data."
+                    )
+                    break
+
+                notes_cursor = notes_res.get("cursor", "")
 
-            notes_has_more = notes_res.get("has_more", False)
-            notes_cursor = notes_res.get("cursor", "")
+                if "notes" not in notes_res:
+                    utils.logger.info(
+                        f"[CreatorHandler.get_all_notes_by_creator] No 'notes' key found in response: {notes_res}"
+                    )
+                    break
 
-            if "notes" not in notes_res:
+                notes = notes_res["notes"]
                 utils.logger.info(
-                    f"[CreatorHandler.get_all_notes_by_creator] No 'notes' key found in response: {notes_res}"
+                    f"[CreatorHandler.get_all_notes_by_creator] got user_id:{user_id} notes len : {len(notes)}, notes_cursor: {notes_cursor}"
+                )
+                note_ids, xsec_tokens, fetched_notes = await self.note_processor.batch_get_notes(
+                    notes, checkpoint_id=checkpoint_id
+                )
+                await self.comment_processor.batch_get_note_comments(
+                    note_ids, xsec_tokens, checkpoint_id=checkpoint_id
                 )
-                break
 
-            notes = notes_res["notes"]
-            utils.logger.info(
-                f"[CreatorHandler.get_all_notes_by_creator] got user_id:{user_id} notes len : {len(notes)}, notes_cursor: {notes_cursor}"
-            )
-            note_ids, xsec_tokens = await self.note_processor.batch_get_note_list(
-                notes, checkpoint_id=checkpoint_id
-            )
-            await self.comment_processor.batch_get_note_comments(
-                note_ids, xsec_tokens, checkpoint_id=checkpoint_id
+                result.extend(notes)
+                saved_creator_count += len(notes)
+
+                # 需要加载最新的检查点，因为在fetch_creator_notes_detail方法中，有对检查点左边
+                checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
+                    checkpoint_id
+                )
+                checkpoint.current_creator_page = notes_cursor
+                await self.checkpoint_manager.update_checkpoint(checkpoint)
+
+                if saved_creator_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
+
+                # 主页笔记按发布时间倒序，这一页的笔记早于开始时间后不再翻页
+                if self.note_processor.is_page_before_publish_time_since(notes, fetched_notes):
+                    utils.logger.info(
+                        f"[CreatorHandler.get_all_notes_by_creator] user_id:{user_id} reached publish time since, stop"
+                    )
+                    break
+
+        return result
+
+    @staticmethod
+    def _get_next_notes_cursor(notes_res: Dict) -> Optional[str]:
+        """
+        根据创作者帖子列表的一页结果获取下一页的游标，没有下一页时返回 None
+        Args:
+            notes_res: 创作者帖子列表的一页结果
+
+        Returns:
+            Optional[str]: 下一页的游标
+        """
+        if not notes_res or "notes" not in notes_res or not notes_res.get("has_more"):
+            return None
+        return notes_res.get("cursor", "")
+
+    def get_work_item_handlers(self, checkpoint_id: str) -> Dict:
+        handlers = super().get_work_item_handlers(checkpoint_id)
+        handlers[WORK_ITEM_KIND_CREATOR] = partial(
+            self.process_creator_work_item, checkpoint_id
+        )
+        return handlers
+
+    def make_creator_work_item(self, creator_url: str, checkpoint_id: str) -> WorkItem:
+        """
+        Make creator work item
+
+        Args:
+            creator_url: creator url
+            checkpoint_id: 入队机器的检查点ID
+
+        Returns:
+            WorkItem
+        """
+        creator_url_info: CreatorUrlInfo = self.extractor.parse_creator_info_from_creator_url(
+            creator_url
+        )
+        return WorkItem(
+            id=make_work_item_id(WORK_ITEM_KIND_CREATOR, creator_url_info.creator_id),
+            kind=WORK_ITEM_KIND_CREATOR,
+            payload={**creator_url_info.model_dump(), "checkpoint_id": checkpoint_id},
+        )
+
+    async def process_creator_work_item(self, checkpoint_id: str, item: WorkItem) -> None:
+        """
+        保存创作者信息，并把创作者的所有帖子作为新任务入队，由所有机器共同爬取帖子详情和评论
+        任务重新投递时从第一页开始翻页，已入队的帖子不会重复入队
+
+        Args:
+            checkpoint_id: Checkpoint ID
+            item: creator work item
+
+        Returns:
+            None
+        """
+        creator_url_info = CreatorUrlInfo.model_validate(item.payload)
+        checkpoint_id = await self.get_work_item_checkpoint_id(checkpoint_id, item)
+        creator_info = await self.xhs_client.get_creator_info(
+            user_id=creator_url_info.creator_id,
+            xsec_token=creator_url_info.xsec_token,
+            xsec_source=creator_url_info.xsec_source,
+        )
+        if not creator_info:
+            raise DataFetchError(
+                f"[CreatorHandler.process_creator_work_item] Get creator info error, user_id: {creator_url_info.creator_id}"
             )
+        await xhs_store.save_creator(creator_info)
 
-            result.extend(notes)
-            saved_creator_count += len(notes)
+        enqueued_note_count = 0
 
-            # 需要加载最新的检查点，因为在fetch_creator_notes_detail方法中，有对检查点左边
-            checkpoint = await self.checkpoint_manager.load_checkpoint_by_id(
-                checkpoint_id
+        async def fetch_notes_page(cursor: str) -> Dict:
+            return await self.xhs_client.get_notes_by_creator(
+                creator_url_info.creator_id,
+                cursor,
+                xsec_token=creator_url_info.xsec_token,
+                xsec_source=creator_url_info.xsec_source,
             )
-            checkpoint.current_creator_page = notes_cursor
-            await self.checkpoint_manager.update_checkpoint(checkpoint)
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-        return result
+        async with aclosing(
+            prefetch_cursor_pages(fetch_notes_page, "", self._get_next_notes_cursor)
+        ) as notes_pages:
+            async for notes_res in notes_pages:
+                if not notes_res or "notes" not in notes_res:
+                    break
+
+                for note_item in notes_res["notes"]:
+                    await self.work_queue.enqueue(
+                        self.make_note_work_item(note_item, checkpoint_id)
+                    )
+                enqueued_note_count += len(notes_res["notes"])
+                if enqueued_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
@@ -94,6 +94,12 @@ class DetailHandler(BaseHandler):
                 }
             )
 
+        if config.ENABLE_WORK_QUEUE:
+            await self.run_work_queue(
+                checkpoint.id, [self.make_note_work_item(note_item, checkpoint.id) for note_item in note_list]
+            )
+            return
+
         note_ids, xsec_tokens = await self.note_processor.batch_get_note_list(note_list, checkpoint_id=checkpoint.id)
         await self.comment_processor.batch_get_note_comments(
             note_ids, xsec_tokens, checkpoint_id=checkpoint.id
@@ -8,12 +8,13 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
-import asyncio
-from typing import Dict, List, TYPE_CHECKING
+from contextlib import aclosing
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import config
 import constant
 from model.m_checkpoint import Checkpoint
+from pkg.pipeline import prefetch_cursor_pages
 from pkg.tools import utils
 from ..field import FeedType
 from .base_handler import BaseHandler
@@ -94,107 +95,124 @@ class HomefeedHandler(BaseHandler):
         saved_note_count = 0
         note_num = 18
 
-        while saved_note_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            try:
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_notes] Get homefeed notes, current_cursor: {current_cursor}, note_index: {note_index}, note_num: {note_num}"
-                )
-
-                homefeed_notes_res = await self.xhs_client.get_homefeed_notes(
-                    category=FeedType.RECOMMEND,
-                    cursor=current_cursor,
-                    note_index=note_index,
-                    note_num=note_num,
+        async def fetch_homefeed_page(page_cursor: Tuple[str, int]) -> Tuple[int, Dict]:
+            cursor, index = page_cursor
+            utils.logger.info(
+                f"[HomefeedHandler.get_homefeed_notes] Get homefeed notes, current_cursor: {cursor}, note_index: {index}, note_num: {note_num}"
+            )
+            homefeed_notes_res = await self.xhs_client.get_homefeed_notes(
+                category=FeedType.RECOMMEND,
+                cursor=cursor,
+                note_index=index,
+                note_num=note_num,
+            )
+            return index, homefeed_notes_res
+
+        def get_next_page_cursor(homefeed_page: Tuple[int, Dict]) -> Optional[Tuple[str, int]]:
+            index, homefeed_notes_res = homefeed_page
+            if not homefeed_notes_res or not homefeed_notes_res.get("cursor_score"):
+                return None
+            return homefeed_notes_res["cursor_score"], index + note_num
+
+        try:
+            # 处理当前页帖子详情和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+            async with aclosing(
+                prefetch_cursor_pages(
+                    fetch_homefeed_page, (current_cursor, note_index), get_next_page_cursor
                 )
-                if not homefeed_notes_res:
-                    utils.logger.info(
-                        f"[HomefeedHandler.get_homefeed_notes] No more content!"
+            ) as homefeed_pages:
+                async for page_note_index, homefeed_notes_res in homefeed_pages:
+                    if not homefeed_notes_res:
+                        utils.logger.info(
+                            f"[HomefeedHandler.get_homefeed_notes] No more content!"
+                        )
+                        break
+
+                    cursor_score = homefeed_notes_res.get("cursor_score", "")
+                    if not cursor_score:
+                        utils.logger.info(
+                            f"[HomefeedHandler.get_homefeed_notes] No more content!"
+                        )
+                        break
+
+                    items: List[Dict] = homefeed_notes_res.get("items", [])
+                    note_items = []
+
+                    # 首页推荐的信息流，每次API返回的结果不一样的概率大，就有可能遇到上一次中断保存的帖子列表有未完成爬取的，这里做一个补偿。
+                    compensation_note_ids = set()
+                    for note_item in checkpoint.crawled_note_list:
+                        if not note_item.is_success_crawled:
+                            compensation_note_item = {
+                                "note_id": note_item.note_id,
+                                "xsec_token": note_item.extra_params_info.get(
+                                    "xsec_token", ""
+                                ),
+                                "xsec_source": note_item.extra_params_info.get(
+                                    "xsec_source", ""
+                                ),
+                            }
+                            note_items.append(compensation_note_item)
+                            compensation_note_ids.add(note_item.note_id)
+
+                    for post_item in items:
+                        if post_item.get("model_type") not in ("rec_query", "hot_query"):
+                            note_id = post_item.get("id")
+                            if not note_id:
+                                continue
+                            if note_id not in compensation_note_ids:
+                                note_item = {
+                                    "note_id": note_id,
+                                    "xsec_token": post_item.get("xsec_token", ""),
+                                    "xsec_source": "pc_feed",
+                                    # 列表元数据，用于跳过没有变化的帖子
+                                    "note_card": post_item.get("note_card") or {},
+                                }
+                                note_items.append(note_item)
+
+                    note_id_list, xsec_tokens = (
+                        await self.note_processor.batch_get_note_list(
+                            note_list=note_items, checkpoint_id=checkpoint.id
+                        )
                     )
-                    break
-
-                cursor_score = homefeed_notes_res.get("cursor_score", "")
-                if not cursor_score:
-                    utils.logger.info(
-                        f"[HomefeedHandler.get_homefeed_notes] No more content!"
+                    await self.comment_processor.batch_get_note_comments(
+                        note_id_list, xsec_tokens, checkpoint_id=checkpoint.id
                     )
-                    break
-
-                items: List[Dict] = homefeed_notes_res.get("items", [])
-                note_items = []
-
-                # 首页推荐的信息流，每次API返回的结果不一样的概率大，就有可能遇到上一次中断保存的帖子列表有未完成爬取的，这里做一个补偿。
-                compensation_note_ids = set()
-                for note_item in checkpoint.crawled_note_list:
-                    if not note_item.is_success_crawled:
-                        compensation_note_item = {
-                            "note_id": note_item.note_id,
-                            "xsec_token": note_item.extra_params_info.get(
-                                "xsec_token", ""
-                            ),
-                            "xsec_source": note_item.extra_params_info.get(
-                                "xsec_source", ""
-                            ),
-                        }
-                        note_items.append(compensation_note_item)
-                        compensation_note_ids.add(note_item.note_id)
-
-                for post_item in items:
-                    if post_item.get("model_type") not in ("rec_query", "hot_query"):
-                        note_id = post_item.get("id")
-                        if not note_id:
-                            continue
-                        if note_id not in compensation_note_ids:
-                            note_item = {
-                                "note_id": note_id,
-                                "xsec_token": post_item.get("xsec_token", ""),
-                                "xsec_source": "pc_feed",
-                            }
-                            note_items.append(note_item)
 
-                note_id_list, xsec_tokens = (
-                    await self.note_processor.batch_get_note_list(
-                        note_list=note_items, checkpoint_id=checkpoint.id
-                    )
-                )
-                await self.comment_processor.batch_get_note_comments(
-                    note_id_list, xsec_tokens, checkpoint_id=checkpoint.id
-                )
+                    current_cursor = cursor_score
+                    note_index = page_note_index + note_num
+                    saved_note_count += len(note_id_list)
 
-                current_cursor = cursor_score
-                note_index += note_num
+                    # 更新检查点状态
+                    lastest_checkpoint = (
+                        await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
+                    )
+                    lastest_checkpoint.current_homefeed_cursor = current_cursor
+                    lastest_checkpoint.current_homefeed_note_index = note_index
+                    await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+                    if saved_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+                        break
 
-            except Exception as ex:
+        except Exception as ex:
+            utils.logger.error(
+                f"[HomefeedHandler.get_homefeed_notes] Get homefeed notes error: {ex}"
+            )
+            # 发生异常了，则打印当前爬取的游标和索引，用于后续继续爬取
+            utils.logger.info(
+                "------------------------------------------记录当前爬取的游标和索引------------------------------------------"
+            )
+            for i in range(3):
                 utils.logger.error(
-                    f"[HomefeedHandler.get_homefeed_notes] Get homefeed notes error: {ex}"
-                )
-                # 发生异常了，则打印当前爬取的游标和索引，用于后续继续爬取
-                utils.logger.info(
-                    "------------------------------------------记录当前爬取的游标和索引------------------------------------------"
-                )
-                for i in range(3):
-                    utils.logger.error(
-                        f"[HomefeedHandler.get_homefeed_notes] Current cursor: {current_cursor}, note_index: {note_index}"
-                    )
-                utils.logger.info(
-                    "------------------------------------------记录当前爬取的游标和索引---------------------------------------------------"
+                    f"[HomefeedHandler.get_homefeed_notes] Current cursor: {current_cursor}, note_index: {note_index}"
                 )
+            utils.logger.info(
+                "------------------------------------------记录当前爬取的游标和索引---------------------------------------------------"
+            )
 
-                utils.logger.info(
-                    f"[HomefeedHandler.get_homefeed_notes] 可以在配置文件中开启断点续爬功能，继续爬取当前位置的信息"
-                )
-                return
-
-            finally:
-                # 更新检查点状态
-                lastest_checkpoint = (
-                    await self.checkpoint_manager.load_checkpoint_by_id(checkpoint.id)
-                )
-                lastest_checkpoint.current_homefeed_cursor = current_cursor
-                lastest_checkpoint.current_homefeed_note_index = note_index
-                await self.checkpoint_manager.update_checkpoint(lastest_checkpoint)
+            utils.logger.info(
+                f"[HomefeedHandler.get_homefeed_notes] 可以在配置文件中开启断点续爬功能，继续爬取当前位置的信息"
+            )
+            return
 
         utils.logger.info(
             "[HomefeedHandler.get_homefeed_notes] XiaoHongShu homefeed notes crawler finished ..."
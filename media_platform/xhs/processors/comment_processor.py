@@ -10,17 +10,34 @@
 
 import asyncio
 from asyncio import Task
-from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import config
-from config.base_config import PER_NOTE_MAX_COMMENTS_COUNT
+import constant
 from model.m_xhs import XhsComment
+from pkg.pipeline import (
+    CommentCrawlPlan,
+    CommentPlanner,
+    get_note_completion_records,
+    ordered_concurrent_stream,
+    parse_comment_count,
+)
 from pkg.tools import utils
+from repo.comment_watermark import (
+    advance_watermark,
+    filter_new_comments,
+    get_comment_watermark_manager,
+)
 from repo.platform_save_data import xhs as xhs_store
 
 if TYPE_CHECKING:
     from ..client import XiaoHongShuClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
+
+# 评论接口每页返回的一级评论数量，用于预估翻页次数
+XHS_COMMENT_PAGE_SIZE = 10
 
 
 class CommentProcessor:
@@ -30,7 +47,7 @@ class CommentProcessor:
         self,
         xhs_client: "XiaoHongShuClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_note_comment_semaphore: asyncio.Semaphore,
+        crawler_note_comment_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize comment processor
@@ -38,11 +55,17 @@ class CommentProcessor:
         Args:
             xhs_client: XiaoHongShu API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_note_comment_semaphore: Semaphore to limit concurrent comment tasks
+            crawler_note_comment_semaphore: Adaptive concurrency limiter to limit concurrent comment tasks
         """
         self.xhs_client = xhs_client
         self.checkpoint_manager = checkpoint_manager
         self.crawler_note_comment_semaphore = crawler_note_comment_semaphore
+        # 评论预算在一次运行的所有批次之间共享
+        self.comment_planner = CommentPlanner(
+            per_note_limit=config.PER_NOTE_MAX_COMMENTS_COUNT,
+            run_budget=config.CRAWLER_MAX_COMMENTS_COUNT_PER_RUN,
+            page_size=XHS_COMMENT_PAGE_SIZE,
+        )
 
     async def batch_get_note_comments(
         self,
@@ -71,7 +94,8 @@ class CommentProcessor:
         utils.logger.info(
             f"[CommentProcessor.batch_get_note_comments] Begin batch get note comments, note list: {note_list}"
         )
-        task_list: List[Task] = []
+        xsec_token_map: Dict[str, str] = {}
+        note_comment_counts: List[Tuple[str, Optional[int]]] = []
         for index, note_id in enumerate(note_list):
 
             # 先判断checkpoint中该note的is_success_crawled_comments是否为True，如果为True，则跳过
@@ -81,24 +105,74 @@ class CommentProcessor:
                 utils.logger.info(
                     f"[CommentProcessor.batch_get_note_comments] Note {note_id} is already crawled comments, skip"
                 )
+                await get_note_completion_records().complete_note(
+                    constant.XHS_PLATFORM_NAME, note_id
+                )
                 continue
 
+            xsec_token_map[note_id] = xsec_tokens[index]
+            note_comment_counts.append(
+                (note_id, await self._get_note_comment_count(checkpoint_id, note_id))
+            )
+
+        # 根据笔记的评论数量生成爬取计划，跳过没有评论的笔记，并在请求之前分配每个笔记的评论数量上限
+        comment_plans = self.comment_planner.plan(note_comment_counts)
+        planned_note_ids = {plan.note_id for plan in comment_plans}
+        for note_id, comment_count in note_comment_counts:
+            if note_id not in planned_note_ids:
+                utils.logger.info(
+                    f"[CommentProcessor.batch_get_note_comments] Note {note_id} has no comments or the comment budget is used up, skip"
+                )
+                # 没有评论的笔记已经爬完，评论预算用完的笔记下次运行时还需要爬取评论
+                if comment_count == 0:
+                    await get_note_completion_records().complete_note(
+                        constant.XHS_PLATFORM_NAME, note_id
+                    )
+
+        task_list: List[Task] = []
+        for comment_plan in comment_plans:
+            utils.logger.info(
+                f"[CommentProcessor.batch_get_note_comments] Note {comment_plan.note_id} comment plan, "
+                f"comment_count: {comment_plan.comment_count}, estimated_pages: {comment_plan.estimated_pages}, "
+                f"max_comments: {comment_plan.max_comments}"
+            )
             task = asyncio.create_task(
                 self.get_comments_async_task(
-                    note_id,
-                    xsec_token=xsec_tokens[index],
+                    comment_plan.note_id,
+                    xsec_token=xsec_token_map[comment_plan.note_id],
                     checkpoint_id=checkpoint_id,
+                    comment_plan=comment_plan,
                 ),
-                name=note_id,
+                name=comment_plan.note_id,
             )
             task_list.append(task)
         await asyncio.gather(*task_list)
 
+    async def _get_note_comment_count(
+        self, checkpoint_id: str, note_id: str
+    ) -> Optional[int]:
+        """
+        从检查点中获取笔记详情（或列表项）上的评论数量
+        Args:
+            checkpoint_id: checkpoint id
+            note_id: note id
+
+        Returns:
+            Optional[int]: 评论数量，未知时返回 None
+        """
+        note_info = await self.checkpoint_manager.get_note_info_from_checkpont(
+            checkpoint_id=checkpoint_id, note_id=note_id
+        )
+        if not note_info or not note_info.extra_params_info:
+            return None
+        return parse_comment_count(note_info.extra_params_info.get("comment_count"))
+
     async def get_comments_async_task(
         self,
         note_id: str,
         xsec_token: str = "",
         checkpoint_id: str = "",
+        comment_plan: Optional[CommentCrawlPlan] = None,
     ):
         """
         Get note comments with keyword filtering and quantity limitation
@@ -106,6 +180,7 @@ class CommentProcessor:
             note_id: note id
             xsec_token: xsec token
             checkpoint_id: checkpoint id
+            comment_plan: comment crawl plan of the note
 
         Returns:
             None
@@ -114,28 +189,39 @@ class CommentProcessor:
             utils.logger.info(
                 f"[CommentProcessor.get_comments_async_task] Begin get note id comments {note_id}"
             )
-            await self.get_note_all_comments(
-                note_id=note_id,
-                xsec_token=xsec_token,
-                checkpoint_id=checkpoint_id,
-            )
+            # 评论按页入库，这里只统计数量，不保留评论
+            crawled_count = 0
+            async with aclosing(
+                self.get_note_all_comments(
+                    note_id=note_id,
+                    xsec_token=xsec_token,
+                    checkpoint_id=checkpoint_id,
+                    comment_plan=comment_plan,
+                )
+            ) as comment_pages:
+                async for comments in comment_pages:
+                    crawled_count += len(comments)
+            if comment_plan:
+                self.comment_planner.release(comment_plan, crawled_count)
 
     async def get_note_all_comments(
         self,
         note_id: str,
         xsec_token: str = "",
         checkpoint_id: str = "",
-    ) -> List[XhsComment]:
+        comment_plan: Optional[CommentCrawlPlan] = None,
+    ) -> AsyncIterator[List[XhsComment]]:
         """
         获取指定笔记下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
+        每一页评论（以及每个一级评论下的二级评论）入库后立即产出，只记录数量，不在内存中累积整个帖子的评论
         Args:
             note_id: 笔记ID
-            callback: 一次笔记爬取结束后
             xsec_token: 验证token
             checkpoint_id: 检查点ID
+            comment_plan: 评论爬取计划，没有传入时只按 PER_NOTE_MAX_COMMENTS_COUNT 限制数量
 
         Returns:
-            List[XhsComment]: 评论模型列表
+            AsyncIterator[List[XhsComment]]: 已入库的评论页
         """
         current_comment_cursor = ""
         lastest_comment_cursor = await self.checkpoint_manager.get_note_comment_cursor(
@@ -147,7 +233,25 @@ class CommentProcessor:
             )
             current_comment_cursor = lastest_comment_cursor
 
-        result = []
+        # 增量爬取：加载该帖子已保存的最新一级评论，评论接口按时间倒序返回，翻到已保存的评论就停止翻页
+        watermark_manager = None
+        watermark = None
+        if config.ENABLE_INCREMENTAL_COMMENTS:
+            watermark_manager = get_comment_watermark_manager()
+            watermark = await watermark_manager.load_watermark(
+                constant.XHS_PLATFORM_NAME, note_id
+            )
+        newest_watermark = watermark.model_copy() if watermark else None
+
+        if comment_plan is None:
+            comment_plan = CommentCrawlPlan(
+                note_id=note_id,
+                comment_count=None,
+                estimated_pages=0,
+                max_comments=config.PER_NOTE_MAX_COMMENTS_COUNT,
+            )
+
+        crawled_count = 0
         comments_has_more = True
         comments_cursor = current_comment_cursor  # 首次用外部传入的 cursor
 
@@ -156,43 +260,73 @@ class CommentProcessor:
         )
 
         while comments_has_more:
-            comments, comments_res = await self.xhs_client.get_note_comments(
-                note_id, comments_cursor, xsec_token
-            )
-            comments_has_more = comments_res.get("has_more", False)
-            comments_cursor = comments_res.get("cursor", "")
-
-            # 更新评论游标到checkpoint中
-            if comments_cursor:
+            # 上一页的一级评论和二级评论都入库后才把评论游标推进到下一页，中断后从没有处理完的一页继续，
+            # 该页下二级评论已经爬完的一级评论直接跳过，没爬完的从保存的二级评论游标继续
+            if comments_cursor and comments_cursor != current_comment_cursor:
                 await self.checkpoint_manager.update_note_comment_cursor(
                     checkpoint_id=checkpoint_id,
                     note_id=note_id,
                     comment_cursor=comments_cursor,
                 )
+                current_comment_cursor = comments_cursor
+
+            # 在请求下一页之前判断评论数量上限，避免多请求一页再丢弃
+            if not comment_plan.allows_more(crawled_count):
+                utils.logger.info(
+                    f"[CommentProcessor.get_note_all_comments] The number of comments reaches the limit: {comment_plan.max_comments}"
+                )
+                break
+            comments, comments_res = await self.xhs_client.get_note_comments(
+                note_id, comments_cursor, xsec_token
+            )
+            comments_has_more = comments_res.get("has_more", False)
+            comments_cursor = comments_res.get("cursor", "")
 
             if not comments:
                 continue
-            
+
+            raw_comments = comments_res.get("comments", [])
+            if config.ENABLE_INCREMENTAL_COMMENTS:
+                comments, reached_watermark = filter_new_comments(watermark, comments)
+                new_comment_ids = {comment.comment_id for comment in comments}
+                raw_comments = [
+                    raw_comment
+                    for raw_comment in raw_comments
+                    if raw_comment.get("id") in new_comment_ids
+                ]
+                newest_watermark = advance_watermark(
+                    newest_watermark, constant.XHS_PLATFORM_NAME, note_id, comments
+                )
+                if reached_watermark:
+                    utils.logger.info(
+                        f"[CommentProcessor.get_note_all_comments] Reached stored comments of note {note_id}, stop paging"
+                    )
+                    comments_has_more = False
+                if not comments:
+                    continue
+
+            # 最后一页只保留上限以内的评论
+            remaining_count = comment_plan.remaining(crawled_count)
+            if remaining_count is not None and len(comments) > remaining_count:
+                comments = comments[:remaining_count]
+                raw_comments = raw_comments[:remaining_count]
+
             # 保存评论到数据库
             await xhs_store.batch_update_xhs_note_comments(comments)
 
-            # 爬虫请求间隔时间
-            await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+            crawled_count += len(comments)
+            yield comments
 
-            result.extend(comments)
-
-            if (
-                PER_NOTE_MAX_COMMENTS_COUNT
-                and len(result) >= PER_NOTE_MAX_COMMENTS_COUNT
-            ):
-                utils.logger.info(
-                    f"[CommentProcessor.get_note_all_comments] The number of comments exceeds the limit: {PER_NOTE_MAX_COMMENTS_COUNT}"
+            if not comment_plan.allows_more(crawled_count):
+                continue
+            async with aclosing(
+                self.get_comments_all_sub_comments(
+                    note_id, comments, raw_comments, xsec_token, checkpoint_id
                 )
-                break
-            sub_comments = await self.get_comments_all_sub_comments(
-                note_id, comments, comments_res.get("comments", []), xsec_token
-            )
-            result.extend(sub_comments)
+            ) as sub_comment_pages:
+                async for sub_comments in sub_comment_pages:
+                    crawled_count += len(sub_comments)
+                    yield sub_comments
 
         # 更新评论游标，标记为该帖子的评论已爬取
         await self.checkpoint_manager.update_note_comment_cursor(
@@ -201,8 +335,11 @@ class CommentProcessor:
             comment_cursor=comments_cursor,
             is_success_crawled_comments=True,
         )
-
-        return result
+        if watermark_manager:
+            await watermark_manager.save_watermark(newest_watermark)
+        await get_note_completion_records().complete_note(
+            constant.XHS_PLATFORM_NAME, note_id
+        )
 
     async def get_comments_all_sub_comments(
         self,
@@ -210,61 +347,91 @@ class CommentProcessor:
         comments: List[XhsComment],
         raw_comments: List[Dict],
         xsec_token: str = "",
-    ) -> List[XhsComment]:
+        checkpoint_id: str = "",
+    ) -> AsyncIterator[List[XhsComment]]:
         """
         获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
+        每页二级评论入库后在检查点中记录该一级评论的二级评论游标，爬完后记录到已完成的一级评论中，
+        断点续爬时跳过已完成的一级评论，没爬完的一级评论从保存的游标继续
         Args:
             note_id: 笔记ID
             comments: 评论模型列表
             raw_comments: 原始评论数据（用于获取游标信息）
             xsec_token: 验证token
+            checkpoint_id: 检查点ID
 
         Returns:
-            List[XhsComment]: 子评论模型列表
+            AsyncIterator[List[XhsComment]]: 按一级评论顺序产出已入库的二级评论
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
             utils.logger.info(
                 f"[CommentProcessor.get_comments_all_sub_comments] Crawling sub_comment mode is not enabled"
             )
-            return []
-
-        result = []
-        # 使用raw_comments获取游标信息，使用comments获取评论ID
-        for comment, raw_comment in zip(comments, raw_comments):
-            sub_comments_data = raw_comment.get("sub_comments")
-            if sub_comments_data:
-                # 转换子评论为模型并保存
-                sub_comments_models = self.xhs_client._extractor.extract_comments_from_dict(
-                    note_id, sub_comments_data, xsec_token, comment.comment_id
-                )
-                await xhs_store.batch_update_xhs_note_comments(sub_comments_models)
-                result.extend(sub_comments_models)
-
-            sub_comment_has_more = raw_comment.get("sub_comment_has_more")
-            if not sub_comment_has_more:
-                continue
+            return
 
-            root_comment_id = comment.comment_id
-            sub_comment_cursor = raw_comment.get("sub_comment_cursor")
+        sub_comment_cursors, completed_root_comment_ids = (
+            await self.checkpoint_manager.get_note_sub_comment_progress(
+                checkpoint_id=checkpoint_id, note_id=note_id
+            )
+        )
 
+        async def iter_root_sub_comments(
+            comment_pair: Tuple[XhsComment, Dict]
+        ) -> AsyncIterator[Tuple[List[XhsComment], Optional[str], bool]]:
+            # 产出 (二级评论, 下一页游标, 是否已爬完)，游标为 None 表示不需要记录进度
+            comment, raw_comment = comment_pair
+            if comment.comment_id in completed_root_comment_ids:
+                return
+
+            sub_comment_cursor = sub_comment_cursors.get(comment.comment_id)
+            if sub_comment_cursor is None:
+                # 一级评论中自带前几条二级评论
+                sub_comments = []
+                sub_comments_data = raw_comment.get("sub_comments")
+                if sub_comments_data:
+                    sub_comments = self.xhs_client._extractor.extract_comments_from_dict(
+                        note_id, sub_comments_data, xsec_token, comment.comment_id
+                    )
+                sub_comment_has_more = raw_comment.get("sub_comment_has_more")
+                sub_comment_cursor = raw_comment.get("sub_comment_cursor", "")
+                yield sub_comments, (
+                    sub_comment_cursor if sub_comment_has_more else None
+                ), not sub_comment_has_more
+                if not sub_comment_has_more:
+                    return
+
+            sub_comment_has_more = True
             while sub_comment_has_more:
                 sub_comments, sub_comments_res = await self.xhs_client.get_note_sub_comments(
                     note_id,
-                    root_comment_id,
+                    comment.comment_id,
                     10,
                     sub_comment_cursor,
                     xsec_token,
                 )
                 sub_comment_has_more = sub_comments_res.get("has_more", False)
                 sub_comment_cursor = sub_comments_res.get("cursor", "")
-                
-                if not sub_comments:
-                    continue
-                
-                # 保存子评论到数据库
-                await xhs_store.batch_update_xhs_note_comments(sub_comments)
-
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
-                result.extend(sub_comments)
-        return result
+                yield sub_comments or [], sub_comment_cursor, not sub_comment_has_more
+
+        # 不同一级评论的二级评论翻页互不依赖，并发获取，并发数和客户端工作池同时能执行的请求数一致（每个账号按各自的限速请求），
+        # 保存时按一级评论的顺序依次入库，保证输出顺序和并发数无关，入库后交给调用方计数，不再保留
+        # 使用raw_comments获取游标信息，使用comments获取评论ID
+        async with aclosing(
+            ordered_concurrent_stream(
+                iter_root_sub_comments,
+                list(zip(comments, raw_comments)),
+                concurrency=self.xhs_client.concurrency,
+            )
+        ) as root_results:
+            async for (comment, _), (sub_comments, sub_comment_cursor, is_finished) in root_results:
+                if sub_comments:
+                    await xhs_store.batch_update_xhs_note_comments(sub_comments)
+                    yield sub_comments
+                if sub_comment_cursor is not None:
+                    await self.checkpoint_manager.update_note_sub_comment_progress(
+                        checkpoint_id=checkpoint_id,
+                        note_id=note_id,
+                        root_comment_id=comment.comment_id,
+                        sub_comment_cursor=sub_comment_cursor,
+                        is_finished=is_finished,
+                    )
@@ -9,18 +9,31 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
 import asyncio
+from functools import partial
 from typing import Dict, List, Optional, TYPE_CHECKING, Tuple
+from model.m_note_snapshot import NoteSnapshot
 from model.m_xhs import XhsNote
 from tenacity import RetryError
 
 import config
+import constant
+from pkg.pipeline import get_note_completion_records
 from pkg.tools import utils
+from pkg.tools.publish_time_window import PublishTimeWindow
+from repo.note_seen_set import get_note_seen_set_manager
+from repo.note_snapshot import get_note_snapshot_manager
 from repo.platform_save_data import xhs as xhs_store
 from ..exception import DataFetchError
+from ..extractor import XiaoHongShuExtractor
+from var import source_keyword_var
 
 if TYPE_CHECKING:
     from ..client import XiaoHongShuClient
     from repo.checkpoint.checkpoint_store import CheckpointRepoManager
+    from pkg.rate_limit import AdaptiveConcurrencyLimiter
+
+# auto 模式下列表卡片必须包含的字段，缺少任意一个时请求笔记详情
+LITE_NOTE_REQUIRED_FIELDS = ("title", "user_id", "liked_count", "comment_count")
 
 
 class NoteProcessor:
@@ -30,7 +43,7 @@ class NoteProcessor:
         self,
         xhs_client: "XiaoHongShuClient",
         checkpoint_manager: "CheckpointRepoManager",
-        crawler_note_task_semaphore: asyncio.Semaphore,
+        crawler_note_task_semaphore: "AdaptiveConcurrencyLimiter",
     ):
         """
         Initialize note processor
@@ -38,11 +51,12 @@ class NoteProcessor:
         Args:
             xhs_client: XiaoHongShu API client
             checkpoint_manager: Checkpoint manager for resume functionality
-            crawler_note_task_semaphore: Semaphore to limit concurrent note tasks
+            crawler_note_task_semaphore: Adaptive concurrency limiter to limit concurrent note tasks
         """
         self.xhs_client = xhs_client
         self.checkpoint_manager = checkpoint_manager
         self.crawler_note_task_semaphore = crawler_note_task_semaphore
+        self.extractor = XiaoHongShuExtractor()
 
     async def get_note_detail_async_task(
         self,
@@ -50,6 +64,7 @@ class NoteProcessor:
         xsec_source: str,
         xsec_token: str,
         checkpoint_id: str,
+        note_snapshot: Optional[NoteSnapshot] = None,
     ) -> Optional[XhsNote]:
         """
         Get note detail from html or api
@@ -59,6 +74,7 @@ class NoteProcessor:
             xsec_source: xsec source
             xsec_token: xsec token
             checkpoint_id: checkpoint id
+            note_snapshot: list-level metadata snapshot, saved after the comments are crawled
         Returns:
             note detail
         """
@@ -80,7 +96,14 @@ class NoteProcessor:
 
                 note_detail = note_detail_from_api or note_detail_from_html
                 if note_detail:
+                    # 列表中没有发布时间，拿到详情后才能判断是否在发布时间窗口内，窗口外的笔记不保存也不爬评论
+                    if not PublishTimeWindow.from_config().contains(note_detail.time):
+                        utils.logger.info(
+                            f"[NoteProcessor.get_note_detail_async_task] Note {note_id} is out of publish time window, skip"
+                        )
+                        return note_detail
                     await xhs_store.update_xhs_note(note_detail)
+                    await self._record_crawled_note(note_id, note_snapshot)
                     return note_detail
 
             except DataFetchError as ex:
@@ -103,16 +126,98 @@ class NoteProcessor:
 
             finally:
                 is_success_crawled = note_detail is not None
+                # 记录详情中的评论数量，爬取评论时据此跳过没有评论的笔记、分配评论预算
                 await self.checkpoint_manager.update_note_to_checkpoint(
                     checkpoint_id=checkpoint_id,
                     note_id=note_id,
                     is_success_crawled=is_success_crawled,
                     is_success_crawled_comments=False,
                     current_note_comment_cursor=None,
+                    extra_params_info=(
+                        {"comment_count": note_detail.comment_count}
+                        if note_detail
+                        else None
+                    ),
                 )
 
-                # 爬虫请求间隔时间
-                await asyncio.sleep(config.CRAWLER_TIME_SLEEP)
+    async def save_note_from_list_item_task(
+        self,
+        note: XhsNote,
+        checkpoint_id: str,
+        note_snapshot: Optional[NoteSnapshot] = None,
+    ) -> XhsNote:
+        """
+        Save note built from the list item without requesting note detail
+
+        Args:
+            note: note built from the list item
+            checkpoint_id: checkpoint id
+            note_snapshot: list-level metadata snapshot
+        Returns:
+            note
+        """
+        await xhs_store.update_xhs_note(note)
+        await self._record_crawled_note(note.note_id, note_snapshot)
+        await self.checkpoint_manager.update_note_to_checkpoint(
+            checkpoint_id=checkpoint_id,
+            note_id=note.note_id,
+            is_success_crawled=True,
+            is_success_crawled_comments=False,
+            current_note_comment_cursor=None,
+            extra_params_info={"comment_count": note.comment_count},
+        )
+        return note
+
+    @staticmethod
+    async def _record_crawled_note(
+        note_id: str, note_snapshot: Optional[NoteSnapshot] = None
+    ) -> None:
+        """
+        Record the stored note for dedup and freshness check of later crawls,
+        both are recorded after the comments of the note are crawled
+
+        Args:
+            note_id: note id
+            note_snapshot: list-level metadata snapshot
+
+        Returns:
+            None
+        """
+        if config.ENABLE_NOTE_DEDUP:
+            await get_note_seen_set_manager().mark_seen_note_after_comments(
+                constant.XHS_PLATFORM_NAME, note_id, source_keyword_var.get()
+            )
+        if note_snapshot:
+            await get_note_completion_records().record_after_comments(
+                constant.XHS_PLATFORM_NAME,
+                note_id,
+                partial(get_note_snapshot_manager().save_snapshot, note_snapshot),
+            )
+
+    def _get_note_from_list_item(self, note_item: Dict) -> Optional[XhsNote]:
+        """
+        Build note from the list item according to NOTE_DETAIL_MODE,
+        return None when the note detail should be requested
+
+        Args:
+            note_item: note item from search, creator or homefeed list
+
+        Returns:
+            Optional[XhsNote]
+        """
+        if config.NOTE_DETAIL_MODE == constant.DETAIL_MODE_FULL:
+            return None
+        note = self.extractor.extract_note_from_list_item(note_item)
+        if note is None:
+            return None
+        if config.NOTE_DETAIL_MODE == constant.DETAIL_MODE_AUTO and not all(
+            getattr(note, field) for field in LITE_NOTE_REQUIRED_FIELDS
+        ):
+            return None
+        # 列表卡片中没有发布时间，设置了发布时间窗口时（lite 模式也一样）请求详情才能判断是否在窗口内
+        if not note.time and PublishTimeWindow.from_config().enabled:
+            return None
+        return note
 
     async def batch_get_note_list(
         self, note_list: List[Dict], checkpoint_id: str = ""
@@ -126,18 +231,59 @@ class NoteProcessor:
         Returns:
             Tuple of note IDs and xsec tokens
         """
+        note_ids, xsec_tokens, _ = await self.batch_get_notes(note_list, checkpoint_id)
+        return note_ids, xsec_tokens
+
+    async def batch_get_notes(
+        self, note_list: List[Dict], checkpoint_id: str = ""
+    ) -> Tuple[List[str], List[str], List[XhsNote]]:
+        """
+        Same as batch_get_note_list, also returns the notes fetched in this batch,
+        whose publish time tells the caller whether the list has passed the publish time window
+
+        Args:
+            note_list: List of note items
+            checkpoint_id: Checkpoint ID
+
+        Returns:
+            Tuple of note IDs, xsec tokens and the fetched notes
+        """
         task_list, note_ids, xsec_tokens = [], [], []
         for note_item in note_list:
             note_id = note_item.get("note_id", "")
             if not note_id:
                 continue
 
+            is_crawled_in_checkpoint = (
+                await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
+                    checkpoint_id=checkpoint_id, note_id=note_id
+                )
+            )
+            if (
+                config.ENABLE_NOTE_DEDUP
+                and not is_crawled_in_checkpoint
+                and await get_note_seen_set_manager().check_seen_note(
+                    constant.XHS_PLATFORM_NAME, note_id, source_keyword_var.get()
+                )
+            ):
+                utils.logger.info(
+                    f"[NoteProcessor.batch_get_notes] Note {note_id} is already crawled by other keyword or job, skip"
+                )
+                continue
+
+            note_snapshot = None
+            if config.ENABLE_NOTE_FRESHNESS_CHECK and not is_crawled_in_checkpoint:
+                note_snapshot = self._make_note_snapshot(note_item)
+                if await get_note_snapshot_manager().is_note_unchanged(note_snapshot):
+                    utils.logger.info(
+                        f"[NoteProcessor.batch_get_notes] Note {note_id} is unchanged since last crawl, skip detail and comments"
+                    )
+                    continue
+
             note_ids.append(note_id)
             xsec_tokens.append(note_item.get("xsec_token", ""))
 
-            if await self.checkpoint_manager.check_note_is_crawled_in_checkpoint(
-                checkpoint_id=checkpoint_id, note_id=note_item.get("note_id", "")
-            ):
+            if is_crawled_in_checkpoint:
                 utils.logger.info(
                     f"[NoteProcessor.batch_get_notes] Note {note_item.get('note_id', '')} is already crawled, skip"
                 )
@@ -151,13 +297,86 @@ class NoteProcessor:
                     "xsec_token": note_item.get("xsec_token", ""),
                 },
             )
-            task = self.get_note_detail_async_task(
-                note_id=note_item.get("note_id", ""),
-                xsec_source=note_item.get("xsec_source", ""),
-                xsec_token=note_item.get("xsec_token", ""),
-                checkpoint_id=checkpoint_id,
-            )
+            note_from_list_item = self._get_note_from_list_item(note_item)
+            if note_from_list_item:
+                task = self.save_note_from_list_item_task(
+                    note=note_from_list_item,
+                    checkpoint_id=checkpoint_id,
+                    note_snapshot=note_snapshot,
+                )
+            else:
+                task = self.get_note_detail_async_task(
+                    note_id=note_item.get("note_id", ""),
+                    xsec_source=note_item.get("xsec_source", ""),
+                    xsec_token=note_item.get("xsec_token", ""),
+                    checkpoint_id=checkpoint_id,
+                    note_snapshot=note_snapshot,
+                )
             task_list.append(task)
 
-        await asyncio.gather(*task_list)
-        return note_ids, xsec_tokens
+        note_details = await asyncio.gather(*task_list)
+        publish_time_window = PublishTimeWindow.from_config()
+        if publish_time_window.enabled:
+            out_of_window_note_ids = {
+                note_detail.note_id
+                for note_detail in note_details
+                if note_detail and not publish_time_window.contains(note_detail.time)
+            }
+            note_xsec_tokens = [
+                (note_id, xsec_token)
+                for note_id, xsec_token in zip(note_ids, xsec_tokens)
+                if note_id not in out_of_window_note_ids
+            ]
+            note_ids = [note_id for note_id, _ in note_xsec_tokens]
+            xsec_tokens = [xsec_token for _, xsec_token in note_xsec_tokens]
+        return note_ids, xsec_tokens, [note_detail for note_detail in note_details if note_detail]
+
+    @staticmethod
+    def is_page_before_publish_time_since(
+        note_list: List[Dict], notes: List[XhsNote]
+    ) -> bool:
+        """
+        按发布时间倒序的列表（创作者主页、按最新排序的搜索）中，这一页最后一条已知发布时间的笔记早于 --since 时，
+        后面的页也都早于 --since，不需要再翻页。列表卡片中没有发布时间，只能用这一页获取到的详情判断，置顶笔记除外
+
+        Args:
+            note_list: note items of the page
+            notes: notes fetched from the page
+
+        Returns:
+            bool
+        """
+        publish_time_window = PublishTimeWindow.from_config()
+        if not publish_time_window.since:
+            return False
+        note_times = {note.note_id: note.time for note in notes if note.time}
+        for note_item in reversed(note_list):
+            note_card = note_item.get("note_card") or note_item
+            if (note_card.get("interact_info") or {}).get("sticky"):
+                continue
+            note_time = note_times.get(note_item.get("note_id", ""))
+            if note_time:
+                return publish_time_window.is_before_since(note_time)
+        return False
+
+    @staticmethod
+    def _make_note_snapshot(note_item: Dict) -> NoteSnapshot:
+        """
+        Make snapshot from list-level metadata of a note item,
+        search and homefeed items wrap the metadata in note_card, creator items do not
+
+        Args:
+            note_item: note item from search, creator or homefeed list
+
+        Returns:
+            NoteSnapshot
+        """
+        note_card = note_item.get("note_card") or note_item
+        interact_info = note_card.get("interact_info") or {}
+        return NoteSnapshot(
+            platform=constant.XHS_PLATFORM_NAME,
+            note_id=note_item.get("note_id", ""),
+            liked_count=str(interact_info.get("liked_count", "")),
+            comment_count=str(interact_info.get("comment_count", "")),
+            last_update_time=str(note_card.get("last_update_time", "")),
+        )
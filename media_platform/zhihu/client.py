@@ -10,24 +10,35 @@
 
 
 # -*- coding: utf-8 -*-
-import asyncio
 import json
+import time
 import traceback
-from typing import Any, Callable, Dict, List, Optional, Union
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
 import httpx
 from httpx import Response
-from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
+from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractApiClient
+from constant.base_constant import ZHIHU_PLATFORM_NAME
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from pkg.account_pool import AccountWithIpModel
 from pkg.account_pool.pool import AccountWithIpPoolManager
-from pkg.rpc.sign_srv_client import SignServerClient, ZhihuSignRequest
+from pkg.pipeline import ordered_concurrent_iter
+from pkg.rate_limit import get_concurrency_controller, get_request_pacer
+from pkg.retry import raise_for_retry_after, request_retry
+from pkg.rpc.sign_srv_client import ZhihuSignRequest, get_sign_client
+from pkg.single_flight import coalesce_requests
 from pkg.tools import utils
+from repo.comment_watermark import (
+    advance_watermark,
+    filter_new_comments,
+    get_comment_watermark_manager,
+)
 
 from .exception import DataFetchError, ForbiddenError
 from .field import SearchSort, SearchTime, SearchType
@@ -50,7 +61,7 @@ class ZhiHuClient(AbstractApiClient):
         """
         self.timeout = timeout
         self._user_agent = user_agent or utils.get_user_agent()
-        self._sign_client = SignServerClient()
+        self._sign_client = get_sign_client()
         self.account_with_ip_pool = account_with_ip_pool
         self.account_info: Optional[AccountWithIpModel] = None
         self._extractor = ZhihuExtractor()
@@ -78,6 +89,17 @@ class ZhiHuClient(AbstractApiClient):
             else None
         )
 
+    @property
+    def _pacing_account_name(self) -> str:
+        """
+        请求限速按账号维度区分，同一账号的请求共享令牌桶
+        Returns:
+
+        """
+        if not self.account_info:
+            return ""
+        return self.account_info.account.account_name
+
     @property
     def _cookies(self):
         return self.account_info.account.cookies
@@ -156,7 +178,7 @@ class ZhiHuClient(AbstractApiClient):
         headers["x-zse-96"] = sign_res.data.x_zse_96
         return headers
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+    @request_retry(max_attempts=3)
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
         """
         封装httpx的公共请求方法，对请求响应做一些处理
@@ -172,14 +194,25 @@ class ZhiHuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop("return_response", False)
 
+        await get_request_pacer().acquire(
+            ZHIHU_PLATFORM_NAME, self._pacing_account_name, url
+        )
+        request_start_time = time.monotonic()
         async with httpx.AsyncClient(proxies=self._proxies) as client:
             response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        await get_concurrency_controller(ZHIHU_PLATFORM_NAME).record_response(
+            response.status_code, time.monotonic() - request_start_time
+        )
+        raise_for_retry_after(response)
 
         if response.status_code != 200:
             utils.logger.error(
                 f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}"
             )
             if response.status_code == 403:
+                get_concurrency_controller(ZHIHU_PLATFORM_NAME).record_backoff(
+                    "forbidden"
+                )
                 raise ForbiddenError(response.text)
             elif response.status_code == 404:  # 如果一个content没有评论也是404
                 return {}
@@ -198,6 +231,7 @@ class ZhiHuClient(AbstractApiClient):
             utils.logger.error(f"[ZhiHuClient.request] Request error: {response.text}")
             raise DataFetchError(response.text)
 
+    @coalesce_requests(ZHIHU_PLATFORM_NAME)
     async def get(self, uri: str, params=None, **kwargs) -> Union[Response, Dict, str]:
         """
         GET请求，对请求头签名
@@ -381,26 +415,36 @@ class ZhiHuClient(AbstractApiClient):
     async def get_note_all_comments(
         self,
         content: ZhihuContent,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
-    ) -> List[ZhihuComment]:
+    ) -> AsyncIterator[List[ZhihuComment]]:
         """
         获取指定帖子下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
+        每一页评论回调入库后立即产出，不在内存中累积整个帖子的评论
         Args:
             content: 内容详情对象(问题｜文章｜视频)
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
+            AsyncIterator[List[ZhihuComment]]: 已回调的评论页
+        """
+        # 增量爬取：按时间倒序获取评论，翻到已保存的最新一级评论就停止翻页
+        order_by = "score"
+        watermark_manager = None
+        watermark = None
+        if config.ENABLE_INCREMENTAL_COMMENTS:
+            order_by = "ts"
+            watermark_manager = get_comment_watermark_manager()
+            watermark = await watermark_manager.load_watermark(
+                ZHIHU_PLATFORM_NAME, content.content_id
+            )
+        newest_watermark = watermark.model_copy() if watermark else None
 
-        """
-        result: List[ZhihuComment] = []
         is_end: bool = False
         offset: str = ""
         limit: int = 10
         while not is_end:
             root_comment_res = await self.get_root_comments(
-                content.content_id, content.content_type, offset, limit
+                content.content_id, content.content_type, offset, limit, order_by
             )
             if not root_comment_res:
                 break
@@ -414,41 +458,56 @@ class ZhiHuClient(AbstractApiClient):
             if not comments:
                 break
 
+            if config.ENABLE_INCREMENTAL_COMMENTS:
+                comments, reached_watermark = filter_new_comments(watermark, comments)
+                newest_watermark = advance_watermark(
+                    newest_watermark, ZHIHU_PLATFORM_NAME, content.content_id, comments
+                )
+                if reached_watermark:
+                    utils.logger.info(
+                        f"[ZhiHuClient.get_note_all_comments] Reached stored comments of content {content.content_id}, stop paging"
+                    )
+                    is_end = True
+                if not comments:
+                    break
+
             if callback:
                 await callback(comments)
 
-            result.extend(comments)
-            await self.get_comments_all_sub_comments(
-                content, comments, crawl_interval=crawl_interval, callback=callback
-            )
-            await asyncio.sleep(crawl_interval)
-        return result
+            yield comments
+            async with aclosing(
+                self.get_comments_all_sub_comments(
+                    content, comments, callback=callback
+                )
+            ) as sub_comment_pages:
+                async for sub_comments in sub_comment_pages:
+                    yield sub_comments
+        if watermark_manager:
+            await watermark_manager.save_watermark(newest_watermark)
 
     async def get_comments_all_sub_comments(
         self,
         content: ZhihuContent,
         comments: List[ZhihuComment],
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
-    ) -> List[ZhihuComment]:
+    ) -> AsyncIterator[List[ZhihuComment]]:
         """
         获取指定评论下的所有子评论
         Args:
             content: 内容详情对象(问题｜文章｜视频)
             comments: 评论列表
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
-
+            AsyncIterator[List[ZhihuComment]]: 按一级评论顺序产出已回调的子评论
         """
         if not config.ENABLE_GET_SUB_COMMENTS:
-            return []
+            return
 
-        all_sub_comments: List[ZhihuComment] = []
-        for parment_comment in comments:
+        async def get_root_sub_comments(parment_comment: ZhihuComment) -> List[ZhihuComment]:
+            root_sub_comments: List[ZhihuComment] = []
             if parment_comment.sub_comment_count == 0:
-                continue
+                return root_sub_comments
 
             is_end: bool = False
             offset: str = ""
@@ -469,12 +528,23 @@ class ZhiHuClient(AbstractApiClient):
                 if not sub_comments:
                     break
 
-                if callback:
-                    await callback(sub_comments)
+                root_sub_comments.extend(sub_comments)
+            return root_sub_comments
 
-                all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
-        return all_sub_comments
+        # 各一级评论的子评论在当前账号内并发获取，并发数为当前账号限速的突发容量，
+        # 请求仍然经过账号的令牌桶限速，按一级评论的顺序回调，回调后交给调用方，不再保留
+        async with aclosing(
+            ordered_concurrent_iter(
+                get_root_sub_comments,
+                comments,
+                concurrency=get_request_pacer().burst,
+            )
+        ) as root_results:
+            async for _, root_sub_comments in root_results:
+                if root_sub_comments:
+                    if callback:
+                        await callback(root_sub_comments)
+                    yield root_sub_comments
 
     async def get_answer_info(
         self, question_id: str, answer_id: str
@@ -601,14 +671,12 @@ class ZhiHuClient(AbstractApiClient):
     async def get_all_anwser_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有回答
         Args:
             creator: 创作者信息
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
 
         Returns:
@@ -634,20 +702,17 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_all_articles_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有文章
         Args:
             creator:
-            crawl_interval:
             callback:
 
         Returns:
@@ -670,20 +735,17 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_all_videos_by_creator(
         self,
         creator: ZhihuCreator,
-        crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
     ) -> List[ZhihuContent]:
         """
         获取创作者的所有视频
         Args:
             creator:
-            crawl_interval:
             callback:
 
         Returns:
@@ -706,7 +768,6 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
         return all_contents
 
     async def get_answers_by_question_id(
@@ -747,7 +808,6 @@ class ZhiHuClient(AbstractApiClient):
     async def get_all_answers_by_question_id(
         self,
         question_id: str,
-        crawl_interval: float = 1.0,
         max_answers: int = 0,
         order: str = "default",
         callback: Optional[Callable] = None,
@@ -757,7 +817,6 @@ class ZhiHuClient(AbstractApiClient):
 
         Args:
             question_id: 问题ID
-            crawl_interval: 爬取一次笔记的延迟单位（秒）
             max_answers: 0 表示不限制
 
         Returns:
@@ -784,7 +843,6 @@ class ZhiHuClient(AbstractApiClient):
             all_answers.extend(contents)
             if callback:
                 await callback(contents)
-            await asyncio.sleep(crawl_interval)
             req_params = self._extractor.extract_next_req_params_from_url(
                 paging_info, specific_params=req_params.keys()
             )
@@ -11,16 +11,20 @@
 
 # -*- coding: utf-8 -*-
 import asyncio
-import random
 from asyncio import Task
-from typing import Dict, List, Optional, cast
+from contextlib import aclosing
+from functools import partial
+from typing import Dict, List, Optional, Tuple, cast
 
 import config
 import constant
 from base.base_crawler import AbstractCrawler
 from model.m_zhihu import ZhihuContent, ZhihuCreator
+from pkg.account_pool.client_pool import ClientWorkerPool
 from pkg.account_pool.pool import AccountWithIpPoolManager
+from pkg.pipeline import fetch_pages_concurrently, prefetch_cursor_pages
 from pkg.proxy.proxy_ip_pool import ProxyIpPool, create_ip_pool
+from pkg.rate_limit import AdaptiveConcurrencyLimiter, get_concurrency_controller
 from pkg.tools import utils
 from repo.platform_save_data import zhihu as zhihu_store
 from var import crawler_type_var, source_keyword_var
@@ -34,8 +38,15 @@ class ZhihuCrawler(AbstractCrawler):
 
     def __init__(self) -> None:
         self.zhihu_client = ZhiHuClient()
+        # 多账号并行时，处理器通过客户端工作池发起请求，池中每个客户端使用各自的账号和IP
+        self.client_pool = ClientWorkerPool(self.zhihu_client)
         self._extractor = ZhihuExtractor()
 
+        # 限制并发数，并发数由自适应并发控制器根据请求结果动态调整
+        concurrency_controller = get_concurrency_controller(constant.ZHIHU_PLATFORM_NAME)
+        self.crawler_note_task_semaphore = concurrency_controller.limiter("note")
+        self.crawler_note_comment_semaphore = concurrency_controller.limiter("comment")
+
     async def async_initialize(self):
         """
         Asynchronous Initialization
@@ -66,9 +77,33 @@ class ZhihuCrawler(AbstractCrawler):
         self.zhihu_client.account_with_ip_pool = account_with_ip_pool
         await self.zhihu_client.update_account_info()
 
+        # 多账号并行：额外创建 ACCOUNT_WORKER_NUM - 1 个客户端，每个客户端从账号池租用各自的账号和IP
+        await self.client_pool.add_workers(
+            partial(self._create_worker_client, account_with_ip_pool),
+            min(
+                config.ACCOUNT_WORKER_NUM - 1,
+                account_with_ip_pool.available_account_count(),
+            ),
+        )
+
         # 设置爬虫类型
         crawler_type_var.set(config.CRAWLER_TYPE)
 
+    async def _create_worker_client(
+        self, account_with_ip_pool: AccountWithIpPoolManager
+    ) -> ZhiHuClient:
+        """
+        创建多账号并行模式下的工作客户端
+        Args:
+            account_with_ip_pool: 账号池管理器
+
+        Returns:
+
+        """
+        client = ZhiHuClient(account_with_ip_pool=account_with_ip_pool)
+        await client.update_account_info()
+        return client
+
     async def start(self) -> None:
         """
         Start the crawler
@@ -102,46 +137,75 @@ class ZhihuCrawler(AbstractCrawler):
         zhihu_limit_count = 20  # zhihu limit page fixed value
         if config.CRAWLER_MAX_NOTES_COUNT < zhihu_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = zhihu_limit_count
-        start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
+        keyword_semaphore = asyncio.Semaphore(max(1, config.SEARCH_KEYWORD_CONCURRENCY))
+        await asyncio.gather(
+            *[
+                self._search_keyword(keyword, keyword_semaphore, zhihu_limit_count)
+                for keyword in config.KEYWORDS.split(",")
+            ]
+        )
+
+    async def _search_keyword(
+        self, keyword: str, semaphore: asyncio.Semaphore, zhihu_limit_count: int
+    ) -> None:
+        """
+        Search a single keyword, keywords are searched concurrently (SEARCH_KEYWORD_CONCURRENCY)
+        Args:
+            keyword: search keyword
+            semaphore: keyword concurrency control
+            zhihu_limit_count: page size
+
+        Returns:
+
+        """
+        async with semaphore:
+            start_page = config.START_PAGE
             source_keyword_var.set(keyword)
             utils.logger.info(
                 f"[ZhihuCrawler.search] Current search keyword: {keyword}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * zhihu_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[ZhihuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
-
-                try:
-                    utils.logger.info(
-                        f"[ZhihuCrawler.search] search zhihu keyword: {keyword}, page: {page}"
-                    )
-                    content_list: List[ZhihuContent] = (
-                        await self.zhihu_client.get_note_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                        )
+
+            async def fetch_search_page(page: int) -> List[ZhihuContent]:
+                utils.logger.info(
+                    f"[ZhihuCrawler.search] search zhihu keyword: {keyword}, page: {page}"
+                )
+                content_list: List[ZhihuContent] = (
+                    await self.client_pool.get_note_by_keyword(
+                        keyword=keyword,
+                        page=page,
                     )
-                    utils.logger.info(
-                        f"[ZhihuCrawler.search] Search contents :{content_list}"
+                )
+                utils.logger.info(
+                    f"[ZhihuCrawler.search] Search contents :{content_list}"
+                )
+                if not content_list:
+                    utils.logger.info("No more content!")
+                return content_list
+
+            last_page = start_page - 1 + config.CRAWLER_MAX_NOTES_COUNT // zhihu_limit_count
+            if last_page < start_page:
+                return
+            if start_page > 1:
+                utils.logger.info(f"[ZhihuCrawler.search] Skip page 1 - {start_page - 1}")
+
+            try:
+                # 搜索结果按页码寻址，并发请求后面的几页（并发数为客户端工作池同时能执行的请求数），按页码顺序处理
+                async with aclosing(
+                    fetch_pages_concurrently(
+                        fetch_search_page,
+                        start_page=start_page,
+                        concurrency=self.client_pool.concurrency,
+                        last_page=last_page,
                     )
-                    if not content_list:
-                        utils.logger.info("No more content!")
-                        break
-
-                    page += 1
-                    for content in content_list:
-                        await zhihu_store.update_zhihu_content(content)
+                ) as page_iterator:
+                    async for _, content_list in page_iterator:
+                        for content in content_list:
+                            await zhihu_store.update_zhihu_content(content)
 
-                    await self.batch_get_content_comments(content_list)
-                except DataFetchError:
-                    utils.logger.error("[ZhihuCrawler.search] Search content error")
-                    return
+                        await self.batch_get_content_comments(content_list)
+            except DataFetchError:
+                utils.logger.error("[ZhihuCrawler.search] Search content error")
+                return
 
     async def batch_get_content_comments(self, content_list: List[ZhihuContent]):
         """
@@ -158,17 +222,17 @@ class ZhihuCrawler(AbstractCrawler):
             )
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
         task_list: List[Task] = []
         for content_item in content_list:
             task = asyncio.create_task(
-                self.get_comments(content_item, semaphore), name=content_item.content_id
+                self.get_comments(content_item, self.crawler_note_comment_semaphore),
+                name=content_item.content_id,
             )
             task_list.append(task)
         await asyncio.gather(*task_list)
 
     async def get_comments(
-        self, content_item: ZhihuContent, semaphore: asyncio.Semaphore
+        self, content_item: ZhihuContent, semaphore: AdaptiveConcurrencyLimiter
     ):
         """
         Get note comments with keyword filtering and quantity limitation
@@ -183,10 +247,18 @@ class ZhihuCrawler(AbstractCrawler):
             utils.logger.info(
                 f"[ZhihuCrawler.get_comments] Begin get note id comments {content_item.content_id}"
             )
-            await self.zhihu_client.get_note_all_comments(
-                content=content_item,
-                crawl_interval=random.random(),
-                callback=zhihu_store.batch_update_zhihu_note_comments,
+            # 评论按页入库，这里只统计数量，不保留评论
+            crawled_count = 0
+            async with aclosing(
+                self.client_pool.get_note_all_comments(
+                    content=content_item,
+                    callback=zhihu_store.batch_update_zhihu_note_comments,
+                )
+            ) as comment_pages:
+                async for comments in comment_pages:
+                    crawled_count += len(comments)
+            utils.logger.info(
+                f"[ZhihuCrawler.get_comments] content_id: {content_item.content_id} comments have all been obtained, count: {crawled_count}"
             )
 
     async def get_creators_and_notes(self) -> None:
@@ -204,7 +276,7 @@ class ZhihuCrawler(AbstractCrawler):
             )
             user_url_token = user_link.split("/")[-1]
             # get creator detail info from web html content
-            createor_info: ZhihuCreator = await self.zhihu_client.get_creator_info(
+            createor_info: ZhihuCreator = await self.client_pool.get_creator_info(
                 url_token=user_url_token
             )
             if not createor_info:
@@ -221,23 +293,20 @@ class ZhihuCrawler(AbstractCrawler):
             # 默认只提取回答信息，如果需要文章和视频，把下面的注释打开即可
 
             # Get all anwser information of the creator
-            all_content_list = await self.zhihu_client.get_all_anwser_by_creator(
+            all_content_list = await self.client_pool.get_all_anwser_by_creator(
                 creator=createor_info,
-                crawl_interval=random.random(),
                 callback=zhihu_store.batch_update_zhihu_contents,
             )
 
             # Get all articles of the creator's contents
-            # all_content_list = await self.zhihu_client.get_all_articles_by_creator(
+            # all_content_list = await self.client_pool.get_all_articles_by_creator(
             #     creator=createor_info,
-            #     crawl_interval=random.random(),
             #     callback=zhihu_store.batch_update_zhihu_contents
             # )
 
             # Get all videos of the creator's contents
-            # all_content_list = await self.zhihu_client.get_all_videos_by_creator(
+            # all_content_list = await self.client_pool.get_all_videos_by_creator(
             #     creator=createor_info,
-            #     crawl_interval=random.random(),
             #     callback=zhihu_store.batch_update_zhihu_contents
             # )
 
@@ -245,7 +314,7 @@ class ZhihuCrawler(AbstractCrawler):
             await self.batch_get_content_comments(all_content_list)
 
     async def get_note_detail(
-        self, full_note_url: str, semaphore: asyncio.Semaphore, note_type: str
+        self, full_note_url: str, semaphore: AdaptiveConcurrencyLimiter, note_type: str
     ) -> Optional[ZhihuContent]:
         """
         Get note detail
@@ -267,21 +336,21 @@ class ZhihuCrawler(AbstractCrawler):
                 utils.logger.info(
                     f"[ZhihuCrawler.get_specified_notes] Get answer info, question_id: {question_id}, answer_id: {answer_id}"
                 )
-                return await self.zhihu_client.get_answer_info(question_id, answer_id)
+                return await self.client_pool.get_answer_info(question_id, answer_id)
 
             elif note_type == constant.ARTICLE_NAME:
                 article_id = full_note_url.split("/")[-1]
                 utils.logger.info(
                     f"[ZhihuCrawler.get_specified_notes] Get article info, article_id: {article_id}"
                 )
-                return await self.zhihu_client.get_article_info(article_id)
+                return await self.client_pool.get_article_info(article_id)
 
             elif note_type == constant.VIDEO_NAME:
                 video_id = full_note_url.split("/")[-1]
                 utils.logger.info(
                     f"[ZhihuCrawler.get_specified_notes] Get video info, video_id: {video_id}"
                 )
-                return await self.zhihu_client.get_video_info(video_id)
+                return await self.client_pool.get_video_info(video_id)
 
     async def get_specified_notes(self):
         """
@@ -298,9 +367,8 @@ class ZhihuCrawler(AbstractCrawler):
             if note_type == constant.QUESTION_NAME:
                 question_id = full_note_url.split("/")[-1]
                 all_answer_contents = (
-                    await self.zhihu_client.get_all_answers_by_question_id(
+                    await self.client_pool.get_all_answers_by_question_id(
                         question_id,
-                        crawl_interval=0,
                         max_answers=config.CRAWLER_MAX_NOTES_COUNT,
                         order="default",
                         callback=zhihu_store.batch_update_zhihu_contents,
@@ -310,7 +378,7 @@ class ZhihuCrawler(AbstractCrawler):
             else:
                 note_detail = await self.get_note_detail(
                     full_note_url=full_note_url,
-                    semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                    semaphore=self.crawler_note_task_semaphore,
                     note_type=note_type,
                 )
                 note_details.append(note_detail)
@@ -325,43 +393,52 @@ class ZhihuCrawler(AbstractCrawler):
         utils.logger.info(
             "[ZhihuCrawler.get_homefeed_notes] Begin get zhihu homefeed notes"
         )
-        after_id, end_offset = 0, 0
-        page_number = 1
         save_note_count = 0
-        session_token = ""
-        while save_note_count <= config.CRAWLER_MAX_NOTES_COUNT:
-            homefeed_notes_res = await self.zhihu_client.get_homefeed_notes(
-                page_number=page_number,
-                after_id=after_id,
-                end_offset=end_offset,
-                seesion_token=session_token,
-            )
-            paging_info: Dict = homefeed_notes_res.get("paging", {})
-            if not paging_info or paging_info.get("is_end", False):
-                utils.logger.info("No more homefeed notes")
-                break
 
-            content_list = self._extractor.extract_contents_from_homefeed(
-                homefeed_notes_res
-            )
-            for content in content_list:
-                await zhihu_store.update_zhihu_content(content)
+        async def fetch_homefeed_page(page_params: Dict) -> Tuple[Dict, Dict]:
+            homefeed_notes_res = await self.client_pool.get_homefeed_notes(**page_params)
+            return page_params, homefeed_notes_res
 
+        def get_next_page_params(homefeed_page: Tuple[Dict, Dict]) -> Optional[Dict]:
+            page_params, homefeed_notes_res = homefeed_page
+            paging_info: Dict = homefeed_notes_res.get("paging", {})
+            if not paging_info or paging_info.get("is_end", False):
+                return None
             # extract next request params from url
             paging_info = self._extractor.extract_next_req_params_from_url(
                 paging_info, specific_params=["after_id", "end_offset", "session_token"]
             )
-            after_id, end_offset, session_token = (
-                paging_info.get("after_id", 0),
-                paging_info.get("end_offset", 0),
-                paging_info.get("session_token", ""),
-            )
-            page_number += 1
-            save_note_count += len(content_list)
-            await self.batch_get_content_comments(content_list)
-            utils.logger.info(
-                f"[ZhihuCrawler.get_homefeed_notes] Get homefeed notes, page_number: {page_number}, save_note_count: {save_note_count}"
-            )
+            return {
+                "page_number": page_params["page_number"] + 1,
+                "after_id": paging_info.get("after_id", 0),
+                "end_offset": paging_info.get("end_offset", 0),
+                "seesion_token": paging_info.get("session_token", ""),
+            }
+
+        # 处理当前页内容和评论的同时提前请求下一页，达到爬取数量上限时取消已发出的请求
+        first_page_params = {"page_number": 1, "after_id": 0, "end_offset": 0, "seesion_token": ""}
+        async with aclosing(
+            prefetch_cursor_pages(fetch_homefeed_page, first_page_params, get_next_page_params)
+        ) as homefeed_pages:
+            async for page_params, homefeed_notes_res in homefeed_pages:
+                paging_info: Dict = homefeed_notes_res.get("paging", {})
+                if not paging_info or paging_info.get("is_end", False):
+                    utils.logger.info("No more homefeed notes")
+                    break
+
+                content_list = self._extractor.extract_contents_from_homefeed(
+                    homefeed_notes_res
+                )
+                for content in content_list:
+                    await zhihu_store.update_zhihu_content(content)
+
+                save_note_count += len(content_list)
+                await self.batch_get_content_comments(content_list)
+                utils.logger.info(
+                    f"[ZhihuCrawler.get_homefeed_notes] Get homefeed notes, page_number: {page_params['page_number'] + 1}, save_note_count: {save_note_count}"
+                )
+                if save_note_count > config.CRAWLER_MAX_NOTES_COUNT:
+                    break
 
         utils.logger.info(
             "[ZhihuCrawler.get_homefeed_notes] Zhihu homefeed notes crawler finished ..."
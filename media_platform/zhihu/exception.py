@@ -11,13 +11,21 @@
 
 from httpx import RequestError
 
+from pkg.retry import RetryClass
+
 
 class DataFetchError(RequestError):
     """something error when fetch"""
 
+    retry_class = RetryClass.FATAL
+
 
 class IPBlockError(RequestError):
     """fetch so fast that the server block us ip"""
 
+    retry_class = RetryClass.ACCOUNT
+
 class ForbiddenError(RequestError):
-    """Forbidden"""
\ No newline at end of file
+    """Forbidden"""
+
+    retry_class = RetryClass.ACCOUNT
@@ -13,6 +13,20 @@ class CheckpointNote(BaseModel):
     current_note_comment_cursor: Optional[str] = Field(
         "", description="当前帖子评论游标"
     )
+    # 以下两个字段只记录当前一级评论页的二级评论进度，一级评论游标推进到下一页时清空，保持检查点体积很小
+    sub_comment_cursors: Dict[str, str] = Field(
+        default_factory=dict, description="当前一级评论页中未爬完的一级评论ID -> 二级评论游标"
+    )
+    completed_root_comment_ids: List[str] = Field(
+        default_factory=list, description="当前一级评论页中二级评论已爬完的一级评论ID"
+    )
+
+
+class CheckpointSearchKeyword(BaseModel):
+    keyword: str = Field(..., description="搜索关键词")
+    current_search_page: int = Field(1, description="当前关键词的搜索页码")
+    current_search_id: Optional[str] = Field(None, description="当前关键词的搜索ID")
+    is_finished: bool = Field(False, description="当前关键词是否已经搜索完成")
 
 
 class Checkpoint(BaseModel):
@@ -33,6 +47,10 @@ class Checkpoint(BaseModel):
     current_search_keyword: Optional[str] = Field(None, description="当前搜索关键词")
     current_search_page: Optional[int] = Field(None, description="当前搜索页码")
     current_search_id: Optional[str] = Field(None, description="当前搜索ID")
+    # 每个关键词各自的翻页游标，多个关键词并发搜索时，断点续爬从每个未完成关键词自己的页码继续
+    search_keyword_cursors: Optional[Dict[str, CheckpointSearchKeyword]] = Field(
+        {}, description="关键词 -> 关键词搜索游标"
+    )
 
     # 创作者模式相关字段
     current_creator_id: Optional[str] = Field(None, description="当前创作者ID")
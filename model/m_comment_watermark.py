@@ -0,0 +1,15 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class CommentWatermark(BaseModel):
+    """
+    帖子评论的水位：已经保存的最新一级评论，增量爬取评论时遇到水位之前的评论就停止翻页
+    """
+
+    platform: str = Field(..., description="平台名称")
+    note_id: str = Field(..., description="帖子ID")
+    newest_comment_id: str = Field("", description="已保存的最新一级评论ID")
+    newest_comment_time: int = Field(0, description="已保存的最新一级评论的时间戳")
+    updated_at: Optional[float] = Field(None, description="水位更新时间戳")
@@ -0,0 +1,52 @@
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CrawlJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class CrawlJob(BaseModel):
+    """
+    爬虫守护进程的爬取任务，任务参数保存在任务自身，运行时作为配置作用域的覆盖项
+    """
+
+    # 主键
+    id: Optional[str] = Field(None, description="任务ID")
+
+    platform: str = Field(
+        ..., description="平台名称，如 xhs、dy、ks、bili、wb、tieba、zhihu"
+    )
+    crawler_type: str = Field(..., description="爬取类型：search/detail/creator/homefeed")
+    config_overrides: Dict[str, Any] = Field(
+        {}, description="任务的其他配置项，例如 KEYWORDS、CRAWLER_MAX_NOTES_COUNT、XHS_SPECIFIED_NOTE_URL_LIST"
+    )
+
+    status: CrawlJobStatus = Field(CrawlJobStatus.PENDING, description="任务状态")
+    cancel_requested: bool = Field(False, description="是否请求取消任务")
+    error: Optional[str] = Field(None, description="任务失败原因")
+    stats: Dict[str, int] = Field(
+        {}, description="任务的运行统计，包括保存的数量、重试次数、结束时各限制器的并发数"
+    )
+
+    created_at: float = Field(0, description="创建时间戳")
+    started_at: Optional[float] = Field(None, description="开始运行时间戳")
+    finished_at: Optional[float] = Field(None, description="结束时间戳")
+
+    def to_crawler_job(self) -> Dict[str, Any]:
+        """
+        转换为 main.run_crawler_job 使用的配置覆盖项
+        Returns:
+            Dict[str, Any]: 配置名 -> 配置值
+        """
+        return {
+            **self.config_overrides,
+            "PLATFORM": self.platform,
+            "CRAWLER_TYPE": self.crawler_type,
+        }
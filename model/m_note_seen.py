@@ -0,0 +1,15 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SeenNote(BaseModel):
+    """
+    已经爬取过详情和评论的帖子，跨关键词、跨任务去重时使用
+    """
+
+    platform: str = Field(..., description="平台名称")
+    note_id: str = Field(..., description="帖子ID")
+    source_keywords: List[str] = Field(default_factory=list, description="搜到过这个帖子的关键词")
+    first_seen_at: Optional[float] = Field(None, description="第一次爬取帖子的时间戳")
+    last_seen_at: Optional[float] = Field(None, description="最近一次看到帖子的时间戳")
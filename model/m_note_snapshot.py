@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class NoteSnapshot(BaseModel):
+    """
+    帖子在列表接口（搜索、创作者主页、首页推荐）中返回的轻量元数据快照，再次爬取时用于判断帖子是否有变化
+    """
+
+    platform: str = Field(..., description="平台名称")
+    note_id: str = Field(..., description="帖子ID")
+    liked_count: str = Field("", description="点赞数")
+    comment_count: str = Field("", description="评论数")
+    last_update_time: str = Field("", description="最后更新时间戳")
+    seen_at: Optional[float] = Field(None, description="最近一次在列表中看到帖子的时间戳")
+    updated_at: Optional[float] = Field(None, description="最近一次爬取帖子详情的时间戳")
+
+    def has_metadata(self) -> bool:
+        """
+        列表接口是否返回了可以比较的元数据
+        """
+        return bool(self.liked_count or self.comment_count or self.last_update_time)
+
+    def is_same_as(self, other: "NoteSnapshot") -> bool:
+        """
+        计数和更新时间是否和另一个快照一致
+        """
+        return (
+            self.liked_count == other.liked_count
+            and self.comment_count == other.comment_count
+            and self.last_update_time == other.last_update_time
+        )
@@ -12,3 +12,4 @@
 # -*- coding: utf-8 -*-
 from .field import *
 from .pool import AccountPoolManager
+from .client_pool import ClientWorkerPool
@@ -0,0 +1,193 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多账号客户端工作池，多个客户端（各自使用不同的账号和IP）共同消费同一份抓取任务
+import asyncio
+import inspect
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import config
+from pkg.tools import utils
+
+# 这些方法维护的是客户端自身的账号状态，不能分派给其他客户端执行
+CLIENT_LOCAL_METHODS = {
+    "update_account_info",
+    "mark_account_invalid",
+    "check_ip_expired",
+    "pong",
+}
+
+
+class ClientWorkerPool:
+    def __init__(self, primary_client: Any, calls_per_client: Optional[int] = None):
+        """
+        客户端工作池，对外暴露和平台客户端一样的接口。
+        调用客户端的异步接口时，由当前进行中请求最少的客户端执行，每个客户端同时最多执行 calls_per_client 个请求，
+        所有客户端都满载时在共享的条件变量上等待；每个客户端按各自账号的限速发起请求
+        Args:
+            primary_client: 主客户端，非异步接口的属性（提取器、账号池等）都从主客户端获取
+            calls_per_client: 每个客户端同时执行的请求数，为空时读取配置 MAX_CONCURRENCY_NUM
+        """
+        self._primary_client = primary_client
+        self._calls_per_client = calls_per_client
+        self._clients: List[Any] = [primary_client]
+        self._in_flight: Dict[int, int] = {id(primary_client): 0}
+        self._slot_released = asyncio.Condition()
+
+    @property
+    def size(self) -> int:
+        return len(self._clients)
+
+    @property
+    def calls_per_client(self) -> int:
+        if self._calls_per_client is not None:
+            return max(1, self._calls_per_client)
+        return max(1, config.MAX_CONCURRENCY_NUM)
+
+    @property
+    def concurrency(self) -> int:
+        """
+        工作池同时能执行的请求数，用作帖子/评论翻页等并发流水线的并发数
+        Returns:
+
+        """
+        return self.size * self.calls_per_client
+
+    def add_client(self, client: Any) -> None:
+        """
+        添加一个已经初始化好账号的客户端到工作池
+        Args:
+            client: 平台客户端
+
+        Returns:
+
+        """
+        self._clients.append(client)
+        self._in_flight[id(client)] = 0
+
+    async def add_workers(
+        self, client_factory: Callable[[], Awaitable[Any]], worker_num: int
+    ) -> None:
+        """
+        创建多个客户端加入工作池，每个客户端在创建时从账号池租用自己的账号和IP
+        Args:
+            client_factory: 异步的客户端创建函数，返回初始化好账号的客户端
+            worker_num: 需要新增的客户端数量
+
+        Returns:
+
+        """
+        for _ in range(worker_num):
+            try:
+                client = await client_factory()
+            except Exception as e:
+                utils.logger.warning(
+                    f"[ClientWorkerPool.add_workers] create worker client failed: {e}, "
+                    f"continue with {self.size} clients"
+                )
+                break
+            self.add_client(client)
+        utils.logger.info(f"[ClientWorkerPool.add_workers] client worker num: {self.size}")
+
+    def _least_busy_client(self) -> Optional[Any]:
+        client = min(self._clients, key=lambda c: self._in_flight[id(c)])
+        if self._in_flight[id(client)] >= self.calls_per_client:
+            return None
+        return client
+
+    @asynccontextmanager
+    async def _use_client(self, client: Optional[Any] = None):
+        """
+        占用一个客户端的请求名额，退出时释放名额并唤醒等待的调用
+        Args:
+            client: 指定的客户端，为空时选择进行中请求最少的客户端
+
+        Returns:
+
+        """
+        async with self._slot_released:
+            while True:
+                if client is None:
+                    picked = self._least_busy_client()
+                elif self._in_flight[id(client)] < self.calls_per_client:
+                    picked = client
+                else:
+                    picked = None
+                if picked is not None:
+                    break
+                await self._slot_released.wait()
+            self._in_flight[id(picked)] += 1
+        try:
+            yield picked
+        finally:
+            self._in_flight[id(picked)] -= 1
+            async with self._slot_released:
+                self._slot_released.notify_all()
+
+    async def run(self, method_name: str, *args, **kwargs) -> Any:
+        """
+        选择进行中请求最少的客户端执行接口调用
+        Args:
+            method_name: 客户端的方法名
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: 接口返回值
+        """
+        async with self._use_client() as client:
+            return await getattr(client, method_name)(*args, **kwargs)
+
+    async def iterate(self, method_name: str, *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        执行异步生成器接口（例如逐页产出评论）。生成器的翻页游标和账号绑定，整个迭代过程由同一个客户端执行，
+        但只在请求每一页时占用该客户端的请求名额，调用方处理上一页数据期间名额可以分给其他调用
+        Args:
+            method_name: 客户端的方法名
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            AsyncIterator[Any]: 接口产出的数据
+        """
+        async with self._use_client() as client:
+            items = getattr(client, method_name)(*args, **kwargs)
+            try:
+                item = await items.__anext__()
+            except StopAsyncIteration:
+                return
+        async with aclosing(items):
+            while True:
+                yield item
+                async with self._use_client(client):
+                    try:
+                        item = await items.__anext__()
+                    except StopAsyncIteration:
+                        return
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._primary_client, name)
+        if name in CLIENT_LOCAL_METHODS:
+            return attr
+        if inspect.isasyncgenfunction(attr):
+
+            def dispatch_iter(*args, **kwargs):
+                return self.iterate(name, *args, **kwargs)
+
+            return dispatch_iter
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def dispatch(*args, **kwargs):
+            return await self.run(name, *args, **kwargs)
+
+        return dispatch
@@ -14,8 +14,6 @@ import asyncio
 import os
 from typing import Dict, List, Optional
 
-import pandas as pd
-
 import config
 import constant
 from constant import EXCEL_ACCOUNT_SAVE, MYSQL_ACCOUNT_SAVE
@@ -24,9 +22,6 @@ from pkg.account_pool.field import (AccountInfoModel, AccountStatusEnum,
 from pkg.proxy import IpInfoModel
 from pkg.proxy.proxy_ip_pool import ProxyIpPool
 from pkg.tools import utils
-from repo.accounts_cookies import cookies_manage_sql
-from repo.accounts_cookies.cookies_manage_sql import \
-    update_account_status_by_id
 
 
 class AccountPoolManager:
@@ -58,6 +53,8 @@ class AccountPoolManager:
         Returns:
 
         """
+        import pandas as pd
+
         utils.logger.info(
             f"[AccountPoolManager.load_accounts_from_xlsx] load account from {self._platform_name} accounts_cookies.xlsx"
         )
@@ -92,6 +89,8 @@ class AccountPoolManager:
         Returns:
 
         """
+        from repo.accounts_cookies import cookies_manage_sql
+
         account_list: List[Dict] = (
             await cookies_manage_sql.query_platform_accounts_cookies(
                 self._platform_name
@@ -152,6 +151,16 @@ class AccountPoolManager:
             "[AccountPoolManager.get_active_account] 账号池中没有可用的账号"
         )
 
+    def available_account_count(self) -> int:
+        """
+        get the number of accounts that can still be leased
+        Returns:
+            int: number of normal accounts left in the pool
+        """
+        return len(
+            [acc for acc in self._account_list if acc.status.value == AccountStatusEnum.NORMAL.value]
+        )
+
     def add_account(self, account: AccountInfoModel):
         """
         add account
@@ -173,6 +182,10 @@ class AccountPoolManager:
         account.status = status
         account.invalid_timestamp = utils.get_current_timestamp()
         if self._account_save_type == MYSQL_ACCOUNT_SAVE:
+            from repo.accounts_cookies.cookies_manage_sql import (
+                update_account_status_by_id,
+            )
+
             await update_account_status_by_id(account.id, account)
         elif self._account_save_type == EXCEL_ACCOUNT_SAVE:
             # excel中的账户状态好像没有更新的必要，暂且设置为todo吧
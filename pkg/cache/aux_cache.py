@@ -0,0 +1,189 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 平台辅助参数缓存，抖音 msToken/webid、B站 w_webid、微博创作者容器ID等预备请求的结果
+#            按 (命名空间, 平台, 账号, 键) 持久化缓存并设置过期时间，程序重启后在有效期内直接复用，不再重复请求
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, Optional, Type, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+
+import config
+from pkg.cache.abs_cache import AbstractCache
+from pkg.cache.cache_factory import CacheFactory
+from pkg.tools import utils
+
+T = TypeVar("T")
+
+
+class AuxCacheNamespace(Generic[T]):
+    def __init__(self, name: str, value_type: Type[T], ttl: int):
+        """
+        缓存命名空间，同一个命名空间下的值类型和过期时间相同
+        Args:
+            name: 命名空间名称
+            value_type: 值类型，例如 str、Dict、pydantic 模型，读取时按该类型校验，结构不符的旧缓存视为未命中
+            ttl: 过期时间，单位：秒
+        """
+        self.name = name
+        self.ttl = ttl
+        self._adapter: TypeAdapter = TypeAdapter(value_type)
+
+    def dump(self, value: T) -> Any:
+        return self._adapter.dump_python(value, mode="json")
+
+    def load(self, raw_value: Any) -> T:
+        return self._adapter.validate_python(raw_value)
+
+
+class PlatformAuxCache:
+    def __init__(self, cache: Optional[AbstractCache], key_prefix: str = "mc_aux_cache"):
+        """
+        platform aux cache constructor
+        Args:
+            cache: 底层缓存，为 None 时不缓存，所有读取都未命中
+            key_prefix: 缓存键前缀
+        """
+        self._cache = cache
+        self._key_prefix = key_prefix
+
+    def _build_key(
+        self, namespace: AuxCacheNamespace, platform: str, account_name: str, key: str
+    ) -> str:
+        # 与账号无关的值（例如创作者的容器ID）账号名称传空字符串，所有账号共享
+        return f"{self._key_prefix}:{namespace.name}:{platform}:{account_name or '_'}:{key}"
+
+    async def get(
+        self,
+        namespace: AuxCacheNamespace[T],
+        platform: str,
+        account_name: str,
+        key: str,
+    ) -> Optional[T]:
+        """
+        读取缓存
+        Args:
+            namespace: 命名空间
+            platform: 平台名称
+            account_name: 账号名称，与账号无关的值传空字符串
+            key: 缓存键
+
+        Returns:
+            Optional[T]: 缓存的值，未命中或已过期时返回 None
+        """
+        if self._cache is None:
+            return None
+        cache_key = self._build_key(namespace, platform, account_name, key)
+        try:
+            raw_value = await asyncio.to_thread(self._cache.get, cache_key)
+        except Exception as e:
+            utils.logger.warning(f"[PlatformAuxCache.get] read {cache_key} error: {e}")
+            return None
+        if raw_value is None:
+            return None
+        try:
+            return namespace.load(raw_value)
+        except ValidationError:
+            await asyncio.to_thread(self._cache.delete, cache_key)
+            return None
+
+    async def set(
+        self,
+        namespace: AuxCacheNamespace[T],
+        platform: str,
+        account_name: str,
+        key: str,
+        value: T,
+    ) -> None:
+        """
+        写入缓存，过期时间由命名空间决定
+        Args:
+            namespace: 命名空间
+            platform: 平台名称
+            account_name: 账号名称，与账号无关的值传空字符串
+            key: 缓存键
+            value: 值
+
+        Returns:
+
+        """
+        if self._cache is None:
+            return
+        cache_key = self._build_key(namespace, platform, account_name, key)
+        try:
+            await asyncio.to_thread(
+                self._cache.set, cache_key, namespace.dump(value), namespace.ttl
+            )
+        except Exception as e:
+            utils.logger.warning(f"[PlatformAuxCache.set] write {cache_key} error: {e}")
+
+    async def get_or_load(
+        self,
+        namespace: AuxCacheNamespace[T],
+        platform: str,
+        account_name: str,
+        key: str,
+        loader: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        读取缓存，未命中时调用 loader 请求并写入缓存，loader 抛出的异常直接向上抛出，不会写入缓存
+        Args:
+            namespace: 命名空间
+            platform: 平台名称
+            account_name: 账号名称，与账号无关的值传空字符串
+            key: 缓存键
+            loader: 未命中时获取值的协程函数
+
+        Returns:
+            T: 缓存的值或 loader 返回的值
+        """
+        value = await self.get(namespace, platform, account_name, key)
+        if value is not None:
+            return value
+        value = await loader()
+        await self.set(namespace, platform, account_name, key, value)
+        return value
+
+
+def create_platform_aux_cache(storage_type: str = "", **kwargs) -> PlatformAuxCache:
+    """
+    创建平台辅助参数缓存的工厂函数
+    Args:
+        storage_type: 存储类型，支持 "sqlite" 或 "redis"，为空时读取配置 PLATFORM_AUX_CACHE_STORAGE_TYPE
+        **kwargs: 额外的参数传递给底层缓存的构造函数
+
+    Returns:
+        PlatformAuxCache: 平台辅助参数缓存
+    """
+    if not config.ENABLE_PLATFORM_AUX_CACHE:
+        return PlatformAuxCache(None)
+    storage_type = (storage_type or config.PLATFORM_AUX_CACHE_STORAGE_TYPE).lower()
+    if storage_type == "sqlite":
+        kwargs.setdefault("db_path", "data/cache/platform_aux_cache.db")
+    elif storage_type != "redis":
+        raise ValueError(f"不支持的存储类型: {storage_type}")
+    return PlatformAuxCache(CacheFactory.create_cache(storage_type, **kwargs))
+
+
+_platform_aux_cache: Optional[PlatformAuxCache] = None
+
+
+def get_platform_aux_cache() -> PlatformAuxCache:
+    """
+    获取进程内共享的平台辅助参数缓存，第一次使用时创建
+    Returns:
+        PlatformAuxCache: 平台辅助参数缓存
+    """
+    global _platform_aux_cache
+    if _platform_aux_cache is None:
+        _platform_aux_cache = create_platform_aux_cache()
+    return _platform_aux_cache
@@ -16,13 +16,32 @@
 # @Desc    : RedisCache实现
 import pickle
 import time
-from typing import Any, List
+from typing import Any, List, Optional
 
 from redis import Redis
 
 from config import db_config
 from pkg.cache.abs_cache import AbstractCache
 
+# 进程内共享的 redis 客户端，redis-py 的客户端自带连接池，多个缓存实例、多个平台爬虫共用同一个连接池
+_shared_redis_client: Optional[Redis] = None
+
+
+def get_redis_client() -> Redis:
+    """
+    获取进程内共享的 redis 客户端
+    :return:
+    """
+    global _shared_redis_client
+    if _shared_redis_client is None:
+        _shared_redis_client = Redis(
+            host=db_config.REDIS_DB_HOST,
+            port=db_config.REDIS_DB_PORT,
+            db=db_config.REDIS_DB_NUM,
+            password=db_config.REDIS_DB_PWD,
+        )
+    return _shared_redis_client
+
 
 class RedisCache(AbstractCache):
 
@@ -36,12 +55,7 @@ class RedisCache(AbstractCache):
         连接redis, 返回redis客户端, 这里按需配置redis连接信息
         :return:
         """
-        return Redis(
-            host=db_config.REDIS_DB_HOST,
-            port=db_config.REDIS_DB_PORT,
-            db=db_config.REDIS_DB_NUM,
-            password=db_config.REDIS_DB_PWD,
-        )
+        return get_redis_client()
 
     def get(self, key: str) -> Any:
         """
@@ -0,0 +1,110 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于 sqlite 文件的缓存，程序重启后缓存仍然有效，适合单机保存需要跨运行复用的数据
+import pathlib
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from pkg.cache.abs_cache import AbstractCache
+
+
+class SqliteCache(AbstractCache):
+
+    def __init__(self, db_path: str = "data/cache/cache.db"):
+        """
+        初始化 sqlite 缓存
+        :param db_path: 数据库文件路径
+        :return:
+        """
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expire_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值, 已过期的键会被删除
+        :param key:
+        :return:
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expire_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中, 并且序列化
+        :param key:
+        :param value:
+        :param expire_time: 过期时间，单位：秒
+        :return:
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expire_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), time.time() + expire_time),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        """
+        删除键
+        :param key:
+        :return:
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的未过期key, pattern 使用 * 通配符
+        :param pattern: 匹配模式
+        :return:
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM cache WHERE key GLOB ? AND expire_at >= ?",
+                (pattern, time.time()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ttl(self, key: str) -> int:
+        """
+        获取键的剩余生存时间, 返回-2表示键已经不存在了
+        :param key:
+        :return:
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expire_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] < time.time():
+            return -2
+        return int(row[0] - time.time())
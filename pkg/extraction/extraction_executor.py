@@ -0,0 +1,182 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 解析执行器：声明为CPU密集的解析方法在页面较大时放到进程池中执行，避免大页面的正则、json、
+#            parsel 解析阻塞事件循环，拖慢同时进行中的所有请求；小页面直接在事件循环中解析，省去进程间传输的开销
+import asyncio
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import config
+from pkg.tools import utils
+from var import crawler_type_var, source_keyword_var
+
+T = TypeVar("T")
+
+# 解析方法中会读取的上下文变量，进程池中的进程拿不到父进程的上下文，需要随任务一起传过去
+_PROPAGATED_CONTEXT_VARS: Dict[str, ContextVar] = {
+    var.name: var for var in (source_keyword_var, crawler_type_var)
+}
+
+_CPU_HEAVY_PAYLOAD_ARG = "__cpu_heavy_payload_arg__"
+
+
+def cpu_heavy(payload_arg: str):
+    """
+    声明解析方法是CPU密集的，payload_arg 参数（页面内容）超过大小阈值时放到进程池中执行
+    被声明的方法的参数和返回值都需要可以 pickle
+    Args:
+        payload_arg: 决定是否放到进程池执行的参数名称
+
+    Returns:
+
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        setattr(func, _CPU_HEAVY_PAYLOAD_ARG, payload_arg)
+        return func
+
+    return decorator
+
+
+def _call_with_context(
+    context_values: Dict[str, Any], extract_func: Callable[..., T], *args, **kwargs
+) -> T:
+    for var_name, value in context_values.items():
+        _PROPAGATED_CONTEXT_VARS[var_name].set(value)
+    return extract_func(*args, **kwargs)
+
+
+class ExtractionExecutor:
+    def __init__(self, max_workers: int, offload_min_size: int):
+        """
+        extraction executor constructor
+        Args:
+            max_workers: 进程池中的进程数量，0表示不使用进程池
+            offload_min_size: 页面内容超过该大小（字符数）时才放到进程池中解析
+        """
+        self._max_workers = max_workers
+        self._offload_min_size = offload_min_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # 第一次需要时才启动进程池，用不到进程池的任务不会多出子进程
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def should_offload(self, extract_func: Callable, *args, **kwargs) -> bool:
+        """
+        是否放到进程池中执行
+        Args:
+            extract_func: 解析方法
+            *args: 解析方法的参数
+            **kwargs: 解析方法的参数
+
+        Returns:
+            bool
+        """
+        payload_arg = getattr(extract_func, _CPU_HEAVY_PAYLOAD_ARG, None)
+        if self._max_workers <= 0 or payload_arg is None:
+            return False
+        payload = inspect.signature(extract_func).bind(*args, **kwargs).arguments.get(payload_arg)
+        return payload is not None and len(payload) >= self._offload_min_size
+
+    async def run(self, extract_func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        执行解析方法
+        Args:
+            extract_func: 解析方法
+            *args: 解析方法的参数
+            **kwargs: 解析方法的参数
+
+        Returns:
+            解析方法的返回值
+        """
+        if not self.should_offload(extract_func, *args, **kwargs):
+            return extract_func(*args, **kwargs)
+
+        context_values = {
+            var_name: var.get() for var_name, var in _PROPAGATED_CONTEXT_VARS.items()
+        }
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_pool(),
+                partial(_call_with_context, context_values, extract_func, *args, **kwargs),
+            )
+        except BrokenProcessPool as e:
+            # 进程池中的进程异常退出后进程池不可用，重建进程池，这次在事件循环中解析
+            utils.logger.error(f"[ExtractionExecutor.run] process pool is broken: {e!r}, extract inline")
+            self.shutdown()
+            return extract_func(*args, **kwargs)
+
+    def shutdown(self) -> None:
+        """
+        关闭进程池
+        Returns:
+
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_extraction_executor: Optional[ExtractionExecutor] = None
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    """
+    获取进程内共享的解析执行器，多个平台的爬虫共用一个进程池
+    Returns:
+
+    """
+    global _extraction_executor
+    if _extraction_executor is None:
+        _extraction_executor = ExtractionExecutor(
+            config.EXTRACTION_PROCESS_NUM, config.EXTRACTION_OFFLOAD_MIN_SIZE
+        )
+    return _extraction_executor
+
+
+async def run_extraction(extract_func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    使用共享的解析执行器执行解析方法
+    Args:
+        extract_func: 解析方法
+        *args: 解析方法的参数
+        **kwargs: 解析方法的参数
+
+    Returns:
+        解析方法的返回值
+    """
+    return await get_extraction_executor().run(extract_func, *args, **kwargs)
+
+
+def shutdown_extraction_executor() -> None:
+    """
+    关闭共享的解析执行器
+    Returns:
+
+    """
+    global _extraction_executor
+    if _extraction_executor is not None:
+        _extraction_executor.shutdown()
+        _extraction_executor = None
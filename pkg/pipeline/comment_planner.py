@@ -0,0 +1,196 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 评论爬取计划，根据帖子上已有的评论数量跳过没有评论的帖子、预估翻页次数，
+#            并把单次运行的评论数量预算分配到各个帖子上，在请求之前就限制每个帖子的评论数量
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+
+def parse_comment_count(value: Any) -> Optional[int]:
+    """
+    解析帖子上的评论数量，例如 12、"12"、"1.2万"、"10+"、"1万+"
+    Args:
+        value: 评论数量
+
+    Returns:
+        Optional[int]: 评论数量，无法解析（列表中没有评论数量）时返回 None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+
+    match = re.search(r"(\d+(?:\.\d+)?)\s*([万wWkK千]?)", str(value))
+    if not match:
+        return None
+    number = float(match.group(1))
+    unit = match.group(2)
+    if unit in ("万", "w", "W"):
+        number *= 10000
+    elif unit in ("千", "k", "K"):
+        number *= 1000
+    return int(number)
+
+
+@dataclass
+class CommentCrawlPlan:
+    """
+    单个帖子的评论爬取计划
+    """
+
+    note_id: str
+    # 帖子上的评论数量，None 表示未知
+    comment_count: Optional[int]
+    # 预估的一级评论翻页次数，0 表示未知
+    estimated_pages: int
+    # 该帖子最多爬取的评论数量，0 表示不限制
+    max_comments: int
+
+    def remaining(self, crawled_count: int) -> Optional[int]:
+        """
+        该帖子还能爬取的评论数量
+        Args:
+            crawled_count: 已经爬取的评论数量
+
+        Returns:
+            Optional[int]: 还能爬取的数量，None 表示不限制
+        """
+        if not self.max_comments:
+            return None
+        return max(0, self.max_comments - crawled_count)
+
+    def allows_more(self, crawled_count: int) -> bool:
+        """
+        是否还可以继续请求下一页评论
+        Args:
+            crawled_count: 已经爬取的评论数量
+
+        Returns:
+            bool
+        """
+        remaining = self.remaining(crawled_count)
+        return remaining is None or remaining > 0
+
+
+class CommentPlanner:
+    def __init__(self, per_note_limit: int = 0, run_budget: int = 0, page_size: int = 20):
+        """
+        comment planner constructor
+        Args:
+            per_note_limit: 单个帖子最多爬取的评论数量，0表示不限制
+            run_budget: 单次运行所有帖子最多爬取的评论数量，0表示不限制
+            page_size: 评论接口每页返回的评论数量，用于预估翻页次数
+        """
+        self._per_note_limit = max(0, per_note_limit)
+        self._run_budget = max(0, run_budget)
+        self._remaining_budget = self._run_budget
+        self._page_size = max(1, page_size)
+
+    @property
+    def remaining_budget(self) -> Optional[int]:
+        """
+        本次运行剩余的评论预算，None 表示不限制
+        """
+        return self._remaining_budget if self._run_budget else None
+
+    def plan(self, notes: List[Tuple[str, Optional[int]]]) -> List[CommentCrawlPlan]:
+        """
+        生成一批帖子的评论爬取计划，评论数量为0的帖子直接跳过，评论数量用于预估翻页次数，不限制爬取数量；
+        开启了单次运行预算时，按"注水"的方式把剩余预算分给各个帖子：评论少的帖子先拿满，
+        剩余的预算再平均分给评论多的帖子，分配到的数量从预算中预留，爬取结束后通过 release 归还未用完的部分
+        Args:
+            notes: (帖子ID, 评论数量) 列表，评论数量为 None 表示未知
+
+        Returns:
+            List[CommentCrawlPlan]: 按输入顺序排列的爬取计划，不包含被跳过的帖子
+        """
+        wanted_counts = {}
+        for note_id, comment_count in notes:
+            if comment_count == 0:
+                continue
+            wanted = self._per_note_limit
+            # 帖子上显示的评论数量只是估计值（"10+"、"1.2万"），只用来预估翻页次数和作为分配预算的权重，
+            # 不作为帖子的评论数量上限，只有设置了单帖上限或单次运行预算时才限制数量
+            if self._run_budget and comment_count is not None and (
+                not wanted or comment_count < wanted
+            ):
+                wanted = comment_count
+            # 0 表示不限制
+            wanted_counts[note_id] = wanted
+
+        allocated_counts = dict(wanted_counts)
+        if self._run_budget:
+            allocated_counts = self._allocate_budget(wanted_counts)
+
+        plans: List[CommentCrawlPlan] = []
+        for note_id, comment_count in notes:
+            if note_id not in allocated_counts:
+                continue
+            max_comments = allocated_counts[note_id]
+            if self._run_budget and not max_comments:
+                continue
+            known_counts = [count for count in (max_comments, comment_count) if count]
+            expected_count = min(known_counts) if known_counts else 0
+            plans.append(
+                CommentCrawlPlan(
+                    note_id=note_id,
+                    comment_count=comment_count,
+                    estimated_pages=math.ceil(expected_count / self._page_size),
+                    max_comments=max_comments,
+                )
+            )
+        return plans
+
+    def release(self, plan: CommentCrawlPlan, crawled_count: int) -> None:
+        """
+        帖子评论爬取结束后归还预留但没有用完的预算
+        Args:
+            plan: 爬取计划
+            crawled_count: 实际爬取的评论数量
+
+        Returns:
+
+        """
+        if not self._run_budget:
+            return
+        unused_count = plan.remaining(crawled_count) or 0
+        self._remaining_budget = min(
+            self._run_budget, self._remaining_budget + unused_count
+        )
+
+    def _allocate_budget(self, wanted_counts: dict) -> dict:
+        """
+        把剩余预算分配给各个帖子并从预算中预留
+        Args:
+            wanted_counts: 帖子ID -> 期望的评论数量（0表示不限制）
+
+        Returns:
+            dict: 帖子ID -> 分配到的评论数量（0表示没有分配到预算）
+        """
+        # 不限制数量的帖子排在最后，分完所有剩余预算
+        ordered_note_ids = sorted(
+            wanted_counts,
+            key=lambda note_id: wanted_counts[note_id] or math.inf,
+        )
+        allocated_counts = {}
+        left_note_count = len(ordered_note_ids)
+        for note_id in ordered_note_ids:
+            fair_share = math.ceil(self._remaining_budget / left_note_count)
+            wanted = wanted_counts[note_id] or fair_share
+            allocated = min(wanted, fair_share)
+            allocated_counts[note_id] = allocated
+            self._remaining_budget -= allocated
+            left_note_count -= 1
+        return allocated_counts
@@ -0,0 +1,77 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 帖子爬取完成后的记录（元数据快照、已爬取集合），开启评论爬取时等帖子的评论也爬完后才记录，
+#            避免评论还没爬完（中断、失败）的帖子在下次运行时被当作已爬取跳过
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import config
+
+NoteCompletionRecord = Callable[[], Awaitable[None]]
+
+
+class NoteCompletionRecords:
+    def __init__(self):
+        """
+        note completion records constructor
+        """
+        self._pending_records: Dict[Tuple[str, str], List[NoteCompletionRecord]] = {}
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_records)
+
+    async def record_after_comments(
+        self, platform: str, note_id: str, record: NoteCompletionRecord
+    ) -> None:
+        """
+        帖子的评论爬完后执行记录，没有开启评论爬取时立即执行
+        Args:
+            platform: 平台名称
+            note_id: 帖子ID
+            record: 记录函数
+
+        Returns:
+
+        """
+        if not config.ENABLE_GET_COMMENTS:
+            await record()
+            return
+        self._pending_records.setdefault((platform, note_id), []).append(record)
+
+    async def complete_note(self, platform: str, note_id: str) -> None:
+        """
+        帖子的评论已经爬完（或者帖子没有评论），执行等待中的记录
+        Args:
+            platform: 平台名称
+            note_id: 帖子ID
+
+        Returns:
+
+        """
+        for record in self._pending_records.pop((platform, note_id), []):
+            await record()
+
+
+_note_completion_records: Optional[NoteCompletionRecords] = None
+
+
+def get_note_completion_records() -> NoteCompletionRecords:
+    """
+    获取进程内共享的帖子完成记录
+    Returns:
+
+    """
+    global _note_completion_records
+    if _note_completion_records is None:
+        _note_completion_records = NoteCompletionRecords()
+    return _note_completion_records
@@ -0,0 +1,144 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 有界并发、按输入顺序输出的并发映射，例如多个一级评论的二级评论并发翻页，入库顺序仍然和一级评论顺序一致
+import asyncio
+from contextlib import aclosing
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def ordered_concurrent_map(
+    func: Callable[[T], Awaitable[R]],
+    items: Sequence[T],
+    concurrency: int,
+    on_result: Optional[Callable[[T, R], Awaitable[Any]]] = None,
+) -> List[R]:
+    """
+    并发执行 func(item)，同时最多执行 concurrency 个；按 items 的顺序依次回调 on_result，
+    前面的数据没有完成时，后面已经完成的数据等待，保证输出顺序和并发数无关
+    任意一个 func 抛出异常时取消其余未完成的任务并抛出该异常
+    Args:
+        func: 处理函数
+        items: 输入数据
+        concurrency: 最大并发数
+        on_result: 按输入顺序回调的结果处理函数，例如保存到数据库
+
+    Returns:
+        List[R]: 和 items 顺序一致的结果列表
+    """
+    results: List[R] = []
+    async with aclosing(ordered_concurrent_iter(func, items, concurrency)) as item_results:
+        async for item, result in item_results:
+            if on_result:
+                await on_result(item, result)
+            results.append(result)
+    return results
+
+
+async def ordered_concurrent_iter(
+    func: Callable[[T], Awaitable[R]],
+    items: Sequence[T],
+    concurrency: int,
+) -> AsyncIterator[Tuple[T, R]]:
+    """
+    并发执行 func(item)，同时最多执行 concurrency 个，按 items 的顺序逐个产出 (item, 结果)，
+    调用方处理完一个结果后就可以释放它，不需要像 ordered_concurrent_map 一样保留所有结果
+    任意一个 func 抛出异常、或者调用方提前关闭迭代器时取消其余未完成的任务
+    Args:
+        func: 处理函数
+        items: 输入数据
+        concurrency: 最大并发数
+
+    Returns:
+        AsyncIterator[Tuple[T, R]]: 和 items 顺序一致的 (item, 结果)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.create_task(run(item)) for item in items]
+    try:
+        for index, (item, task) in enumerate(zip(items, tasks)):
+            result = await task
+            # 产出之后不再持有任务的引用，结果由调用方决定是否保留
+            tasks[index] = None
+            yield item, result
+    finally:
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def ordered_concurrent_stream(
+    func: Callable[[T], AsyncIterator[R]],
+    items: Sequence[T],
+    concurrency: int,
+) -> AsyncIterator[Tuple[T, R]]:
+    """
+    并发迭代 func(item) 返回的异步迭代器，同时最多迭代 concurrency 个；按 items 的顺序逐个产出 (item, 数据)，
+    排在最前面的 item 产出的数据立即交给调用方（例如一页二级评论入库后马上记录断点），
+    后面的 item 产出的数据先缓存，轮到它时再按产出顺序交给调用方，保证输出顺序和并发数无关
+    任意一个 func 抛出异常、或者调用方提前关闭迭代器时取消其余未完成的任务
+    Args:
+        func: 返回异步迭代器的处理函数
+        items: 输入数据
+        concurrency: 最大并发数
+
+    Returns:
+        AsyncIterator[Tuple[T, R]]: 按 items 的顺序排列的 (item, 数据)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    queues: List[asyncio.Queue] = [asyncio.Queue() for _ in items]
+
+    async def run(item: T, queue: asyncio.Queue) -> None:
+        try:
+            async with semaphore:
+                async with aclosing(func(item)) as results:
+                    async for result in results:
+                        queue.put_nowait((False, result))
+        except Exception as e:
+            # 异常通过队列交给调用方，轮到该 item 时抛出
+            queue.put_nowait((True, e))
+            return
+        queue.put_nowait((True, None))
+
+    tasks = [
+        asyncio.create_task(run(item, queue)) for item, queue in zip(items, queues)
+    ]
+    try:
+        for item, queue in zip(items, queues):
+            while True:
+                is_finished, result = await queue.get()
+                if is_finished:
+                    if result is not None:
+                        raise result
+                    break
+                yield item, result
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
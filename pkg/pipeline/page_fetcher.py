@@ -0,0 +1,123 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 列表接口翻页：按页码（或偏移量）寻址的接口并发请求后面的若干页，游标翻页的接口提前请求下一页
+import asyncio
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+R = TypeVar("R")
+
+
+def _is_empty_page(page_result: Any) -> bool:
+    return not page_result
+
+
+async def fetch_pages_concurrently(
+    fetch_page: Callable[[int], Awaitable[R]],
+    start_page: int,
+    concurrency: int,
+    page_step: int = 1,
+    last_page: Optional[int] = None,
+    get_last_page: Optional[Callable[[R], Optional[int]]] = None,
+    is_empty: Callable[[R], bool] = _is_empty_page,
+) -> AsyncIterator[Tuple[int, R]]:
+    """
+    并发翻页，先单独请求起始页，之后同时请求后面的 concurrency 页，按页码顺序产出结果
+    遇到第一个空页时停止，已经发出的更后面的页请求会被取消并丢弃；调用方提前结束迭代时同样会取消未完成的请求
+    请求本身仍然经过客户端的限速，所以并发数一般取客户端工作池同时能执行的请求数
+    Args:
+        fetch_page: 请求一页数据的函数，参数为页码（或偏移量）
+        start_page: 起始页码（或偏移量）
+        concurrency: 同时请求的页数
+        page_step: 相邻两页的页码差，按偏移量翻页的接口传每页数量
+        last_page: 最后一页的页码（包含），为空表示直到遇到空页
+        get_last_page: 根据起始页的结果计算最后一页的页码，例如根据返回的总数计算
+        is_empty: 判断一页是否为空页的函数
+
+    Returns:
+        AsyncIterator[Tuple[int, R]]: (页码, 该页的结果)
+    """
+    first_result = await fetch_page(start_page)
+    if is_empty(first_result):
+        return
+    if get_last_page:
+        last_page = get_last_page(first_result)
+
+    yield start_page, first_result
+
+    next_page = start_page + page_step
+    pending: Deque[Tuple[int, asyncio.Task]] = deque()
+
+    def fill_pending() -> None:
+        nonlocal next_page
+        while len(pending) < max(1, concurrency) and (
+            last_page is None or next_page <= last_page
+        ):
+            pending.append((next_page, asyncio.create_task(fetch_page(next_page))))
+            next_page += page_step
+
+    try:
+        fill_pending()
+        while pending:
+            page, task = pending.popleft()
+            page_result = await task
+            if is_empty(page_result):
+                return
+            yield page, page_result
+            fill_pending()
+    finally:
+        for _, task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*[task for _, task in pending], return_exceptions=True)
+
+
+async def prefetch_cursor_pages(
+    fetch_page: Callable[[Any], Awaitable[R]],
+    start_cursor: Any,
+    get_next_cursor: Callable[[R], Optional[Any]],
+) -> AsyncIterator[R]:
+    """
+    游标翻页的接口无法并发请求，但可以在处理当前页（详情、评论、入库）的同时提前请求下一页
+    每拿到一页就根据它的游标发出下一页的请求，再把当前页交给调用方处理；
+    调用方提前结束迭代（例如达到 CRAWLER_MAX_NOTES_COUNT）时会取消已经发出的下一页请求
+    Args:
+        fetch_page: 根据游标请求一页数据的函数
+        start_cursor: 起始游标
+        get_next_cursor: 根据当前页的结果返回下一页的游标，没有下一页（或者当前页无效）时返回 None
+
+    Returns:
+        AsyncIterator[R]: 每一页的结果
+    """
+    next_task: Optional[asyncio.Task] = asyncio.create_task(fetch_page(start_cursor))
+    try:
+        while next_task is not None:
+            page_result = await next_task
+            next_task = None
+            next_cursor = get_next_cursor(page_result)
+            if next_cursor is not None:
+                next_task = asyncio.create_task(fetch_page(next_cursor))
+            yield page_result
+    finally:
+        if next_task is not None:
+            next_task.cancel()
+            await asyncio.gather(next_task, return_exceptions=True)
@@ -0,0 +1,142 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 有界队列串联的多阶段流水线（生产者 -> 阶段1 -> 阶段2 ...）
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+# 阶段之间传递的结束标记
+_STOP = object()
+
+
+@dataclass
+class PipelineStage:
+    """
+    流水线中的一个处理阶段
+    handler 返回值会传给下一个阶段，返回 None 表示该条数据在本阶段就处理完了
+    """
+
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    queue_size: int = 1
+
+
+class StagedPipeline:
+    def __init__(
+        self,
+        producer: AsyncIterator[Any],
+        stages: List[PipelineStage],
+        on_item_done: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ):
+        """
+        staged pipeline constructor
+        Args:
+            producer: 生产者异步迭代器，例如搜索翻页
+            stages: 处理阶段列表，阶段之间通过有界的 asyncio.Queue 连接
+            on_item_done: 按生产顺序回调已完成的数据，用于推进检查点等水位信息
+                          （只有当前数据和它之前的所有数据都处理完了才会回调）
+        """
+        if not stages:
+            raise ValueError("[StagedPipeline] at least one stage is required")
+        self._producer = producer
+        self._stages = stages
+        self._on_item_done = on_item_done
+        self._queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=max(1, stage.queue_size)) for stage in stages
+        ]
+        self._running_workers: List[int] = [max(1, stage.workers) for stage in stages]
+        self._produced_items: Dict[int, Any] = {}
+        self._finished_seqs: set = set()
+        self._next_done_seq = 0
+        self._done_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        """
+        运行流水线直到生产者耗尽且所有阶段处理完毕，任一阶段异常会取消整条流水线并抛出该异常
+        Returns:
+
+        """
+        tasks: List[asyncio.Task] = [asyncio.create_task(self._produce())]
+        for stage_index, stage in enumerate(self._stages):
+            for _ in range(max(1, stage.workers)):
+                tasks.append(asyncio.create_task(self._work(stage_index)))
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _produce(self) -> None:
+        """
+        从生产者读取数据放到第一个阶段的队列中
+        Returns:
+
+        """
+        seq = 0
+        async for item in self._producer:
+            self._produced_items[seq] = item
+            await self._queues[0].put((seq, item))
+            seq += 1
+        for _ in range(self._running_workers[0]):
+            await self._queues[0].put(_STOP)
+
+    async def _work(self, stage_index: int) -> None:
+        """
+        阶段 worker，处理本阶段队列的数据并交给下一个阶段
+        Args:
+            stage_index: 阶段下标
+
+        Returns:
+
+        """
+        stage = self._stages[stage_index]
+        in_queue = self._queues[stage_index]
+        is_last_stage = stage_index == len(self._stages) - 1
+        while True:
+            entry = await in_queue.get()
+            if entry is _STOP:
+                break
+            seq, payload = entry
+            result = await stage.handler(payload)
+            if result is None or is_last_stage:
+                await self._mark_done(seq)
+            else:
+                await self._queues[stage_index + 1].put((seq, result))
+
+        # 本阶段最后一个退出的worker负责通知下一个阶段结束
+        self._running_workers[stage_index] -= 1
+        if self._running_workers[stage_index] == 0 and not is_last_stage:
+            for _ in range(self._running_workers[stage_index + 1]):
+                await self._queues[stage_index + 1].put(_STOP)
+
+    async def _mark_done(self, seq: int) -> None:
+        """
+        标记数据处理完成，按生产顺序回调 on_item_done
+        Args:
+            seq: 数据序号
+
+        Returns:
+
+        """
+        async with self._done_lock:
+            self._finished_seqs.add(seq)
+            while self._next_done_seq in self._finished_seqs:
+                self._finished_seqs.remove(self._next_done_seq)
+                item = self._produced_items.pop(self._next_done_seq)
+                self._next_done_seq += 1
+                if self._on_item_done:
+                    await self._on_item_done(item)
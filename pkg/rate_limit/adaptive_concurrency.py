@@ -0,0 +1,268 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : AIMD 自适应并发控制，请求正常时缓慢增加并发，被风控或者延迟升高时成倍减少并发
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import config
+from pkg.tools import utils
+
+# 这些状态码表示平台正在限流或者出现了验证码，需要降低并发
+BACKOFF_STATUS_CODES = {429, 461, 471}
+
+# 至少采集到这么多次请求延迟之后才开始根据延迟判断是否需要降低并发
+MIN_LATENCY_SAMPLES = 5
+
+# 请求延迟滑动平均的平滑系数
+LATENCY_EWMA_ALPHA = 0.1
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, name: str, ceiling: int, initial: int = 1, floor: int = 1):
+        """
+        自适应并发限制器，用法和 asyncio.Semaphore 一样: async with limiter
+        Args:
+            name: 限制器名称，用于日志和指标
+            ceiling: 并发上限
+            initial: 初始并发数
+            floor: 并发下限
+        """
+        self.name = name
+        self.ceiling = max(1, ceiling)
+        self.floor = max(1, min(floor, self.ceiling))
+        self._limit = float(max(self.floor, min(initial, self.ceiling)))
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self) -> "AdaptiveConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.release()
+
+    async def increase(self) -> None:
+        """
+        加性增：每成功一轮（约等于当前并发数个请求）并发数加1
+        Returns:
+
+        """
+        old_limit = self.limit
+        self._limit = min(self.ceiling, self._limit + 1 / self._limit)
+        if self.limit > old_limit:
+            utils.logger.info(
+                f"[AdaptiveConcurrencyLimiter] {self.name} concurrency limit {old_limit} -> {self.limit}"
+            )
+            async with self._condition:
+                self._condition.notify_all()
+
+    def decrease(self, factor: float, reason: str) -> None:
+        """
+        乘性减：并发数按比例减少，正在执行的任务不受影响，新任务需要等并发数降下来
+        Args:
+            factor: 减少的比例
+            reason: 减少的原因
+
+        Returns:
+
+        """
+        old_limit = self.limit
+        self._limit = max(self.floor, self._limit * factor)
+        if self.limit < old_limit:
+            utils.logger.warning(
+                f"[AdaptiveConcurrencyLimiter] {self.name} concurrency limit {old_limit} -> {self.limit}, reason: {reason}"
+            )
+
+
+class AdaptiveConcurrencyController:
+    def __init__(
+        self,
+        platform: str,
+        ceiling: Optional[int] = None,
+        initial: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        """
+        单个平台的自适应并发控制器，客户端把请求结果反馈给控制器，控制器统一调整该平台所有限制器的并发数
+        Args:
+            platform: 平台名称
+            ceiling: 并发上限，为空时读取配置 MAX_CONCURRENCY_NUM
+            initial: 初始并发数，为空时读取配置
+            enabled: 是否开启自适应，关闭时并发数固定为上限，为空时读取配置
+        """
+        self.platform = platform
+        self.ceiling = ceiling if ceiling is not None else config.MAX_CONCURRENCY_NUM
+        self.enabled = (
+            enabled if enabled is not None else config.ENABLE_ADAPTIVE_CONCURRENCY
+        )
+        if not self.enabled:
+            self.initial = self.ceiling
+        elif initial is not None:
+            self.initial = initial
+        else:
+            self.initial = config.ADAPTIVE_CONCURRENCY_INITIAL
+        self._limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        self._latency_ewma: float = 0
+        self._latency_samples = 0
+        self._last_decrease_at: float = 0
+
+    def limiter(self, task_type: str) -> AdaptiveConcurrencyLimiter:
+        """
+        获取某一类任务的并发限制器，例如 note、comment
+        Args:
+            task_type: 任务类型
+
+        Returns:
+
+        """
+        if task_type not in self._limiters:
+            self._limiters[task_type] = AdaptiveConcurrencyLimiter(
+                name=f"{self.platform}.{task_type}",
+                ceiling=self.ceiling,
+                initial=self.initial,
+            )
+        return self._limiters[task_type]
+
+    async def record_response(self, status_code: int, latency: float) -> None:
+        """
+        反馈一次请求的响应结果
+        Args:
+            status_code: 响应状态码
+            latency: 请求耗时（秒）
+
+        Returns:
+
+        """
+        if not self.enabled:
+            return
+        if status_code in BACKOFF_STATUS_CODES:
+            self.record_backoff(f"status code {status_code}")
+            return
+
+        latency_threshold = (
+            self._latency_ewma * config.ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE
+        )
+        is_slow = (
+            self._latency_samples >= MIN_LATENCY_SAMPLES and latency > latency_threshold
+        )
+        if self._latency_samples == 0:
+            self._latency_ewma = latency
+        else:
+            self._latency_ewma += LATENCY_EWMA_ALPHA * (latency - self._latency_ewma)
+        self._latency_samples += 1
+
+        if is_slow:
+            self.record_backoff(f"latency {latency:.2f}s > {latency_threshold:.2f}s")
+            return
+        for limiter in self._limiters.values():
+            await limiter.increase()
+
+    def record_backoff(self, reason: str) -> None:
+        """
+        反馈一次风控信号（访问频次异常、IP被封、验证码、延迟升高），
+        冷却时间内的多次信号只减少一次并发，避免同一批并发请求把并发数一直减到下限
+        Args:
+            reason: 原因
+
+        Returns:
+
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if (
+            self._last_decrease_at
+            and now - self._last_decrease_at < config.ADAPTIVE_CONCURRENCY_BACKOFF_COOLDOWN
+        ):
+            return
+        self._last_decrease_at = now
+        for limiter in self._limiters.values():
+            limiter.decrease(config.ADAPTIVE_CONCURRENCY_DECREASE_FACTOR, reason)
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        当前各个限制器的并发数
+        Returns:
+            Dict[str, int]: 限制器名称 -> 当前并发数
+        """
+        return {limiter.name: limiter.limit for limiter in self._limiters.values()}
+
+
+_controllers: Dict[str, AdaptiveConcurrencyController] = {}
+# 爬虫任务自己的并发控制器，同一个进程先后/并发运行多个爬虫任务时（多平台、守护进程），
+# 控制器在任务的配置作用域中创建，MAX_CONCURRENCY_NUM 等配置按任务生效
+_job_controllers_var: ContextVar[Optional[Dict[str, AdaptiveConcurrencyController]]] = (
+    ContextVar("job_concurrency_controllers", default=None)
+)
+
+
+def enter_concurrency_scope() -> None:
+    """
+    为当前上下文（一般是一个爬虫任务）创建新的并发控制器集合
+    Returns:
+
+    """
+    _job_controllers_var.set({})
+
+
+def _get_controllers() -> Dict[str, AdaptiveConcurrencyController]:
+    job_controllers = _job_controllers_var.get()
+    if job_controllers is not None:
+        return job_controllers
+    return _controllers
+
+
+def get_concurrency_controller(platform: str) -> AdaptiveConcurrencyController:
+    """
+    获取当前爬虫任务中平台共享的自适应并发控制器，没有任务级的控制器时使用进程内共享的控制器
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    controllers = _get_controllers()
+    if platform not in controllers:
+        controllers[platform] = AdaptiveConcurrencyController(platform)
+    return controllers[platform]
+
+
+def get_concurrency_metrics() -> Dict[str, int]:
+    """
+    导出当前爬虫任务各平台当前的并发数指标
+    Returns:
+        Dict[str, int]: 例如 {"xhs.note": 2, "xhs.comment": 3}
+    """
+    metrics: Dict[str, int] = {}
+    for controller in _get_controllers().values():
+        metrics.update(controller.metrics())
+    return metrics
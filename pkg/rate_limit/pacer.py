@@ -0,0 +1,207 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于令牌桶的请求限速服务，同一 (平台, 账号) 的所有请求共享一个令牌桶，单独配置了速率的接口类型再额外限速
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+
+# 接口类型识别规则：URL（或graphql的operationName）中包含关键字即归为该类型，按顺序匹配
+ENDPOINT_CLASS_RULES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("comment", ("comment", "reply")),
+    ("search", ("search",)),
+)
+DEFAULT_ENDPOINT_CLASS = "default"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        令牌桶
+        Args:
+            rate: 每秒生成的令牌数，小于等于0表示不限速
+            burst: 桶容量，允许的最大突发请求数
+        """
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def update(self, rate: float, burst: int) -> None:
+        """
+        更新速率和容量，已经积累的令牌按旧速率结算
+        Args:
+            rate: 每秒生成的令牌数
+            burst: 桶容量
+
+        Returns:
+
+        """
+        if rate == self.rate and max(1, burst) == self.capacity:
+            return
+        if self.rate > 0:
+            self._refill()
+        else:
+            self._updated_at = time.monotonic()
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = min(self._tokens, float(self.capacity))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """
+        获取一个令牌，令牌不足时等待，等待者按先来后到的顺序拿到令牌
+        Returns:
+
+        """
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class RequestPacer:
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        endpoint_rates: Optional[Dict[str, float]] = None,
+    ):
+        """
+        请求限速服务，同一 (平台, 账号) 的所有请求共享一个令牌桶，总速率不超过账号速率；
+        在 endpoint_rates 中配置了速率的接口类型另有一个令牌桶，该类请求需要同时拿到两个令牌
+        速率在每次获取令牌时读取，任务作用域内修改的配置立即生效
+        Args:
+            rate: 每个账号的每秒请求数，为空时读取配置
+            burst: 突发容量，为空时读取配置
+            endpoint_rates: 按接口类型限制的每秒请求数，为空时读取配置
+        """
+        self._rate = rate
+        self._burst = burst
+        self._endpoint_rates = endpoint_rates
+        self._account_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._endpoint_buckets: Dict[Tuple[str, str, str], TokenBucket] = {}
+
+    @property
+    def default_rate(self) -> float:
+        if self._rate is not None:
+            return self._rate
+        if config.CRAWLER_PACING_RATE > 0:
+            return config.CRAWLER_PACING_RATE
+        if config.CRAWLER_TIME_SLEEP > 0:
+            return 1 / config.CRAWLER_TIME_SLEEP
+        return 0
+
+    @property
+    def burst(self) -> int:
+        return self._burst if self._burst is not None else config.CRAWLER_PACING_BURST
+
+    def rate_for(self, endpoint_class: str) -> Optional[float]:
+        """
+        接口类型单独配置的每秒请求数
+        Args:
+            endpoint_class: 接口类型
+
+        Returns:
+            Optional[float]: 没有单独配置时返回 None，只受账号速率限制
+        """
+        endpoint_rates = (
+            self._endpoint_rates
+            if self._endpoint_rates is not None
+            else config.CRAWLER_PACING_ENDPOINT_RATES
+        )
+        return endpoint_rates.get(endpoint_class)
+
+    @staticmethod
+    def classify_endpoint(url: str, operation_name: str = "") -> str:
+        """
+        根据请求地址识别接口类型
+        Args:
+            url: 请求地址
+            operation_name: graphql 接口的 operationName（快手等所有请求共用一个地址的平台）
+
+        Returns:
+            str: 接口类型
+        """
+        target = f"{url} {operation_name}".lower()
+        for endpoint_class, keywords in ENDPOINT_CLASS_RULES:
+            if any(keyword in target for keyword in keywords):
+                return endpoint_class
+        return DEFAULT_ENDPOINT_CLASS
+
+    def get_account_bucket(self, platform: str, account: str) -> TokenBucket:
+        key = (platform, account)
+        if key not in self._account_buckets:
+            self._account_buckets[key] = TokenBucket(self.default_rate, self.burst)
+        bucket = self._account_buckets[key]
+        bucket.update(self.default_rate, self.burst)
+        return bucket
+
+    def get_endpoint_bucket(
+        self, platform: str, account: str, endpoint_class: str
+    ) -> Optional[TokenBucket]:
+        endpoint_rate = self.rate_for(endpoint_class)
+        if endpoint_rate is None:
+            return None
+        key = (platform, account, endpoint_class)
+        if key not in self._endpoint_buckets:
+            self._endpoint_buckets[key] = TokenBucket(endpoint_rate, self.burst)
+        bucket = self._endpoint_buckets[key]
+        bucket.update(endpoint_rate, self.burst)
+        return bucket
+
+    async def acquire(
+        self, platform: str, account: str, url: str, operation_name: str = ""
+    ) -> None:
+        """
+        发起请求前获取令牌
+        Args:
+            platform: 平台名称
+            account: 账号名称，同一账号共享限速
+            url: 请求地址
+            operation_name: graphql 接口的 operationName
+
+        Returns:
+
+        """
+        endpoint_class = self.classify_endpoint(url, operation_name)
+        endpoint_bucket = self.get_endpoint_bucket(platform, account, endpoint_class)
+        if endpoint_bucket is not None:
+            await endpoint_bucket.acquire()
+        await self.get_account_bucket(platform, account).acquire()
+
+
+_request_pacer: Optional[RequestPacer] = None
+
+
+def get_request_pacer() -> RequestPacer:
+    """
+    获取进程内共享的请求限速服务
+    Returns:
+
+    """
+    global _request_pacer
+    if _request_pacer is None:
+        _request_pacer = RequestPacer()
+    return _request_pacer
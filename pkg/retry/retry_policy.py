@@ -0,0 +1,297 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 客户端公共的重试策略：按异常类型区分是否重试、指数退避、Retry-After、全局重试预算
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Optional
+
+from httpx import RequestError, Response
+from tenacity import RetryCallState, RetryError, retry, retry_if_exception
+from tenacity.stop import stop_base
+from tenacity.wait import wait_base
+
+import config
+from pkg.tools import utils
+
+# 这些状态码表示需要等待一段时间再请求，响应头里可能会带有 Retry-After
+RETRY_AFTER_STATUS_CODES = {429, 503}
+
+
+class RetryClass(Enum):
+    # 临时性错误（网络抖动、超时、限流），指数退避后重试
+    TRANSIENT = "transient"
+    # 账号或IP被风控（IP被封、验证码、403），不在当前账号上重试，直接交给 get/post 更换账号与IP
+    ACCOUNT = "account"
+    # 确定性错误（签名错误、数据不存在），重试也不会成功，直接抛出原始异常
+    FATAL = "fatal"
+
+
+class TooManyRequestsError(RequestError):
+    """server ask us to retry later"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify_exception(exception: BaseException) -> RetryClass:
+    """
+    异常分类，平台的异常类通过类属性 retry_class 声明自己的分类（见各平台的 exception.py），
+    没有声明的异常按临时性错误处理
+    Args:
+        exception: 异常
+
+    Returns:
+        RetryClass: 异常分类
+    """
+    retry_class = getattr(exception, "retry_class", None)
+    if isinstance(retry_class, RetryClass):
+        return retry_class
+    return RetryClass.TRANSIENT
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式
+    Args:
+        value: 响应头的值
+
+    Returns:
+        Optional[float]: 需要等待的秒数
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def raise_for_retry_after(response: Response) -> None:
+    """
+    响应是 429/503 时抛出 TooManyRequestsError，并带上 Retry-After 的等待时间
+    Args:
+        response: httpx 响应
+
+    Returns:
+
+    """
+    if response.status_code not in RETRY_AFTER_STATUS_CODES:
+        return
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    raise TooManyRequestsError(
+        f"status code: {response.status_code}, retry after: {retry_after}",
+        retry_after=retry_after,
+    )
+
+
+class RetryBudget:
+    def __init__(self, max_retries: Optional[int] = None):
+        """
+        单次运行的全局重试预算，所有客户端共享，避免一个坏掉的代理把时间都耗在重试上
+        Args:
+            max_retries: 最多允许的重试次数，0表示不限制，为空时读取配置
+        """
+        self.max_retries = (
+            max_retries if max_retries is not None else config.RETRY_BUDGET_PER_RUN
+        )
+        self.used = 0
+        self._exhausted_logged = False
+
+    @property
+    def exhausted(self) -> bool:
+        if self.max_retries <= 0:
+            return False
+        if self.used >= self.max_retries and not self._exhausted_logged:
+            self._exhausted_logged = True
+            utils.logger.warning(
+                f"[RetryBudget] retry budget {self.max_retries} exhausted, stop retrying in this run"
+            )
+        return self.used >= self.max_retries
+
+    def consume(self) -> None:
+        self.used += 1
+
+
+_retry_budget: Optional[RetryBudget] = None
+# 爬虫任务自己的重试预算，同一个进程先后/并发运行多个爬虫任务时（多平台、守护进程），每个任务的预算互不影响
+_job_retry_budget_var: ContextVar[Optional[RetryBudget]] = ContextVar(
+    "job_retry_budget", default=None
+)
+
+
+def enter_retry_budget_scope() -> RetryBudget:
+    """
+    为当前上下文（一般是一个爬虫任务）创建新的重试预算
+    Returns:
+
+    """
+    retry_budget = RetryBudget()
+    _job_retry_budget_var.set(retry_budget)
+    return retry_budget
+
+
+def get_retry_budget() -> RetryBudget:
+    """
+    获取当前爬虫任务的重试预算，没有任务级的预算时使用进程内共享的重试预算
+    Returns:
+
+    """
+    global _retry_budget
+    job_retry_budget = _job_retry_budget_var.get()
+    if job_retry_budget is not None:
+        return job_retry_budget
+    if _retry_budget is None:
+        _retry_budget = RetryBudget()
+    return _retry_budget
+
+
+class stop_by_retry_policy(stop_base):
+    def __init__(
+        self, max_attempts: Optional[int] = None, budget: Optional[RetryBudget] = None
+    ):
+        """
+        重试停止策略，配置在每次判断时读取，任务作用域内修改的配置立即生效
+        Args:
+            max_attempts: 最多尝试次数，为空时读取配置 RETRY_MAX_ATTEMPTS
+            budget: 重试预算，为空时使用当前任务的预算
+        """
+        self._max_attempts = max_attempts
+        self.budget = budget
+
+    @property
+    def max_attempts(self) -> int:
+        return self._max_attempts or config.RETRY_MAX_ATTEMPTS
+
+    def is_budget_exhausted(self, retry_state: RetryCallState) -> bool:
+        """
+        是否因为全局重试预算用完而停止（而不是达到最大尝试次数、账号/IP类错误）
+        Args:
+            retry_state:
+
+        Returns:
+            bool
+        """
+        if retry_state.attempt_number >= self.max_attempts:
+            return False
+        exception = retry_state.outcome.exception()
+        if exception and classify_exception(exception) == RetryClass.ACCOUNT:
+            return False
+        return (self.budget or get_retry_budget()).exhausted
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        if retry_state.attempt_number >= self.max_attempts:
+            return True
+        exception = retry_state.outcome.exception()
+        if exception and classify_exception(exception) == RetryClass.ACCOUNT:
+            return True
+        return (self.budget or get_retry_budget()).exhausted
+
+
+class wait_by_retry_policy(wait_base):
+    def __init__(
+        self,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        retry_after_max: Optional[float] = None,
+    ):
+        """
+        重试等待策略，为空的参数在每次计算时读取配置
+        Args:
+            backoff_base: 指数退避的基数，为空时读取配置 RETRY_BACKOFF_BASE
+            backoff_max: 指数退避的上限，为空时读取配置 RETRY_BACKOFF_MAX
+            retry_after_max: Retry-After 最多等待的时间，为空时读取配置 RETRY_AFTER_MAX_WAIT
+        """
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._retry_after_max = retry_after_max
+
+    @property
+    def backoff_base(self) -> float:
+        return (
+            self._backoff_base
+            if self._backoff_base is not None
+            else config.RETRY_BACKOFF_BASE
+        )
+
+    @property
+    def backoff_max(self) -> float:
+        return (
+            self._backoff_max if self._backoff_max is not None else config.RETRY_BACKOFF_MAX
+        )
+
+    @property
+    def retry_after_max(self) -> float:
+        return (
+            self._retry_after_max
+            if self._retry_after_max is not None
+            else config.RETRY_AFTER_MAX_WAIT
+        )
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        exception = retry_state.outcome.exception()
+        retry_after = getattr(exception, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.retry_after_max)
+        # full jitter 指数退避
+        exp_backoff = self.backoff_base * 2 ** (retry_state.attempt_number - 1)
+        return random.uniform(0, min(self.backoff_max, exp_backoff))
+
+
+def request_retry(
+    max_attempts: Optional[int] = None, budget: Optional[RetryBudget] = None
+):
+    """
+    客户端 request() 的重试装饰器，替代固定间隔的 tenacity retry：
+    只重试临时性错误，账号/IP 类错误和多次重试仍然失败的临时性错误抛出 RetryError 交给 get/post 更换账号，
+    确定性错误直接抛出原始异常；全局重试预算用完后临时性错误也直接抛出原始异常，不触发更换账号，
+    避免一个坏掉的代理耗尽预算后把整个账号池都标记为失效
+    Args:
+        max_attempts: 最多尝试次数，为空时在每次请求时读取配置
+        budget: 重试预算，为空时使用当前任务的预算
+
+    Returns:
+
+    """
+    stop = stop_by_retry_policy(max_attempts, budget=budget)
+
+    def before_sleep(retry_state: RetryCallState) -> None:
+        (budget or get_retry_budget()).consume()
+        utils.logger.warning(
+            f"[request_retry] {retry_state.fn.__qualname__} attempt {retry_state.attempt_number} failed: "
+            f"{retry_state.outcome.exception()!r}, retry in {retry_state.next_action.sleep:.2f}s"
+        )
+
+    def retry_error_callback(retry_state: RetryCallState):
+        if stop.is_budget_exhausted(retry_state):
+            # 抛出原始异常
+            return retry_state.outcome.result()
+        raise RetryError(retry_state.outcome) from retry_state.outcome.exception()
+
+    return retry(
+        retry=retry_if_exception(
+            lambda e: classify_exception(e) != RetryClass.FATAL
+        ),
+        stop=stop,
+        wait=wait_by_retry_policy(),
+        before_sleep=before_sleep,
+        retry_error_callback=retry_error_callback,
+    )
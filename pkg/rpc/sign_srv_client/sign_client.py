@@ -11,7 +11,7 @@
 
 # -*- coding: utf-8 -*-
 import asyncio
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 
 import aiohttp
 
@@ -39,6 +39,30 @@ class SignServerClient:
         """
         self._endpoint = endpoint
         self._timeout = timeout
+        # 复用同一个 aiohttp 会话（连接池），不再每次请求都新建会话
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        get or create the aiohttp session
+        Returns:
+
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self._timeout)
+            )
+        return self._session
+
+    async def close(self):
+        """
+        close the aiohttp session
+        Returns:
+
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def request(self, method: str, uri: str, **kwargs) -> Union[Dict, Any]:
         """
@@ -52,16 +76,15 @@ class SignServerClient:
 
         """
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self._timeout)) as session:
-                async with session.request(method, self._endpoint + uri, **kwargs) as response:
-                    if response.status != 200:
-                        response_text = await response.text()
-                        utils.logger.error(
-                            f"[XhsSignClient.request] response status code {response.status} response content: {response_text}")
-                        raise Exception(f"请求签名服务器失败，状态码：{response.status}")
-
-                    data = await response.json()
-                    return data
+            async with self._get_session().request(method, self._endpoint + uri, **kwargs) as response:
+                if response.status != 200:
+                    response_text = await response.text()
+                    utils.logger.error(
+                        f"[XhsSignClient.request] response status code {response.status} response content: {response_text}")
+                    raise Exception(f"请求签名服务器失败，状态码：{response.status}")
+
+                data = await response.json()
+                return data
         except Exception as e:
             raise Exception(f"请求签名服务器失败, error: {e}")
 
@@ -153,6 +176,35 @@ class SignServerClient:
         utils.logger.info("[XhsSignClient.pong_sign_server] xhs sign server is alive")
 
 
+_shared_sign_client: Optional[SignServerClient] = None
+
+
+def get_sign_client() -> SignServerClient:
+    """
+    获取进程内共享的签名服务客户端，同一进程运行的所有平台爬虫共用一个连接池
+    Returns:
+
+    """
+    global _shared_sign_client
+    if _shared_sign_client is None:
+        _shared_sign_client = SignServerClient()
+    return _shared_sign_client
+
+
+async def close_sign_client():
+    """
+    关闭共享的签名服务客户端
+    Returns:
+
+    """
+    if _shared_sign_client is not None:
+        await _shared_sign_client.close()
+
+
 if __name__ == '__main__':
-    sign_client = SignServerClient()
-    asyncio.run(sign_client.pong_sign_server())
+    async def pong():
+        sign_client = get_sign_client()
+        await sign_client.pong_sign_server()
+        await close_sign_client()
+
+    asyncio.run(pong())
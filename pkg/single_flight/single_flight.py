@@ -0,0 +1,147 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 相同请求合并（single-flight）：并发的相同只读请求只发送一次，其他协程等待第一个请求的结果
+import asyncio
+import copy
+import functools
+import inspect
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import config
+from pkg.stats import get_crawl_stats
+
+T = TypeVar("T")
+
+
+class _InFlightCall:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiter_count = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        single flight constructor
+        """
+        self._calls: Dict[str, _InFlightCall] = {}
+
+    @property
+    def in_flight_count(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行请求，同一个key已经有请求在进行中时不再发送，等待进行中的请求的结果（或异常）
+        请求在独立的任务中运行，发起请求的协程被取消不影响其他等待者，所有等待者都取消后才取消请求
+        Args:
+            key: 请求的唯一标识
+            func: 发送请求的协程函数
+
+        Returns:
+            T: 请求结果，后加入的等待者拿到的 dict/list 结果是深拷贝，修改结果不会互相影响
+        """
+        call = self._calls.get(key)
+        is_follower = call is not None
+        if call is None:
+            call = _InFlightCall(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            get_crawl_stats().incr("coalesced_requests")
+
+        call.waiter_count += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiter_count -= 1
+            if call.waiter_count == 0 and not call.task.done():
+                call.task.cancel()
+
+        if is_follower and isinstance(result, (dict, list)):
+            return copy.deepcopy(result)
+        return result
+
+    def _forget(self, key: str, call: _InFlightCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+def build_request_key(scope: str, method: str, arguments: Dict[str, Any]) -> str:
+    """
+    生成请求的唯一标识，参数和请求体按 key 排序，参数顺序不同的相同请求得到相同的标识
+    Args:
+        scope: 作用域，例如 平台:账号
+        method: 请求方法
+        arguments: 请求方法的参数名 -> 参数值（URI、请求参数、请求体等）
+
+    Returns:
+        str: 请求的唯一标识
+    """
+    return json.dumps(
+        [scope, method, arguments],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=repr,
+    )
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    获取进程内共享的请求合并器
+    Returns:
+
+    """
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+
+def coalesce_requests(platform: str):
+    """
+    装饰客户端的只读请求方法（get/post 等），同一个账号并发发起的相同请求只发送一次
+    不同账号的请求不合并：登录态检查等接口的结果与账号相关，某个账号被风控导致的失败也不应该传给其他账号
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            if not config.ENABLE_REQUEST_COALESCING:
+                return await func(self, *args, **kwargs)
+            # 按参数名绑定，位置参数和关键字参数传入的相同请求得到相同的标识
+            bound_arguments = signature.bind(self, *args, **kwargs)
+            bound_arguments.apply_defaults()
+            arguments = dict(bound_arguments.arguments)
+            arguments.pop("self", None)
+            scope = f"{platform}:{getattr(self, '_pacing_account_name', '')}"
+            key = build_request_key(scope, func.__name__, arguments)
+            return await get_single_flight().do(
+                key, lambda: func(self, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,89 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 爬虫任务的运行统计（保存的帖子、评论、创作者数量，重试次数），多进程模式下由主进程汇总各分片的统计
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+
+
+class CrawlStats:
+    def __init__(self):
+        self._counter: Counter = Counter()
+
+    def incr(self, name: str, count: int = 1) -> None:
+        """
+        增加计数
+        Args:
+            name: 统计项名称
+            count: 增加的数量
+
+        Returns:
+
+        """
+        self._counter[name] += count
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        导出当前的统计，返回普通的 dict，可以跨进程传递
+        Returns:
+            Dict[str, int]: 统计项名称 -> 数量
+        """
+        return dict(self._counter)
+
+
+_crawl_stats: Optional[CrawlStats] = None
+# 爬虫任务自己的统计，同一个进程并发运行多个爬虫任务时（多平台、守护进程），每个任务的统计互不影响
+_job_crawl_stats_var: ContextVar[Optional[CrawlStats]] = ContextVar(
+    "job_crawl_stats", default=None
+)
+
+
+def enter_crawl_stats_scope() -> CrawlStats:
+    """
+    为当前上下文（一般是一个爬虫任务）创建新的统计
+    Returns:
+
+    """
+    crawl_stats = CrawlStats()
+    _job_crawl_stats_var.set(crawl_stats)
+    return crawl_stats
+
+
+def get_crawl_stats() -> CrawlStats:
+    """
+    获取当前爬虫任务的统计，没有任务级的统计时使用进程内共享的统计
+    Returns:
+
+    """
+    global _crawl_stats
+    job_crawl_stats = _job_crawl_stats_var.get()
+    if job_crawl_stats is not None:
+        return job_crawl_stats
+    if _crawl_stats is None:
+        _crawl_stats = CrawlStats()
+    return _crawl_stats
+
+
+def merge_crawl_stats(stats_list: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    """
+    汇总多个统计
+    Args:
+        stats_list: 统计列表
+
+    Returns:
+        Dict[str, int]: 汇总后的统计
+    """
+    merged: Counter = Counter()
+    for stats in stats_list:
+        merged.update(stats)
+    return dict(merged)
@@ -21,13 +21,13 @@ import urllib.parse
 from io import BytesIO
 from typing import Dict
 
-from PIL import Image, ImageDraw  # type: ignore
-
 from . import utils
 
 
 def show_qrcode(qr_code) -> None:  # type: ignore
     """parse base64 encode qrcode image and show it"""
+    from PIL import Image, ImageDraw  # type: ignore
+
     if "," in qr_code:
         qr_code = qr_code.split(",")[1]
     qr_code = base64.b64decode(qr_code)
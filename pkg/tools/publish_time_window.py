@@ -0,0 +1,130 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 发布时间窗口，只爬取发布时间在 --since 和 --until 之间的帖子，按发布时间倒序的列表越过 --since 后停止翻页
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+
+def parse_time_bound(time_str: str, is_upper_bound: bool = False) -> int:
+    """
+    解析发布时间窗口的边界
+    Args:
+        time_str: 日期 "2024-01-01"、日期时间 "2024-01-01 12:00:00"，或者最近N天 "7d"，为空表示不限制
+        is_upper_bound: 是否是结束时间，只有日期的结束时间包含当天，解析为当天的 23:59:59
+
+    Returns:
+        int: 秒级时间戳，不限制时返回 0
+    """
+    time_str = (time_str or "").strip()
+    if not time_str:
+        return 0
+
+    relative_days = re.fullmatch(r"(\d+)d", time_str)
+    if relative_days:
+        return int(time.time()) - int(relative_days.group(1)) * 86400
+
+    try:
+        return int(datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S").timestamp())
+    except ValueError:
+        pass
+    try:
+        day_start = datetime.strptime(time_str, "%Y-%m-%d")
+    except ValueError:
+        pass
+    else:
+        if is_upper_bound:
+            return int((day_start + timedelta(days=1)).timestamp()) - 1
+        return int(day_start.timestamp())
+    raise ValueError(
+        f"无效的发布时间: {time_str}，支持 2024-01-01、2024-01-01 12:00:00 或者 7d（最近7天）"
+    )
+
+
+def normalize_publish_time(publish_time: Any) -> int:
+    """
+    各平台的发布时间有秒级和毫秒级时间戳，统一转换成秒级时间戳
+    Args:
+        publish_time: 发布时间戳
+
+    Returns:
+        int: 秒级时间戳，无法解析时返回 0
+    """
+    try:
+        publish_time = int(float(publish_time or 0))
+    except (TypeError, ValueError):
+        return 0
+    if publish_time > 1000000000000:
+        publish_time //= 1000
+    return publish_time
+
+
+class PublishTimeWindow:
+    def __init__(self, since: int = 0, until: int = 0):
+        """
+        publish time window constructor
+        Args:
+            since: 最早的发布时间（秒级时间戳），0 表示不限制
+            until: 最晚的发布时间（秒级时间戳），0 表示不限制
+        """
+        self.since = since
+        self.until = until
+
+    @classmethod
+    def from_config(cls) -> "PublishTimeWindow":
+        """
+        从配置 CRAWLER_PUBLISH_TIME_SINCE、CRAWLER_PUBLISH_TIME_UNTIL 创建发布时间窗口
+        Returns:
+            PublishTimeWindow
+        """
+        import config
+
+        return cls(
+            since=parse_time_bound(config.CRAWLER_PUBLISH_TIME_SINCE),
+            until=parse_time_bound(config.CRAWLER_PUBLISH_TIME_UNTIL, is_upper_bound=True),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.since or self.until)
+
+    def contains(self, publish_time: Any) -> bool:
+        """
+        帖子的发布时间是否在窗口内，发布时间未知的帖子无法判断，按在窗口内处理
+        Args:
+            publish_time: 发布时间戳（秒级或毫秒级）
+
+        Returns:
+            bool
+        """
+        publish_time = normalize_publish_time(publish_time)
+        if not publish_time:
+            return True
+        if self.since and publish_time < self.since:
+            return False
+        if self.until and publish_time > self.until:
+            return False
+        return True
+
+    def is_before_since(self, publish_time: Any) -> bool:
+        """
+        帖子是否早于窗口的开始时间，按发布时间倒序的列表遇到这样的帖子（置顶帖子除外）就可以停止翻页
+        Args:
+            publish_time: 发布时间戳（秒级或毫秒级）
+
+        Returns:
+            bool
+        """
+        publish_time = normalize_publish_time(publish_time)
+        return bool(self.since and publish_time and publish_time < self.since)
@@ -55,7 +55,7 @@ def get_logger():
     if config.ENABLE_LOG_FILE:
         # create logs dir
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        log_dir = os.path.join(project_root, 'logs', config.PLATFORM)
+        log_dir = os.path.join(project_root, 'logs', config.PLATFORM.replace(',', '_'))
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
 
@@ -0,0 +1,46 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+import config
+from .abs_work_queue import (
+    WORK_ITEM_KIND_COMMENT_THREAD,
+    WORK_ITEM_KIND_CREATOR,
+    WORK_ITEM_KIND_NOTE,
+    AbstractWorkQueue,
+    WorkItem,
+    make_work_item_id,
+)
+from .local_work_queue import LocalWorkQueue
+from .worker import WorkQueueWorker
+
+
+def create_work_queue(name: str, queue_type: str = "", **kwargs) -> AbstractWorkQueue:
+    """创建工作队列的工厂函数
+
+    Args:
+        name (str): 队列名称，多台机器使用相同名称的 redis 队列即可共同消费
+        queue_type (str): 队列类型，支持 "redis" 或 "memory"，为空时读取配置 WORK_QUEUE_TYPE
+        **kwargs: 额外的参数传递给对应的队列构造函数
+
+    Returns:
+        AbstractWorkQueue: 工作队列实例
+    """
+    queue_type = queue_type or config.WORK_QUEUE_TYPE
+    kwargs.setdefault("lease_seconds", config.WORK_QUEUE_LEASE_SECONDS)
+    kwargs.setdefault("max_deliveries", config.WORK_QUEUE_MAX_DELIVERIES)
+    if queue_type.lower() == "redis":
+        from .redis_work_queue import RedisWorkQueue
+
+        return RedisWorkQueue(name, **kwargs)
+    elif queue_type.lower() == "memory":
+        return LocalWorkQueue(name, **kwargs)
+    else:
+        raise ValueError(f"不支持的工作队列类型: {queue_type}")
@@ -0,0 +1,157 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 分布式工作队列抽象，多台机器上的爬虫作为无状态的消费者共同消费同一个队列
+#            领取（lease）后在可见性超时时间内未确认（ack）的任务会重新投递，投递次数达到上限后进入死信队列
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# 工作任务类型：帖子详情、帖子的评论、创作者
+WORK_ITEM_KIND_NOTE = "note"
+WORK_ITEM_KIND_COMMENT_THREAD = "comment_thread"
+WORK_ITEM_KIND_CREATOR = "creator"
+
+
+class WorkItem(BaseModel):
+    """
+    工作队列中的任务
+    """
+
+    id: str = Field(..., description="任务ID，同一个ID只会入队一次，用于幂等入队")
+    kind: str = Field(..., description="任务类型")
+    payload: Dict[str, Any] = Field(default_factory=dict, description="任务参数")
+    attempts: int = Field(default=0, description="已投递次数")
+    last_error: Optional[str] = Field(default=None, description="最近一次失败的原因")
+    lease_token: Optional[str] = Field(
+        default=None, description="领取凭证，只有持有最新凭证的消费者才能确认或退回任务"
+    )
+
+
+def make_work_item_id(kind: str, *keys: str) -> str:
+    """
+    生成任务ID，相同的任务类型和业务主键生成相同的ID
+    Args:
+        kind: 任务类型
+        *keys: 业务主键，如帖子ID
+
+    Returns:
+        str: 格式为kind:key1:key2
+    """
+    return ":".join([kind, *keys])
+
+
+class AbstractWorkQueue(ABC):
+    def __init__(self, name: str, lease_seconds: float, max_deliveries: int):
+        """
+        work queue constructor
+        Args:
+            name: 队列名称，名称相同的队列共享任务
+            lease_seconds: 默认的可见性超时时间，单位：秒
+            max_deliveries: 最多投递次数，达到后失败的任务进入死信队列
+        """
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_deliveries = max(1, max_deliveries)
+
+    @abstractmethod
+    async def enqueue(self, item: WorkItem) -> bool:
+        """
+        幂等入队，已经入队过的任务ID（包括已完成的）在队列清空前不会重复入队
+        Args:
+            item: 任务
+
+        Returns:
+            bool: 是否入队成功
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def lease(self, lease_seconds: Optional[float] = None) -> Optional[WorkItem]:
+        """
+        领取一个任务，任务在可见性超时时间内对其他消费者不可见
+        领取前会先把超时未确认的任务重新放回队列（或移入死信队列）
+        Args:
+            lease_seconds: 可见性超时时间，为空时使用默认值
+
+        Returns:
+            Optional[WorkItem]: 领取到的任务，队列为空时返回 None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def extend_lease(self, item: WorkItem, lease_seconds: Optional[float] = None) -> bool:
+        """
+        延长任务的可见性超时时间，用于耗时较长的任务
+        Args:
+            item: 领取到的任务
+            lease_seconds: 从现在开始的可见性超时时间
+
+        Returns:
+            bool: 是否仍然持有该任务
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ack(self, item: WorkItem) -> bool:
+        """
+        确认任务完成
+        Args:
+            item: 领取到的任务
+
+        Returns:
+            bool: 是否确认成功，租约已过期并被其他消费者领取时返回 False
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def nack(self, item: WorkItem, error: str = "", dead_letter: bool = False) -> bool:
+        """
+        退回任务，投递次数未达到上限时重新入队，否则进入死信队列
+        Args:
+            item: 领取到的任务
+            error: 失败原因
+            dead_letter: 是否直接进入死信队列（不可重试的错误）
+
+        Returns:
+            bool: 是否退回成功，租约已过期并被其他消费者领取时返回 False
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def is_drained(self) -> bool:
+        """
+        队列中既没有待领取的任务，也没有被领取未确认的任务
+        Returns:
+            bool
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear_if_drained(self) -> bool:
+        """
+        队列处理完后清空入队记录、死信和任务内容，之后相同的任务ID可以重新入队（例如第二天用相同配置再跑一次）
+        队列中还有待领取或被领取未确认的任务时不清空，中断的运行可以接着消费
+        Returns:
+            bool: 是否已清空
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_dead_letters(self) -> List[WorkItem]:
+        """
+        列出死信队列中的任务
+        Returns:
+            List[WorkItem]
+        """
+        raise NotImplementedError
@@ -0,0 +1,110 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 进程内的工作队列，没有 redis 时的单机回退实现，语义与 redis 实现一致
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+from .abs_work_queue import AbstractWorkQueue, WorkItem
+
+
+class LocalWorkQueue(AbstractWorkQueue):
+    def __init__(self, name: str, lease_seconds: float, max_deliveries: int):
+        super().__init__(name, lease_seconds, max_deliveries)
+        self._enqueued_ids: Set[str] = set()
+        self._items: Dict[str, WorkItem] = {}
+        self._pending: Deque[str] = deque()
+        # 被领取的任务ID -> (领取凭证, 可见性超时的截止时间)
+        self._leased: Dict[str, tuple] = {}
+        self._dead_letters: List[str] = []
+
+    def _is_current_lease(self, item: WorkItem) -> bool:
+        lease = self._leased.get(item.id)
+        return lease is not None and lease[0] == item.lease_token
+
+    def _requeue_expired_leases(self) -> None:
+        now = time.monotonic()
+        for item_id, (_, deadline) in list(self._leased.items()):
+            if deadline > now:
+                continue
+            del self._leased[item_id]
+            if self._items[item_id].attempts >= self.max_deliveries:
+                self._dead_letters.append(item_id)
+            else:
+                self._pending.append(item_id)
+
+    async def enqueue(self, item: WorkItem) -> bool:
+        if item.id in self._enqueued_ids:
+            return False
+        self._enqueued_ids.add(item.id)
+        self._items[item.id] = item.model_copy(update={"attempts": 0, "lease_token": None})
+        self._pending.append(item.id)
+        return True
+
+    async def lease(self, lease_seconds: Optional[float] = None) -> Optional[WorkItem]:
+        self._requeue_expired_leases()
+        if not self._pending:
+            return None
+
+        item_id = self._pending.popleft()
+        item = self._items[item_id]
+        item.attempts += 1
+        lease_token = uuid.uuid4().hex
+        self._leased[item_id] = (
+            lease_token,
+            time.monotonic() + (lease_seconds or self.lease_seconds),
+        )
+        return item.model_copy(update={"lease_token": lease_token})
+
+    async def extend_lease(self, item: WorkItem, lease_seconds: Optional[float] = None) -> bool:
+        if not self._is_current_lease(item):
+            return False
+        self._leased[item.id] = (
+            item.lease_token,
+            time.monotonic() + (lease_seconds or self.lease_seconds),
+        )
+        return True
+
+    async def ack(self, item: WorkItem) -> bool:
+        if not self._is_current_lease(item):
+            return False
+        del self._leased[item.id]
+        del self._items[item.id]
+        return True
+
+    async def nack(self, item: WorkItem, error: str = "", dead_letter: bool = False) -> bool:
+        if not self._is_current_lease(item):
+            return False
+        del self._leased[item.id]
+        stored_item = self._items[item.id]
+        stored_item.last_error = error
+        if dead_letter or stored_item.attempts >= self.max_deliveries:
+            self._dead_letters.append(item.id)
+        else:
+            self._pending.append(item.id)
+        return True
+
+    async def is_drained(self) -> bool:
+        return not self._pending and not self._leased
+
+    async def clear_if_drained(self) -> bool:
+        if not await self.is_drained():
+            return False
+        self._enqueued_ids.clear()
+        self._items.clear()
+        self._dead_letters.clear()
+        return True
+
+    async def list_dead_letters(self) -> List[WorkItem]:
+        return [self._items[item_id].model_copy() for item_id in self._dead_letters]
@@ -0,0 +1,248 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于 redis 的工作队列，多台机器共享
+#            {prefix}:enqueued  set   入队过的任务ID，用于幂等入队，队列处理完后清空
+#            {prefix}:items     hash  任务ID -> 任务内容
+#            {prefix}:pending   list  待领取的任务ID
+#            {prefix}:leased    zset  被领取的任务ID -> 可见性超时的截止时间（redis 服务器时间，避免各机器时钟不一致）
+#            {prefix}:tokens    hash  任务ID -> 领取凭证
+#            {prefix}:attempts  hash  任务ID -> 已投递次数
+#            {prefix}:dead      list  死信任务ID
+#            领取、确认、退回、清空都在 lua 脚本中原子执行
+import uuid
+from typing import List, Optional
+
+from .abs_work_queue import AbstractWorkQueue, WorkItem
+
+_LUA_SERVER_NOW = """
+local server_time = redis.call('TIME')
+local now = tonumber(server_time[1]) + tonumber(server_time[2]) / 1000000
+"""
+
+# KEYS: enqueued, items, pending  ARGV: item_id, item_json
+_ENQUEUE_SCRIPT = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('RPUSH', KEYS[3], ARGV[1])
+return 1
+"""
+
+# KEYS: pending, leased, tokens, attempts, dead  ARGV: lease_seconds, lease_token, max_deliveries
+_LEASE_SCRIPT = _LUA_SERVER_NOW + """
+local expired_ids = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, expired_id in ipairs(expired_ids) do
+    redis.call('ZREM', KEYS[2], expired_id)
+    redis.call('HDEL', KEYS[3], expired_id)
+    if tonumber(redis.call('HGET', KEYS[4], expired_id) or '0') >= tonumber(ARGV[3]) then
+        redis.call('RPUSH', KEYS[5], expired_id)
+    else
+        redis.call('RPUSH', KEYS[1], expired_id)
+    end
+end
+local item_id = redis.call('LPOP', KEYS[1])
+if not item_id then
+    return false
+end
+local attempts = redis.call('HINCRBY', KEYS[4], item_id, 1)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[1]), item_id)
+redis.call('HSET', KEYS[3], item_id, ARGV[2])
+return {item_id, attempts}
+"""
+
+# KEYS: leased, tokens  ARGV: item_id, lease_token, lease_seconds
+_EXTEND_LEASE_SCRIPT = _LUA_SERVER_NOW + """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# KEYS: leased, tokens, items, attempts  ARGV: item_id, lease_token
+_ACK_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[4], ARGV[1])
+return 1
+"""
+
+# KEYS: pending, leased, tokens, attempts, dead, items  ARGV: item_id, lease_token, max_deliveries, item_json, dead_letter
+_NACK_SCRIPT = """
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('HSET', KEYS[6], ARGV[1], ARGV[4])
+if ARGV[5] == '1' or tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0') >= tonumber(ARGV[3]) then
+    redis.call('RPUSH', KEYS[5], ARGV[1])
+else
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+# KEYS: pending, leased, enqueued, items, attempts, tokens, dead
+_CLEAR_IF_DRAINED_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) > 0 or redis.call('ZCARD', KEYS[2]) > 0 then
+    return 0
+end
+redis.call('DEL', KEYS[3], KEYS[4], KEYS[5], KEYS[6], KEYS[7])
+return 1
+"""
+
+
+class RedisWorkQueue(AbstractWorkQueue):
+    def __init__(
+        self,
+        name: str,
+        lease_seconds: float,
+        max_deliveries: int,
+        key_prefix: str = "work_queue",
+    ):
+        super().__init__(name, lease_seconds, max_deliveries)
+        from pkg.cache.redis_cache import get_redis_client
+
+        self._redis_client = get_redis_client()
+        prefix = f"{key_prefix}:{name}"
+        self._enqueued_key = f"{prefix}:enqueued"
+        self._items_key = f"{prefix}:items"
+        self._pending_key = f"{prefix}:pending"
+        self._leased_key = f"{prefix}:leased"
+        self._tokens_key = f"{prefix}:tokens"
+        self._attempts_key = f"{prefix}:attempts"
+        self._dead_key = f"{prefix}:dead"
+
+        self._enqueue_script = self._redis_client.register_script(_ENQUEUE_SCRIPT)
+        self._lease_script = self._redis_client.register_script(_LEASE_SCRIPT)
+        self._extend_lease_script = self._redis_client.register_script(_EXTEND_LEASE_SCRIPT)
+        self._ack_script = self._redis_client.register_script(_ACK_SCRIPT)
+        self._nack_script = self._redis_client.register_script(_NACK_SCRIPT)
+        self._clear_if_drained_script = self._redis_client.register_script(
+            _CLEAR_IF_DRAINED_SCRIPT
+        )
+
+    def _load_item(self, item_id: str) -> Optional[WorkItem]:
+        data = self._redis_client.hget(self._items_key, item_id)
+        return WorkItem.model_validate_json(data) if data else None
+
+    async def enqueue(self, item: WorkItem) -> bool:
+        item = item.model_copy(update={"attempts": 0, "lease_token": None})
+        return bool(
+            self._enqueue_script(
+                keys=[self._enqueued_key, self._items_key, self._pending_key],
+                args=[item.id, item.model_dump_json()],
+            )
+        )
+
+    async def lease(self, lease_seconds: Optional[float] = None) -> Optional[WorkItem]:
+        while True:
+            lease_token = uuid.uuid4().hex
+            result = self._lease_script(
+                keys=[
+                    self._pending_key,
+                    self._leased_key,
+                    self._tokens_key,
+                    self._attempts_key,
+                    self._dead_key,
+                ],
+                args=[lease_seconds or self.lease_seconds, lease_token, self.max_deliveries],
+            )
+            if not result:
+                return None
+
+            item_id, attempts = result[0].decode(), int(result[1])
+            item = self._load_item(item_id)
+            if item is None:
+                # 任务内容已被清理，直接丢弃
+                self._ack_script(
+                    keys=[self._leased_key, self._tokens_key, self._items_key, self._attempts_key],
+                    args=[item_id, lease_token],
+                )
+                continue
+            return item.model_copy(update={"attempts": attempts, "lease_token": lease_token})
+
+    async def extend_lease(self, item: WorkItem, lease_seconds: Optional[float] = None) -> bool:
+        return bool(
+            self._extend_lease_script(
+                keys=[self._leased_key, self._tokens_key],
+                args=[item.id, item.lease_token, lease_seconds or self.lease_seconds],
+            )
+        )
+
+    async def ack(self, item: WorkItem) -> bool:
+        return bool(
+            self._ack_script(
+                keys=[self._leased_key, self._tokens_key, self._items_key, self._attempts_key],
+                args=[item.id, item.lease_token],
+            )
+        )
+
+    async def nack(self, item: WorkItem, error: str = "", dead_letter: bool = False) -> bool:
+        stored_item = item.model_copy(update={"last_error": error, "lease_token": None})
+        return bool(
+            self._nack_script(
+                keys=[
+                    self._pending_key,
+                    self._leased_key,
+                    self._tokens_key,
+                    self._attempts_key,
+                    self._dead_key,
+                    self._items_key,
+                ],
+                args=[
+                    item.id,
+                    item.lease_token,
+                    self.max_deliveries,
+                    stored_item.model_dump_json(),
+                    "1" if dead_letter else "0",
+                ],
+            )
+        )
+
+    async def is_drained(self) -> bool:
+        pipe = self._redis_client.pipeline()
+        pipe.llen(self._pending_key)
+        pipe.zcard(self._leased_key)
+        pending_count, leased_count = pipe.execute()
+        return pending_count == 0 and leased_count == 0
+
+    async def clear_if_drained(self) -> bool:
+        return bool(
+            self._clear_if_drained_script(
+                keys=[
+                    self._pending_key,
+                    self._leased_key,
+                    self._enqueued_key,
+                    self._items_key,
+                    self._attempts_key,
+                    self._tokens_key,
+                    self._dead_key,
+                ],
+            )
+        )
+
+    async def list_dead_letters(self) -> List[WorkItem]:
+        dead_items = []
+        for item_id in self._redis_client.lrange(self._dead_key, 0, -1):
+            item = self._load_item(item_id.decode())
+            if item is not None:
+                dead_items.append(item)
+        return dead_items
@@ -0,0 +1,103 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 工作队列的消费者，按任务类型分发给对应的处理函数，直到所有机器上的任务都处理完
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from pkg.tools import utils
+
+from .abs_work_queue import AbstractWorkQueue, WorkItem
+
+WorkItemHandler = Callable[[WorkItem], Awaitable[None]]
+
+
+class WorkQueueWorker:
+    def __init__(
+        self,
+        work_queue: AbstractWorkQueue,
+        handlers: Dict[str, WorkItemHandler],
+        concurrency: int = 1,
+        poll_interval: float = 1,
+    ):
+        """
+        work queue worker constructor
+        Args:
+            work_queue: 工作队列
+            handlers: 任务类型 -> 处理函数，处理函数抛出异常时任务会被退回
+            concurrency: 同时处理的任务数量
+            poll_interval: 队列为空但其他消费者还有未确认的任务时，再次领取的间隔时间
+        """
+        self.work_queue = work_queue
+        self._handlers = handlers
+        self._concurrency = max(1, concurrency)
+        self._poll_interval = poll_interval
+
+    async def run_until_drained(self) -> None:
+        """
+        持续消费，直到队列中既没有待领取的任务，也没有被领取未确认的任务
+        其他消费者处理任务时可能产生新任务，或者因为宕机导致租约超时重新投递，所以不能在本地领取不到任务时就退出
+        Returns:
+
+        """
+        await asyncio.gather(*[self._consume() for _ in range(self._concurrency)])
+
+    async def _consume(self) -> None:
+        while True:
+            item = await self.work_queue.lease()
+            if item is None:
+                if await self.work_queue.is_drained():
+                    return
+                await asyncio.sleep(self._poll_interval)
+                continue
+            await self.process_item(item)
+
+    async def process_item(self, item: WorkItem) -> None:
+        """
+        处理一个任务，处理期间定时续租，成功后确认，失败后退回
+        Args:
+            item: 领取到的任务
+
+        Returns:
+
+        """
+        handler: Optional[WorkItemHandler] = self._handlers.get(item.kind)
+        if handler is None:
+            utils.logger.error(f"[WorkQueueWorker] unknown work item kind: {item.kind}, item: {item.id}")
+            await self.work_queue.nack(item, f"unknown work item kind: {item.kind}", dead_letter=True)
+            return
+
+        keep_lease_task = asyncio.create_task(self._keep_lease(item))
+        try:
+            await handler(item)
+        except asyncio.CancelledError:
+            # 爬虫任务被取消，马上退回任务让其他消费者领取，不用等租约过期
+            await asyncio.shield(self.work_queue.nack(item, "cancelled"))
+            raise
+        except Exception as e:
+            utils.logger.error(
+                f"[WorkQueueWorker] process work item {item.id} error (attempts: {item.attempts}): {e!r}"
+            )
+            await self.work_queue.nack(item, repr(e))
+            return
+        finally:
+            keep_lease_task.cancel()
+        if not await self.work_queue.ack(item):
+            utils.logger.warning(
+                f"[WorkQueueWorker] lease of work item {item.id} expired before ack, it may be processed again"
+            )
+
+    async def _keep_lease(self, item: WorkItem) -> None:
+        while True:
+            await asyncio.sleep(self.work_queue.lease_seconds / 3)
+            if not await self.work_queue.extend_lease(item):
+                return
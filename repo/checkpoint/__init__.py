@@ -1,23 +1,29 @@
-from config import CHECKPOINT_STORAGE_TYPE
+from typing import Optional
+
+import config
+
 from .checkpoint_store import (
     CheckpointJsonFileRepo,
     CheckpointRedisRepo,
     CheckpointRepoManager,
+    generate_checkpoint_id,
+    generate_shard_checkpoint_id,
 )
 
 
 def create_checkpoint_manager(
-    storage_type: str = CHECKPOINT_STORAGE_TYPE, **kwargs
+    storage_type: Optional[str] = None, **kwargs
 ) -> CheckpointRepoManager:
     """创建检查点管理器的工厂函数
 
     Args:
-        storage_type (str): 存储类型，支持 "file" 或 "redis"
+        storage_type (str): 存储类型，支持 "file" 或 "redis"，为空时读取配置 CHECKPOINT_STORAGE_TYPE
         **kwargs: 额外的参数传递给对应的存储库构造函数
 
     Returns:
         CheckpointRepoManager: 检查点管理器实例
     """
+    storage_type = storage_type or config.CHECKPOINT_STORAGE_TYPE
     if storage_type.lower() == "redis":
         repo = CheckpointRedisRepo(**kwargs)
     elif storage_type.lower() == "file":
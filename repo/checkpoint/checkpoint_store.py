@@ -3,9 +3,10 @@ import os
 import sys
 from abc import abstractmethod, ABC
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 import pathlib
 import json
+import re
 import time
 from datetime import datetime
 
@@ -17,7 +18,7 @@ sys.path.append(parent_dir)
 
 
 import config
-from model.m_checkpoint import Checkpoint, CheckpointNote
+from model.m_checkpoint import Checkpoint, CheckpointNote, CheckpointSearchKeyword
 from pkg.cache.abs_cache import AbstractCache
 from pkg.cache.cache_factory import CacheFactory
 
@@ -37,6 +38,29 @@ def generate_checkpoint_id(platform: str, mode: str) -> str:
     return f"{platform}_{mode}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
 
 
+def generate_shard_checkpoint_id(checkpoint_id: str, shard_index: int, shard_count: int) -> str:
+    """生成多进程模式下分片的检查点ID，同一个任务ID、相同的分片数重新运行时得到相同的分片检查点ID
+
+    Args:
+        checkpoint_id (str): 整个任务的检查点ID
+        shard_index (int): 分片序号
+        shard_count (int): 分片数量
+
+    Returns:
+        str: 格式为checkpoint_id_shard{序号}of{分片数量}，如xhs_search_20250617183823_shard0of4
+    """
+    return f"{checkpoint_id}_shard{shard_index}of{shard_count}"
+
+
+def is_shard_checkpoint_id(checkpoint_id: str) -> bool:
+    """是否是多进程模式下分片的检查点ID，加载最新的检查点时不考虑分片的检查点
+
+    Args:
+        checkpoint_id (str): 检查点ID
+    """
+    return re.search(r"_shard\d+of\d+$", checkpoint_id) is not None
+
+
 class BaseCheckpointRepo(ABC):
     @abstractmethod
     async def save_checkpoint(self, checkpoint: Checkpoint) -> Checkpoint:
@@ -128,7 +152,11 @@ class CheckpointJsonFileRepo(BaseCheckpointRepo):
         """
         if not checkpoint_id:
             # 模糊查询，获取最新的检查点
-            checkpoint_files = list(self.cache_dir.glob(f"{platform}_{mode}*.json"))
+            checkpoint_files = [
+                checkpoint_file
+                for checkpoint_file in self.cache_dir.glob(f"{platform}_{mode}*.json")
+                if not is_shard_checkpoint_id(checkpoint_file.stem)
+            ]
             if not checkpoint_files:
                 return None
             checkpoint_file = max(checkpoint_files, key=lambda x: x.stat().st_mtime)
@@ -267,6 +295,8 @@ class CheckpointRedisRepo(BaseCheckpointRepo):
                 for key in keys:
                     # 从key中提取id
                     checkpoint_id_from_key = key.split(":")[-1]
+                    if is_shard_checkpoint_id(checkpoint_id_from_key):
+                        continue
                     timestamp_key = self._get_timestamp_key(checkpoint_id_from_key)
                     timestamp = self.redis_cache_client.get(timestamp_key)
 
@@ -338,6 +368,12 @@ class CheckpointRepoManager:
     def __init__(self, checkpoint_repo: BaseCheckpointRepo):
         self.checkpoint_repo = checkpoint_repo
         self.crawler_note_lock = asyncio.Lock()
+        # (检查点ID, 帖子ID) -> 一级评论ID -> (二级评论游标, 是否已爬完)，还没有写入检查点的二级评论进度
+        self._pending_sub_comment_progress: Dict[
+            Tuple[str, str], Dict[str, Tuple[str, bool]]
+        ] = {}
+        # (检查点ID, 帖子ID) -> (缓存的二级评论页数, 最早一页缓存的时间)
+        self._pending_sub_comment_pages: Dict[Tuple[str, str], Tuple[int, float]] = {}
 
     async def save_checkpoint(self, checkpoint: Checkpoint) -> Checkpoint:
         """保存检查点
@@ -346,7 +382,11 @@ class CheckpointRepoManager:
             checkpoint (Checkpoint): 检查点
         """
         if checkpoint.id is None:
-            checkpoint.id = generate_checkpoint_id(checkpoint.platform, checkpoint.mode)
+            # 多进程模式下分片的检查点ID由主进程指定，首次运行时也使用该ID，重新运行时才能找到
+            if is_shard_checkpoint_id(config.SPECIFIED_CHECKPOINT_ID):
+                checkpoint.id = config.SPECIFIED_CHECKPOINT_ID
+            else:
+                checkpoint.id = generate_checkpoint_id(checkpoint.platform, checkpoint.mode)
 
         await self.checkpoint_repo.save_checkpoint(checkpoint)
         return await self.load_checkpoint(
@@ -364,6 +404,116 @@ class CheckpointRepoManager:
             checkpoint.platform, checkpoint.mode, checkpoint.id
         )
 
+    async def update_checkpoint_fields(
+        self, checkpoint_id: str, **fields: Any
+    ) -> Optional[Checkpoint]:
+        """协程安全地更新检查点的部分字段（如搜索页码），避免和帖子状态的并发更新互相覆盖
+
+        Args:
+            checkpoint_id (str): 检查点ID
+            **fields: 需要更新的检查点字段
+        """
+        async with self.crawler_note_lock:
+            checkpoint = await self.load_checkpoint_by_id(checkpoint_id)
+            if checkpoint is None:
+                logger.error(f"检查点不存在: {checkpoint_id}")
+                return None
+
+            for field_name, field_value in fields.items():
+                setattr(checkpoint, field_name, field_value)
+            return await self.update_checkpoint(checkpoint)
+
+    @staticmethod
+    def has_search_keyword_progress(
+        checkpoint: Checkpoint, keyword_list: List[str]
+    ) -> bool:
+        """检查点中是否有当前关键词列表的搜索进度（关键词游标或者旧版本的单关键词进度）
+
+        Args:
+            checkpoint (Checkpoint): 检查点
+            keyword_list (List[str]): 关键词列表
+        """
+        search_keyword_cursors = checkpoint.search_keyword_cursors or {}
+        return any(
+            keyword in search_keyword_cursors
+            or keyword == checkpoint.current_search_keyword
+            for keyword in keyword_list
+        )
+
+    async def init_search_keyword_cursors(
+        self, checkpoint: Checkpoint, keyword_list: List[str]
+    ) -> Checkpoint:
+        """初始化每个关键词的搜索游标并保存检查点
+        旧版本的检查点只记录了当前关键词和页码，按关键词顺序迁移：之前的关键词视为已完成，当前关键词从记录的页码继续
+
+        Args:
+            checkpoint (Checkpoint): 检查点
+            keyword_list (List[str]): 关键词列表
+        """
+        if checkpoint.search_keyword_cursors is None:
+            checkpoint.search_keyword_cursors = {}
+
+        if (
+            not checkpoint.search_keyword_cursors
+            and checkpoint.current_search_keyword in keyword_list
+        ):
+            legacy_keyword_index = keyword_list.index(checkpoint.current_search_keyword)
+            for keyword in keyword_list[:legacy_keyword_index]:
+                checkpoint.search_keyword_cursors[keyword] = CheckpointSearchKeyword(
+                    keyword=keyword, is_finished=True
+                )
+            checkpoint.search_keyword_cursors[checkpoint.current_search_keyword] = (
+                CheckpointSearchKeyword(
+                    keyword=checkpoint.current_search_keyword,
+                    current_search_page=checkpoint.current_search_page or 1,
+                    current_search_id=checkpoint.current_search_id,
+                )
+            )
+
+        for keyword in keyword_list:
+            if keyword not in checkpoint.search_keyword_cursors:
+                checkpoint.search_keyword_cursors[keyword] = CheckpointSearchKeyword(
+                    keyword=keyword
+                )
+
+        return await self.save_checkpoint(checkpoint)
+
+    async def update_search_keyword_cursor(
+        self,
+        checkpoint_id: str,
+        keyword: str,
+        current_search_page: Optional[int] = None,
+        current_search_id: Optional[str] = None,
+        is_finished: Optional[bool] = None,
+    ) -> Optional[Checkpoint]:
+        """协程安全地更新某个关键词的搜索游标
+
+        Args:
+            checkpoint_id (str): 检查点ID
+            keyword (str): 搜索关键词
+            current_search_page (Optional[int]): 下一次要搜索的页码
+            current_search_id (Optional[str]): 搜索ID
+            is_finished (Optional[bool]): 关键词是否已经搜索完成
+        """
+        async with self.crawler_note_lock:
+            checkpoint = await self.load_checkpoint_by_id(checkpoint_id)
+            if checkpoint is None:
+                logger.error(f"检查点不存在: {checkpoint_id}")
+                return None
+
+            if checkpoint.search_keyword_cursors is None:
+                checkpoint.search_keyword_cursors = {}
+            cursor = checkpoint.search_keyword_cursors.setdefault(
+                keyword, CheckpointSearchKeyword(keyword=keyword)
+            )
+            if current_search_page is not None:
+                cursor.current_search_page = current_search_page
+            if current_search_id is not None:
+                cursor.current_search_id = current_search_id
+            if is_finished is not None:
+                cursor.is_finished = is_finished
+            return await self.update_checkpoint(checkpoint)
+
     async def add_note_to_checkpoint(
         self,
         checkpoint_id: str,
@@ -422,7 +572,7 @@ class CheckpointRepoManager:
             is_success_crawled (bool): 是否成功爬取
             is_success_crawled_comments (bool): 是否成功爬取评论
             current_note_comment_cursor (Optional[str]): 当前帖子评论游标
-            extra_params_info (Optional[Dict[str, Any]]): 额外参数信息
+            extra_params_info (Optional[Dict[str, Any]]): 额外参数信息，合并到已有的额外参数信息中
         """
         async with self.crawler_note_lock:
             checkpoint = await self.load_checkpoint_by_id(checkpoint_id)
@@ -436,7 +586,10 @@ class CheckpointRepoManager:
                     note.is_success_crawled_comments = is_success_crawled_comments
                     note.current_note_comment_cursor = current_note_comment_cursor
                     if extra_params_info:
-                        note.extra_params_info = extra_params_info
+                        note.extra_params_info = {
+                            **(note.extra_params_info or {}),
+                            **extra_params_info,
+                        }
                     break
 
             await self.update_checkpoint(checkpoint)
@@ -583,11 +736,123 @@ class CheckpointRepoManager:
                 logger.error(f"检查点不存在: {checkpoint_id}")
                 return False
 
+            pending = self._pending_sub_comment_progress.pop((checkpoint_id, note_id), None)
+            self._pending_sub_comment_pages.pop((checkpoint_id, note_id), None)
             for note in checkpoint.crawled_note_list:
                 if note.note_id == note_id:
+                    if note.current_note_comment_cursor != comment_cursor:
+                        # 一级评论翻到了下一页，上一页的二级评论进度不再需要
+                        note.sub_comment_cursors = {}
+                        note.completed_root_comment_ids = []
+                    elif pending:
+                        # 同一页的二级评论进度随评论游标一起写入
+                        self._apply_sub_comment_progress(note, pending)
                     note.current_note_comment_cursor = comment_cursor
                     note.is_success_crawled_comments = is_success_crawled_comments
                     break
 
             await self.update_checkpoint(checkpoint)
             return True
+
+    async def get_note_sub_comment_progress(
+        self, checkpoint_id: str, note_id: str
+    ) -> Tuple[Dict[str, str], Set[str]]:
+        """获取帖子当前一级评论页的二级评论进度
+
+        Args:
+            checkpoint_id (str): 检查点ID
+            note_id (str): 帖子ID
+
+        Returns:
+            Tuple[Dict[str, str], Set[str]]: 未爬完的一级评论ID -> 二级评论游标，二级评论已爬完的一级评论ID
+        """
+        sub_comment_cursors, completed_root_comment_ids = {}, set()
+        note = await self.get_note_info_from_checkpont(checkpoint_id, note_id)
+        if note is not None:
+            sub_comment_cursors = dict(note.sub_comment_cursors)
+            completed_root_comment_ids = set(note.completed_root_comment_ids)
+
+        # 合并还没有写入检查点的进度
+        pending = self._pending_sub_comment_progress.get((checkpoint_id, note_id), {})
+        for root_comment_id, (sub_comment_cursor, is_finished) in pending.items():
+            if is_finished:
+                sub_comment_cursors.pop(root_comment_id, None)
+                completed_root_comment_ids.add(root_comment_id)
+            else:
+                sub_comment_cursors[root_comment_id] = sub_comment_cursor
+        return sub_comment_cursors, completed_root_comment_ids
+
+    async def update_note_sub_comment_progress(
+        self,
+        checkpoint_id: str,
+        note_id: str,
+        root_comment_id: str,
+        sub_comment_cursor: str,
+        is_finished: bool = False,
+    ) -> bool:
+        """更新一级评论下的二级评论游标，二级评论爬完后把该一级评论加入已完成集合
+        二级评论每翻一页都会调用，游标先记在内存中，一级评论的二级评论爬完、保存评论游标，
+        或者缓存的页数、时间达到 CHECKPOINT_SUB_COMMENT_FLUSH_PAGES、CHECKPOINT_SUB_COMMENT_FLUSH_SECONDS 时，
+        才把该帖子积攒的进度一次写入检查点，很长的二级评论中途崩溃时也只需要重爬最近的几页
+
+        Args:
+            checkpoint_id (str): 检查点ID
+            note_id (str): 帖子ID
+            root_comment_id (str): 一级评论ID
+            sub_comment_cursor (str): 下一页二级评论的游标
+            is_finished (bool): 该一级评论下的二级评论是否已经爬完
+        """
+        pending_key = (checkpoint_id, note_id)
+        pending = self._pending_sub_comment_progress.setdefault(pending_key, {})
+        pending[root_comment_id] = (sub_comment_cursor, is_finished)
+        page_count, first_page_at = self._pending_sub_comment_pages.get(
+            pending_key, (0, time.monotonic())
+        )
+        page_count += 1
+        self._pending_sub_comment_pages[pending_key] = (page_count, first_page_at)
+        if (
+            not is_finished
+            and page_count < config.CHECKPOINT_SUB_COMMENT_FLUSH_PAGES
+            and time.monotonic() - first_page_at < config.CHECKPOINT_SUB_COMMENT_FLUSH_SECONDS
+        ):
+            return True
+        return await self.flush_note_sub_comment_progress(checkpoint_id, note_id)
+
+    async def flush_note_sub_comment_progress(self, checkpoint_id: str, note_id: str) -> bool:
+        """把帖子还没有写入检查点的二级评论进度写入检查点
+
+        Args:
+            checkpoint_id (str): 检查点ID
+            note_id (str): 帖子ID
+        """
+        async with self.crawler_note_lock:
+            pending = self._pending_sub_comment_progress.pop((checkpoint_id, note_id), None)
+            self._pending_sub_comment_pages.pop((checkpoint_id, note_id), None)
+            if not pending:
+                return True
+
+            checkpoint = await self.load_checkpoint_by_id(checkpoint_id)
+            if checkpoint is None or checkpoint.crawled_note_list is None:
+                return False
+
+            for note in checkpoint.crawled_note_list:
+                if note.note_id == note_id:
+                    self._apply_sub_comment_progress(note, pending)
+                    break
+            else:
+                return False
+
+            await self.update_checkpoint(checkpoint)
+            return True
+
+    @staticmethod
+    def _apply_sub_comment_progress(
+        note: CheckpointNote, pending: Dict[str, Tuple[str, bool]]
+    ) -> None:
+        for root_comment_id, (sub_comment_cursor, is_finished) in pending.items():
+            if is_finished:
+                note.sub_comment_cursors.pop(root_comment_id, None)
+                if root_comment_id not in note.completed_root_comment_ids:
+                    note.completed_root_comment_ids.append(root_comment_id)
+            else:
+                note.sub_comment_cursors[root_comment_id] = sub_comment_cursor
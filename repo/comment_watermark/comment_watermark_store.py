@@ -0,0 +1,210 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 评论水位存储，记录每个帖子已保存的最新一级评论，支持 sqlite（单机）和 redis
+import asyncio
+import pathlib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Sequence, Tuple
+
+from model.m_comment_watermark import CommentWatermark
+
+
+def get_comment_timestamp(comment: Any) -> int:
+    """获取评论的时间戳，各平台的评论模型使用 create_time 或 publish_time
+
+    Args:
+        comment (Any): 评论模型
+
+    Returns:
+        int: 时间戳，无法解析时返回 0
+    """
+    comment_time = getattr(comment, "create_time", None) or getattr(
+        comment, "publish_time", None
+    )
+    try:
+        return int(comment_time or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def filter_new_comments(
+    watermark: Optional[CommentWatermark], comments: Sequence[Any]
+) -> Tuple[List[Any], bool]:
+    """过滤出一页按时间倒序返回的评论中比水位新的评论
+
+    置顶或热门评论可能出现在页面的开头，所以用这一页的最后一条（最旧的）评论判断是否已经翻到了已保存的评论
+
+    Args:
+        watermark (Optional[CommentWatermark]): 帖子评论水位，为空表示帖子还没有保存过评论
+        comments (Sequence[Any]): 一页评论
+
+    Returns:
+        Tuple[List[Any], bool]: 比水位新的评论，是否已经翻到已保存的评论（可以停止翻页）
+    """
+    if watermark is None or not watermark.newest_comment_id:
+        return list(comments), False
+
+    def is_new_comment(comment: Any) -> bool:
+        if comment.comment_id == watermark.newest_comment_id:
+            return False
+        # 同一秒内的其他评论也当作新评论，重复保存是幂等的
+        return get_comment_timestamp(comment) >= watermark.newest_comment_time
+
+    new_comments = [comment for comment in comments if is_new_comment(comment)]
+    reached_watermark = bool(comments) and not is_new_comment(comments[-1])
+    return new_comments, reached_watermark
+
+
+def advance_watermark(
+    watermark: Optional[CommentWatermark],
+    platform: str,
+    note_id: str,
+    comments: Sequence[Any],
+) -> Optional[CommentWatermark]:
+    """用新保存的评论推进水位
+
+    Args:
+        watermark (Optional[CommentWatermark]): 当前水位
+        platform (str): 平台名称
+        note_id (str): 帖子ID
+        comments (Sequence[Any]): 新保存的一级评论
+
+    Returns:
+        Optional[CommentWatermark]: 推进后的水位，没有评论时返回原水位
+    """
+    for comment in comments:
+        comment_time = get_comment_timestamp(comment)
+        if watermark is None:
+            watermark = CommentWatermark(platform=platform, note_id=note_id)
+        if not watermark.newest_comment_id or comment_time > watermark.newest_comment_time:
+            watermark.newest_comment_id = comment.comment_id
+            watermark.newest_comment_time = comment_time
+    return watermark
+
+
+class BaseCommentWatermarkRepo(ABC):
+    @abstractmethod
+    async def load_watermark(self, platform: str, note_id: str) -> Optional[CommentWatermark]:
+        """加载帖子评论水位
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+
+        Returns:
+            Optional[CommentWatermark]: 水位，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def save_watermark(self, watermark: CommentWatermark) -> CommentWatermark:
+        """保存帖子评论水位
+
+        Args:
+            watermark (CommentWatermark): 水位
+
+        Returns:
+            CommentWatermark: 保存后的水位
+        """
+        pass
+
+
+class CommentWatermarkSqliteRepo(BaseCommentWatermarkRepo):
+    """基于 sqlite 的评论水位存储库，单机运行时使用"""
+
+    def __init__(self, db_path: str = "data/comment_watermark/comment_watermarks.db"):
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # sqlite 的读写放到线程池中执行，避免阻塞事件循环，连接由锁保护
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comment_watermarks ("
+                "platform TEXT NOT NULL, note_id TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (platform, note_id))"
+            )
+            self._conn.commit()
+
+    def _load_watermark(self, platform: str, note_id: str) -> Optional[CommentWatermark]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM comment_watermarks WHERE platform = ? AND note_id = ?",
+                (platform, note_id),
+            ).fetchone()
+        return CommentWatermark.model_validate_json(row[0]) if row else None
+
+    def _save_watermark(self, watermark: CommentWatermark) -> CommentWatermark:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO comment_watermarks (platform, note_id, data) VALUES (?, ?, ?)",
+                (watermark.platform, watermark.note_id, watermark.model_dump_json()),
+            )
+            self._conn.commit()
+        return watermark
+
+    async def load_watermark(self, platform: str, note_id: str) -> Optional[CommentWatermark]:
+        return await asyncio.to_thread(self._load_watermark, platform, note_id)
+
+    async def save_watermark(self, watermark: CommentWatermark) -> CommentWatermark:
+        return await asyncio.to_thread(self._save_watermark, watermark)
+
+
+class CommentWatermarkRedisRepo(BaseCommentWatermarkRepo):
+    """基于 redis 的评论水位存储库，每个平台的水位保存在一个 hash 中，多台机器共享"""
+
+    def __init__(self, key_prefix: str = "comment_watermark"):
+        from pkg.cache.redis_cache import get_redis_client
+
+        self._redis_client = get_redis_client()
+        self._key_prefix = key_prefix
+
+    def _get_key(self, platform: str) -> str:
+        return f"{self._key_prefix}:{platform}"
+
+    async def load_watermark(self, platform: str, note_id: str) -> Optional[CommentWatermark]:
+        data = self._redis_client.hget(self._get_key(platform), note_id)
+        return CommentWatermark.model_validate_json(data) if data else None
+
+    async def save_watermark(self, watermark: CommentWatermark) -> CommentWatermark:
+        self._redis_client.hset(
+            self._get_key(watermark.platform), watermark.note_id, watermark.model_dump_json()
+        )
+        return watermark
+
+
+class CommentWatermarkRepoManager:
+    def __init__(self, comment_watermark_repo: BaseCommentWatermarkRepo):
+        self.comment_watermark_repo = comment_watermark_repo
+
+    async def load_watermark(self, platform: str, note_id: str) -> Optional[CommentWatermark]:
+        """加载帖子评论水位
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+        """
+        return await self.comment_watermark_repo.load_watermark(platform, note_id)
+
+    async def save_watermark(self, watermark: Optional[CommentWatermark]) -> None:
+        """保存帖子评论水位，一个帖子的评论全部爬取完成后调用
+
+        Args:
+            watermark (Optional[CommentWatermark]): 水位，为空时不保存
+        """
+        if watermark is None or not watermark.newest_comment_id:
+            return
+        watermark.updated_at = time.time()
+        await self.comment_watermark_repo.save_watermark(watermark)
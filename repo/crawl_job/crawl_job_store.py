@@ -0,0 +1,325 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 爬虫守护进程的持久化任务队列，支持 sqlite（单机）和 redis
+import asyncio
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from model.m_crawl_job import CrawlJob, CrawlJobStatus
+
+logger = logging.getLogger(__name__)
+
+# 已经结束的任务状态
+FINISHED_JOB_STATUSES = (
+    CrawlJobStatus.SUCCEEDED,
+    CrawlJobStatus.FAILED,
+    CrawlJobStatus.CANCELLED,
+)
+
+
+def generate_crawl_job_id(platform: str, crawler_type: str) -> str:
+    """生成任务ID
+
+    Args:
+        platform (str): 平台
+        crawler_type (str): 爬取类型
+
+    Returns:
+        str: 格式为platform_type_YYYYMMDDHHMMSS_随机串，如xhs_search_20250617183823_1a2b3c
+    """
+    return f"{platform}_{crawler_type}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+class BaseCrawlJobRepo(ABC):
+    @abstractmethod
+    async def add_job(self, job: CrawlJob) -> CrawlJob:
+        """保存任务并放入待运行队列
+
+        Args:
+            job (CrawlJob): 状态为 pending 的任务
+
+        Returns:
+            CrawlJob: 保存后的任务
+        """
+        pass
+
+    @abstractmethod
+    async def update_job(self, job: CrawlJob) -> CrawlJob:
+        """更新任务
+
+        Args:
+            job (CrawlJob): 任务
+
+        Returns:
+            CrawlJob: 更新后的任务
+        """
+        pass
+
+    @abstractmethod
+    async def load_job(self, job_id: str) -> Optional[CrawlJob]:
+        """加载任务
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            Optional[CrawlJob]: 任务，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def list_jobs(self, limit: int = 50) -> List[CrawlJob]:
+        """按创建时间倒序列出任务
+
+        Args:
+            limit (int): 最多返回的任务数量
+        """
+        pass
+
+    @abstractmethod
+    async def claim_next_job(self) -> Optional[CrawlJob]:
+        """原子地领取最早提交的待运行任务，并把任务状态改为 running
+
+        Returns:
+            Optional[CrawlJob]: 领取到的任务，没有待运行任务时返回 None
+        """
+        pass
+
+
+class CrawlJobSqliteRepo(BaseCrawlJobRepo):
+    """基于 sqlite 的任务存储库，单机运行守护进程时使用"""
+
+    def __init__(self, db_path: str = "data/daemon/crawl_jobs.db"):
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # sqlite 的读写放到线程池中执行，避免阻塞事件循环，连接由锁保护
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS crawl_jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_crawl_jobs_status ON crawl_jobs (status, created_at)"
+            )
+            self._conn.commit()
+
+    def _save_job(self, job: CrawlJob) -> CrawlJob:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crawl_jobs (id, status, created_at, data) VALUES (?, ?, ?, ?)",
+                (job.id, job.status.value, job.created_at, job.model_dump_json()),
+            )
+            self._conn.commit()
+        return job
+
+    def _load_job(self, job_id: str) -> Optional[CrawlJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM crawl_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return CrawlJob.model_validate_json(row[0]) if row else None
+
+    def _list_jobs(self, limit: int) -> List[CrawlJob]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM crawl_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [CrawlJob.model_validate_json(row[0]) for row in rows]
+
+    def _claim_next_job(self) -> Optional[CrawlJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM crawl_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (CrawlJobStatus.PENDING.value,),
+            ).fetchone()
+            if row is None:
+                return None
+            job = CrawlJob.model_validate_json(row[0])
+            job.status = CrawlJobStatus.RUNNING
+            job.started_at = time.time()
+            self._conn.execute(
+                "UPDATE crawl_jobs SET status = ?, data = ? WHERE id = ?",
+                (job.status.value, job.model_dump_json(), job.id),
+            )
+            self._conn.commit()
+        return job
+
+    async def add_job(self, job: CrawlJob) -> CrawlJob:
+        return await asyncio.to_thread(self._save_job, job)
+
+    async def update_job(self, job: CrawlJob) -> CrawlJob:
+        return await asyncio.to_thread(self._save_job, job)
+
+    async def load_job(self, job_id: str) -> Optional[CrawlJob]:
+        return await asyncio.to_thread(self._load_job, job_id)
+
+    async def list_jobs(self, limit: int = 50) -> List[CrawlJob]:
+        return await asyncio.to_thread(self._list_jobs, limit)
+
+    async def claim_next_job(self) -> Optional[CrawlJob]:
+        return await asyncio.to_thread(self._claim_next_job)
+
+
+class CrawlJobRedisRepo(BaseCrawlJobRepo):
+    """基于 redis 的任务存储库，任务保存在 hash 中，待运行的任务ID保存在 list 中"""
+
+    def __init__(self, key_prefix: str = "crawl_job"):
+        from pkg.cache.redis_cache import get_redis_client
+
+        self._redis_client = get_redis_client()
+        self._jobs_key = f"{key_prefix}:jobs"
+        self._pending_key = f"{key_prefix}:pending"
+
+    async def add_job(self, job: CrawlJob) -> CrawlJob:
+        pipe = self._redis_client.pipeline()
+        pipe.hset(self._jobs_key, job.id, job.model_dump_json())
+        pipe.rpush(self._pending_key, job.id)
+        pipe.execute()
+        return job
+
+    async def update_job(self, job: CrawlJob) -> CrawlJob:
+        self._redis_client.hset(self._jobs_key, job.id, job.model_dump_json())
+        return job
+
+    async def load_job(self, job_id: str) -> Optional[CrawlJob]:
+        data = self._redis_client.hget(self._jobs_key, job_id)
+        return CrawlJob.model_validate_json(data) if data else None
+
+    async def list_jobs(self, limit: int = 50) -> List[CrawlJob]:
+        jobs = [
+            CrawlJob.model_validate_json(data)
+            for data in self._redis_client.hvals(self._jobs_key)
+        ]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return jobs[:limit]
+
+    async def claim_next_job(self) -> Optional[CrawlJob]:
+        while True:
+            job_id = self._redis_client.lpop(self._pending_key)
+            if job_id is None:
+                return None
+            job = await self.load_job(job_id.decode())
+            # 排队期间被取消的任务直接跳过
+            if job is None or job.status != CrawlJobStatus.PENDING:
+                continue
+            job.status = CrawlJobStatus.RUNNING
+            job.started_at = time.time()
+            return await self.update_job(job)
+
+
+class CrawlJobRepoManager:
+    def __init__(self, crawl_job_repo: BaseCrawlJobRepo):
+        self.crawl_job_repo = crawl_job_repo
+
+    async def submit_job(self, job: CrawlJob) -> CrawlJob:
+        """提交任务
+
+        Args:
+            job (CrawlJob): 任务
+        """
+        if job.id is None:
+            job.id = generate_crawl_job_id(job.platform, job.crawler_type)
+        job.status = CrawlJobStatus.PENDING
+        job.created_at = time.time()
+        return await self.crawl_job_repo.add_job(job)
+
+    async def claim_next_job(self) -> Optional[CrawlJob]:
+        """领取下一个待运行的任务"""
+        return await self.crawl_job_repo.claim_next_job()
+
+    async def load_job(self, job_id: str) -> Optional[CrawlJob]:
+        """加载任务
+
+        Args:
+            job_id (str): 任务ID
+        """
+        return await self.crawl_job_repo.load_job(job_id)
+
+    async def list_jobs(self, limit: int = 50) -> List[CrawlJob]:
+        """列出最近的任务
+
+        Args:
+            limit (int): 最多返回的任务数量
+        """
+        return await self.crawl_job_repo.list_jobs(limit)
+
+    async def cancel_job(self, job_id: str) -> Optional[CrawlJob]:
+        """取消任务，排队中的任务直接取消，运行中的任务标记取消请求，由守护进程停止
+
+        Args:
+            job_id (str): 任务ID
+        """
+        job = await self.load_job(job_id)
+        if job is None or job.status in FINISHED_JOB_STATUSES:
+            return job
+
+        if job.status == CrawlJobStatus.PENDING:
+            job.status = CrawlJobStatus.CANCELLED
+            job.finished_at = time.time()
+        else:
+            job.cancel_requested = True
+        return await self.crawl_job_repo.update_job(job)
+
+    async def finish_job(
+        self,
+        job: CrawlJob,
+        status: CrawlJobStatus,
+        error: Optional[str] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> CrawlJob:
+        """记录任务运行结果
+
+        Args:
+            job (CrawlJob): 任务
+            status (CrawlJobStatus): 结束状态
+            error (Optional[str]): 失败原因
+            stats (Optional[Dict[str, int]]): 任务的运行统计
+        """
+        # 运行期间可能有取消请求写入，先加载最新的任务再更新
+        job = await self.load_job(job.id) or job
+        job.status = status
+        job.error = error
+        if stats is not None:
+            job.stats = stats
+        job.finished_at = time.time()
+        return await self.crawl_job_repo.update_job(job)
+
+    async def requeue_interrupted_jobs(self, running_job_ids: List[str]) -> int:
+        """守护进程重启后，把上次异常退出时还在运行的任务重新放回队列（配合断点续爬继续爬取）
+
+        Args:
+            running_job_ids (List[str]): 当前进程正在运行的任务ID，这些任务不处理
+
+        Returns:
+            int: 重新入队的任务数量
+        """
+        requeued_count = 0
+        for job in await self.list_jobs(limit=1000):
+            if job.status != CrawlJobStatus.RUNNING or job.id in running_job_ids:
+                continue
+            if job.cancel_requested:
+                await self.finish_job(job, CrawlJobStatus.CANCELLED)
+                continue
+            job.status = CrawlJobStatus.PENDING
+            job.started_at = None
+            await self.crawl_job_repo.add_job(job)
+            requeued_count += 1
+        return requeued_count
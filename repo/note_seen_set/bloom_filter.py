@@ -0,0 +1,53 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 布隆过滤器，判断帖子是否爬取过，不存在时一定返回 False，存在时可能误判，需要再精确确认
+import hashlib
+import math
+from typing import List
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        bloom filter constructor
+        Args:
+            capacity: 预计保存的元素数量
+            error_rate: 元素数量达到 capacity 时的误判率
+        """
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def get_positions(self, key: str) -> List[int]:
+        """
+        计算元素对应的比特位，用两个哈希值组合出 num_hashes 个哈希值（Kirsch-Mitzenmacher）
+        Args:
+            key: 元素
+
+        Returns:
+            List[int]: 比特位
+        """
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        hash1 = int.from_bytes(digest[:8], "little")
+        hash2 = int.from_bytes(digest[8:], "little") | 1
+        return [(hash1 + i * hash2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self.get_positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self.get_positions(key)
+        )
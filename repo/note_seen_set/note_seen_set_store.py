@@ -0,0 +1,255 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 已爬取帖子集合，跨关键词、跨任务去重，先查布隆过滤器，命中后再精确确认，支持 sqlite（单机）和 redis
+import asyncio
+import pathlib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import partial
+from typing import Dict, Optional
+
+from model.m_note_seen import SeenNote
+from pkg.pipeline.note_completion import get_note_completion_records
+
+from .bloom_filter import BloomFilter
+
+
+class BaseNoteSeenSetRepo(ABC):
+    @abstractmethod
+    async def might_contain(self, platform: str, note_id: str) -> bool:
+        """查询布隆过滤器
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+
+        Returns:
+            bool: 返回 False 时帖子一定没有爬取过，返回 True 时需要精确确认
+        """
+        pass
+
+    @abstractmethod
+    async def load_seen_note(self, platform: str, note_id: str) -> Optional[SeenNote]:
+        """精确查询已爬取的帖子
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+
+        Returns:
+            Optional[SeenNote]: 已爬取的帖子，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def save_seen_note(self, seen_note: SeenNote) -> SeenNote:
+        """保存已爬取的帖子，同时加入布隆过滤器
+
+        Args:
+            seen_note (SeenNote): 已爬取的帖子
+
+        Returns:
+            SeenNote: 保存后的帖子
+        """
+        pass
+
+
+class NoteSeenSetSqliteRepo(BaseNoteSeenSetRepo):
+    """基于 sqlite 的已爬取帖子存储库，布隆过滤器保存在内存中，第一次查询某个平台时从数据库文件加载"""
+
+    def __init__(
+        self,
+        db_path: str = "data/note_seen_set/note_seen_set.db",
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+    ):
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # sqlite 的读写放到线程池中执行，避免阻塞事件循环，连接由锁保护
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._bloom_filters: Dict[str, BloomFilter] = {}
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_notes ("
+                "platform TEXT NOT NULL, note_id TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (platform, note_id))"
+            )
+            self._conn.commit()
+
+    def _get_bloom_filter(self, platform: str) -> BloomFilter:
+        with self._lock:
+            bloom_filter = self._bloom_filters.get(platform)
+            if bloom_filter is None:
+                bloom_filter = BloomFilter(self._capacity, self._error_rate)
+                for (note_id,) in self._conn.execute(
+                    "SELECT note_id FROM seen_notes WHERE platform = ?", (platform,)
+                ):
+                    bloom_filter.add(note_id)
+                self._bloom_filters[platform] = bloom_filter
+        return bloom_filter
+
+    def _might_contain(self, platform: str, note_id: str) -> bool:
+        return note_id in self._get_bloom_filter(platform)
+
+    def _load_seen_note(self, platform: str, note_id: str) -> Optional[SeenNote]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM seen_notes WHERE platform = ? AND note_id = ?",
+                (platform, note_id),
+            ).fetchone()
+        return SeenNote.model_validate_json(row[0]) if row else None
+
+    def _save_seen_note(self, seen_note: SeenNote) -> SeenNote:
+        bloom_filter = self._get_bloom_filter(seen_note.platform)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO seen_notes (platform, note_id, data) VALUES (?, ?, ?)",
+                (seen_note.platform, seen_note.note_id, seen_note.model_dump_json()),
+            )
+            self._conn.commit()
+            bloom_filter.add(seen_note.note_id)
+        return seen_note
+
+    async def might_contain(self, platform: str, note_id: str) -> bool:
+        bloom_filter = self._bloom_filters.get(platform)
+        if bloom_filter is not None:
+            # 布隆过滤器已经加载时直接在事件循环中查询，大部分没有爬取过的帖子不需要切换线程
+            return note_id in bloom_filter
+        return await asyncio.to_thread(self._might_contain, platform, note_id)
+
+    async def load_seen_note(self, platform: str, note_id: str) -> Optional[SeenNote]:
+        return await asyncio.to_thread(self._load_seen_note, platform, note_id)
+
+    async def save_seen_note(self, seen_note: SeenNote) -> SeenNote:
+        return await asyncio.to_thread(self._save_seen_note, seen_note)
+
+
+class NoteSeenSetRedisRepo(BaseNoteSeenSetRepo):
+    """基于 redis 的已爬取帖子存储库，布隆过滤器保存在 bitmap 中，帖子保存在 hash 中，多台机器共享"""
+
+    def __init__(
+        self,
+        key_prefix: str = "note_seen_set",
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+    ):
+        from pkg.cache.redis_cache import get_redis_client
+
+        self._redis_client = get_redis_client()
+        self._key_prefix = key_prefix
+        # 只用来计算比特位，比特位保存在 redis 中
+        self._bloom_filter = BloomFilter(capacity, error_rate)
+
+    def _get_notes_key(self, platform: str) -> str:
+        return f"{self._key_prefix}:{platform}:notes"
+
+    def _get_bloom_key(self, platform: str) -> str:
+        return f"{self._key_prefix}:{platform}:bloom"
+
+    async def might_contain(self, platform: str, note_id: str) -> bool:
+        bloom_key = self._get_bloom_key(platform)
+        pipe = self._redis_client.pipeline()
+        for position in self._bloom_filter.get_positions(note_id):
+            pipe.getbit(bloom_key, position)
+        return all(pipe.execute())
+
+    async def load_seen_note(self, platform: str, note_id: str) -> Optional[SeenNote]:
+        data = self._redis_client.hget(self._get_notes_key(platform), note_id)
+        return SeenNote.model_validate_json(data) if data else None
+
+    async def save_seen_note(self, seen_note: SeenNote) -> SeenNote:
+        bloom_key = self._get_bloom_key(seen_note.platform)
+        pipe = self._redis_client.pipeline()
+        pipe.hset(
+            self._get_notes_key(seen_note.platform),
+            seen_note.note_id,
+            seen_note.model_dump_json(),
+        )
+        for position in self._bloom_filter.get_positions(seen_note.note_id):
+            pipe.setbit(bloom_key, position, 1)
+        pipe.execute()
+        return seen_note
+
+
+class NoteSeenSetRepoManager:
+    def __init__(self, note_seen_set_repo: BaseNoteSeenSetRepo):
+        self.note_seen_set_repo = note_seen_set_repo
+        # 来源关键词是先读后写的，并发更新同一个帖子时加锁，避免后保存的覆盖先记录的关键词
+        self.note_seen_lock = asyncio.Lock()
+
+    async def check_seen_note(
+        self, platform: str, note_id: str, source_keyword: str = ""
+    ) -> bool:
+        """判断帖子是否已经爬取过，爬取过时只记录新的来源关键词
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+            source_keyword (str): 本次搜到帖子的关键词
+
+        Returns:
+            bool: 已经爬取过，可以跳过详情和评论的爬取
+        """
+        if not await self.note_seen_set_repo.might_contain(platform, note_id):
+            return False
+
+        async with self.note_seen_lock:
+            # 布隆过滤器可能误判，用精确查询确认
+            seen_note = await self.note_seen_set_repo.load_seen_note(platform, note_id)
+            if seen_note is None:
+                return False
+
+            if source_keyword and source_keyword not in seen_note.source_keywords:
+                seen_note.source_keywords.append(source_keyword)
+            seen_note.last_seen_at = time.time()
+            await self.note_seen_set_repo.save_seen_note(seen_note)
+            return True
+
+    async def mark_seen_note(
+        self, platform: str, note_id: str, source_keyword: str = ""
+    ) -> None:
+        """帖子详情和评论都爬取成功后加入已爬取集合
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+            source_keyword (str): 搜到帖子的关键词
+        """
+        async with self.note_seen_lock:
+            seen_note = await self.note_seen_set_repo.load_seen_note(platform, note_id)
+            if seen_note is None:
+                seen_note = SeenNote(platform=platform, note_id=note_id, first_seen_at=time.time())
+            if source_keyword and source_keyword not in seen_note.source_keywords:
+                seen_note.source_keywords.append(source_keyword)
+            seen_note.last_seen_at = time.time()
+            await self.note_seen_set_repo.save_seen_note(seen_note)
+
+    async def mark_seen_note_after_comments(
+        self, platform: str, note_id: str, source_keyword: str = ""
+    ) -> None:
+        """帖子详情保存后调用，等帖子的评论爬完后才加入已爬取集合，没有开启评论爬取时立即加入
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+            source_keyword (str): 搜到帖子的关键词
+        """
+        await get_note_completion_records().record_after_comments(
+            platform,
+            note_id,
+            partial(self.mark_seen_note, platform, note_id, source_keyword),
+        )
@@ -0,0 +1,56 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+from typing import Optional
+
+import config
+from .note_snapshot_store import (
+    BaseNoteSnapshotRepo,
+    NoteSnapshotRedisRepo,
+    NoteSnapshotRepoManager,
+    NoteSnapshotSqliteRepo,
+)
+
+_note_snapshot_manager: Optional[NoteSnapshotRepoManager] = None
+
+
+def create_note_snapshot_manager(
+    storage_type: str = "", **kwargs
+) -> NoteSnapshotRepoManager:
+    """创建帖子快照管理器的工厂函数
+
+    Args:
+        storage_type (str): 存储类型，支持 "sqlite" 或 "redis"，为空时读取配置 NOTE_SNAPSHOT_STORAGE_TYPE
+        **kwargs: 额外的参数传递给对应的存储库构造函数
+
+    Returns:
+        NoteSnapshotRepoManager: 帖子快照管理器实例
+    """
+    storage_type = storage_type or config.NOTE_SNAPSHOT_STORAGE_TYPE
+    if storage_type.lower() == "redis":
+        repo = NoteSnapshotRedisRepo(**kwargs)
+    elif storage_type.lower() == "sqlite":
+        repo = NoteSnapshotSqliteRepo(**kwargs)
+    else:
+        raise ValueError(f"不支持的存储类型: {storage_type}")
+
+    return NoteSnapshotRepoManager(repo)
+
+
+def get_note_snapshot_manager() -> NoteSnapshotRepoManager:
+    """获取进程内共享的帖子快照管理器，第一次使用时创建
+
+    Returns:
+        NoteSnapshotRepoManager: 帖子快照管理器实例
+    """
+    global _note_snapshot_manager
+    if _note_snapshot_manager is None:
+        _note_snapshot_manager = create_note_snapshot_manager()
+    return _note_snapshot_manager
@@ -0,0 +1,155 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 帖子列表元数据快照存储，再次爬取时跳过计数和更新时间都没有变化的帖子，支持 sqlite（单机）和 redis
+import asyncio
+import pathlib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from model.m_note_snapshot import NoteSnapshot
+
+
+class BaseNoteSnapshotRepo(ABC):
+    @abstractmethod
+    async def load_snapshot(self, platform: str, note_id: str) -> Optional[NoteSnapshot]:
+        """加载帖子快照
+
+        Args:
+            platform (str): 平台名称
+            note_id (str): 帖子ID
+
+        Returns:
+            Optional[NoteSnapshot]: 快照，不存在时返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def save_snapshot(self, snapshot: NoteSnapshot) -> NoteSnapshot:
+        """保存帖子快照
+
+        Args:
+            snapshot (NoteSnapshot): 快照
+
+        Returns:
+            NoteSnapshot: 保存后的快照
+        """
+        pass
+
+
+class NoteSnapshotSqliteRepo(BaseNoteSnapshotRepo):
+    """基于 sqlite 的帖子快照存储库，单机运行时使用"""
+
+    def __init__(self, db_path: str = "data/note_snapshot/note_snapshots.db"):
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # sqlite 的读写放到线程池中执行，避免阻塞事件循环，连接由锁保护
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS note_snapshots ("
+                "platform TEXT NOT NULL, note_id TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (platform, note_id))"
+            )
+            self._conn.commit()
+
+    def _load_snapshot(self, platform: str, note_id: str) -> Optional[NoteSnapshot]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM note_snapshots WHERE platform = ? AND note_id = ?",
+                (platform, note_id),
+            ).fetchone()
+        return NoteSnapshot.model_validate_json(row[0]) if row else None
+
+    def _save_snapshot(self, snapshot: NoteSnapshot) -> NoteSnapshot:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO note_snapshots (platform, note_id, data) VALUES (?, ?, ?)",
+                (snapshot.platform, snapshot.note_id, snapshot.model_dump_json()),
+            )
+            self._conn.commit()
+        return snapshot
+
+    async def load_snapshot(self, platform: str, note_id: str) -> Optional[NoteSnapshot]:
+        return await asyncio.to_thread(self._load_snapshot, platform, note_id)
+
+    async def save_snapshot(self, snapshot: NoteSnapshot) -> NoteSnapshot:
+        return await asyncio.to_thread(self._save_snapshot, snapshot)
+
+
+class NoteSnapshotRedisRepo(BaseNoteSnapshotRepo):
+    """基于 redis 的帖子快照存储库，每个平台的快照保存在一个 hash 中，多台机器共享"""
+
+    def __init__(self, key_prefix: str = "note_snapshot"):
+        from pkg.cache.redis_cache import get_redis_client
+
+        self._redis_client = get_redis_client()
+        self._key_prefix = key_prefix
+
+    def _get_key(self, platform: str) -> str:
+        return f"{self._key_prefix}:{platform}"
+
+    async def load_snapshot(self, platform: str, note_id: str) -> Optional[NoteSnapshot]:
+        data = self._redis_client.hget(self._get_key(platform), note_id)
+        return NoteSnapshot.model_validate_json(data) if data else None
+
+    async def save_snapshot(self, snapshot: NoteSnapshot) -> NoteSnapshot:
+        self._redis_client.hset(
+            self._get_key(snapshot.platform), snapshot.note_id, snapshot.model_dump_json()
+        )
+        return snapshot
+
+
+class NoteSnapshotRepoManager:
+    def __init__(self, note_snapshot_repo: BaseNoteSnapshotRepo):
+        self.note_snapshot_repo = note_snapshot_repo
+        # 记录看到帖子的时间是先读后写，和保存新快照互斥，避免旧快照覆盖刚保存的新快照
+        self.note_snapshot_lock = asyncio.Lock()
+
+    async def is_note_unchanged(self, snapshot: NoteSnapshot) -> bool:
+        """判断帖子自上次爬取以来是否没有变化，没有变化时只记录看到帖子的时间
+
+        Args:
+            snapshot (NoteSnapshot): 本次列表接口返回的帖子快照
+
+        Returns:
+            bool: 没有变化，可以跳过详情和评论的爬取
+        """
+        # 列表接口没有返回计数时无法判断，按有变化处理
+        if not snapshot.has_metadata():
+            return False
+
+        async with self.note_snapshot_lock:
+            stored_snapshot = await self.note_snapshot_repo.load_snapshot(
+                snapshot.platform, snapshot.note_id
+            )
+            if stored_snapshot is None or not stored_snapshot.is_same_as(snapshot):
+                return False
+
+            stored_snapshot.seen_at = time.time()
+            await self.note_snapshot_repo.save_snapshot(stored_snapshot)
+            return True
+
+    async def save_snapshot(self, snapshot: NoteSnapshot) -> None:
+        """帖子详情和评论都爬取成功后保存快照
+
+        Args:
+            snapshot (NoteSnapshot): 本次列表接口返回的帖子快照
+        """
+        if not snapshot.has_metadata():
+            return
+        async with self.note_snapshot_lock:
+            snapshot.seen_at = snapshot.updated_at = time.time()
+            await self.note_snapshot_repo.save_snapshot(snapshot)
@@ -0,0 +1,220 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多进程模式（python main.py --workers N）：主进程把任务按关键词、创作者、帖子ID分片，
+#            每个分片在独立的子进程中运行自己的事件循环，子进程结束后由主进程汇总运行统计
+import asyncio
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import config
+import constant
+from constant import MYSQL_ACCOUNT_SAVE
+from pkg.stats import merge_crawl_stats
+from pkg.tools import utils
+from pkg.tools.utils import init_logging_config
+from repo.checkpoint import generate_checkpoint_id, generate_shard_checkpoint_id
+
+# 爬取类型 -> 平台 -> 可以分片的配置项，搜索模式按关键词分片（KEYWORDS 是逗号分隔的字符串）
+# 分片数量由第一个配置项决定，保证每个分片至少有一个关键词/创作者/帖子，其余配置项按同样的分片数量分配
+SHARD_CONFIG_NAMES: Dict[str, Dict[str, List[str]]] = {
+    constant.CRALER_TYPE_SEARCH: {
+        constant.XHS_PLATFORM_NAME: ["KEYWORDS"],
+        constant.DOUYIN_PLATFORM_NAME: ["KEYWORDS"],
+        constant.KUAISHOU_PLATFORM_NAME: ["KEYWORDS"],
+        constant.BILIBILI_PLATFORM_NAME: ["KEYWORDS"],
+        constant.WEIBO_PLATFORM_NAME: ["KEYWORDS"],
+        constant.TIEBA_PLATFORM_NAME: ["KEYWORDS", "TIEBA_NAME_LIST"],
+        constant.ZHIHU_PLATFORM_NAME: ["KEYWORDS"],
+    },
+    constant.CRALER_TYPE_DETAIL: {
+        constant.XHS_PLATFORM_NAME: ["XHS_SPECIFIED_NOTE_URL_LIST"],
+        constant.DOUYIN_PLATFORM_NAME: ["DY_SPECIFIED_ID_LIST"],
+        constant.KUAISHOU_PLATFORM_NAME: ["KS_SPECIFIED_ID_LIST"],
+        constant.BILIBILI_PLATFORM_NAME: ["BILI_SPECIFIED_ID_LIST"],
+        constant.WEIBO_PLATFORM_NAME: ["WEIBO_SPECIFIED_ID_LIST"],
+        constant.TIEBA_PLATFORM_NAME: ["TIEBA_SPECIFIED_ID_LIST"],
+        constant.ZHIHU_PLATFORM_NAME: ["ZHIHU_SPECIFIED_ID_LIST"],
+    },
+    constant.CRALER_TYPE_CREATOR: {
+        constant.XHS_PLATFORM_NAME: ["XHS_CREATOR_URL_LIST"],
+        constant.DOUYIN_PLATFORM_NAME: ["DY_CREATOR_ID_LIST"],
+        constant.KUAISHOU_PLATFORM_NAME: ["KS_CREATOR_ID_LIST"],
+        constant.BILIBILI_PLATFORM_NAME: ["BILI_CREATOR_ID_LIST"],
+        constant.WEIBO_PLATFORM_NAME: ["WEIBO_CREATOR_ID_LIST"],
+        constant.TIEBA_PLATFORM_NAME: ["TIEBA_CREATOR_URL_LIST"],
+        constant.ZHIHU_PLATFORM_NAME: ["ZHIHU_CREATOR_URL_LIST"],
+    },
+}
+
+
+def _get_config_value(crawler_job: Dict[str, Any], config_name: str) -> Any:
+    return crawler_job.get(config_name, getattr(config, config_name))
+
+
+def _get_shard_items(crawler_job: Dict[str, Any], config_name: str) -> List[Any]:
+    value = _get_config_value(crawler_job, config_name)
+    if config_name == "KEYWORDS":
+        return [keyword.strip() for keyword in value.split(",") if keyword.strip()]
+    return list(value)
+
+
+def split_crawler_job(crawler_job: Dict[str, Any], worker_num: int) -> List[Dict[str, Any]]:
+    """
+    把一个爬虫任务按关键词、创作者、帖子ID轮流分配到最多 worker_num 个分片中，每个分片使用自己的检查点ID
+    同一个检查点ID（--checkpoint_id）和相同的进程数重新运行时，分片的划分和分片检查点ID都不变，可以断点续爬
+    Args:
+        crawler_job: 爬虫任务（配置覆盖项）
+        worker_num: 子进程数量
+
+    Returns:
+        List[Dict[str, Any]]: 分片任务列表，无法分片时只有原任务一个分片
+    """
+    platform = crawler_job["PLATFORM"]
+    crawler_type = _get_config_value(crawler_job, "CRAWLER_TYPE")
+    config_names = SHARD_CONFIG_NAMES.get(crawler_type, {}).get(platform, [])
+    shard_items = {
+        config_name: _get_shard_items(crawler_job, config_name)
+        for config_name in config_names
+    }
+    if not config_names:
+        return [crawler_job]
+    shard_count = min(worker_num, len(shard_items[config_names[0]]))
+    if shard_count <= 1:
+        return [crawler_job]
+
+    checkpoint_id = _get_config_value(crawler_job, "SPECIFIED_CHECKPOINT_ID")
+    if not checkpoint_id:
+        checkpoint_id = generate_checkpoint_id(platform, crawler_type)
+        utils.logger.info(
+            f"[split_crawler_job] {platform} {crawler_type} job is split into {shard_count} shards, "
+            f"resume them with --checkpoint_id {checkpoint_id} --workers {worker_num}"
+        )
+    shard_jobs = []
+    for shard_index in range(shard_count):
+        shard_job = dict(crawler_job)
+        for config_name, items in shard_items.items():
+            items = items[shard_index::shard_count]
+            shard_job[config_name] = ",".join(items) if config_name == "KEYWORDS" else items
+        shard_job["SPECIFIED_CHECKPOINT_ID"] = generate_shard_checkpoint_id(
+            checkpoint_id, shard_index, shard_count
+        )
+        shard_jobs.append(shard_job)
+    return shard_jobs
+
+
+def _snapshot_config() -> Dict[str, Any]:
+    """
+    子进程使用 spawn 方式启动，会重新导入配置文件，这里把主进程中的配置（包括命令行参数）整体传给子进程
+    Returns:
+
+    """
+    return {
+        config_name: getattr(config, config_name)
+        for config_name in dir(config)
+        if config_name.isupper()
+    }
+
+
+async def _run_shard_job(shard_job: Dict[str, Any]) -> Dict[str, int]:
+    # 延迟导入，避免 main 和 supervisor 循环导入
+    from main import run_crawler_job
+
+    config.enter_config_scope(shard_job)
+    init_logging_config()
+    use_db = config.SAVE_DATA_OPTION == "db" or config.ACCOUNT_POOL_SAVE_TYPE in [
+        MYSQL_ACCOUNT_SAVE
+    ]
+    if use_db:
+        import db
+
+        await db.init_db()
+    try:
+        return await run_crawler_job(shard_job)
+    finally:
+        if "pkg.rpc.sign_srv_client" in sys.modules:
+            await sys.modules["pkg.rpc.sign_srv_client"].close_sign_client()
+        # 关闭解析进程池
+        if "pkg.extraction" in sys.modules:
+            sys.modules["pkg.extraction"].shutdown_extraction_executor()
+        if use_db:
+            await db.close()
+
+
+def run_shard_job(shard_job: Dict[str, Any]) -> Dict[str, int]:
+    """
+    子进程入口，在新的事件循环中运行一个分片任务
+    Args:
+        shard_job: 分片任务（完整的配置项）
+
+    Returns:
+        Dict[str, int]: 分片的运行统计
+    """
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    return asyncio.run(_run_shard_job(shard_job))
+
+
+async def run_supervisor(crawler_jobs: List[Dict[str, Any]], worker_num: int) -> Dict[str, int]:
+    """
+    把所有任务分片后交给最多 worker_num 个子进程运行，汇总各分片的运行统计
+    Args:
+        crawler_jobs: 爬虫任务列表
+        worker_num: 子进程数量
+
+    Returns:
+        Dict[str, int]: 汇总后的运行统计
+    """
+    config_snapshot = _snapshot_config()
+    shard_jobs = [
+        {**config_snapshot, **shard_job, "CRAWLER_WORKER_PROCESS_NUM": 1}
+        for crawler_job in crawler_jobs
+        for shard_job in split_crawler_job(crawler_job, worker_num)
+    ]
+    utils.logger.info(
+        f"[run_supervisor] run {len(shard_jobs)} shard jobs with {worker_num} worker processes"
+    )
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(
+        max_workers=min(worker_num, len(shard_jobs)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        results = await asyncio.gather(
+            *[
+                loop.run_in_executor(executor, run_shard_job, shard_job)
+                for shard_job in shard_jobs
+            ],
+            return_exceptions=True,
+        )
+
+    shard_stats_list, failed_shard_ids = [], []
+    for shard_job, result in zip(shard_jobs, results):
+        shard_id = f"{shard_job['PLATFORM']}:{shard_job['SPECIFIED_CHECKPOINT_ID'] or '-'}"
+        if isinstance(result, BaseException):
+            failed_shard_ids.append(shard_id)
+            utils.logger.error(f"[run_supervisor] shard {shard_id} failed: {result!r}")
+            continue
+        shard_stats_list.append(result)
+        utils.logger.info(f"[run_supervisor] shard {shard_id} finished, stats: {result}")
+
+    total_stats = merge_crawl_stats(shard_stats_list)
+    utils.logger.info(
+        f"[run_supervisor] {len(shard_jobs) - len(failed_shard_ids)}/{len(shard_jobs)} shards finished, total stats: {total_stats}"
+    )
+    if failed_shard_ids:
+        raise Exception(
+            f"[run_supervisor] shards failed: {failed_shard_ids}, rerun with the same --checkpoint_id to resume them"
+        )
+    return total_stats
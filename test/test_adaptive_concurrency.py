@@ -0,0 +1,118 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : AIMD 自适应并发控制测试
+import asyncio
+
+import config
+from pkg.rate_limit import (
+    AdaptiveConcurrencyController,
+    enter_concurrency_scope,
+    get_concurrency_controller,
+    get_concurrency_metrics,
+)
+from test.async_utils import run_async
+
+
+def _controller(ceiling: int = 8, initial: int = 1) -> AdaptiveConcurrencyController:
+    return AdaptiveConcurrencyController(
+        "test", ceiling=ceiling, initial=initial, enabled=True
+    )
+
+
+def test_additive_increase_bounded_by_ceiling():
+    controller = _controller(ceiling=4)
+    limiter = controller.limiter("note")
+
+    async def run():
+        for _ in range(100):
+            await controller.record_response(200, 0.1)
+
+    run_async(run())
+    assert limiter.limit == 4
+    assert controller.metrics() == {"test.note": 4}
+
+
+def test_multiplicative_decrease_on_backoff_status_and_cooldown():
+    controller = _controller(ceiling=8, initial=8)
+    note_limiter = controller.limiter("note")
+    comment_limiter = controller.limiter("comment")
+
+    async def run():
+        await controller.record_response(461, 0.1)
+        # 冷却时间内的信号不会再次减少并发
+        await controller.record_response(471, 0.1)
+        controller.record_backoff("access frequency")
+
+    run_async(run())
+    assert note_limiter.limit == 8 * config.ADAPTIVE_CONCURRENCY_DECREASE_FACTOR
+    assert comment_limiter.limit == note_limiter.limit
+
+
+def test_backoff_on_rising_latency():
+    controller = _controller(ceiling=8, initial=8)
+    limiter = controller.limiter("note")
+
+    async def run():
+        for _ in range(10):
+            await controller.record_response(200, 0.1)
+        await controller.record_response(200, 1.0)
+
+    run_async(run())
+    assert limiter.limit < 8
+
+
+def test_limiter_bounds_in_flight_tasks():
+    controller = _controller(ceiling=2, initial=2)
+    limiter = controller.limiter("note")
+    max_in_flight = 0
+
+    async def task():
+        nonlocal max_in_flight
+        async with limiter:
+            max_in_flight = max(max_in_flight, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*[task() for _ in range(10)])
+
+    run_async(run())
+    assert max_in_flight == 2
+    assert limiter.in_flight == 0
+
+
+def test_disabled_controller_is_static():
+    controller = AdaptiveConcurrencyController("test", ceiling=3, enabled=False)
+    limiter = controller.limiter("note")
+
+    async def run():
+        await controller.record_response(461, 0.1)
+
+    run_async(run())
+    assert limiter.limit == 3
+
+
+def test_each_job_scope_reads_its_own_concurrency_ceiling():
+    async def run_job(max_concurrency_num: int):
+        config.enter_config_scope({"MAX_CONCURRENCY_NUM": max_concurrency_num})
+        enter_concurrency_scope()
+        controller = get_concurrency_controller("test_job")
+        controller.limiter("note")
+        return controller.ceiling, get_concurrency_metrics()
+
+    async def run():
+        return await asyncio.gather(
+            asyncio.create_task(run_job(2)), asyncio.create_task(run_job(6))
+        )
+
+    (first_ceiling, first_metrics), (second_ceiling, _) = run_async(run())
+    assert (first_ceiling, second_ceiling) == (2, 6)
+    assert list(first_metrics) == ["test_job.note"]
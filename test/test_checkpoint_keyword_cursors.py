@@ -0,0 +1,74 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 检查点关键词游标测试
+import asyncio
+
+from model.m_checkpoint import Checkpoint
+from repo.checkpoint.checkpoint_store import (
+    CheckpointJsonFileRepo,
+    CheckpointRepoManager,
+)
+from test.async_utils import run_async
+
+
+def _manager(tmp_path) -> CheckpointRepoManager:
+    return CheckpointRepoManager(CheckpointJsonFileRepo(cache_dir=str(tmp_path)))
+
+
+def test_concurrent_keyword_cursors_resume_independently(tmp_path):
+    manager = _manager(tmp_path)
+    keyword_list = ["a", "b", "c"]
+
+    async def run():
+        checkpoint = await manager.init_search_keyword_cursors(
+            Checkpoint(platform="xhs", mode="search"), keyword_list
+        )
+        await asyncio.gather(
+            manager.update_search_keyword_cursor(checkpoint.id, "a", current_search_page=3),
+            manager.update_search_keyword_cursor(checkpoint.id, "b", is_finished=True),
+            manager.update_search_keyword_cursor(
+                checkpoint.id, "c", current_search_page=2, current_search_id="sid"
+            ),
+        )
+        return await manager.load_checkpoint(platform="xhs", mode="search")
+
+    checkpoint = run_async(run())
+    cursors = checkpoint.search_keyword_cursors
+    assert manager.has_search_keyword_progress(checkpoint, keyword_list)
+    assert (cursors["a"].current_search_page, cursors["a"].is_finished) == (3, False)
+    assert cursors["b"].is_finished
+    assert (cursors["c"].current_search_page, cursors["c"].current_search_id) == (2, "sid")
+
+
+def test_legacy_single_keyword_checkpoint_is_migrated(tmp_path):
+    manager = _manager(tmp_path)
+    legacy_checkpoint = Checkpoint(
+        platform="dy",
+        mode="search",
+        current_search_keyword="b",
+        current_search_page=5,
+        current_search_id="sid",
+    )
+
+    checkpoint = run_async(
+        manager.init_search_keyword_cursors(legacy_checkpoint, ["a", "b", "c"])
+    )
+    cursors = checkpoint.search_keyword_cursors
+    assert cursors["a"].is_finished
+    assert (cursors["b"].current_search_page, cursors["b"].current_search_id) == (5, "sid")
+    assert not cursors["b"].is_finished
+    assert (cursors["c"].current_search_page, cursors["c"].is_finished) == (1, False)
+
+
+def test_checkpoint_without_matching_keywords_is_not_resumed():
+    checkpoint = Checkpoint(platform="xhs", mode="search", current_search_keyword="x")
+    assert not CheckpointRepoManager.has_search_keyword_progress(checkpoint, ["a"])
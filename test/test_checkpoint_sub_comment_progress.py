@@ -0,0 +1,116 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 检查点二级评论进度测试
+import asyncio
+
+import config
+from model.m_checkpoint import Checkpoint
+from repo.checkpoint.checkpoint_store import (
+    CheckpointJsonFileRepo,
+    CheckpointRepoManager,
+)
+from test.async_utils import run_async
+
+
+def test_sub_comment_progress_is_kept_until_root_page_advances(tmp_path):
+    manager = CheckpointRepoManager(CheckpointJsonFileRepo(cache_dir=str(tmp_path)))
+
+    async def run():
+        checkpoint = await manager.save_checkpoint(Checkpoint(platform="xhs", mode="search"))
+        await manager.add_note_to_checkpoint(checkpoint.id, "note")
+        await manager.update_note_comment_cursor(checkpoint.id, "note", "page1")
+        await asyncio.gather(
+            manager.update_note_sub_comment_progress(checkpoint.id, "note", "root1", "c2"),
+            manager.update_note_sub_comment_progress(checkpoint.id, "note", "root2", "c1"),
+        )
+        await manager.update_note_sub_comment_progress(
+            checkpoint.id, "note", "root2", "", is_finished=True
+        )
+        # 同一页重复保存游标不会清空二级评论进度
+        await manager.update_note_comment_cursor(checkpoint.id, "note", "page1")
+        progress = await manager.get_note_sub_comment_progress(checkpoint.id, "note")
+
+        await manager.update_note_comment_cursor(checkpoint.id, "note", "page2")
+        advanced_progress = await manager.get_note_sub_comment_progress(checkpoint.id, "note")
+        return progress, advanced_progress
+
+    progress, advanced_progress = run_async(run())
+    assert progress == ({"root1": "c2"}, {"root2"})
+    assert advanced_progress == ({}, set())
+
+
+def test_sub_comment_pages_are_written_once_per_finished_root(tmp_path):
+    manager = CheckpointRepoManager(CheckpointJsonFileRepo(cache_dir=str(tmp_path)))
+
+    async def run():
+        checkpoint = await manager.save_checkpoint(Checkpoint(platform="xhs", mode="search"))
+        await manager.add_note_to_checkpoint(checkpoint.id, "note")
+        await manager.update_note_comment_cursor(checkpoint.id, "note", "page1")
+
+        write_count = 0
+        update_checkpoint = manager.update_checkpoint
+
+        async def counting_update_checkpoint(checkpoint_to_save):
+            nonlocal write_count
+            write_count += 1
+            return await update_checkpoint(checkpoint_to_save)
+
+        manager.update_checkpoint = counting_update_checkpoint
+        for cursor in ("c1", "c2", "c3"):
+            await manager.update_note_sub_comment_progress(checkpoint.id, "note", "root1", cursor)
+        await manager.update_note_sub_comment_progress(checkpoint.id, "note", "root2", "c1")
+        # 未写入检查点的进度也能读到
+        pending_progress = await manager.get_note_sub_comment_progress(checkpoint.id, "note")
+        writes_before_finish = write_count
+
+        await manager.update_note_sub_comment_progress(
+            checkpoint.id, "note", "root1", "", is_finished=True
+        )
+        stored_note = await manager.get_note_info_from_checkpont(checkpoint.id, "note")
+        return pending_progress, writes_before_finish, write_count, stored_note
+
+    pending_progress, writes_before_finish, write_count, stored_note = run_async(run())
+    assert pending_progress == ({"root1": "c3", "root2": "c1"}, set())
+    assert writes_before_finish == 0
+    assert write_count == 1
+    assert stored_note.sub_comment_cursors == {"root2": "c1"}
+    assert stored_note.completed_root_comment_ids == ["root1"]
+
+
+def test_long_sub_comment_thread_is_written_every_few_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHECKPOINT_SUB_COMMENT_FLUSH_PAGES", 3)
+    monkeypatch.setattr(config, "CHECKPOINT_SUB_COMMENT_FLUSH_SECONDS", 3600)
+    manager = CheckpointRepoManager(CheckpointJsonFileRepo(cache_dir=str(tmp_path)))
+
+    async def stored_cursors(checkpoint_id):
+        note = await manager.get_note_info_from_checkpont(checkpoint_id, "note")
+        return dict(note.sub_comment_cursors)
+
+    async def run():
+        checkpoint = await manager.save_checkpoint(Checkpoint(platform="xhs", mode="search"))
+        await manager.add_note_to_checkpoint(checkpoint.id, "note")
+        await manager.update_note_comment_cursor(checkpoint.id, "note", "page1")
+        stored = []
+        for page in range(1, 8):
+            await manager.update_note_sub_comment_progress(checkpoint.id, "note", "root1", f"c{page}")
+            stored.append(await stored_cursors(checkpoint.id))
+
+        # 超过缓存时间后下一页就写入检查点
+        monkeypatch.setattr(config, "CHECKPOINT_SUB_COMMENT_FLUSH_SECONDS", 0)
+        await manager.update_note_sub_comment_progress(checkpoint.id, "note", "root1", "c8")
+        stored.append(await stored_cursors(checkpoint.id))
+        return stored
+
+    stored = run_async(run())
+    assert stored[:7] == [{}, {}, {"root1": "c3"}, {"root1": "c3"}, {"root1": "c3"}, {"root1": "c6"}, {"root1": "c6"}]
+    assert stored[7] == {"root1": "c8"}
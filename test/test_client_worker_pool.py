@@ -0,0 +1,114 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多账号客户端工作池测试
+import asyncio
+
+from pkg.account_pool import ClientWorkerPool
+from test.async_utils import run_async
+
+
+class FakeClient:
+    def __init__(self, account_name: str):
+        self.account_name = account_name
+        self.extractor = f"extractor-{account_name}"
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.updated = 0
+
+    async def get_note_by_id(self, note_id: str):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.account_name, note_id
+
+    async def update_account_info(self):
+        self.updated += 1
+
+    async def iter_note_comments(self, note_id: str):
+        for page in range(3):
+            await asyncio.sleep(0)
+            yield self.account_name, note_id, page
+
+
+def test_calls_are_spread_over_clients():
+    primary = FakeClient("a")
+    pool = ClientWorkerPool(primary, calls_per_client=1)
+
+    async def run():
+        async def create_client():
+            return FakeClient(f"worker{pool.size}")
+
+        await pool.add_workers(create_client, 2)
+        return await asyncio.gather(
+            *[pool.get_note_by_id(str(i)) for i in range(9)]
+        )
+
+    results = run_async(run())
+    assert pool.size == 3
+    assert [note_id for _, note_id in results] == [str(i) for i in range(9)]
+    used_accounts = {account_name for account_name, _ in results}
+    assert used_accounts == {"a", "worker1", "worker2"}
+    # 每个客户端同一时间最多执行 calls_per_client 个请求
+    assert primary.max_in_flight == 1
+
+
+def test_single_client_serves_concurrent_calls():
+    client = FakeClient("a")
+    pool = ClientWorkerPool(client, calls_per_client=3)
+
+    async def run():
+        return await asyncio.gather(*[pool.get_note_by_id(str(i)) for i in range(6)])
+
+    results = run_async(run())
+    assert len(results) == 6
+    assert pool.concurrency == 3
+    assert client.max_in_flight == 3
+
+
+def test_add_workers_stops_when_account_lease_fails():
+    pool = ClientWorkerPool(FakeClient("a"))
+
+    async def create_client():
+        raise Exception("账号池中没有可用的账号")
+
+    run_async(pool.add_workers(create_client, 3))
+    assert pool.size == 1
+
+
+def test_local_methods_and_attributes_use_primary_client():
+    primary = FakeClient("a")
+    pool = ClientWorkerPool(primary)
+    pool.add_client(FakeClient("b"))
+
+    run_async(pool.update_account_info())
+    assert primary.updated == 1
+    assert pool.extractor == "extractor-a"
+
+
+def test_async_generator_releases_client_between_pages():
+    pool = ClientWorkerPool(FakeClient("a"), calls_per_client=1)
+    pool.add_client(FakeClient("b"))
+
+    async def run():
+        pages = pool.iter_note_comments("1")
+        first_page = await pages.__anext__()
+        # 两页之间不占用客户端，其他调用可以由任意客户端执行；后续页仍由同一个客户端（同一个账号）请求
+        other_calls = await asyncio.gather(pool.get_note_by_id("2"), pool.get_note_by_id("3"))
+        rest_pages = [page async for page in pages]
+        return first_page, other_calls, rest_pages, dict(pool._in_flight)
+
+    first_page, other_calls, rest_pages, in_flight = run_async(run())
+    assert first_page == ("a", "1", 0)
+    assert {account_name for account_name, _ in other_calls} == {"a", "b"}
+    assert rest_pages == [("a", "1", 1), ("a", "1", 2)]
+    assert set(in_flight.values()) == {0}
@@ -0,0 +1,61 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 评论爬取计划测试
+from pkg.pipeline import CommentPlanner, parse_comment_count
+
+
+def test_parse_comment_count():
+    assert parse_comment_count(12) == 12
+    assert parse_comment_count("0") == 0
+    assert parse_comment_count("1.2万") == 12000
+    assert parse_comment_count("10+") == 10
+    assert parse_comment_count("") is None
+    assert parse_comment_count(None) is None
+
+
+def test_plan_skips_empty_notes_and_applies_per_note_limit():
+    planner = CommentPlanner(per_note_limit=100, page_size=10)
+    plans = planner.plan([("a", 0), ("b", 35), ("c", 50000), ("d", None)])
+
+    assert [plan.note_id for plan in plans] == ["b", "c", "d"]
+    # 显示的评论数量可能偏少，只用来预估翻页次数，上限仍然是单帖上限
+    assert [plan.max_comments for plan in plans] == [100, 100, 100]
+    assert [plan.estimated_pages for plan in plans] == [4, 10, 10]
+    assert not plans[1].allows_more(100)
+
+
+def test_comment_count_does_not_cap_notes_without_limits():
+    planner = CommentPlanner(page_size=10)
+    plans = planner.plan([("a", parse_comment_count("10+")), ("b", parse_comment_count("1.2万"))])
+
+    assert [plan.max_comments for plan in plans] == [0, 0]
+    assert [plan.estimated_pages for plan in plans] == [1, 1200]
+    assert plans[0].allows_more(10000)
+
+
+def test_run_budget_is_water_filled_and_released():
+    planner = CommentPlanner(run_budget=100, page_size=20)
+    plans = planner.plan([("small", 10), ("big", 50000), ("unknown", None)])
+
+    # 评论少的帖子先拿满，剩余预算平均分给其他帖子
+    assert {plan.note_id: plan.max_comments for plan in plans} == {
+        "small": 10,
+        "big": 45,
+        "unknown": 45,
+    }
+    assert planner.remaining_budget == 0
+    assert planner.plan([("late", 10)]) == []
+
+    planner.release(plans[2], 5)
+    assert planner.remaining_budget == 40
+    assert planner.plan([("late", 10)])[0].max_comments == 10
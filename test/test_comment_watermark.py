@@ -0,0 +1,71 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 评论水位测试，按时间倒序翻页时遇到已保存的评论停止，置顶评论不影响判断
+from model.m_comment_watermark import CommentWatermark
+from model.m_xhs import XhsComment
+from repo.comment_watermark import (
+    advance_watermark,
+    create_comment_watermark_manager,
+    filter_new_comments,
+)
+from test.async_utils import run_async
+
+
+def _comment(comment_id: str, create_time: int) -> XhsComment:
+    return XhsComment(comment_id=comment_id, note_id="note", create_time=str(create_time))
+
+
+def test_first_crawl_keeps_all_comments():
+    comments = [_comment("c3", 300), _comment("c2", 200)]
+
+    new_comments, reached = filter_new_comments(None, comments)
+
+    assert new_comments == comments
+    assert not reached
+
+
+def test_stop_paging_at_stored_comments_despite_pinned_comment():
+    watermark = CommentWatermark(
+        platform="xhs", note_id="note", newest_comment_id="c2", newest_comment_time=200
+    )
+    # 置顶的旧评论在第一页开头，不能让翻页提前停止
+    first_page = [_comment("c1", 100), _comment("c5", 500), _comment("c4", 400)]
+    second_page = [_comment("c3", 300), _comment("c2", 200), _comment("c0", 50)]
+
+    new_comments, reached = filter_new_comments(watermark, first_page)
+    assert [comment.comment_id for comment in new_comments] == ["c5", "c4"]
+    assert not reached
+
+    new_comments, reached = filter_new_comments(watermark, second_page)
+    assert [comment.comment_id for comment in new_comments] == ["c3"]
+    assert reached
+
+    newest = advance_watermark(watermark.model_copy(), "xhs", "note", first_page[1:] + new_comments)
+    assert (newest.newest_comment_id, newest.newest_comment_time) == ("c5", 500)
+
+
+def test_sqlite_watermark_round_trip(tmp_path):
+    manager = create_comment_watermark_manager(
+        "sqlite", db_path=str(tmp_path / "comment_watermarks.db")
+    )
+
+    async def main():
+        assert await manager.load_watermark("xhs", "note") is None
+        watermark = advance_watermark(None, "xhs", "note", [_comment("c1", 100)])
+        await manager.save_watermark(watermark)
+        return await manager.load_watermark("xhs", "note")
+
+    watermark = run_async(main())
+    assert watermark.newest_comment_id == "c1"
+    assert watermark.newest_comment_time == 100
+    assert watermark.updated_at
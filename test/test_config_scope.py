@@ -0,0 +1,46 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多平台同进程运行时的配置作用域测试
+import asyncio
+import json
+
+import config
+import main
+from test.async_utils import run_async
+
+
+def test_concurrent_tasks_read_and_write_their_own_config():
+    global_max_notes_count = config.CRAWLER_MAX_NOTES_COUNT
+
+    async def crawler_job(platform: str, max_notes_count: int):
+        config.enter_config_scope({"PLATFORM": platform})
+        await asyncio.sleep(0.01)
+        config.CRAWLER_MAX_NOTES_COUNT = max_notes_count
+        await asyncio.sleep(0.01)
+        return config.PLATFORM, config.CRAWLER_MAX_NOTES_COUNT
+
+    async def run():
+        return await asyncio.gather(crawler_job("xhs", 1), crawler_job("dy", 2))
+
+    assert run_async(run()) == [("xhs", 1), ("dy", 2)]
+    assert config.CRAWLER_MAX_NOTES_COUNT == global_max_notes_count
+
+
+def test_load_crawler_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PLATFORM", "xhs, dy")
+    assert main.load_crawler_jobs() == [{"PLATFORM": "xhs"}, {"PLATFORM": "dy"}]
+
+    job_file = tmp_path / "jobs.json"
+    crawler_jobs = [{"PLATFORM": "bili", "KEYWORDS": "AI"}]
+    job_file.write_text(json.dumps(crawler_jobs), encoding="utf-8")
+    monkeypatch.setattr(config, "PLATFORM_JOB_FILE", str(job_file))
+    assert main.load_crawler_jobs() == crawler_jobs
@@ -0,0 +1,134 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 爬虫守护进程和持久化任务队列测试
+import asyncio
+
+import daemon
+from model.m_crawl_job import CrawlJob, CrawlJobStatus
+from repo.crawl_job import create_crawl_job_manager
+from test.async_utils import run_async
+
+
+def _job_manager(tmp_path):
+    return create_crawl_job_manager("sqlite", db_path=str(tmp_path / "jobs.db"))
+
+
+def test_jobs_are_claimed_in_order_and_survive_restart(tmp_path):
+    job_manager = _job_manager(tmp_path)
+
+    async def run():
+        first = await job_manager.submit_job(CrawlJob(platform="xhs", crawler_type="search"))
+        second = await job_manager.submit_job(CrawlJob(platform="dy", crawler_type="detail"))
+        cancelled = await job_manager.submit_job(CrawlJob(platform="bili", crawler_type="search"))
+        await job_manager.cancel_job(cancelled.id)
+
+        claimed = await job_manager.claim_next_job()
+        assert claimed.id == first.id and claimed.status == CrawlJobStatus.RUNNING
+
+        # 模拟守护进程重启：新的管理器读取同一个 sqlite 文件，上次运行中的任务重新入队
+        restarted_manager = _job_manager(tmp_path)
+        assert await restarted_manager.requeue_interrupted_jobs([]) == 1
+        claimed_ids = [
+            (await restarted_manager.claim_next_job()).id,
+            (await restarted_manager.claim_next_job()).id,
+        ]
+        assert await restarted_manager.claim_next_job() is None
+        return claimed_ids, [first.id, second.id]
+
+    claimed_ids, submitted_ids = run_async(run())
+    assert sorted(claimed_ids) == sorted(submitted_ids)
+
+
+def test_daemon_records_job_results(tmp_path, monkeypatch):
+    job_manager = _job_manager(tmp_path)
+    crawl_daemon = daemon.CrawlDaemon(job_manager)
+    crawler_jobs = []
+
+    async def fake_run_crawler_job(crawler_job):
+        crawler_jobs.append(crawler_job)
+        if crawler_job["KEYWORDS"] == "fail":
+            raise RuntimeError("boom")
+        if crawler_job["KEYWORDS"] == "slow":
+            await asyncio.sleep(10)
+        return {"notes": 2, "concurrency_limit.xhs.note": 3}
+
+    monkeypatch.setattr(daemon, "run_crawler_job", fake_run_crawler_job)
+
+    async def run_job(keywords):
+        await crawl_daemon.submit_job(
+            {
+                "platform": "xhs",
+                "crawler_type": "search",
+                "config_overrides": {"KEYWORDS": keywords},
+            }
+        )
+        job = await job_manager.claim_next_job()
+        task = asyncio.create_task(crawl_daemon._run_job(job))
+        crawl_daemon._running_tasks[job.id] = task
+        if keywords == "slow":
+            await asyncio.sleep(0.01)
+            await job_manager.cancel_job(job.id)
+            await crawl_daemon._cancel_requested_jobs()
+        await asyncio.gather(task, return_exceptions=True)
+        return await job_manager.load_job(job.id)
+
+    async def run():
+        return [await run_job(keywords) for keywords in ["ok", "fail", "slow"]]
+
+    succeeded, failed, cancelled = run_async(run())
+    assert succeeded.status == CrawlJobStatus.SUCCEEDED
+    assert succeeded.stats == {"notes": 2, "concurrency_limit.xhs.note": 3}
+    assert failed.status == CrawlJobStatus.FAILED and "boom" in failed.error
+    assert cancelled.status == CrawlJobStatus.CANCELLED
+    assert crawler_jobs[0] == {"KEYWORDS": "ok", "PLATFORM": "xhs", "CRAWLER_TYPE": "search"}
+
+
+def test_cancelled_job_waits_for_crawler_close(tmp_path, monkeypatch):
+    job_manager = _job_manager(tmp_path)
+    crawl_daemon = daemon.CrawlDaemon(job_manager)
+    closed_jobs = []
+
+    async def fake_run_crawler_job(crawler_job):
+        try:
+            await asyncio.sleep(10)
+        finally:
+            # 释放资源期间守护进程再次检查取消请求，不能打断释放过程
+            await asyncio.sleep(0.02)
+            closed_jobs.append(crawler_job["KEYWORDS"])
+
+    monkeypatch.setattr(daemon, "run_crawler_job", fake_run_crawler_job)
+
+    async def run():
+        for keywords in ["cancel", "shutdown"]:
+            await crawl_daemon.submit_job(
+                {"platform": "xhs", "crawler_type": "search", "config_overrides": {"KEYWORDS": keywords}}
+            )
+        cancel_job = await job_manager.claim_next_job()
+        shutdown_job = await job_manager.claim_next_job()
+        for job in [cancel_job, shutdown_job]:
+            crawl_daemon._running_tasks[job.id] = asyncio.create_task(crawl_daemon._run_job(job))
+        await asyncio.sleep(0.01)
+
+        await job_manager.cancel_job(cancel_job.id)
+        await crawl_daemon._cancel_requested_jobs()
+        await asyncio.sleep(0.01)
+        await crawl_daemon._cancel_requested_jobs()
+        await crawl_daemon._running_tasks[cancel_job.id]
+        assert closed_jobs == ["cancel"]
+        assert (await job_manager.load_job(cancel_job.id)).status == CrawlJobStatus.CANCELLED
+
+        # 守护进程退出时等待运行中的爬虫释放资源，任务保持 running 状态，下次启动时重新入队
+        await crawl_daemon.stop()
+        assert closed_jobs == ["cancel", "shutdown"]
+        assert (await job_manager.load_job(shutdown_job.id)).status == CrawlJobStatus.RUNNING
+
+    run_async(run())
@@ -0,0 +1,68 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 解析执行器测试，大页面在进程池中解析，小页面在事件循环中解析
+import asyncio
+import json
+
+from media_platform.xhs.extractor import XiaoHongShuExtractor
+from pkg.extraction import ExtractionExecutor
+from var import source_keyword_var
+from test.async_utils import run_async
+
+
+def _note_html(note_id: str, padding_size: int) -> str:
+    state = {
+        "note": {
+            "noteDetailMap": {
+                note_id: {"note": {"noteId": note_id, "title": "title", "desc": "x" * padding_size}}
+            }
+        }
+    }
+    return f"<script>window.__INITIAL_STATE__={json.dumps(state)}</script>"
+
+
+def _extract_plain(payload: str) -> str:
+    return payload
+
+
+def test_large_payload_is_extracted_in_process_pool():
+    extractor = XiaoHongShuExtractor()
+    executor = ExtractionExecutor(max_workers=1, offload_min_size=1024)
+    large_html, small_html = _note_html("n1", 4096), _note_html("n2", 10)
+
+    assert executor.should_offload(extractor.extract_note_detail_from_html, "n1", large_html)
+    assert not executor.should_offload(extractor.extract_note_detail_from_html, "n2", html=small_html)
+    # 没有声明为CPU密集的方法始终在事件循环中执行
+    assert not executor.should_offload(_extract_plain, large_html)
+
+    async def run():
+        source_keyword_var.set("AI")
+        return await asyncio.gather(
+            executor.run(extractor.extract_note_detail_from_html, "n1", large_html),
+            executor.run(extractor.extract_note_detail_from_html, "n2", small_html),
+        )
+
+    try:
+        large_note, small_note = run_async(run())
+    finally:
+        executor.shutdown()
+    assert (large_note.note_id, large_note.desc, large_note.source_keyword) == ("n1", "x" * 4096, "AI")
+    assert (small_note.note_id, small_note.source_keyword) == ("n2", "AI")
+
+
+def test_disabled_executor_extracts_inline():
+    executor = ExtractionExecutor(max_workers=0, offload_min_size=0)
+    extractor = XiaoHongShuExtractor()
+    html = _note_html("n1", 10)
+    assert not executor.should_offload(extractor.extract_note_detail_from_html, "n1", html)
+    assert run_async(executor.run(extractor.extract_note_detail_from_html, "n1", html)).note_id == "n1"
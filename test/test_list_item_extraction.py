@@ -0,0 +1,81 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : lite 模式下直接从列表数据提取帖子，不请求详情
+import config
+import constant
+from media_platform.bilibili.extractor import BilibiliExtractor
+from media_platform.xhs.extractor import XiaoHongShuExtractor
+from media_platform.xhs.processors.note_processor import NoteProcessor
+
+
+def _xhs_search_item():
+    return {
+        "id": "note1",
+        "note_id": "note1",
+        "model_type": "note",
+        "xsec_token": "token",
+        "note_card": {
+            "type": "normal",
+            "display_title": "标题",
+            "user": {"user_id": "u1", "nick_name": "昵称", "avatar": "a.png"},
+            "interact_info": {"liked_count": "12", "comment_count": "3"},
+            "image_list": [{"info_list": [{"url": "small.jpg"}, {"url": "large.jpg"}]}],
+        },
+    }
+
+
+def test_xhs_note_from_search_item():
+    note = XiaoHongShuExtractor().extract_note_from_list_item(_xhs_search_item())
+
+    assert (note.note_id, note.title, note.nickname) == ("note1", "标题", "昵称")
+    assert (note.liked_count, note.comment_count) == ("12", "3")
+    assert note.image_list == "large.jpg"
+    assert "xsec_token=token" in note.note_url
+
+
+def test_xhs_item_without_card_needs_detail():
+    # 详情模式中只有从链接解析出来的ID
+    assert XiaoHongShuExtractor().extract_note_from_list_item(
+        {"note_id": "note1", "xsec_token": "token"}
+    ) is None
+
+
+def test_xhs_lite_mode_requests_detail_when_publish_window_is_set(monkeypatch):
+    note_processor = NoteProcessor(None, None, None)
+    monkeypatch.setattr(config, "NOTE_DETAIL_MODE", constant.DETAIL_MODE_LITE)
+    assert note_processor._get_note_from_list_item(_xhs_search_item()) is not None
+
+    # 列表卡片中没有发布时间，需要请求详情才能判断是否在发布时间窗口内
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_SINCE", "2024-01-01")
+    assert note_processor._get_note_from_list_item(_xhs_search_item()) is None
+
+
+def test_bilibili_video_from_search_item():
+    search_item = {
+        "aid": 100,
+        "bvid": "BV1xx",
+        "title": '<em class="keyword">AI</em> 入门',
+        "pic": "//i0.hdslb.com/cover.jpg",
+        "play": 1000,
+        "like": 20,
+        "review": 5,
+        "mid": 7,
+        "author": "up",
+    }
+
+    video = BilibiliExtractor().extract_video_from_list_item(search_item)
+
+    assert (video.video_id, video.title) == ("100", "AI 入门")
+    assert (video.liked_count, video.video_comment, video.video_play_count) == ("20", "5", "1000")
+    assert video.video_cover_url == "https://i0.hdslb.com/cover.jpg"
+    assert (video.user_id, video.nickname) == ("7", "up")
@@ -0,0 +1,72 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 已爬取帖子集合测试，布隆过滤器没有漏判，命中后只记录新的来源关键词，评论爬完后才加入集合
+import asyncio
+
+import config
+from pkg.pipeline import get_note_completion_records
+from repo.note_seen_set import BloomFilter, create_note_seen_set_manager
+from test.async_utils import run_async
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f"note_{i}")
+
+    assert all(f"note_{i}" in bloom_filter for i in range(1000))
+    false_positives = sum(f"other_{i}" in bloom_filter for i in range(10000))
+    assert false_positives < 300
+
+
+def test_seen_note_records_extra_keywords(tmp_path):
+    db_path = str(tmp_path / "note_seen_set.db")
+    manager = create_note_seen_set_manager("sqlite", db_path=db_path, capacity=1000)
+
+    async def main():
+        assert not await manager.check_seen_note("xhs", "note", "AI")
+        await manager.mark_seen_note("xhs", "note", "AI")
+        assert await manager.check_seen_note("xhs", "note", "机器人")
+        assert not await manager.check_seen_note("dy", "note", "AI")
+
+        # 之后的任务从数据库文件重新加载布隆过滤器
+        next_job_manager = create_note_seen_set_manager(
+            "sqlite", db_path=db_path, capacity=1000
+        )
+        assert await next_job_manager.check_seen_note("xhs", "note", "AI")
+        return await next_job_manager.note_seen_set_repo.load_seen_note("xhs", "note")
+
+    seen_note = run_async(main())
+    assert seen_note.source_keywords == ["AI", "机器人"]
+
+
+def test_note_is_marked_seen_after_comments_and_keeps_all_keywords(tmp_path, monkeypatch):
+    manager = create_note_seen_set_manager(
+        "sqlite", db_path=str(tmp_path / "note_seen_set.db"), capacity=1000
+    )
+    monkeypatch.setattr(config, "ENABLE_GET_COMMENTS", True)
+
+    async def main():
+        await manager.mark_seen_note_after_comments("xhs", "note", "AI")
+        # 评论还没爬完时不加入集合，中断后下次运行会重新爬取
+        assert not await manager.check_seen_note("xhs", "note")
+        await get_note_completion_records().complete_note("xhs", "note")
+
+        # 不同关键词并发记录同一个帖子，关键词都不会丢失
+        await asyncio.gather(
+            *[manager.mark_seen_note("xhs", "note", keyword) for keyword in ["a", "b", "c"]]
+        )
+        return await manager.note_seen_set_repo.load_seen_note("xhs", "note")
+
+    seen_note = run_async(main())
+    assert sorted(seen_note.source_keywords) == ["AI", "a", "b", "c"]
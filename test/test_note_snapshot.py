@@ -0,0 +1,98 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 帖子快照测试，列表元数据没有变化的帖子跳过爬取，只更新看到帖子的时间，评论爬完后才保存快照
+import asyncio
+from functools import partial
+
+import config
+from model.m_note_snapshot import NoteSnapshot
+from pkg.pipeline import NoteCompletionRecords
+from repo.note_snapshot import create_note_snapshot_manager
+from test.async_utils import run_async
+
+
+def _snapshot(liked_count: str, comment_count: str) -> NoteSnapshot:
+    return NoteSnapshot(
+        platform="xhs", note_id="note", liked_count=liked_count, comment_count=comment_count
+    )
+
+
+def test_skip_only_unchanged_notes(tmp_path):
+    manager = create_note_snapshot_manager(
+        "sqlite", db_path=str(tmp_path / "note_snapshots.db")
+    )
+
+    async def main():
+        # 第一次看到的帖子需要爬取
+        assert not await manager.is_note_unchanged(_snapshot("10", "2"))
+        await manager.save_snapshot(_snapshot("10", "2"))
+        stored = await manager.note_snapshot_repo.load_snapshot("xhs", "note")
+
+        assert await manager.is_note_unchanged(_snapshot("10", "2"))
+        seen = await manager.note_snapshot_repo.load_snapshot("xhs", "note")
+        assert seen.updated_at == stored.updated_at
+        assert seen.seen_at >= stored.seen_at
+
+        # 评论数变化的帖子需要重新爬取
+        assert not await manager.is_note_unchanged(_snapshot("10", "3"))
+
+    run_async(main())
+
+
+def test_note_without_list_metadata_is_always_crawled(tmp_path):
+    manager = create_note_snapshot_manager(
+        "sqlite", db_path=str(tmp_path / "note_snapshots.db")
+    )
+
+    async def main():
+        await manager.save_snapshot(_snapshot("", ""))
+        return await manager.is_note_unchanged(_snapshot("", ""))
+
+    assert not run_async(main())
+
+
+def test_seen_time_update_does_not_overwrite_new_snapshot(tmp_path):
+    manager = create_note_snapshot_manager(
+        "sqlite", db_path=str(tmp_path / "note_snapshots.db")
+    )
+
+    async def main():
+        await manager.save_snapshot(_snapshot("10", "2"))
+        # 记录看到时间的同时保存了评论数变化后的新快照，新快照不能被旧快照覆盖
+        await asyncio.gather(
+            manager.is_note_unchanged(_snapshot("10", "2")),
+            manager.save_snapshot(_snapshot("10", "5")),
+        )
+        return await manager.note_snapshot_repo.load_snapshot("xhs", "note")
+
+    assert run_async(main()).comment_count == "5"
+
+
+def test_snapshot_is_saved_after_comments_are_crawled(tmp_path, monkeypatch):
+    manager = create_note_snapshot_manager(
+        "sqlite", db_path=str(tmp_path / "note_snapshots.db")
+    )
+    completion_records = NoteCompletionRecords()
+    monkeypatch.setattr(config, "ENABLE_GET_COMMENTS", True)
+
+    async def main():
+        await completion_records.record_after_comments(
+            "xhs", "note", partial(manager.save_snapshot, _snapshot("10", "2"))
+        )
+        # 评论还没爬完（例如中断）时不保存快照，下次运行会重新爬取
+        assert not await manager.is_note_unchanged(_snapshot("10", "2"))
+        await completion_records.complete_note("xhs", "note")
+        assert await manager.is_note_unchanged(_snapshot("10", "2"))
+        assert completion_records.pending_count == 0
+
+    run_async(main())
@@ -0,0 +1,97 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 有序并发映射测试，并发数受限，回调顺序和输入顺序一致
+import asyncio
+
+import pytest
+
+from pkg.pipeline import ordered_concurrent_map, ordered_concurrent_stream
+from test.async_utils import run_async
+
+
+def test_results_are_emitted_in_input_order_with_bounded_concurrency():
+    running = 0
+    max_running = 0
+    emitted = []
+
+    async def fetch(item: int):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        # 越靠前的数据越晚完成
+        await asyncio.sleep(0.01 * (5 - item))
+        running -= 1
+        return [item] * item
+
+    async def save(item: int, result):
+        emitted.append((item, result))
+
+    results = run_async(ordered_concurrent_map(fetch, list(range(5)), 2, on_result=save))
+
+    assert results == [[item] * item for item in range(5)]
+    assert emitted == [(item, [item] * item) for item in range(5)]
+    assert max_running == 2
+
+
+def test_error_cancels_pending_items():
+    started = []
+
+    async def fetch(item: int):
+        started.append(item)
+        if item == 0:
+            raise ValueError("boom")
+        await asyncio.sleep(1)
+        return item
+
+    async def main():
+        with pytest.raises(ValueError):
+            await ordered_concurrent_map(fetch, list(range(4)), 2)
+        await asyncio.sleep(0)
+        # 出错后未完成的任务全部取消，不会继续执行
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    run_async(main())
+    assert 3 not in started
+
+
+def test_stream_emits_head_item_immediately_and_keeps_input_order():
+    emitted = []
+
+    async def fetch_pages(item: int):
+        for page in range(2):
+            # 越靠前的数据越晚完成
+            await asyncio.sleep(0.01 * (3 - item))
+            yield item, page
+
+    async def main():
+        async for item, result in ordered_concurrent_stream(fetch_pages, list(range(3)), 3):
+            emitted.append((item, result))
+
+    run_async(main())
+    assert emitted == [(item, (item, page)) for item in range(3) for page in range(2)]
+
+
+def test_stream_raises_error_of_failed_item():
+    async def fetch_pages(item: int):
+        yield item
+        if item == 1:
+            raise ValueError("boom")
+
+    async def main():
+        emitted = []
+        with pytest.raises(ValueError):
+            async for item, _ in ordered_concurrent_stream(fetch_pages, list(range(3)), 2):
+                emitted.append(item)
+        return emitted
+
+    assert run_async(main()) == [0, 1]
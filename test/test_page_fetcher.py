@@ -0,0 +1,125 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 翻页测试，页码翻页并发请求并按顺序产出、遇到空页停止，游标翻页提前请求下一页
+import asyncio
+import math
+from contextlib import aclosing
+
+from pkg.pipeline import fetch_pages_concurrently, prefetch_cursor_pages
+from test.async_utils import run_async
+
+
+async def _collect(page_iterator):
+    async with aclosing(page_iterator) as pages:
+        return [page async for page in pages]
+
+
+def test_pages_are_yielded_in_order_until_first_empty_page():
+    requested = []
+
+    async def fetch_page(page: int):
+        requested.append(page)
+        # 越靠前的页越晚返回
+        await asyncio.sleep(0.01 * (10 - page))
+        return [page] if page <= 4 else []
+
+    pages = run_async(_collect(fetch_pages_concurrently(fetch_page, 1, concurrency=3)))
+
+    assert pages == [(page, [page]) for page in range(1, 5)]
+    # 第一页单独请求，之后最多提前请求 3 页
+    assert max(requested) <= 4 + 3
+
+
+def test_last_page_from_first_page_and_offset_step():
+    total = 45
+    page_size = 10
+
+    async def fetch_page(offset: int):
+        return {"total": total, "items": list(range(offset, min(offset + page_size, total)))}
+
+    pages = run_async(
+        _collect(
+            fetch_pages_concurrently(
+                fetch_page,
+                0,
+                concurrency=4,
+                page_step=page_size,
+                get_last_page=lambda res: (math.ceil(res["total"] / page_size) - 1) * page_size,
+                is_empty=lambda res: not res["items"],
+            )
+        )
+    )
+
+    assert [offset for offset, _ in pages] == [0, 10, 20, 30, 40]
+    assert sum(len(res["items"]) for _, res in pages) == total
+
+
+def test_stop_iteration_cancels_prefetched_pages():
+    async def fetch_page(page: int):
+        if page > 1:
+            await asyncio.sleep(10)
+        return [page]
+
+    async def main():
+        async with aclosing(fetch_pages_concurrently(fetch_page, 1, concurrency=3)) as pages:
+            async for page, _ in pages:
+                break
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return page
+
+    assert run_async(main()) == 1
+
+
+def test_cursor_prefetch_requests_next_page_while_current_is_processed():
+    events = []
+
+    async def fetch_page(cursor: int):
+        events.append(f"fetch {cursor}")
+        await asyncio.sleep(0)
+        return {"items": [cursor], "next": cursor + 1 if cursor < 3 else None}
+
+    async def main():
+        async with aclosing(
+            prefetch_cursor_pages(fetch_page, 1, lambda res: res["next"])
+        ) as pages:
+            async for page in pages:
+                await asyncio.sleep(0.01)
+                events.append(f"done {page['items'][0]}")
+
+    run_async(main())
+    assert events == ["fetch 1", "fetch 2", "done 1", "fetch 3", "done 2", "done 3"]
+
+
+def test_cursor_prefetch_is_cancelled_when_budget_is_reached():
+    cancelled = []
+
+    async def fetch_page(cursor: int):
+        try:
+            if cursor > 1:
+                await asyncio.sleep(10)
+            return {"items": [cursor], "next": cursor + 1}
+        except asyncio.CancelledError:
+            cancelled.append(cursor)
+            raise
+
+    async def main():
+        async with aclosing(
+            prefetch_cursor_pages(fetch_page, 1, lambda res: res["next"])
+        ) as pages:
+            async for _ in pages:
+                # 处理当前页期间下一页的请求已经发出
+                await asyncio.sleep(0)
+                break
+
+    run_async(main())
+    assert cancelled == [2]
@@ -0,0 +1,63 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 平台辅助参数缓存测试，重启后仍然命中，按账号隔离，请求失败和结构不符的值不会被复用
+from typing import Dict
+
+import pytest
+
+from pkg.cache.aux_cache import AuxCacheNamespace, create_platform_aux_cache
+from test.async_utils import run_async
+
+
+TOKEN_CACHE = AuxCacheNamespace("token", str, ttl=60)
+
+
+def test_cached_value_survives_restart_and_is_scoped_per_account(tmp_path):
+    db_path = str(tmp_path / "aux_cache.db")
+    load_calls = []
+
+    async def loader() -> str:
+        load_calls.append(1)
+        return f"token_{len(load_calls)}"
+
+    async def main():
+        aux_cache = create_platform_aux_cache("sqlite", db_path=db_path)
+        assert await aux_cache.get_or_load(TOKEN_CACHE, "dy", "a", "k", loader) == "token_1"
+
+        # 重启后从数据库文件读取，不再调用 loader
+        next_run_cache = create_platform_aux_cache("sqlite", db_path=db_path)
+        assert await next_run_cache.get_or_load(TOKEN_CACHE, "dy", "a", "k", loader) == "token_1"
+        assert await next_run_cache.get_or_load(TOKEN_CACHE, "dy", "b", "k", loader) == "token_2"
+        assert await next_run_cache.get(TOKEN_CACHE, "bili", "a", "k") is None
+
+    run_async(main())
+    assert len(load_calls) == 2
+
+
+def test_failed_loads_and_mismatched_values_are_not_reused(tmp_path):
+    aux_cache = create_platform_aux_cache("sqlite", db_path=str(tmp_path / "aux_cache.db"))
+    container_cache = AuxCacheNamespace("token", Dict[str, str], ttl=60)
+
+    async def failing_loader() -> str:
+        raise ValueError("request failed")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await aux_cache.get_or_load(TOKEN_CACHE, "dy", "", "k", failing_loader)
+        assert await aux_cache.get(TOKEN_CACHE, "dy", "", "k") is None
+
+        # 同名命名空间的值类型变化后，旧缓存视为未命中
+        await aux_cache.set(TOKEN_CACHE, "dy", "", "k", "token")
+        assert await aux_cache.get(container_cache, "dy", "", "k") is None
+
+    run_async(main())
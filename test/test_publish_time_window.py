@@ -0,0 +1,92 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 发布时间窗口测试
+import time
+from datetime import datetime
+
+import pytest
+
+import config
+from pkg.tools.publish_time_window import PublishTimeWindow, parse_time_bound
+
+
+def test_parse_time_bound():
+    assert parse_time_bound("") == 0
+    assert parse_time_bound("2024-01-02") == int(datetime(2024, 1, 2).timestamp())
+    assert parse_time_bound("2024-01-02 12:30:00") == int(
+        datetime(2024, 1, 2, 12, 30).timestamp()
+    )
+    assert parse_time_bound("2024-01-02", is_upper_bound=True) == int(
+        datetime(2024, 1, 2, 23, 59, 59).timestamp()
+    )
+    assert parse_time_bound("2024-01-02 12:30:00", is_upper_bound=True) == int(
+        datetime(2024, 1, 2, 12, 30).timestamp()
+    )
+    assert abs(parse_time_bound("7d") - (time.time() - 7 * 86400)) < 5
+    with pytest.raises(ValueError):
+        parse_time_bound("last week")
+
+
+def test_window_accepts_seconds_and_milliseconds():
+    since = parse_time_bound("2024-01-01")
+    until = parse_time_bound("2024-02-01")
+    window = PublishTimeWindow(since, until)
+    inside = since + 86400
+
+    assert window.contains(inside)
+    assert window.contains(str(inside * 1000))
+    assert not window.contains(until + 1)
+    assert not window.contains(since - 1)
+    # 发布时间未知的帖子无法判断，不跳过
+    assert window.contains("")
+
+    assert window.is_before_since((since - 1) * 1000)
+    assert not window.is_before_since(until + 1)
+    assert not PublishTimeWindow().enabled
+
+
+def test_date_only_until_includes_the_whole_day(monkeypatch):
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_SINCE", "2024-01-01")
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_UNTIL", "2024-01-31")
+    window = PublishTimeWindow.from_config()
+
+    assert window.contains(int(datetime(2024, 1, 31, 18).timestamp()))
+    assert window.contains(int(datetime(2024, 1, 31, 23, 59, 59).timestamp()) * 1000)
+    assert not window.contains(int(datetime(2024, 2, 1).timestamp()))
+
+
+def test_xhs_page_stops_at_since_by_last_fetched_note(monkeypatch):
+    from media_platform.xhs.processors.note_processor import NoteProcessor
+    from model.m_xhs import XhsNote
+
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_SINCE", "2024-01-01")
+    old_time = str(int(datetime(2023, 6, 1).timestamp()) * 1000)
+    new_time = str(int(datetime(2024, 6, 1).timestamp()) * 1000)
+    note_list = [
+        {"note_id": "pinned", "interact_info": {"sticky": True}},
+        {"note_id": "new"},
+        {"note_id": "old"},
+        {"note_id": "skipped"},
+    ]
+
+    # 置顶笔记和没有获取详情的笔记不参与判断
+    assert NoteProcessor.is_page_before_publish_time_since(
+        note_list, [XhsNote(note_id="new", time=new_time), XhsNote(note_id="old", time=old_time)]
+    )
+    assert not NoteProcessor.is_page_before_publish_time_since(
+        note_list, [XhsNote(note_id="pinned", time=old_time), XhsNote(note_id="new", time=new_time)]
+    )
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_SINCE", "")
+    assert not NoteProcessor.is_page_before_publish_time_since(
+        note_list, [XhsNote(note_id="old", time=old_time)]
+    )
@@ -0,0 +1,94 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 令牌桶请求限速测试
+import asyncio
+import time
+
+from pkg.rate_limit import RequestPacer, TokenBucket
+
+
+def test_token_bucket_rate_and_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 前2个令牌是突发容量，后4个按每秒20个的速率生成，约0.2秒
+    elapsed = asyncio.run(run())
+    assert 0.18 <= elapsed < 0.4
+
+
+def test_token_bucket_does_not_add_caller_work_time():
+    async def run():
+        bucket = TokenBucket(rate=10, burst=1)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+            # 模拟解析、存储耗时，这部分时间应该被令牌桶抵扣
+            await asyncio.sleep(0.05)
+        return time.monotonic() - start
+
+    # 固定 sleep 的方式是 4 * (0.1 + 0.05) = 0.6 秒，令牌桶是 3 * 0.1 + 0.05 = 0.35 秒
+    elapsed = asyncio.run(run())
+    assert elapsed < 0.5
+
+
+def test_request_pacer_shares_one_bucket_per_account():
+    pacer = RequestPacer(rate=1, burst=1, endpoint_rates={"comment": 0.5})
+    assert pacer.classify_endpoint("https://x.com/api/sns/web/v2/comment/page") == "comment"
+    assert pacer.classify_endpoint("https://x.com/x/v2/reply/wbi/main") == "comment"
+    assert pacer.classify_endpoint("https://x.com/api/sns/web/v1/search/notes") == "search"
+    assert pacer.classify_endpoint("https://x.com/graphql", "visionSearchPhoto") == "search"
+    assert pacer.classify_endpoint("https://x.com/api/sns/web/v1/feed") == "default"
+
+    bucket = pacer.get_account_bucket("xhs", "account_1")
+    assert bucket.rate == 1
+    assert pacer.get_account_bucket("xhs", "account_1") is bucket
+    assert pacer.get_account_bucket("xhs", "account_2") is not bucket
+    assert pacer.get_account_bucket("dy", "account_1") is not bucket
+    # 只有单独配置了速率的接口类型才有额外的令牌桶
+    assert pacer.get_endpoint_bucket("xhs", "account_1", "comment").rate == 0.5
+    assert pacer.get_endpoint_bucket("xhs", "account_1", "search") is None
+
+    async def run():
+        start = time.monotonic()
+        # 不同账号各自有令牌，不会互相等待
+        await pacer.acquire("ks", "a", "https://x.com/search")
+        await pacer.acquire("ks", "b", "https://x.com/search")
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) < 0.1
+
+
+def test_request_pacer_mixed_endpoints_share_account_rate():
+    pacer = RequestPacer(rate=10, burst=1, endpoint_rates={})
+
+    async def run():
+        start = time.monotonic()
+        for url in ["/search", "/comment", "/feed", "/search", "/comment", "/feed"]:
+            await pacer.acquire("xhs", "a", f"https://x.com{url}")
+        return time.monotonic() - start
+
+    # 6 个不同类型的请求共享账号的令牌桶，第1个用突发容量，后5个按每秒10个生成，约0.5秒
+    assert asyncio.run(run()) >= 0.45
+
+
+def test_request_pacer_reads_rate_on_each_acquire(monkeypatch):
+    import config
+
+    pacer = RequestPacer(burst=1, endpoint_rates={})
+    monkeypatch.setattr(config, "CRAWLER_PACING_RATE", 1)
+    assert pacer.get_account_bucket("xhs", "a").rate == 1
+    monkeypatch.setattr(config, "CRAWLER_PACING_RATE", 5)
+    assert pacer.get_account_bucket("xhs", "a").rate == 5
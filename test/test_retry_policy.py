@@ -0,0 +1,111 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+# -*- coding: utf-8 -*-
+# @Desc    : 请求重试策略测试
+import httpx
+import pytest
+from tenacity import RetryError
+
+import config
+from media_platform.xhs.exception import AccessFrequencyError, NeedVerifyError, SignError
+from pkg.retry import (
+    RetryBudget,
+    RetryClass,
+    TooManyRequestsError,
+    classify_exception,
+    raise_for_retry_after,
+    request_retry,
+)
+from test.async_utils import run_async
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(config, "RETRY_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(config, "RETRY_BACKOFF_MAX", 0.01)
+    monkeypatch.setattr(config, "RETRY_AFTER_MAX_WAIT", 0.05)
+
+
+def _flaky(exceptions, budget=None, max_attempts=5):
+    calls = []
+
+    @request_retry(max_attempts=max_attempts, budget=budget or RetryBudget(0))
+    async def request():
+        calls.append(1)
+        if len(calls) <= len(exceptions):
+            raise exceptions[len(calls) - 1]
+        return "ok"
+
+    return request, calls
+
+
+def test_classify_platform_exceptions():
+    assert classify_exception(SignError("sign")) == RetryClass.FATAL
+    assert classify_exception(NeedVerifyError("captcha")) == RetryClass.ACCOUNT
+    assert classify_exception(AccessFrequencyError("freq")) == RetryClass.TRANSIENT
+    assert classify_exception(httpx.ConnectTimeout("timeout")) == RetryClass.TRANSIENT
+
+
+def test_transient_errors_are_retried():
+    request, calls = _flaky([httpx.ConnectTimeout("t"), AccessFrequencyError("f")])
+    assert run_async(request()) == "ok"
+    assert len(calls) == 3
+
+
+def test_fatal_errors_fail_fast_with_original_exception():
+    request, calls = _flaky([SignError("sign")])
+    with pytest.raises(SignError):
+        run_async(request())
+    assert len(calls) == 1
+
+
+def test_account_errors_fail_over_immediately():
+    request, calls = _flaky([NeedVerifyError("captcha")])
+    with pytest.raises(RetryError):
+        run_async(request())
+    assert len(calls) == 1
+
+
+def test_retry_budget_limits_total_retries():
+    budget = RetryBudget(max_retries=2)
+    request, calls = _flaky([httpx.ConnectError("c")] * 10, budget=budget)
+    # 预算用完后抛出原始异常，不是 RetryError，调用方不会因此更换账号
+    with pytest.raises(httpx.ConnectError):
+        run_async(request())
+    assert len(calls) == 3
+    assert budget.exhausted
+
+
+def test_max_attempts_still_fails_over_with_retry_error():
+    request, calls = _flaky([httpx.ConnectError("c")] * 10, max_attempts=3)
+    with pytest.raises(RetryError):
+        run_async(request())
+    assert len(calls) == 3
+
+
+def test_retry_settings_are_read_per_call(monkeypatch):
+    request, calls = _flaky([httpx.ConnectError("c")] * 10, max_attempts=None)
+    monkeypatch.setattr(config, "RETRY_MAX_ATTEMPTS", 2)
+    with pytest.raises(RetryError):
+        run_async(request())
+    assert len(calls) == 2
+
+
+def test_retry_after_header():
+    response = httpx.Response(429, headers={"Retry-After": "7"})
+    with pytest.raises(TooManyRequestsError) as exc_info:
+        raise_for_retry_after(response)
+    assert exc_info.value.retry_after == 7
+    raise_for_retry_after(httpx.Response(200))
+
+    request, calls = _flaky([TooManyRequestsError("429", retry_after=0.01)])
+    assert run_async(request()) == "ok"
+    assert len(calls) == 2
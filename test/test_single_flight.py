@@ -0,0 +1,87 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 相同请求合并测试，并发的相同请求只发送一次，不同账号不合并，发起请求的协程被取消不影响其他等待者
+import asyncio
+
+import pytest
+
+from pkg.single_flight import SingleFlight, coalesce_requests
+from test.async_utils import run_async
+
+
+class FakeClient:
+    def __init__(self, account_name: str):
+        self._pacing_account_name = account_name
+        self.sent_requests = []
+
+    @coalesce_requests("xhs")
+    async def get(self, uri: str, params=None):
+        self.sent_requests.append((uri, params))
+        await asyncio.sleep(0.01)
+        return {"uri": uri, "params": params}
+
+
+def test_concurrent_identical_requests_are_sent_once():
+    client = FakeClient("a")
+    other_account_client = FakeClient("b")
+
+    async def main():
+        return await asyncio.gather(
+            client.get("/user", {"id": "1", "type": "x"}),
+            client.get("/user", params={"type": "x", "id": "1"}),
+            client.get("/user", {"id": "2"}),
+            other_account_client.get("/user", {"id": "1", "type": "x"}),
+        )
+
+    results = run_async(main())
+    assert len(client.sent_requests) == 2
+    assert len(other_account_client.sent_requests) == 1
+    assert results[0] == results[1]
+    # 后加入的等待者拿到的是副本
+    assert results[0] is not results[1]
+
+
+def test_followers_share_errors_and_survive_leader_cancellation():
+    single_flight = SingleFlight()
+    call_count = 0
+
+    async def failing_request():
+        nonlocal call_count
+        call_count += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("request failed")
+
+    async def slow_request():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        results = await asyncio.gather(
+            single_flight.do("fail", failing_request),
+            single_flight.do("fail", failing_request),
+            return_exceptions=True,
+        )
+        assert call_count == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+        leader = asyncio.ensure_future(single_flight.do("slow", slow_request))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(single_flight.do("slow", slow_request))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert single_flight.in_flight_count == 0
+
+    run_async(main())
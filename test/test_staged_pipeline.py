@@ -0,0 +1,103 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多阶段流水线测试
+import asyncio
+import random
+
+import pytest
+
+from pkg.pipeline import PipelineStage, StagedPipeline
+
+
+async def _pages(count: int, events=None):
+    for page in range(1, count + 1):
+        if events is not None:
+            events.append(("produce", page))
+        yield page
+
+
+def test_pipeline_done_callback_in_production_order():
+    done_pages = []
+
+    async def detail(page):
+        await asyncio.sleep(random.random() / 100)
+        return page * 10
+
+    async def comments(value):
+        await asyncio.sleep(random.random() / 100)
+
+    async def on_done(page):
+        done_pages.append(page)
+
+    pipeline = StagedPipeline(
+        producer=_pages(20),
+        stages=[
+            PipelineStage(name="detail", handler=detail, workers=3, queue_size=2),
+            PipelineStage(name="comments", handler=comments, workers=3, queue_size=2),
+        ],
+        on_item_done=on_done,
+    )
+    asyncio.run(pipeline.run())
+    assert done_pages == list(range(1, 21))
+
+
+def test_pipeline_overlaps_producer_with_slow_stage_and_is_bounded():
+    events = []
+
+    async def comments(page):
+        events.append(("consume", page))
+        await asyncio.sleep(0.01)
+
+    pipeline = StagedPipeline(
+        producer=_pages(6, events),
+        stages=[PipelineStage(name="comments", handler=comments, queue_size=1)],
+    )
+    asyncio.run(pipeline.run())
+
+    # 翻页在第一页评论处理完之前就已经开始了，但最多领先 队列容量+处理中 页
+    first_consume = events.index(("consume", 1))
+    produced_before_done = [e for e in events[: first_consume + 1] if e[0] == "produce"]
+    assert len(produced_before_done) >= 1
+    for i, event in enumerate(events):
+        if event[0] != "produce":
+            continue
+        consumed = len([e for e in events[:i] if e[0] == "consume"])
+        assert event[1] - consumed <= 3
+
+
+def test_pipeline_error_cancels_and_propagates():
+    done_pages = []
+
+    async def detail(page):
+        if page == 3:
+            raise RuntimeError("boom")
+        return page
+
+    async def comments(page):
+        await asyncio.sleep(0.01)
+
+    async def on_done(page):
+        done_pages.append(page)
+
+    pipeline = StagedPipeline(
+        producer=_pages(10),
+        stages=[
+            PipelineStage(name="detail", handler=detail),
+            PipelineStage(name="comments", handler=comments),
+        ],
+        on_item_done=on_done,
+    )
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.run())
+    # 失败页以及之后的页都不会被标记完成，检查点不会越过失败页
+    assert all(page < 3 for page in done_pages)
@@ -0,0 +1,77 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 启动导入耗时回归测试，基于 python -X importtime
+import os
+import subprocess
+import sys
+from typing import Dict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import main 的累计耗时预算（微秒），可通过环境变量放宽，慢机器上的CI可以调大
+STARTUP_IMPORT_BUDGET_US = int(os.getenv("STARTUP_IMPORT_BUDGET_US", 800_000))
+
+# 启动阶段不应该被导入的重依赖
+HEAVY_MODULES = ["pandas", "PIL", "aiomysql", "redis", "parsel", "httpx"]
+
+
+def _run_importtime(code: str) -> Dict[str, int]:
+    """
+    在子进程中执行代码，解析 -X importtime 的输出
+    Returns:
+        Dict[str, int]: 模块名 -> 累计导入耗时（微秒）
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, module_name = line.split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        cumulative[module_name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def test_import_main_skips_platforms_and_heavy_deps():
+    modules = _run_importtime("import main")
+    assert "main" in modules
+    loaded_platforms = [m for m in modules if m.startswith("media_platform.")]
+    assert loaded_platforms == []
+    for heavy_module in HEAVY_MODULES:
+        assert heavy_module not in modules, f"{heavy_module} imported at startup"
+
+
+def test_import_main_within_budget():
+    modules = _run_importtime("import main")
+    assert modules["main"] <= STARTUP_IMPORT_BUDGET_US, (
+        f"import main took {modules['main']}us, budget {STARTUP_IMPORT_BUDGET_US}us"
+    )
+
+
+def test_create_single_platform_only_imports_that_platform():
+    modules = _run_importtime(
+        "import main; main.CrawlerFactory.get_crawler_class('xhs')"
+    )
+    loaded_platforms = {
+        m.split(".")[1] for m in modules if m.startswith("media_platform.")
+    }
+    assert loaded_platforms == {"xhs"}
+    for heavy_module in ["pandas", "PIL", "aiomysql", "redis"]:
+        assert heavy_module not in modules, f"{heavy_module} imported by xhs crawler"
@@ -0,0 +1,91 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多进程模式的任务分片、分片检查点和运行统计测试
+import asyncio
+import os
+import time
+
+import config
+import supervisor
+from base.base_crawler import AbstractStore
+from model.m_checkpoint import Checkpoint
+from pkg.stats import enter_crawl_stats_scope, merge_crawl_stats
+from repo.checkpoint import create_checkpoint_manager
+from test.async_utils import run_async
+
+
+def test_split_crawler_job_by_keywords_and_ids():
+    shard_jobs = supervisor.split_crawler_job(
+        {"PLATFORM": "xhs", "CRAWLER_TYPE": "search", "KEYWORDS": "a, b,c,d,e", "SPECIFIED_CHECKPOINT_ID": "xhs_search_1"},
+        2,
+    )
+    assert [job["KEYWORDS"] for job in shard_jobs] == ["a,c,e", "b,d"]
+    assert [job["SPECIFIED_CHECKPOINT_ID"] for job in shard_jobs] == [
+        "xhs_search_1_shard0of2",
+        "xhs_search_1_shard1of2",
+    ]
+
+    shard_jobs = supervisor.split_crawler_job(
+        {"PLATFORM": "dy", "CRAWLER_TYPE": "detail", "DY_SPECIFIED_ID_LIST": ["1", "2"]}, 4
+    )
+    assert [job["DY_SPECIFIED_ID_LIST"] for job in shard_jobs] == [["1"], ["2"]]
+
+    # 无法分片的任务保持原样
+    homefeed_job = {"PLATFORM": "xhs", "CRAWLER_TYPE": "homefeed"}
+    assert supervisor.split_crawler_job(homefeed_job, 4) == [homefeed_job]
+    single_keyword_job = {"PLATFORM": "xhs", "CRAWLER_TYPE": "search", "KEYWORDS": "a"}
+    assert supervisor.split_crawler_job(single_keyword_job, 4) == [single_keyword_job]
+
+
+def test_shard_checkpoints_use_specified_id_and_are_not_latest(tmp_path):
+    checkpoint_manager = create_checkpoint_manager("file", cache_dir=str(tmp_path))
+
+    async def run():
+        latest = await checkpoint_manager.save_checkpoint(Checkpoint(platform="xhs", mode="search"))
+        # 把普通检查点的修改时间提前，让分片检查点成为最近修改的文件
+        os.utime(tmp_path / f"{latest.id}.json", (time.time() - 10, time.time() - 10))
+
+        config.enter_config_scope({"SPECIFIED_CHECKPOINT_ID": "xhs_search_1_shard0of2"})
+        shard = await checkpoint_manager.save_checkpoint(Checkpoint(platform="xhs", mode="search"))
+        assert shard.id == "xhs_search_1_shard0of2"
+        return latest, await checkpoint_manager.load_checkpoint(platform="xhs", mode="search")
+
+    latest, loaded = run_async(run())
+    assert loaded.id == latest.id
+
+
+def test_store_calls_are_counted_per_job():
+    class DummyStore(AbstractStore):
+        async def store_content(self, content_item):
+            pass
+
+        async def store_comment(self, comment_item):
+            pass
+
+        async def store_creator(self, creator):
+            pass
+
+    async def crawler_job(comment_count: int):
+        crawl_stats = enter_crawl_stats_scope()
+        store = DummyStore()
+        await store.store_content({})
+        for _ in range(comment_count):
+            await store.store_comment({})
+        return crawl_stats.snapshot()
+
+    async def run():
+        return await asyncio.gather(crawler_job(1), crawler_job(2))
+
+    stats_list = run_async(run())
+    assert stats_list == [{"contents": 1, "comments": 1}, {"contents": 1, "comments": 2}]
+    assert merge_crawl_stats(stats_list) == {"contents": 2, "comments": 3}
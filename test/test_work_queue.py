@@ -0,0 +1,257 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 分布式工作队列测试，redis 实现需要本地 redis，连接不上时跳过
+import asyncio
+import uuid
+
+import pytest
+
+from pkg.work_queue import WorkItem, WorkQueueWorker, create_work_queue
+from test.async_utils import run_async
+
+
+def _redis_available() -> bool:
+    try:
+        from pkg.cache.redis_cache import get_redis_client
+
+        return bool(get_redis_client().ping())
+    except Exception:
+        return False
+
+
+@pytest.fixture(params=["memory", "redis"])
+def work_queue_factory(request):
+    if request.param == "redis" and not _redis_available():
+        pytest.skip("redis is not available")
+    # 每个用例使用独立的队列名称，避免 redis 中残留的数据互相影响
+    name = f"test_{uuid.uuid4().hex}"
+    return lambda **kwargs: create_work_queue(name, request.param, **kwargs)
+
+
+def test_enqueue_is_idempotent_and_ack_finishes_item(work_queue_factory):
+    work_queue = work_queue_factory(lease_seconds=60, max_deliveries=3)
+
+    async def run():
+        assert await work_queue.enqueue(WorkItem(id="note:1", kind="note", payload={"note_id": "1"}))
+        assert not await work_queue.enqueue(WorkItem(id="note:1", kind="note"))
+
+        item = await work_queue.lease()
+        assert item.id == "note:1" and item.payload == {"note_id": "1"} and item.attempts == 1
+        assert await work_queue.lease() is None
+        assert not await work_queue.is_drained()
+
+        assert await work_queue.ack(item)
+        assert await work_queue.is_drained()
+        # 已完成的任务也不会重复入队
+        assert not await work_queue.enqueue(WorkItem(id="note:1", kind="note"))
+
+    run_async(run())
+
+
+def test_drained_queue_is_cleared_for_the_next_run(work_queue_factory):
+    work_queue = work_queue_factory(lease_seconds=60, max_deliveries=2)
+
+    async def drain():
+        while True:
+            item = await work_queue.lease()
+            if item is None:
+                return
+            if item.id == "note:2":
+                await work_queue.nack(item, "note deleted")
+            else:
+                await work_queue.ack(item)
+
+    async def run():
+        assert await work_queue.enqueue(WorkItem(id="note:1", kind="note"))
+        assert await work_queue.enqueue(WorkItem(id="note:2", kind="note"))
+        item = await work_queue.lease()
+        # 还有任务没处理完时不清空
+        assert not await work_queue.clear_if_drained()
+        await work_queue.nack(item, "retry")
+        await drain()
+        assert await work_queue.is_drained()
+        assert [i.id for i in await work_queue.list_dead_letters()] == ["note:2"]
+        assert await work_queue.clear_if_drained()
+        assert await work_queue.list_dead_letters() == []
+
+        # 下一次运行相同的种子任务重新入队，队列不会直接判定为已处理完
+        assert await work_queue.enqueue(WorkItem(id="note:1", kind="note"))
+        assert not await work_queue.is_drained()
+        item = await work_queue.lease()
+        assert item.id == "note:1" and item.attempts == 1
+
+    run_async(run())
+
+
+def test_nack_retries_then_dead_letters(work_queue_factory):
+    work_queue = work_queue_factory(lease_seconds=60, max_deliveries=2)
+
+    async def run():
+        await work_queue.enqueue(WorkItem(id="creator:1", kind="creator"))
+        item = await work_queue.lease()
+        assert await work_queue.nack(item, "first error")
+
+        item = await work_queue.lease()
+        assert item.attempts == 2
+        assert await work_queue.nack(item, "second error")
+
+        assert await work_queue.lease() is None
+        assert await work_queue.is_drained()
+        dead_items = await work_queue.list_dead_letters()
+        assert [(i.id, i.last_error) for i in dead_items] == [("creator:1", "second error")]
+
+    run_async(run())
+
+
+def test_expired_lease_is_redelivered_and_stale_ack_rejected(work_queue_factory):
+    work_queue = work_queue_factory(lease_seconds=0.05, max_deliveries=3)
+
+    async def run():
+        await work_queue.enqueue(WorkItem(id="comment_thread:1", kind="comment_thread"))
+        stale_item = await work_queue.lease()
+        await asyncio.sleep(0.1)
+
+        item = await work_queue.lease(lease_seconds=60)
+        assert item.id == stale_item.id and item.attempts == 2
+        # 租约过期后原消费者不能再确认或退回
+        assert not await work_queue.ack(stale_item)
+        assert not await work_queue.nack(stale_item)
+        assert await work_queue.extend_lease(item, 60)
+        assert await work_queue.ack(item)
+        assert await work_queue.is_drained()
+
+    run_async(run())
+
+
+def test_worker_drains_queue_including_follow_up_items(work_queue_factory):
+    work_queue = work_queue_factory(lease_seconds=60, max_deliveries=2)
+    processed = []
+
+    async def handle_creator(item: WorkItem):
+        for note_id in ["1", "2"]:
+            await work_queue.enqueue(WorkItem(id=f"note:{note_id}", kind="note", payload={"note_id": note_id}))
+        processed.append(item.id)
+
+    async def handle_note(item: WorkItem):
+        if item.payload["note_id"] == "2":
+            raise ValueError("note deleted")
+        processed.append(item.id)
+
+    async def run():
+        await work_queue.enqueue(WorkItem(id="creator:1", kind="creator"))
+        await work_queue.enqueue(WorkItem(id="unknown:1", kind="unknown"))
+        worker = WorkQueueWorker(
+            work_queue, {"creator": handle_creator, "note": handle_note}, concurrency=2, poll_interval=0.01
+        )
+        await worker.run_until_drained()
+        return await work_queue.list_dead_letters()
+
+    dead_items = run_async(run())
+    assert sorted(processed) == ["creator:1", "note:1"]
+    assert sorted(item.id for item in dead_items) == ["note:2", "unknown:1"]
+
+
+def test_comment_thread_item_uses_checkpoint_of_enqueuing_node(tmp_path):
+    from media_platform.xhs.handlers.base_handler import BaseHandler
+    from model.m_checkpoint import Checkpoint
+    from repo.checkpoint import create_checkpoint_manager
+
+    class FakeCommentProcessor:
+        def __init__(self):
+            self.calls = []
+
+        async def get_comments_async_task(self, note_id, xsec_token="", checkpoint_id=""):
+            self.calls.append((note_id, checkpoint_id))
+            await checkpoint_manager.update_note_comment_cursor(checkpoint_id, note_id, "next")
+
+    class Handler(BaseHandler):
+        async def handle(self):
+            return None
+
+    checkpoint_manager = create_checkpoint_manager("file", cache_dir=str(tmp_path))
+    comment_processor = FakeCommentProcessor()
+    handler = Handler(None, checkpoint_manager, None, comment_processor)
+
+    async def run():
+        origin = await checkpoint_manager.save_checkpoint(Checkpoint(platform="xhs", mode="detail"))
+        local = await checkpoint_manager.save_checkpoint(Checkpoint(platform="xhs", mode="detail"))
+        shared_item = WorkItem(
+            id="comment_thread:1", kind="comment_thread",
+            payload={"note_id": "1", "checkpoint_id": origin.id},
+        )
+        unknown_item = WorkItem(
+            id="comment_thread:2", kind="comment_thread",
+            payload={"note_id": "2", "checkpoint_id": "other-node-checkpoint"},
+        )
+        await handler.process_comment_thread_work_item(local.id, shared_item)
+        await handler.process_comment_thread_work_item(local.id, unknown_item)
+        return (
+            origin.id,
+            local.id,
+            await checkpoint_manager.get_note_comment_cursor(origin.id, "1"),
+            await checkpoint_manager.get_note_comment_cursor(local.id, "2"),
+        )
+
+    origin_id, local_id, shared_cursor, local_cursor = run_async(run())
+    # 共享存储中能加载到入队机器的检查点时使用它，否则使用本机检查点，并且都能记录评论游标
+    assert comment_processor.calls == [("1", origin_id), ("2", local_id)]
+    assert shared_cursor == "next" and local_cursor == "next"
+
+
+def test_note_item_goes_through_note_list_filters(tmp_path, monkeypatch):
+    import config
+    from media_platform.xhs.exception import DataFetchError
+    from media_platform.xhs.handlers.base_handler import BaseHandler
+    from media_platform.xhs.processors.note_processor import NoteProcessor
+    from model.m_checkpoint import Checkpoint
+    from model.m_xhs import XhsNote
+    from repo.checkpoint import create_checkpoint_manager
+
+    monkeypatch.setattr(config, "ENABLE_GET_COMMENTS", True)
+    monkeypatch.setattr(config, "ENABLE_NOTE_DEDUP", False)
+    monkeypatch.setattr(config, "ENABLE_NOTE_FRESHNESS_CHECK", False)
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_SINCE", "2024-01-01")
+    monkeypatch.setattr(config, "CRAWLER_PUBLISH_TIME_UNTIL", "")
+
+    class FakeXhsClient:
+        async def get_note_by_id(self, note_id, xsec_source, xsec_token):
+            if note_id == "old":
+                return XhsNote(note_id=note_id, time="1672531200000")
+            return None
+
+        async def get_note_by_id_from_html(self, note_id, xsec_source, xsec_token):
+            return None
+
+    class Handler(BaseHandler):
+        async def handle(self):
+            return None
+
+    checkpoint_manager = create_checkpoint_manager("file", cache_dir=str(tmp_path))
+    note_processor = NoteProcessor(FakeXhsClient(), checkpoint_manager, asyncio.Semaphore(1))
+    handler = Handler(None, checkpoint_manager, note_processor, None)
+    handler.work_queue = create_work_queue(f"test_{uuid.uuid4().hex}", "memory")
+
+    async def run():
+        checkpoint = await checkpoint_manager.save_checkpoint(Checkpoint(platform="xhs", mode="detail"))
+        # 发布时间窗口外的帖子不保存，也不爬评论
+        await handler.process_note_work_item(
+            checkpoint.id, BaseHandler.make_note_work_item({"note_id": "old"}, checkpoint.id)
+        )
+        # 详情获取失败时抛出异常，任务重新投递
+        with pytest.raises(DataFetchError):
+            await handler.process_note_work_item(
+                checkpoint.id, BaseHandler.make_note_work_item({"note_id": "missing"}, checkpoint.id)
+            )
+        return await handler.work_queue.lease()
+
+    assert run_async(run()) is None
@@ -10,13 +10,15 @@
 
 
 from contextvars import ContextVar
+from typing import TYPE_CHECKING
 
-import aiomysql  # type: ignore
+if TYPE_CHECKING:
+    import aiomysql  # type: ignore
 
-from async_db import AsyncMysqlDB
+    from async_db import AsyncMysqlDB
 
 request_keyword_var: ContextVar[str] = ContextVar("request_keyword", default="")
 crawler_type_var: ContextVar[str] = ContextVar("crawler_type", default="")
-media_crawler_db_var: ContextVar[AsyncMysqlDB] = ContextVar("media_crawler_db_var")
-db_conn_pool_var: ContextVar[aiomysql.Pool] = ContextVar("db_conn_pool_var")
+media_crawler_db_var: "ContextVar[AsyncMysqlDB]" = ContextVar("media_crawler_db_var")
+db_conn_pool_var: "ContextVar[aiomysql.Pool]" = ContextVar("db_conn_pool_var")
 source_keyword_var: ContextVar[str] = ContextVar("source_keyword", default="")
\ No newline at end of file
@@ -248,9 +248,69 @@ def load_mysql_data():
         # Database might not be available or table doesn't exist
         return []
 
+def get_daemon_api_url():
+    """Crawl daemon API (python daemon.py) address, same DAEMON_API_HOST/DAEMON_API_PORT config the daemon listens on"""
+    import config
+
+    return f"http://{config.DAEMON_API_HOST}:{config.DAEMON_API_PORT}"
+
+
+class DaemonJobProcess:
+    """Track a job submitted to the crawl daemon, same poll()/returncode interface as a subprocess"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._returncode = None
+
+    def poll(self):
+        try:
+            response = httpx.get(f"{get_daemon_api_url()}/jobs/{self.job_id}", timeout=5)
+            job_status = response.json().get("status")
+        except Exception:
+            return None
+        if job_status in ("pending", "running"):
+            return None
+        self._returncode = 0 if job_status == "succeeded" else 1
+        return self._returncode
+
+    @property
+    def returncode(self):
+        return self._returncode
+
+    def cancel(self):
+        httpx.post(f"{get_daemon_api_url()}/jobs/{self.job_id}/cancel", timeout=5)
+
+
+def submit_daemon_job(platform, crawler_type, keywords, max_notes, enable_comments):
+    """Submit the crawl job to the crawl daemon, return None if the daemon is not running"""
+    job_params = {
+        "platform": platform,
+        "crawler_type": crawler_type,
+        "config_overrides": {
+            "KEYWORDS": keywords,
+            "CRAWLER_MAX_NOTES_COUNT": max_notes,
+            "ENABLE_GET_COMMENTS": enable_comments,
+        },
+    }
+    try:
+        response = httpx.post(f"{get_daemon_api_url()}/jobs", json=job_params, timeout=5)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        st.error(f"Crawl daemon rejected the job: {response.json().get('error')}")
+        return None
+    return DaemonJobProcess(response.json()["id"])
+
+
 def start_crawler(platform, crawler_type, keywords, max_notes, enable_comments):
     """Start the crawler process"""
     try:
+        # Prefer the long-lived crawl daemon: pools stay warm and no config file rewrite is needed
+        daemon_job = submit_daemon_job(platform, crawler_type, keywords, max_notes, enable_comments)
+        if daemon_job:
+            st.success(f"✅ Job submitted to crawl daemon: {daemon_job.job_id}")
+            return daemon_job
+
         # Update config file
         if not update_config_file(keywords, max_notes, enable_comments, platform, crawler_type):
             return False
@@ -673,22 +733,16 @@ python app.py""", language="bash")
     
     with col1:
         if st.button("▶️ Start Crawling", disabled=not can_crawl or st.session_state.crawling, use_container_width=True):
-            # Update config with user settings
-            if update_config_file(keywords, max_notes, enable_comments, platform, crawler_type):
-                st.success("✅ Configuration updated!")
-                
-                # Start crawler
-                process = start_crawler(platform, crawler_type, keywords, max_notes, enable_comments)
-                if process:
-                    st.session_state.process = process
-                    st.session_state.crawling = True
-                    st.session_state.last_update = time.time()
-                    st.success("🚀 Crawler started! Check the 'Data Viewer' tab to see results.")
-                    st.info("💡 The crawler is running in the background. Refresh this page to see updates.")
-                else:
-                    st.error("❌ Failed to start crawler. Check terminal for errors.")
+            # Start crawler (submits to the crawl daemon if running, otherwise updates the config file and spawns main.py)
+            process = start_crawler(platform, crawler_type, keywords, max_notes, enable_comments)
+            if process:
+                st.session_state.process = process
+                st.session_state.crawling = True
+                st.session_state.last_update = time.time()
+                st.success("🚀 Crawler started! Check the 'Data Viewer' tab to see results.")
+                st.info("💡 The crawler is running in the background. Refresh this page to see updates.")
             else:
-                st.error("❌ Failed to update configuration file.")
+                st.error("❌ Failed to start crawler. Check terminal for errors.")
     
     # Show crawler status
     crawler_status = check_crawler_status()
@@ -720,6 +774,10 @@ python app.py""", language="bash")
         if hasattr(st.session_state.process, 'poll'):
             if st.session_state.process.poll() is None:
                 st.info("🔄 Crawler is running...")
+                if isinstance(st.session_state.process, DaemonJobProcess):
+                    if st.button("⏹️ Cancel Job"):
+                        st.session_state.process.cancel()
+                        st.rerun()
                 if time.time() - st.session_state.last_update > 5:
                     st.session_state.last_update = time.time()
                     st.rerun()